@@ -0,0 +1,38 @@
+﻿/* =========================================================
+   Claves de idempotencia para la cola offline (SOFTWARE/cola_offline.py)
+   - Cada escritura encolada en el equipo de campo lleva un GUID propio.
+   - Al sincronizar, las filas cuya clave ya existe no se vuelven a
+     insertar: un reintento (corte a mitad de lote, respuesta perdida)
+     no duplica sesiones de reporte_cosecha, reportes ni actividades.
+   - Índices únicos filtrados: las filas escritas sin cola (clave NULL)
+     no se ven afectadas.
+   ========================================================= */
+USE AgroScanDB;
+GO
+
+IF COL_LENGTH('dbo.reporte_cosecha','clave_idem') IS NULL
+  ALTER TABLE dbo.reporte_cosecha ADD clave_idem UNIQUEIDENTIFIER NULL;
+IF COL_LENGTH('dbo.reportes','clave_idem') IS NULL
+  ALTER TABLE dbo.reportes ADD clave_idem UNIQUEIDENTIFIER NULL;
+IF COL_LENGTH('dbo.actividad_campo','clave_idem') IS NULL
+  ALTER TABLE dbo.actividad_campo ADD clave_idem UNIQUEIDENTIFIER NULL;
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name='UX_repC_clave_idem' AND object_id=OBJECT_ID('dbo.reporte_cosecha'))
+  CREATE UNIQUE INDEX UX_repC_clave_idem ON dbo.reporte_cosecha(clave_idem) WHERE clave_idem IS NOT NULL;
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name='UX_reportes_clave_idem' AND object_id=OBJECT_ID('dbo.reportes'))
+  CREATE UNIQUE INDEX UX_reportes_clave_idem ON dbo.reportes(clave_idem) WHERE clave_idem IS NOT NULL;
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name='UX_actividad_campo_clave_idem' AND object_id=OBJECT_ID('dbo.actividad_campo'))
+  CREATE UNIQUE INDEX UX_actividad_campo_clave_idem ON dbo.actividad_campo(clave_idem) WHERE clave_idem IS NOT NULL;
+GO
+
+-- Verificación: no debe devolver filas
+SELECT 'reporte_cosecha' AS tabla, clave_idem, COUNT(*) AS n FROM dbo.reporte_cosecha
+WHERE clave_idem IS NOT NULL GROUP BY clave_idem HAVING COUNT(*) > 1
+UNION ALL
+SELECT 'reportes', clave_idem, COUNT(*) FROM dbo.reportes
+WHERE clave_idem IS NOT NULL GROUP BY clave_idem HAVING COUNT(*) > 1
+UNION ALL
+SELECT 'actividad_campo', clave_idem, COUNT(*) FROM dbo.actividad_campo
+WHERE clave_idem IS NOT NULL GROUP BY clave_idem HAVING COUNT(*) > 1;
+GO
@@ -0,0 +1,19 @@
+﻿/* =========================================================
+   Índices para la paginación por clave (keyset) de reportes
+   - listar_reportes_pagina(usuario_id=...) usa IX_reportes_usuario_fecha
+     (usuario_id, fecha DESC); el id desempata con la clave del clúster.
+   - listar_reportes_pagina() sin usuario (supervisor) usa este índice:
+     ORDER BY fecha DESC, id DESC sin ordenar toda la tabla.
+   - buscar_reportes(estado=...) (explorador del supervisor) usa
+     IX_reportes_estado_fecha: los pendientes salen ya en orden.
+   ========================================================= */
+USE AgroScanDB;
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name='IX_reportes_fecha_id' AND object_id=OBJECT_ID('dbo.reportes'))
+  CREATE INDEX IX_reportes_fecha_id ON dbo.reportes(fecha DESC, id DESC);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name='IX_reportes_estado_fecha' AND object_id=OBJECT_ID('dbo.reportes'))
+  CREATE INDEX IX_reportes_estado_fecha ON dbo.reportes(estado_id, fecha DESC, id DESC) INCLUDE (usuario_id);
+GO
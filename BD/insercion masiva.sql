@@ -0,0 +1,92 @@
+﻿/* =========================================================
+   Inserción masiva (parámetros con valores de tabla, TVP)
+   - registrar_reporte_cosecha_lote() -> sp_RegistrarReporteCosechaLote
+   - registrar_actividad_campo_lote() -> sp_RegistrarActividadCampoLote
+   Una llamada inserta miles de filas con una sola sentencia y devuelve los
+   ids generados EN EL ORDEN de `fila` (MERGE ... OUTPUT permite leer la
+   columna de origen; INSERT ... OUTPUT no).
+   OUTPUT va siempre con INTO: reporte_cosecha tiene trigger
+   (trg_reporte_cosecha_diario) y SQL Server no admite OUTPUT directo al
+   cliente en tablas con triggers habilitados.
+   ========================================================= */
+USE AgroScanDB;
+GO
+
+IF TYPE_ID('dbo.tt_reporte_cosecha') IS NULL
+  CREATE TYPE dbo.tt_reporte_cosecha AS TABLE(
+    fila          INT          NOT NULL PRIMARY KEY,
+    agricultor_id INT          NOT NULL,
+    hectarea_id   INT          NOT NULL,
+    ts            DATETIME2(0) NULL,      -- NULL = SYSUTCDATETIME() (igual que el DEFAULT)
+    aptos         INT          NOT NULL,
+    no_aptos      INT          NOT NULL,
+    fuente        NVARCHAR(30) NULL       -- NULL = N'YOLO'
+  );
+GO
+
+IF TYPE_ID('dbo.tt_actividad_campo') IS NULL
+  CREATE TYPE dbo.tt_actividad_campo AS TABLE(
+    fila          INT           NOT NULL PRIMARY KEY,
+    agricultor_id INT           NOT NULL,
+    hectarea_id   INT           NOT NULL,
+    tipo          VARCHAR(20)   NOT NULL,
+    fecha_hora    DATETIME      NOT NULL,
+    cantidad      DECIMAL(10,2) NULL,
+    unidad        NVARCHAR(20)  NULL,
+    costo         DECIMAL(12,2) NULL,
+    notas         NVARCHAR(500) NULL,
+    aptos         INT           NULL,
+    no_aptos      INT           NULL,
+    cajas         DECIMAL(10,2) NULL,
+    kilos         DECIMAL(10,2) NULL
+  );
+GO
+
+CREATE OR ALTER PROCEDURE dbo.sp_RegistrarReporteCosechaLote
+  @filas dbo.tt_reporte_cosecha READONLY
+AS
+BEGIN
+  SET NOCOUNT ON;
+  SET XACT_ABORT ON;
+  DECLARE @ids TABLE (fila INT PRIMARY KEY, id BIGINT NOT NULL);
+
+  MERGE dbo.reporte_cosecha AS t
+  USING @filas AS f ON 1 = 0
+  WHEN NOT MATCHED THEN
+    INSERT (agricultor_id, hectarea_id, ts, aptos, no_aptos, fuente)
+    VALUES (f.agricultor_id, f.hectarea_id, ISNULL(f.ts, SYSUTCDATETIME()),
+            f.aptos, f.no_aptos, ISNULL(f.fuente, N'YOLO'))
+  OUTPUT f.fila, INSERTED.id INTO @ids (fila, id);
+
+  SELECT id FROM @ids ORDER BY fila;
+END
+GO
+
+CREATE OR ALTER PROCEDURE dbo.sp_RegistrarActividadCampoLote
+  @filas dbo.tt_actividad_campo READONLY
+AS
+BEGIN
+  SET NOCOUNT ON;
+  SET XACT_ABORT ON;
+  DECLARE @ids TABLE (fila INT PRIMARY KEY, id INT NOT NULL);
+
+  BEGIN TRAN;
+    MERGE dbo.actividad_campo AS t
+    USING @filas AS f ON 1 = 0
+    WHEN NOT MATCHED THEN
+      INSERT (agricultor_id, hectarea_id, tipo, fecha_hora, cantidad, unidad, costo, notas)
+      VALUES (f.agricultor_id, f.hectarea_id, f.tipo, f.fecha_hora, f.cantidad, f.unidad,
+              ISNULL(f.costo, 0), f.notas)
+    OUTPUT f.fila, INSERTED.id INTO @ids (fila, id);
+
+    -- Igual que sp_RegistrarActividadCampo: detalle 1:1 solo para 'cosecha'
+    INSERT INTO dbo.cosecha_detalle(actividad_id, aptos, no_aptos, cajas, kilos)
+    SELECT i.id, ISNULL(f.aptos, 0), ISNULL(f.no_aptos, 0), f.cajas, f.kilos
+    FROM @filas f
+    JOIN @ids i ON i.fila = f.fila
+    WHERE f.tipo = 'cosecha';
+  COMMIT;
+
+  SELECT id FROM @ids ORDER BY fila;
+END
+GO
@@ -0,0 +1,162 @@
+﻿/* =========================================================
+   Rollup diario para los dashboards
+   - dbo.reporte_cosecha_diario: un registro por (día, hectárea, agricultor)
+     con las sumas de aptos / no aptos y el nº de sesiones.
+   - trg_reporte_cosecha_diario lo mantiene al día en cada INSERT / UPDATE /
+     DELETE de reporte_cosecha: tanto registrar_reporte_cosecha como
+     trg_actividad_to_reportes_cosecha (cosecha aprobada) pasan por ahí.
+     * Solo inserciones: suma los deltas (MERGE), sin leer reporte_cosecha.
+     * UPDATE / DELETE: recalcula solo los grupos tocados.
+   - dashboard_*_diario (database_mssql.py) suman únicamente los días del
+     rango pedido en lugar de re-agregar toda reporte_cosecha.
+   - dbo.reporte_cosecha_version: contador que el mismo trigger sube en cada
+     sentencia; es el token de la caché de dashboards (token_reporte_cosecha).
+   ========================================================= */
+USE AgroScanDB;
+GO
+
+IF OBJECT_ID('dbo.reporte_cosecha_diario','U') IS NULL
+BEGIN
+  CREATE TABLE dbo.reporte_cosecha_diario(
+    dia           DATE         NOT NULL,
+    hectarea_id   INT          NOT NULL,
+    agricultor_id INT          NOT NULL,
+    aptos         BIGINT       NOT NULL,
+    no_aptos      BIGINT       NOT NULL,
+    sesiones      INT          NOT NULL,
+    primera_ts    DATETIME2(0) NOT NULL,
+    ultima_ts     DATETIME2(0) NOT NULL,
+    CONSTRAINT PK_repC_diario PRIMARY KEY CLUSTERED (dia, hectarea_id, agricultor_id)
+  );
+
+  -- Dashboard del agricultor: WHERE agricultor_id = ? AND dia BETWEEN ? AND ?
+  CREATE INDEX IX_repC_diario_agricultor
+    ON dbo.reporte_cosecha_diario(agricultor_id, dia)
+    INCLUDE (hectarea_id, aptos, no_aptos, primera_ts, ultima_ts);
+END;
+GO
+
+IF OBJECT_ID('dbo.reporte_cosecha_version','U') IS NULL
+BEGIN
+  CREATE TABLE dbo.reporte_cosecha_version(
+    id      TINYINT NOT NULL CONSTRAINT PK_repC_version PRIMARY KEY CONSTRAINT CK_repC_version_unica CHECK (id = 1),
+    version BIGINT  NOT NULL
+  );
+  INSERT INTO dbo.reporte_cosecha_version(id, version) VALUES (1, 0);
+END;
+GO
+
+-- Recalcula todo el rollup desde reporte_cosecha (carga inicial / reparación)
+CREATE OR ALTER PROCEDURE dbo.sp_ReconstruirReporteCosechaDiario
+AS
+BEGIN
+  SET NOCOUNT ON;
+  SET XACT_ABORT ON;
+  BEGIN TRAN;
+    -- bloquea las escrituras en reporte_cosecha mientras se reconstruye:
+    -- las que esperan se aplican luego por el trigger, sin contarse dos veces
+    SELECT TOP (0) id FROM dbo.reporte_cosecha WITH (TABLOCKX, HOLDLOCK);
+
+    DELETE FROM dbo.reporte_cosecha_diario;
+
+    INSERT INTO dbo.reporte_cosecha_diario
+      (dia, hectarea_id, agricultor_id, aptos, no_aptos, sesiones, primera_ts, ultima_ts)
+    SELECT CAST(rc.ts AS DATE), rc.hectarea_id, rc.agricultor_id,
+           SUM(CAST(rc.aptos AS BIGINT)), SUM(CAST(rc.no_aptos AS BIGINT)),
+           COUNT(*), MIN(rc.ts), MAX(rc.ts)
+    FROM dbo.reporte_cosecha rc
+    GROUP BY CAST(rc.ts AS DATE), rc.hectarea_id, rc.agricultor_id;
+
+    UPDATE dbo.reporte_cosecha_version SET version = version + 1 WHERE id = 1;
+  COMMIT;
+END
+GO
+
+IF OBJECT_ID('dbo.trg_reporte_cosecha_diario','TR') IS NOT NULL
+  DROP TRIGGER dbo.trg_reporte_cosecha_diario;
+GO
+CREATE TRIGGER dbo.trg_reporte_cosecha_diario
+ON dbo.reporte_cosecha
+AFTER INSERT, UPDATE, DELETE
+AS
+BEGIN
+  SET NOCOUNT ON;
+
+  IF NOT EXISTS (SELECT 1 FROM inserted) AND NOT EXISTS (SELECT 1 FROM deleted)
+    RETURN;
+
+  -- Token de la caché de dashboards: cambia con altas, bajas y ediciones.
+  -- El bloqueo de la fila dura hasta el COMMIT, así nadie lee la versión
+  -- nueva antes de que los datos sean visibles.
+  UPDATE dbo.reporte_cosecha_version SET version = version + 1 WHERE id = 1;
+
+  -- Solo inserciones (caso normal): suma los deltas agrupados de la sentencia
+  IF NOT EXISTS (SELECT 1 FROM deleted)
+  BEGIN
+    MERGE dbo.reporte_cosecha_diario WITH (HOLDLOCK) AS d
+    USING (
+      SELECT CAST(ts AS DATE) AS dia, hectarea_id, agricultor_id,
+             SUM(CAST(aptos AS BIGINT))    AS aptos,
+             SUM(CAST(no_aptos AS BIGINT)) AS no_aptos,
+             COUNT(*) AS sesiones, MIN(ts) AS primera_ts, MAX(ts) AS ultima_ts
+      FROM inserted
+      GROUP BY CAST(ts AS DATE), hectarea_id, agricultor_id
+    ) AS i
+      ON d.dia = i.dia AND d.hectarea_id = i.hectarea_id AND d.agricultor_id = i.agricultor_id
+    WHEN MATCHED THEN UPDATE SET
+      aptos      = d.aptos + i.aptos,
+      no_aptos   = d.no_aptos + i.no_aptos,
+      sesiones   = d.sesiones + i.sesiones,
+      primera_ts = CASE WHEN i.primera_ts < d.primera_ts THEN i.primera_ts ELSE d.primera_ts END,
+      ultima_ts  = CASE WHEN i.ultima_ts  > d.ultima_ts  THEN i.ultima_ts  ELSE d.ultima_ts  END
+    WHEN NOT MATCHED THEN
+      INSERT (dia, hectarea_id, agricultor_id, aptos, no_aptos, sesiones, primera_ts, ultima_ts)
+      VALUES (i.dia, i.hectarea_id, i.agricultor_id, i.aptos, i.no_aptos, i.sesiones, i.primera_ts, i.ultima_ts);
+    RETURN;
+  END;
+
+  -- UPDATE / DELETE: recalcula solo los grupos (día, hectárea, agricultor) afectados
+  DECLARE @afectados TABLE (
+    dia DATE NOT NULL, hectarea_id INT NOT NULL, agricultor_id INT NOT NULL,
+    PRIMARY KEY (dia, hectarea_id, agricultor_id)
+  );
+  INSERT INTO @afectados (dia, hectarea_id, agricultor_id)
+  SELECT CAST(ts AS DATE), hectarea_id, agricultor_id FROM inserted
+  UNION
+  SELECT CAST(ts AS DATE), hectarea_id, agricultor_id FROM deleted;
+
+  DELETE d
+  FROM dbo.reporte_cosecha_diario d WITH (UPDLOCK, HOLDLOCK)
+  JOIN @afectados a
+    ON a.dia = d.dia AND a.hectarea_id = d.hectarea_id AND a.agricultor_id = d.agricultor_id;
+
+  INSERT INTO dbo.reporte_cosecha_diario
+    (dia, hectarea_id, agricultor_id, aptos, no_aptos, sesiones, primera_ts, ultima_ts)
+  SELECT a.dia, a.hectarea_id, a.agricultor_id,
+         SUM(CAST(rc.aptos AS BIGINT)), SUM(CAST(rc.no_aptos AS BIGINT)),
+         COUNT(*), MIN(rc.ts), MAX(rc.ts)
+  FROM @afectados a
+  JOIN dbo.reporte_cosecha rc
+    ON rc.hectarea_id = a.hectarea_id
+   AND rc.agricultor_id = a.agricultor_id
+   AND rc.ts >= CAST(a.dia AS DATETIME2(0))
+   AND rc.ts <  DATEADD(DAY, 1, CAST(a.dia AS DATETIME2(0)))
+  GROUP BY a.dia, a.hectarea_id, a.agricultor_id;
+END
+GO
+
+-- Carga inicial con lo que ya hay en reporte_cosecha
+EXEC dbo.sp_ReconstruirReporteCosechaDiario;
+GO
+
+-- Verificación: los totales del rollup deben coincidir con la vista
+SELECT s.hectarea_id, s.total_aptos, r.total_aptos AS rollup_aptos,
+       s.total_no_aptos, r.total_no_aptos AS rollup_no_aptos
+FROM dbo.vw_dashboard_supervisor s
+FULL JOIN (
+  SELECT hectarea_id, SUM(aptos) AS total_aptos, SUM(no_aptos) AS total_no_aptos
+  FROM dbo.reporte_cosecha_diario GROUP BY hectarea_id
+) r ON r.hectarea_id = s.hectarea_id
+WHERE ISNULL(s.total_aptos, -1) <> ISNULL(r.total_aptos, -1)
+   OR ISNULL(s.total_no_aptos, -1) <> ISNULL(r.total_no_aptos, -1);
+GO
@@ -1,5 +1,5 @@
 from PyQt5.QtWidgets import (
-    QMainWindow, QWidget, QVBoxLayout, QLabel, QPushButton, QTabWidget
+    QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTabWidget
 )
 from PyQt5.QtGui import QFont, QIcon
 from PyQt5.QtCore import Qt
@@ -8,6 +8,8 @@ from historial_agricultor import HistorialReportesAgricultor
 from agricultor_dashboard import AgricultorDashboardWindow  # dashboard nuevo
 # 👉 NUEVO: pestaña transaccional (registro de actividades)
 from operaciones_agricultor import OperacionesAgricultorWindow
+from database_async import IndicadorCola  # pendientes de sincronizar con el servidor
+from yolo_service import precargar_modelo
 
 BASE_STYLESHEET = """
 QWidget {
@@ -50,6 +52,8 @@ class MainAgricultorWindow(QMainWindow):
         self.setGeometry(160, 120, 950, 650)
         self.setStyleSheet(BASE_STYLESHEET)
         self.init_ui()
+        # Cargar YOLO en segundo plano: la ventana aparece sin esperar los pesos
+        precargar_modelo()
 
     def init_ui(self):
         # Tabs
@@ -86,7 +90,12 @@ class MainAgricultorWindow(QMainWindow):
 
         layout.addWidget(lbl_heading)
         layout.addWidget(self.tabs)
-        layout.addWidget(self.logout_btn, alignment=Qt.AlignRight)
+        pie = QHBoxLayout()
+        self.indicador_cola = IndicadorCola()
+        pie.addWidget(self.indicador_cola)
+        pie.addStretch(1)
+        pie.addWidget(self.logout_btn)
+        layout.addLayout(pie)
 
         self.setCentralWidget(central_widget)
 
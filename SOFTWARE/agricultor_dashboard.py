@@ -1,17 +1,21 @@
 # agricultor_dashboard.py — Dashboard del Agricultor
-# Muestra resumen de sesiones registradas (vw_dashboard_agricultor en BD)
+# Muestra resumen de sesiones registradas (rollup diario reporte_cosecha_diario en BD)
 
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QTableWidget,
     QTableWidgetItem, QHeaderView, QDateEdit, QPushButton, QMessageBox, QFrame
 )
-from PyQt5.QtCore import Qt, QDate
+from PyQt5.QtCore import Qt, QDate, QTimer
 from PyQt5.QtGui import QFont, QIcon
-from database import dashboard_agricultor
+from database import dashboard_agricultor_diario
+from database_async import Canal
 # Matplotlib embebido en PyQt5
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 
+# Espera tras el último cambio de fecha antes de consultar (ráfagas => 1 consulta)
+DEBOUNCE_FECHAS_MS = 400
+
 BASE_STYLESHEET = """
 QWidget { font-family: 'Segoe UI', Arial, sans-serif; font-size: 13px; }
 QLabel#title { font-size: 20px; font-weight: 700; color: #386641; }
@@ -96,9 +100,19 @@ class AgricultorDashboardWindow(QWidget):
 
         self.setLayout(root)
 
-        # Auto-refresh al cambiar fechas
-        self.dt_from.dateChanged.connect(self._on_refresh)
-        self.dt_to.dateChanged.connect(self._on_refresh)
+        # Auto-refresh al cambiar fechas (con debounce)
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(DEBOUNCE_FECHAS_MS)
+        self._debounce.timeout.connect(self._on_refresh)
+        self.dt_from.dateChanged.connect(lambda _: self._debounce.start())
+        self.dt_to.dateChanged.connect(lambda _: self._debounce.start())
+
+        # Consulta en el pool de BD: solo se pinta la respuesta de la última
+        self._canal = Canal(self)
+        self._canal.listo.connect(self._on_datos)
+        self._canal.fallo.connect(self._on_error_datos)
+        self._canal.ocupado.connect(self._on_ocupado)
 
     def _make_kpi(self, label: str, num: str) -> QFrame:
         card = QFrame()
@@ -125,23 +139,27 @@ class AgricultorDashboardWindow(QWidget):
 
     # ---------------- DATA ----------------
     def _on_refresh(self):
-        self.btn_refresh.setEnabled(False)
-        self.btn_refresh.setText("Actualizando…")
-        try:
-            self.refrescar_dashboard()
-            self.btn_refresh.setText("Actualizado ✓")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"No se pudo actualizar el dashboard:\n{e}")
-            self.btn_refresh.setText("Actualizar")
-        finally:
-            self.btn_refresh.setEnabled(True)
+        self._debounce.stop()
+        self.refrescar_dashboard()
+
+    def _on_ocupado(self, ocupado: bool):
+        self.btn_refresh.setEnabled(not ocupado)
+        if ocupado:
+            self.btn_refresh.setText("Actualizando…")
+
+    def _on_error_datos(self, e):
+        self.btn_refresh.setText("Actualizar")
+        QMessageBox.critical(self, "Error", f"No se pudo actualizar el dashboard:\n{e}")
 
     def refrescar_dashboard(self):
-        """Público: para llamarlo desde otras pestañas tras guardar."""
+        """Público: para llamarlo desde otras pestañas tras guardar (no bloquea)."""
         desde_str, hasta_str = self._range_strings_inclusive()
 
-        # Consulta a BD (espera rango inclusivo)
-        rows = dashboard_agricultor(self.agricultor_id, desde_str, hasta_str)
+        # Consulta a BD (rango inclusivo por día, solo suma esos días del rollup)
+        self._canal.pedir(dashboard_agricultor_diario, self.agricultor_id, desde_str, hasta_str)
+
+    def _on_datos(self, rows):
+        self.btn_refresh.setText("Actualizado ✓")
 
         # KPIs globales
         total_aptos = sum(int(r.get("total_aptos") or 0) for r in rows)
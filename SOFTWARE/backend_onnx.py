@@ -0,0 +1,159 @@
+# backend_onnx.py
+# Backend de inferencia YOLO en CPU con ONNX Runtime (sin torch en tiempo de uso).
+# - exportar_onnx(): exporta una sola vez el .pt a ONNX con Ultralytics
+#   (opcionalmente cuantizado a INT8); solo ahí hace falta torch.
+# - ModeloOnnx: se llama igual que un YOLO de Ultralytics
+#   (modelo(imgs, conf=..., verbose=False)) y devuelve objetos con
+#   .boxes.data y .names, así yolo_service arma las mismas detecciones.
+# Si ONNX Runtime trae el proveedor de OpenVINO, se usa antes que el de CPU.
+
+import os
+import ast
+import types
+from typing import Dict, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+IMGSZ = int(os.getenv("AGROSCAN_ONNX_IMGSZ", "640"))
+HILOS = int(os.getenv("AGROSCAN_ONNX_HILOS", "0"))  # 0 = los que decida ONNX Runtime
+# Mismos valores por defecto que la predicción de Ultralytics
+IOU_INTERNO = 0.7
+MAX_DET = 300
+PROVEEDORES_PREFERIDOS = ["OpenVINOExecutionProvider", "CPUExecutionProvider"]
+
+# ========================
+# Exportación (una vez)
+# ========================
+
+def ruta_onnx_para(ruta_pt: str, int8: bool = False) -> str:
+    base = os.path.splitext(ruta_pt)[0]
+    return base + (".int8.onnx" if int8 else ".onnx")
+
+def exportar_onnx(ruta_pt: str, ruta_onnx: Optional[str] = None,
+                  int8: bool = False, imgsz: int = IMGSZ) -> str:
+    """
+    Exporta los pesos .pt a ONNX (batch dinámico). Con int8=True además
+    cuantiza los pesos a INT8 (cuantización dinámica de ONNX Runtime).
+    Devuelve la ruta del .onnx final.
+    """
+    from ultralytics import YOLO  # import pesado (torch): solo para exportar
+    ruta_onnx = ruta_onnx or ruta_onnx_para(ruta_pt, int8)
+    exportado = YOLO(ruta_pt).export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+    if int8:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantize_dynamic(exportado, ruta_onnx, weight_type=QuantType.QUInt8)
+        _copiar_metadatos(exportado, ruta_onnx)
+    elif os.path.abspath(exportado) != os.path.abspath(ruta_onnx):
+        os.replace(exportado, ruta_onnx)
+    return ruta_onnx
+
+def _copiar_metadatos(origen: str, destino: str) -> None:
+    """La cuantización descarta metadata_props (nombres de clase, imgsz): se copian."""
+    import onnx
+    m_origen, m_destino = onnx.load(origen), onnx.load(destino)
+    del m_destino.metadata_props[:]
+    m_destino.metadata_props.extend(m_origen.metadata_props)
+    onnx.save(m_destino, destino)
+
+# ========================
+# Pre / post-proceso
+# ========================
+
+def _letterbox(img: np.ndarray, tam: int) -> Tuple[np.ndarray, float, Tuple[float, float]]:
+    """Redimensiona manteniendo la proporción y rellena con gris 114 (como Ultralytics)."""
+    alto, ancho = img.shape[:2]
+    r = min(tam / alto, tam / ancho)
+    nuevo_w, nuevo_h = int(round(ancho * r)), int(round(alto * r))
+    dw, dh = (tam - nuevo_w) / 2, (tam - nuevo_h) / 2
+    if (nuevo_w, nuevo_h) != (ancho, alto):
+        img = cv2.resize(img, (nuevo_w, nuevo_h), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+    img = cv2.copyMakeBorder(img, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+    return img, r, (left, top)
+
+def _postproceso(pred: np.ndarray, conf: float, r: float, pad: Tuple[float, float],
+                 forma: Tuple[int, int]) -> np.ndarray:
+    """
+    pred: salida cruda (4 + nc, N) de YOLOv8 -> filas (k, 6)
+    [x1, y1, x2, y2, conf, cls] en coordenadas de la imagen original.
+    """
+    pred = pred.T
+    scores_cls = pred[:, 4:]
+    cls = scores_cls.argmax(axis=1)
+    scores = scores_cls[np.arange(len(cls)), cls]
+    m = scores > conf
+    if not m.any():
+        return np.zeros((0, 6), dtype=np.float32)
+    xywh, scores, cls = pred[m, :4], scores[m], cls[m]
+
+    cajas_xywh = np.column_stack([xywh[:, 0] - xywh[:, 2] / 2, xywh[:, 1] - xywh[:, 3] / 2,
+                                  xywh[:, 2], xywh[:, 3]])
+    keep = cv2.dnn.NMSBoxesBatched(cajas_xywh.tolist(), scores.tolist(), cls.tolist(), conf, IOU_INTERNO)
+    keep = np.asarray(keep, dtype=np.int64).reshape(-1)
+    keep = keep[np.argsort(-scores[keep], kind="stable")][:MAX_DET]
+
+    xyxy = np.column_stack([cajas_xywh[keep, 0], cajas_xywh[keep, 1],
+                            cajas_xywh[keep, 0] + cajas_xywh[keep, 2],
+                            cajas_xywh[keep, 1] + cajas_xywh[keep, 3]])
+    xyxy[:, [0, 2]] = ((xyxy[:, [0, 2]] - pad[0]) / r).clip(0, forma[1])
+    xyxy[:, [1, 3]] = ((xyxy[:, [1, 3]] - pad[1]) / r).clip(0, forma[0])
+    return np.column_stack([xyxy, scores[keep], cls[keep]]).astype(np.float32)
+
+# ========================
+# Modelo
+# ========================
+
+class _Resultado:
+    """Lo mínimo de un Results de Ultralytics que usa yolo_service._parse_result."""
+    def __init__(self, filas: np.ndarray, names: Dict[int, str]):
+        self.boxes = types.SimpleNamespace(data=filas)
+        self.names = names
+
+class ModeloOnnx:
+    def __init__(self, ruta_onnx: str):
+        import onnxruntime as ort
+        opciones = ort.SessionOptions()
+        opciones.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if HILOS > 0:
+            opciones.intra_op_num_threads = HILOS
+        disponibles = set(ort.get_available_providers())
+        proveedores = [p for p in PROVEEDORES_PREFERIDOS if p in disponibles]
+        self.ruta = ruta_onnx
+        self.sesion = ort.InferenceSession(ruta_onnx, sess_options=opciones, providers=proveedores)
+        entrada = self.sesion.get_inputs()[0]
+        self._entrada = entrada.name
+        # batch dinámico -> dimensión simbólica (str) o None
+        self._batch_dinamico = not isinstance(entrada.shape[0], int)
+        tam = entrada.shape[2]
+        self.imgsz = tam if isinstance(tam, int) else IMGSZ
+
+        meta = self.sesion.get_modelmeta().custom_metadata_map
+        try:
+            self.names = {int(k): v for k, v in ast.literal_eval(meta.get("names", "{}")).items()}
+        except (ValueError, SyntaxError):
+            self.names = {}
+
+    def __call__(self, fuente: Union[str, np.ndarray, List[Union[str, np.ndarray]]],
+                 conf: float = 0.25, verbose: bool = False) -> List[_Resultado]:
+        imagenes = fuente if isinstance(fuente, list) else [fuente]
+        imagenes = [cv2.imread(im) if isinstance(im, str) else im for im in imagenes]
+        if not imagenes:
+            return []
+
+        prep = [_letterbox(im, self.imgsz) for im in imagenes]
+        # HWC BGR uint8 -> NCHW RGB float32 [0, 1]
+        tensor = np.stack([p[0] for p in prep])[..., ::-1].transpose(0, 3, 1, 2)
+        tensor = np.ascontiguousarray(tensor, dtype=np.float32) / 255.0
+
+        if self._batch_dinamico:
+            salida = self.sesion.run(None, {self._entrada: tensor})[0]
+        else:
+            salida = np.concatenate([self.sesion.run(None, {self._entrada: tensor[i:i + 1]})[0]
+                                     for i in range(len(tensor))])
+
+        return [
+            _Resultado(_postproceso(salida[i], conf, r, pad, im.shape[:2]), self.names)
+            for i, (im, (_, r, pad)) in enumerate(zip(imagenes, prep))
+        ]
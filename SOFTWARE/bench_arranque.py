@@ -0,0 +1,61 @@
+# bench_arranque.py
+# Mide el arranque en frío del lado agricultor, en procesos nuevos:
+#   - "antes":   import torch + módulos de la app + carga de pesos YOLO antes de
+#                poder mostrar la ventana (comportamiento anterior, carga en import)
+#   - "después": solo los módulos de la app (la carga de YOLO va en segundo plano)
+# Además reporta cuánto tarda el modelo en quedar listo en segundo plano.
+#
+# Uso:  python bench_arranque.py [repeticiones]
+
+import os
+import sys
+import statistics
+import subprocess
+
+SCRIPT_ANTES = """
+import time; t0 = time.perf_counter()
+import torch
+import agricultor
+from yolo_service import get_model
+get_model()
+print(time.perf_counter() - t0)
+"""
+
+SCRIPT_DESPUES = """
+import time; t0 = time.perf_counter()
+import agricultor
+print(time.perf_counter() - t0)
+"""
+
+SCRIPT_LISTO = """
+import time; t0 = time.perf_counter()
+import agricultor
+from yolo_service import precargar_modelo, esperar_modelo
+precargar_modelo()
+esperar_modelo()
+print(time.perf_counter() - t0)
+"""
+
+def _medir(script: str, reps: int):
+    tiempos = []
+    for _ in range(reps):
+        out = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True,
+        )
+        tiempos.append(float(out.stdout.strip().splitlines()[-1]))
+    return statistics.median(tiempos), min(tiempos)
+
+if __name__ == "__main__":
+    reps = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    antes, antes_min = _medir(SCRIPT_ANTES, reps)
+    despues, despues_min = _medir(SCRIPT_DESPUES, reps)
+    listo, listo_min = _medir(SCRIPT_LISTO, reps)
+
+    print(f"Repeticiones: {reps} (mediana / mínimo, segundos)")
+    print(f"  Antes   (ventana tras cargar YOLO): {antes:7.3f} / {antes_min:7.3f}")
+    print(f"  Después (ventana sin esperar YOLO): {despues:7.3f} / {despues_min:7.3f}")
+    print(f"  Modelo listo en segundo plano:      {listo:7.3f} / {listo_min:7.3f}")
+    if despues > 0:
+        print(f"  Ventana disponible {antes / despues:.1f}x antes")
@@ -0,0 +1,126 @@
+# bench_backends.py
+# Paridad y rendimiento del backend ONNX Runtime frente al de torch (Ultralytics).
+# Cada backend corre en un proceso nuevo (AGROSCAN_BACKEND=torch|onnx) y mide:
+#   - tiempo de import + carga del modelo (arranque en frío)
+#   - latencia por imagen (mediana) y por lote
+# La paridad empareja detecciones por imagen (misma etiqueta, IoU >= 0.9)
+# y reporta el % emparejado en ambos sentidos y la diferencia media de confianza.
+#
+# Uso:  python bench_backends.py <carpeta_o_imagen> [--int8] [--lote N] [--reps N]
+#       (la primera vez exporta el .onnx desde AGROSCAN_MODELO)
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+import numpy as np
+
+EXTENSIONES = (".jpg", ".jpeg", ".png")
+
+def _imagenes(origen: str):
+    if os.path.isdir(origen):
+        return sorted(os.path.join(origen, f) for f in os.listdir(origen)
+                      if f.lower().endswith(EXTENSIONES))
+    return [origen]
+
+def _hijo(origen: str, lote: int, reps: int):
+    t0 = time.perf_counter()
+    import cv2
+    import yolo_service as ys
+    ys.get_model()  # carga + warm-up
+    arranque = time.perf_counter() - t0
+
+    rutas = _imagenes(origen)
+    imagenes = [cv2.imread(r) for r in rutas]
+    tiempos = []
+    for _ in range(reps):
+        for img in imagenes:
+            t = time.perf_counter()
+            ys._run_model_batch([img])
+            tiempos.append(time.perf_counter() - t)
+    t = time.perf_counter()
+    for _ in range(reps):
+        for i in range(0, len(imagenes), lote):
+            ys._run_model_batch(imagenes[i:i + lote])
+    por_img_lote = (time.perf_counter() - t) / max(1, reps * len(imagenes))
+
+    dets = [ys._group_and_nms(raw) for raw in ys._run_model_batch(imagenes)]
+    print(json.dumps({
+        "arranque_s": arranque,
+        "mediana_ms": statistics.median(tiempos) * 1000,
+        "lote_ms_por_img": por_img_lote * 1000,
+        "detecciones": dets,
+    }))
+
+def _lanzar(backend: str, args) -> dict:
+    env = dict(os.environ, AGROSCAN_BACKEND=backend, AGROSCAN_SERVIDOR="0",
+               AGROSCAN_ONNX_INT8="1" if args.int8 else "0")
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--hijo", args.origen,
+         "--lote", str(args.lote), "--reps", str(args.reps)],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def _emparejar(a, b, umbral: float = 0.9):
+    """Nº de detecciones de `a` con pareja en `b` y diferencias de confianza."""
+    from yolo_service import _iou_matrix
+    if not a or not b:
+        return 0, []
+    ba = np.asarray([d["box"] for d in a], dtype=np.float32)
+    bb = np.asarray([d["box"] for d in b], dtype=np.float32)
+    iou = _iou_matrix(ba, bb)
+    usados, difs = set(), []
+    for i in np.argsort(-iou.max(axis=1)):
+        for j in np.argsort(-iou[i]):
+            if iou[i, j] < umbral:
+                break
+            if j not in usados and a[i]["label"] == b[j]["label"]:
+                usados.add(j)
+                difs.append(abs(a[i]["confidence"] - b[j]["confidence"]))
+                break
+    return len(usados), difs
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Paridad y benchmark torch vs ONNX Runtime")
+    parser.add_argument("origen")
+    parser.add_argument("--int8", action="store_true", help="usar el modelo ONNX cuantizado a INT8")
+    parser.add_argument("--lote", type=int, default=8)
+    parser.add_argument("--reps", type=int, default=3)
+    parser.add_argument("--hijo", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.hijo:
+        _hijo(args.origen, args.lote, args.reps)
+        sys.exit(0)
+
+    print(f"Imágenes: {len(_imagenes(args.origen))} | lote: {args.lote} | repeticiones: {args.reps}")
+    r_torch = _lanzar("torch", args)
+    r_onnx = _lanzar("onnx", args)
+
+    nombre_onnx = "onnx int8" if args.int8 else "onnx"
+    print(f"{'backend':10s} | {'arranque (s)':>12s} | {'1 img (ms)':>10s} | {'lote (ms/img)':>13s}")
+    print("-" * 56)
+    for nombre, r in (("torch", r_torch), (nombre_onnx, r_onnx)):
+        print(f"{nombre:10s} | {r['arranque_s']:12.2f} | {r['mediana_ms']:10.1f} | {r['lote_ms_por_img']:13.1f}")
+    print(f"Aceleración 1 img: {r_torch['mediana_ms'] / r_onnx['mediana_ms']:.2f}x | "
+          f"lote: {r_torch['lote_ms_por_img'] / r_onnx['lote_ms_por_img']:.2f}x")
+
+    n_torch = n_onnx = match_t = match_o = 0
+    difs = []
+    for dt, do in zip(r_torch["detecciones"], r_onnx["detecciones"]):
+        n_torch += len(dt)
+        n_onnx += len(do)
+        m, d = _emparejar(dt, do)
+        match_t += m
+        difs += d
+        match_o += _emparejar(do, dt)[0]
+    print(f"Paridad: detecciones torch={n_torch} onnx={n_onnx} | "
+          f"emparejadas torch->onnx {100 * match_t / max(1, n_torch):.1f}% | "
+          f"onnx->torch {100 * match_o / max(1, n_onnx):.1f}% | "
+          f"|Δconf| medio {statistics.mean(difs) if difs else 0.0:.4f}")
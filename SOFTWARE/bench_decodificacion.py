@@ -0,0 +1,102 @@
+# bench_decodificacion.py
+# Latencia por imagen y pico de RSS del análisis de una foto (p. ej. 12 MP de
+# celular), comparando:
+#   - "antes":   cv2.imread + modelo(ruta) (segunda decodificación dentro de
+#                Ultralytics) + copia completa para dibujar
+#   - "después": analizar_imagen_yolo(ruta): una decodificación, el array va al
+#                modelo y se dibuja sobre el mismo buffer
+# Cada modo corre en un proceso nuevo para que el pico de memoria sea comparable.
+#
+# Uso:  python bench_decodificacion.py <carpeta_o_imagen> [repeticiones]
+
+import os
+import sys
+import json
+import time
+import statistics
+import subprocess
+
+EXTENSIONES = (".jpg", ".jpeg", ".png")
+
+def _imagenes(origen: str):
+    if os.path.isdir(origen):
+        return sorted(os.path.join(origen, f) for f in os.listdir(origen)
+                      if f.lower().endswith(EXTENSIONES))
+    return [origen]
+
+def _pico_rss_mb() -> float:
+    try:
+        import resource  # Linux / macOS
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return pico / 1024.0 if sys.platform != "darwin" else pico / (1024.0 * 1024.0)
+    except ImportError:  # Windows
+        import ctypes
+        from ctypes import wintypes
+
+        class _PMC(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+        pmc = _PMC(); pmc.cb = ctypes.sizeof(_PMC)
+        ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(),
+                                                 ctypes.byref(pmc), pmc.cb)
+        return pmc.PeakWorkingSetSize / (1024.0 * 1024.0)
+
+def _hijo(modo: str, rutas, reps: int):
+    import cv2
+    import yolo_service as ys
+
+    ys.get_model()  # carga y warm-up fuera de la medición
+
+    def antes(ruta):
+        img = cv2.imread(ruta)
+        raw = ys._run_model(ruta)  # Ultralytics vuelve a decodificar la ruta
+        dets = ys._group_and_nms(raw)
+        return ys._draw_dets(img, dets)  # copia completa
+
+    def despues(ruta):
+        return ys.analizar_imagen_yolo(ruta)[1]
+
+    fn = antes if modo == "antes" else despues
+    rss_base = _pico_rss_mb()
+    tiempos = []
+    for _ in range(reps):
+        for ruta in rutas:
+            t0 = time.perf_counter()
+            fn(ruta)
+            tiempos.append(time.perf_counter() - t0)
+    print(json.dumps({
+        "mediana_ms": statistics.median(tiempos) * 1000,
+        "pico_rss_mb": _pico_rss_mb(),
+        "rss_tras_modelo_mb": rss_base,
+    }))
+
+def _lanzar(modo: str, origen: str, reps: int):
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--hijo", modo, origen, str(reps)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--hijo":
+        _hijo(sys.argv[2], _imagenes(sys.argv[3]), int(sys.argv[4]))
+        sys.exit(0)
+
+    if len(sys.argv) < 2:
+        print("Uso: python bench_decodificacion.py <carpeta_o_imagen> [repeticiones]")
+        sys.exit(1)
+    origen = sys.argv[1]
+    reps = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    print(f"Imágenes: {len(_imagenes(origen))} | repeticiones: {reps}")
+
+    r_antes = _lanzar("antes", origen, reps)
+    r_despues = _lanzar("despues", origen, reps)
+    for nombre, r in (("Antes", r_antes), ("Después", r_despues)):
+        print(f"  {nombre:8s} latencia mediana: {r['mediana_ms']:8.1f} ms | "
+              f"pico RSS: {r['pico_rss_mb']:8.1f} MB (tras cargar modelo: {r['rss_tras_modelo_mb']:.1f} MB)")
+    print(f"  Reducción de latencia: {100 * (1 - r_despues['mediana_ms'] / r_antes['mediana_ms']):.1f}%")
+    print(f"  Reducción de pico RSS: {r_antes['pico_rss_mb'] - r_despues['pico_rss_mb']:.1f} MB")
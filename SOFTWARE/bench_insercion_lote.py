@@ -0,0 +1,118 @@
+# bench_insercion_lote.py
+# Inserción de N sesiones de conteo (por defecto 100.000) en reporte_cosecha:
+#   - "una a una":   registrar_reporte_cosecha (conexión + commit por fila);
+#                    se mide una muestra y se extrapola a N
+#   - "executemany": INSERT por fila con fast_executemany en UNA transacción
+#                    (referencia sin SP)
+#   - "tvp":         registrar_reporte_cosecha_lote (SP con parámetro tabla,
+#                    bloques de LOTE_TVP filas, UNA transacción, devuelve ids)
+# Con --actividades también compara registrar_actividad_campo vs
+# registrar_actividad_campo_lote (tipo 'cosecha', con detalle).
+# Las filas llevan fuente='BENCH' / notas='BENCH' y se borran al terminar.
+#
+# Requiere BD/insercion masiva.sql aplicado.
+# Uso:  python bench_insercion_lote.py [--sesiones 100000] [--muestra 500] [--actividades 10000]
+
+import time
+import argparse
+import datetime
+
+import database_mssql as db
+
+FUENTE = "BENCH"
+
+def _ids(sql: str):
+    with db._conn() as c:
+        return [int(r[0]) for r in c.cursor().execute(sql).fetchall()]
+
+def _sesiones(n: int, hectareas, agricultores):
+    for i in range(n):
+        yield {"agricultor_id": agricultores[i % len(agricultores)],
+               "hectarea_id": hectareas[i % len(hectareas)],
+               "aptos": i % 200, "no_aptos": i % 60, "fuente": FUENTE}
+
+def _una_a_una(n: int, hectareas, agricultores) -> float:
+    t0 = time.perf_counter()
+    for r in _sesiones(n, hectareas, agricultores):
+        db.registrar_reporte_cosecha(r["agricultor_id"], r["hectarea_id"], r["aptos"], r["no_aptos"], fuente=FUENTE)
+    return time.perf_counter() - t0
+
+def _executemany(n: int, hectareas, agricultores) -> float:
+    t0 = time.perf_counter()
+    with db._conn() as c:
+        cur = c.cursor()
+        cur.fast_executemany = True
+        cur.executemany(
+            "INSERT INTO dbo.reporte_cosecha(agricultor_id, hectarea_id, aptos, no_aptos, fuente) VALUES (?,?,?,?,?);",
+            [(r["agricultor_id"], r["hectarea_id"], r["aptos"], r["no_aptos"], FUENTE)
+             for r in _sesiones(n, hectareas, agricultores)])
+    return time.perf_counter() - t0
+
+def _tvp(n: int, hectareas, agricultores):
+    t0 = time.perf_counter()
+    ids = db.registrar_reporte_cosecha_lote(_sesiones(n, hectareas, agricultores))
+    return time.perf_counter() - t0, ids
+
+def _actividades(n: int, hectareas, agricultores):
+    ahora = datetime.datetime.now().replace(microsecond=0)
+    for i in range(n):
+        yield {"agricultor_id": agricultores[i % len(agricultores)],
+               "hectarea_id": hectareas[i % len(hectareas)],
+               "tipo": "cosecha", "fecha_hora": ahora - datetime.timedelta(minutes=i),
+               "cantidad": 1.0, "unidad": "jornal", "costo": 0.0, "notas": FUENTE,
+               "aptos": i % 200, "no_aptos": i % 60, "cajas": i % 10, "kilos": float(i % 300)}
+
+def _borrar():
+    with db._conn() as c:
+        cur = c.cursor()
+        cur.execute("""
+            DELETE d FROM dbo.cosecha_detalle d
+            JOIN dbo.actividad_campo a ON a.id = d.actividad_id WHERE a.notas = ?;
+        """, (FUENTE,))
+        cur.execute("DELETE FROM dbo.actividad_campo WHERE notas = ?;", (FUENTE,))
+        act = cur.rowcount
+        cur.execute("DELETE FROM dbo.reporte_cosecha WHERE fuente = ?;", (FUENTE,))
+        return cur.rowcount, act
+
+def _fila(modo: str, n: int, seg: float, nota: str = ""):
+    print(f"{modo:22s} | {n:8d} | {seg:9.2f} | {n / seg:10.0f} {nota}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inserción una a una vs fast_executemany vs TVP")
+    parser.add_argument("--sesiones", type=int, default=100_000)
+    parser.add_argument("--muestra", type=int, default=500, help="filas para medir el modo una a una")
+    parser.add_argument("--actividades", type=int, default=0, help="0 = no medir actividad_campo")
+    args = parser.parse_args()
+
+    hectareas = _ids("SELECT TOP (50) id FROM dbo.hectareas ORDER BY id;")
+    agricultores = _ids("SELECT TOP (20) id FROM dbo.usuarios ORDER BY id;")
+    if not hectareas or not agricultores:
+        raise SystemExit("Hacen falta hectáreas y usuarios en la BD para generar datos.")
+
+    try:
+        print(f"{'modo':22s} | {'filas':>8s} | {'seg':>9s} | {'filas/s':>10s}")
+        print("-" * 60)
+        m = min(args.muestra, args.sesiones)
+        seg = _una_a_una(m, hectareas, agricultores)
+        _fila("una a una (muestra)", m, seg, f"-> ~{seg * args.sesiones / m:.0f} s para {args.sesiones}")
+        _fila("fast_executemany", args.sesiones, _executemany(args.sesiones, hectareas, agricultores))
+        try:
+            seg, ids = _tvp(args.sesiones, hectareas, agricultores)
+        except Exception as e:
+            raise SystemExit(f"registrar_reporte_cosecha_lote falló (¿falta BD/insercion masiva.sql?): {e}")
+        ok = len(ids) == args.sesiones and ids == sorted(ids)
+        _fila("tvp (lote)", args.sesiones, seg, f"ids {'ok' if ok else 'INCOMPLETOS'}")
+
+        if args.actividades:
+            m = min(args.muestra, args.actividades)
+            t0 = time.perf_counter()
+            for r in _actividades(m, hectareas, agricultores):
+                db.registrar_actividad_campo(**r)
+            _fila("actividad una a una", m, time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            ids = db.registrar_actividad_campo_lote(_actividades(args.actividades, hectareas, agricultores))
+            _fila("actividad tvp (lote)", args.actividades, time.perf_counter() - t0,
+                  f"ids {'ok' if len(ids) == args.actividades else 'INCOMPLETOS'}")
+    finally:
+        ses, act = _borrar()
+        print(f"Borradas {ses} sesiones y {act} actividades sintéticas")
@@ -0,0 +1,88 @@
+# bench_nms.py
+# Micro-benchmark: NMS vectorizado (yolo_service._group_and_nms) vs el bucle
+# original en Python puro (_iou + _nms_per_group), con 100, 1.000 y 5.000 cajas.
+#
+# Uso:  python bench_nms.py [repeticiones]
+
+import sys
+import time
+import random
+from typing import Dict, List
+
+from yolo_service import _group_and_nms
+
+# =========================
+# Implementación original (referencia)
+# =========================
+def _iou_ref(box1: List[int], box2: List[int]) -> float:
+    x1 = max(box1[0], box2[0])
+    y1 = max(box1[1], box2[1])
+    x2 = min(box1[2], box2[2])
+    y2 = min(box1[3], box2[3])
+    inter_w, inter_h = max(0, x2 - x1), max(0, y2 - y1)
+    inter_area = inter_w * inter_h
+    if inter_area <= 0:
+        return 0.0
+    area1 = max(0, box1[2]-box1[0]) * max(0, box1[3]-box1[1])
+    area2 = max(0, box2[2]-box2[0]) * max(0, box2[3]-box2[1])
+    denom = float(area1 + area2 - inter_area)
+    return inter_area / denom if denom > 0 else 0.0
+
+def _nms_per_group_ref(dets: List[Dict], iou_threshold: float) -> List[Dict]:
+    keep: List[Dict] = []
+    for d in sorted(dets, key=lambda x: -x["confidence"]):
+        overlapped = any(_iou_ref(d["box"], k["box"]) > iou_threshold for k in keep)
+        if not overlapped:
+            keep.append(d)
+    return keep
+
+def _group_and_nms_ref(detections: List[Dict], iou_threshold: float = 0.30) -> List[Dict]:
+    groups: Dict[str, List[Dict]] = {}
+    for d in detections:
+        groups.setdefault(d["label"], []).append(d)
+    final_dets: List[Dict] = []
+    for _, dets in groups.items():
+        final_dets.extend(_nms_per_group_ref(dets, iou_threshold))
+    return final_dets
+
+# =========================
+# Datos sintéticos: lecho denso de turiones (cajas altas y delgadas)
+# =========================
+def _detecciones_sinteticas(n: int, seed: int = 7) -> List[Dict]:
+    rnd = random.Random(seed)
+    dets = []
+    for _ in range(n):
+        x = rnd.randint(0, 3800)
+        y = rnd.randint(0, 2800)
+        w = rnd.randint(20, 60)
+        h = rnd.randint(80, 220)
+        label = "Espárrago sano" if rnd.random() < 0.8 else "Espárrago enfermo"
+        dets.append({
+            "name": label.lower(),
+            "label": label,
+            "box": [x, y, x + w, y + h],
+            "confidence": rnd.random(),
+        })
+    return dets
+
+def _medir(fn, dets, reps: int) -> float:
+    mejor = float("inf")
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        fn(dets, iou_threshold=0.30)
+        mejor = min(mejor, time.perf_counter() - t0)
+    return mejor
+
+def _firma(dets: List[Dict]):
+    return sorted((d["label"], tuple(d["box"]), d["confidence"]) for d in dets)
+
+if __name__ == "__main__":
+    reps = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    print(f"{'cajas':>7} | {'python (ms)':>12} | {'numpy (ms)':>11} | {'speedup':>8} | iguales")
+    print("-" * 60)
+    for n in (100, 1000, 5000):
+        dets = _detecciones_sinteticas(n)
+        t_ref = _medir(_group_and_nms_ref, dets, reps)
+        t_np = _medir(_group_and_nms, dets, reps)
+        iguales = _firma(_group_and_nms_ref(dets)) == _firma(_group_and_nms(dets))
+        print(f"{n:>7} | {t_ref*1000:>12.2f} | {t_np*1000:>11.2f} | {t_ref/t_np:>7.1f}x | {'sí' if iguales else 'NO'}")
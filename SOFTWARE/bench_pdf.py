@@ -0,0 +1,80 @@
+# bench_pdf.py
+# Tamaño y tiempo de generar_pdf_reporte_detallado con foto + imagen anotada:
+#   - "original":       PDF_DPI=0, las imágenes se incrustan a resolución completa
+#   - "preparada fría": re-muestreo a PDF_DPI + JPEG (caché de derivados vacía)
+#   - "preparada caché": misma imagen otra vez (regenerar tras cambiar estado)
+# Sin argumentos usa una foto sintética de 12 MP (JPEG) y una anotada PNG del
+# mismo tamaño; también acepta dos rutas reales.
+#
+# Uso:  python bench_pdf.py [foto.jpg anotada.png] [--repeticiones 5]
+
+import os
+import shutil
+import argparse
+import tempfile
+import statistics
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+import exportador
+
+def _sinteticas(carpeta: str):
+    """Foto 4000x3000 con textura (no comprime trivialmente) y su versión anotada en PNG."""
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:3000, 0:4000]
+    base = np.stack([(x / 16) % 256, (y / 12) % 256, ((x + y) / 24) % 256], axis=-1)
+    ruido = rng.integers(0, 40, size=base.shape)
+    foto = Image.fromarray(np.clip(base + ruido, 0, 255).astype(np.uint8), "RGB")
+    p_foto = os.path.join(carpeta, "foto.jpg")
+    foto.save(p_foto, "JPEG", quality=92)
+    d = ImageDraw.Draw(foto)
+    for i in range(40):
+        x0, y0 = 90 * i, 60 * i
+        d.rectangle([x0, y0, x0 + 300, y0 + 200], outline=(255, 0, 0), width=8)
+    p_anot = os.path.join(carpeta, "anotada.png")
+    foto.save(p_anot, "PNG")
+    return p_foto, p_anot
+
+def _generar(destino: str, foto: str, anotada: str) -> float:
+    t0 = time.perf_counter()
+    exportador.generar_pdf_reporte_detallado(
+        nombre_usuario="bench", fecha="2025-01-01 10:00:00", planta="Espárrago",
+        enfermedad="Cultivo saludable", num_frutos=12, maduracion="No aplica",
+        estado="aprobado", comentario_supervisor="bench", path_imagen=foto,
+        destino=destino, path_imagen_anotada=anotada)
+    return time.perf_counter() - t0
+
+def _fila(modo: str, tiempos, destino: str):
+    print(f"{modo:18s} | {statistics.median(tiempos) * 1000:9.0f} | {os.path.getsize(destino) / 1024:10.0f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PDF con imágenes originales vs preparadas")
+    parser.add_argument("imagenes", nargs="*", help="foto y anotada (opcional)")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_pdf_")
+    try:
+        foto, anotada = args.imagenes[:2] if len(args.imagenes) >= 2 else _sinteticas(tmp)
+        exportador.CACHE_IMAGENES = os.path.join(tmp, "cache")
+        destino = os.path.join(tmp, "reporte.pdf")
+        dpi = exportador.PDF_DPI
+        print(f"foto: {os.path.getsize(foto) / 1024:.0f} KB  anotada: {os.path.getsize(anotada) / 1024:.0f} KB  "
+              f"DPI={dpi}  calidad={exportador.PDF_JPEG_CALIDAD}")
+        print(f"{'modo':18s} | {'ms (med)':>9s} | {'PDF (KB)':>10s}")
+        print("-" * 44)
+
+        exportador.PDF_DPI = 0
+        _fila("original", [_generar(destino, foto, anotada) for _ in range(args.repeticiones)], destino)
+
+        exportador.PDF_DPI = dpi
+        frias = []
+        for _ in range(args.repeticiones):
+            shutil.rmtree(exportador.CACHE_IMAGENES, ignore_errors=True)
+            frias.append(_generar(destino, foto, anotada))
+        _fila("preparada fría", frias, destino)
+        _fila("preparada caché", [_generar(destino, foto, anotada) for _ in range(args.repeticiones)], destino)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
@@ -0,0 +1,78 @@
+# bench_pool.py
+# Latencia de obtener una conexión a SQL Server y ejecutar un SELECT 1:
+#   - "antes":   pyodbc.connect(CONN_STR) nuevo en cada llamada (handshake completo)
+#   - "después": _conn() del pool de database_mssql (conexión reutilizada)
+# También mide N hilos concurrentes (como varias pantallas refrescando a la vez).
+#
+# Uso:  python bench_pool.py [repeticiones] [hilos]
+
+import sys
+import time
+import statistics
+import threading
+
+import pyodbc
+
+import database_mssql as db
+
+def _percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(round(p / 100 * (len(valores) - 1))))]
+
+def _antes():
+    conn = pyodbc.connect(db.CONN_STR, autocommit=False)
+    try:
+        conn.cursor().execute("SELECT 1").fetchone()
+    finally:
+        conn.close()
+
+def _despues():
+    with db._conn() as c:
+        c.cursor().execute("SELECT 1").fetchone()
+
+def _medir(fn, reps):
+    tiempos = []
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        fn()
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    return tiempos
+
+def _medir_concurrente(fn, reps, hilos):
+    tiempos, lock = [], threading.Lock()
+
+    def _trabajo():
+        propios = _medir(fn, reps)
+        with lock:
+            tiempos.extend(propios)
+
+    ts = [threading.Thread(target=_trabajo) for _ in range(hilos)]
+    t0 = time.perf_counter()
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    return tiempos, time.perf_counter() - t0
+
+def _fila(nombre, tiempos):
+    print(f"{nombre:22s} | {statistics.median(tiempos):9.2f} | {_percentil(tiempos, 95):9.2f} | {max(tiempos):9.2f}")
+
+if __name__ == "__main__":
+    reps = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    hilos = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    _despues()  # primera conexión del pool fuera de la medición
+
+    print(f"Repeticiones: {reps} | hilos: {hilos} | pool: min={db._POOL.minimo} max={db._POOL.maximo}")
+    print(f"{'modo':22s} | {'mediana ms':>9s} | {'p95 ms':>9s} | {'máx ms':>9s}")
+    print("-" * 60)
+    antes = _medir(_antes, reps)
+    despues = _medir(_despues, reps)
+    _fila("antes (connect)", antes)
+    _fila("después (pool)", despues)
+
+    antes_c, t_antes = _medir_concurrente(_antes, reps, hilos)
+    despues_c, t_despues = _medir_concurrente(_despues, reps, hilos)
+    _fila(f"antes x{hilos} hilos", antes_c)
+    _fila(f"después x{hilos} hilos", despues_c)
+    print(f"Aceleración (mediana): {statistics.median(antes) / statistics.median(despues):.1f}x | "
+          f"concurrente: {hilos * reps / t_antes:.0f} vs {hilos * reps / t_despues:.0f} consultas/s")
@@ -0,0 +1,158 @@
+# bench_rollup.py
+# Dashboards sobre millones de filas de reporte_cosecha:
+#   - "antes":   dashboard_supervisor / dashboard_agricultor (vistas que
+#                re-agregan toda la tabla y filtran por ultima_fecha después)
+#   - "directo": SUM sobre reporte_cosecha con el rango de ts en el WHERE
+#                (referencia de corrección para el rango)
+#   - "rollup":  dashboard_*_diario (suma solo los días pedidos del rollup)
+# También mide el costo del trigger en registrar_reporte_cosecha.
+# Las filas sintéticas llevan fuente='BENCH' y se borran al terminar
+# (el trigger recalcula el rollup de los grupos tocados).
+#
+# Requiere BD/rollup dashboard.sql aplicado.
+# Uso:  python bench_rollup.py [--filas 2000000] [--dias 730] [--reps 5] [--conservar]
+
+import time
+import argparse
+import statistics
+
+import database_mssql as db
+
+FUENTE = "BENCH"
+BLOQUE = 250_000
+
+def _ids(sql: str):
+    with db._conn() as c:
+        return [int(r[0]) for r in c.cursor().execute(sql).fetchall()]
+
+def _generar(filas: int, dias: int, hectareas, agricultores) -> float:
+    """Inserta `filas` sesiones al azar en los últimos `dias` días (en bloques, con el trigger activo)."""
+    t0 = time.perf_counter()
+    with db._conn() as c:
+        cur = c.cursor()
+        cur.execute("CREATE TABLE #h (n INT PRIMARY KEY, id INT NOT NULL);")
+        cur.execute("CREATE TABLE #a (n INT PRIMARY KEY, id INT NOT NULL);")
+        cur.executemany("INSERT INTO #h VALUES (?, ?);", list(enumerate(hectareas)))
+        cur.executemany("INSERT INTO #a VALUES (?, ?);", list(enumerate(agricultores)))
+        hechas = 0
+        while hechas < filas:
+            n = min(BLOQUE, filas - hechas)
+            cur.execute("""
+                ;WITH n AS (
+                    SELECT TOP (?) ROW_NUMBER() OVER (ORDER BY (SELECT NULL)) - 1 AS i
+                    FROM sys.all_objects a CROSS JOIN sys.all_objects b
+                )
+                INSERT INTO dbo.reporte_cosecha(agricultor_id, hectarea_id, ts, aptos, no_aptos, fuente)
+                SELECT a.id, h.id,
+                       DATEADD(SECOND, ABS(CHECKSUM(NEWID())) % 86400,
+                               DATEADD(DAY, -(ABS(CHECKSUM(NEWID())) % ?),
+                                       CAST(CAST(SYSUTCDATETIME() AS DATE) AS DATETIME2(0)))),
+                       ABS(CHECKSUM(NEWID())) % 200, ABS(CHECKSUM(NEWID())) % 60, ?
+                FROM n
+                JOIN #h h ON h.n = n.i % ?
+                JOIN #a a ON a.n = (n.i / ?) % ?;
+            """, (n, dias, FUENTE, len(hectareas), len(hectareas), len(agricultores)))
+            c.commit()
+            hechas += n
+            print(f"  generadas {hechas}/{filas} ({hechas / (time.perf_counter() - t0):.0f} filas/s)")
+    return time.perf_counter() - t0
+
+def _borrar():
+    total = 0
+    with db._conn() as c:
+        cur = c.cursor()
+        while True:
+            cur.execute("DELETE TOP (?) FROM dbo.reporte_cosecha WHERE fuente = ?;", (BLOQUE // 5, FUENTE))
+            n = cur.rowcount
+            c.commit()
+            total += max(0, n)
+            if n <= 0:
+                return total
+
+def _directo_supervisor(date_from, date_to):
+    filtro, params = "", []
+    if date_from and date_to:
+        filtro = "WHERE rc.ts >= CAST(? AS DATE) AND rc.ts < DATEADD(DAY, 1, CAST(CAST(? AS DATE) AS DATETIME2(0)))"
+        params = [date_from, date_to]
+    with db._conn() as c:
+        cur = c.cursor()
+        cur.execute(f"""
+            SELECT rc.hectarea_id, SUM(rc.aptos) AS total_aptos, SUM(rc.no_aptos) AS total_no_aptos
+            FROM dbo.reporte_cosecha rc {filtro}
+            GROUP BY rc.hectarea_id ORDER BY rc.hectarea_id;
+        """, params)
+        return db._rows_to_dicts(cur)
+
+def _totales(rows):
+    return {int(r["hectarea_id"]): (int(r["total_aptos"] or 0), int(r["total_no_aptos"] or 0)) for r in rows}
+
+def _medir(fn, reps):
+    tiempos, res = [], None
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        res = fn()
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(tiempos), res
+
+def _insercion(agricultor_id, hectarea_id, reps) -> float:
+    tiempos = []
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        db.registrar_reporte_cosecha(agricultor_id, hectarea_id, 10, 2, fuente=FUENTE)
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(tiempos)
+
+def _trigger(habilitar: bool):
+    with db._conn() as c:
+        c.cursor().execute(f"{'ENABLE' if habilitar else 'DISABLE'} TRIGGER dbo.trg_reporte_cosecha_diario "
+                           "ON dbo.reporte_cosecha;")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vistas de dashboard vs rollup diario")
+    parser.add_argument("--filas", type=int, default=2_000_000)
+    parser.add_argument("--dias", type=int, default=730)
+    parser.add_argument("--reps", type=int, default=5)
+    parser.add_argument("--conservar", action="store_true", help="no borrar las filas sintéticas")
+    args = parser.parse_args()
+
+    hectareas = _ids("SELECT TOP (50) id FROM dbo.hectareas ORDER BY id;")
+    agricultores = _ids("SELECT TOP (20) id FROM dbo.usuarios ORDER BY id;")
+    if not hectareas or not agricultores:
+        raise SystemExit("Hacen falta hectáreas y usuarios en la BD para generar datos.")
+
+    print(f"Generando {args.filas} filas en {args.dias} días "
+          f"({len(hectareas)} hectáreas x {len(agricultores)} agricultores)…")
+    seg = _generar(args.filas, args.dias, hectareas, agricultores)
+    print(f"Generación con trigger: {seg:.1f} s ({args.filas / seg:.0f} filas/s)")
+
+    try:
+        hoy = time.strftime("%Y-%m-%d", time.gmtime())
+        agri = agricultores[0]
+        print(f"\n{'rango':>8s} | {'sup. vista ms':>13s} | {'sup. directo ms':>15s} | {'sup. rollup ms':>14s} | "
+              f"{'agri vista ms':>13s} | {'agri rollup ms':>14s} | paridad")
+        print("-" * 108)
+        for dias in (7, 30, 365, None):
+            if dias:
+                desde = time.strftime("%Y-%m-%d", time.gmtime(time.time() - (dias - 1) * 86400))
+                rango, etiqueta = (desde, hoy), f"{dias} d"
+            else:
+                rango, etiqueta = (None, None), "todo"
+            sv, _ = _medir(lambda: db.dashboard_supervisor(*rango), args.reps)
+            sd, ref = _medir(lambda: _directo_supervisor(*rango), args.reps)
+            sr, rol = _medir(lambda: db.dashboard_supervisor_diario(*rango), args.reps)
+            av, _ = _medir(lambda: db.dashboard_agricultor(agri, *rango), args.reps)
+            ar, _ = _medir(lambda: db.dashboard_agricultor_diario(agri, *rango), args.reps)
+            paridad = "ok" if _totales(ref) == _totales(rol) else "DIFIERE"
+            print(f"{etiqueta:>8s} | {sv:13.1f} | {sd:15.1f} | {sr:14.1f} | {av:13.1f} | {ar:14.1f} | {paridad}")
+
+        reps_ins = max(20, args.reps * 10)
+        _trigger(False)
+        try:
+            sin = _insercion(agri, hectareas[0], reps_ins)
+        finally:
+            _trigger(True)
+        con = _insercion(agri, hectareas[0], reps_ins)
+        print(f"\nregistrar_reporte_cosecha (mediana): sin trigger {sin:.2f} ms | con trigger {con:.2f} ms")
+    finally:
+        if not args.conservar:
+            print(f"Borrando filas sintéticas… {_borrar()} filas")
@@ -0,0 +1,119 @@
+# bench_tabla_virtual.py
+# Render de la tabla de reportes con 10.000 y 100.000 filas sintéticas:
+#   - "antes":   QTableWidget + QTableWidgetItem por celda + 2 QPushButton por
+#                fila vía setCellWidget (como historial_agricultor original)
+#   - "después": QTableView + tabla_virtual (modelo con fetchMore + delegado
+#                que pinta los botones)
+# Mide el tiempo hasta la primera pintura, el tiempo en recorrer la tabla
+# hasta el final y el pico de memoria (RSS). Cada caso corre en un proceso nuevo.
+#
+# Uso:  python bench_tabla_virtual.py [--filas 10000 100000] [--max-antes 10000]
+#       (el modo "antes" con 100k filas tarda varios minutos; por eso el tope)
+
+import os
+import sys
+import json
+import time
+import argparse
+import datetime
+import subprocess
+
+from bench_decodificacion import _pico_rss_mb
+
+def _filas(n: int):
+    base = datetime.datetime(2020, 1, 1)
+    estados = ("pendiente", "aprobado", "rechazado")
+    return [(n - i, 1, base + datetime.timedelta(minutes=n - i), "Espárrago",
+             "Cultivo saludable", i % 40, "No aplica", f"reports/imagenes/{i}.png",
+             f"reports/{i}.pdf", estados[i % 3], "" if i % 5 else "Revisar")
+            for i in range(n)]
+
+def _antes(app, filas):
+    from PyQt5.QtWidgets import QTableWidget, QTableWidgetItem, QPushButton
+    tabla = QTableWidget()
+    tabla.resize(970, 430)
+    tabla.setColumnCount(8)
+    tabla.setRowCount(len(filas))
+    for i, r in enumerate(filas):
+        for j, v in enumerate((r[0], r[3], r[4], r[2], r[9], r[10])):
+            tabla.setItem(i, j, QTableWidgetItem(str(v)))
+        btn_eliminar = QPushButton("🗑 Eliminar")
+        btn_eliminar.setEnabled(r[9] == "pendiente")
+        tabla.setCellWidget(i, 6, btn_eliminar)
+        tabla.setCellWidget(i, 7, QPushButton("👁 Ver"))
+    return tabla
+
+def _despues(app, filas):
+    from PyQt5.QtWidgets import QTableView
+    from tabla_virtual import Boton, Columna, FuenteLista, ModeloTablaVirtual, configurar_vista
+    modelo = ModeloTablaVirtual([
+        Columna("ID", lambda r: r[0]), Columna("Planta", lambda r: r[3]),
+        Columna("Estado", lambda r: r[4]), Columna("Fecha", lambda r: r[2]),
+        Columna("Evaluacion", lambda r: r[9]), Columna("Comentario", lambda r: r[10]),
+        Columna("Eliminar", tipo="botones", botones=[
+            Boton("🗑 Eliminar", lambda r: None, habilitado=lambda r: r[9] == "pendiente")]),
+        Columna("Ver", tipo="botones", botones=[Boton("👁 Ver", lambda r: None)]),
+    ], FuenteLista(filas))
+    tabla = QTableView()
+    tabla.resize(970, 430)
+    configurar_vista(tabla, modelo)
+    modelo.recargar()
+    tabla._modelo = modelo  # mantener referencia
+    return tabla
+
+def _hijo(modo: str, n: int):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication([])
+    filas = _filas(n)
+    rss_base = _pico_rss_mb()
+
+    t0 = time.perf_counter()
+    tabla = (_antes if modo == "antes" else _despues)(app, filas)
+    tabla.show()
+    app.processEvents()
+    primera = time.perf_counter() - t0
+
+    # recorrer hasta el final (en el modo virtual esto dispara los fetchMore)
+    t1 = time.perf_counter()
+    modelo = tabla.model()
+    while True:
+        tabla.scrollToBottom()
+        app.processEvents()
+        if not modelo.canFetchMore(modelo.index(-1, -1)):
+            break
+    tabla.scrollToBottom()
+    app.processEvents()
+    recorrido = time.perf_counter() - t1
+
+    print(json.dumps({"primera_s": primera, "recorrido_s": recorrido,
+                      "filas": modelo.rowCount(), "rss_mb": _pico_rss_mb() - rss_base}))
+
+def _lanzar(modo: str, n: int):
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--hijo", modo, str(n)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--hijo":
+        _hijo(sys.argv[2], int(sys.argv[3]))
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(description="QTableWidget + widgets por fila vs tabla_virtual")
+    parser.add_argument("--filas", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--max-antes", type=int, default=10000,
+                        help="no correr el modo 'antes' por encima de estas filas")
+    args = parser.parse_args()
+
+    print(f"{'modo':8s} | {'filas':>7s} | {'1ª pintura (s)':>14s} | {'hasta el final (s)':>18s} | {'RSS +MB':>8s}")
+    print("-" * 70)
+    for n in args.filas:
+        for modo in ("antes", "despues"):
+            if modo == "antes" and n > args.max_antes:
+                print(f"{modo:8s} | {n:7d} | {'omitido (--max-antes)':>14s}")
+                continue
+            r = _lanzar(modo, n)
+            print(f"{modo:8s} | {n:7d} | {r['primera_s']:14.3f} | {r['recorrido_s']:18.3f} | {r['rss_mb']:8.1f}")
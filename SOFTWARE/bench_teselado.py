@@ -0,0 +1,92 @@
+# bench_teselado.py
+# Latencia vs recall del análisis por teselas en imágenes grandes (dron / 12 MP+).
+# Compara la imagen completa (reducida por el modelo) con varias
+# configuraciones de teselado (tamaño, solape, lote).
+#
+# Si existe una carpeta de etiquetas en formato YOLO (<nombre>.txt con
+# "clase cx cy w h" normalizados), se calcula el recall (IoU >= 0.5, sin
+# distinguir clase); si no, solo se reportan los conteos detectados.
+#
+# Uso:  python bench_teselado.py <carpeta_imagenes> [carpeta_etiquetas]
+
+import os
+import sys
+import time
+import statistics
+from typing import Dict, List
+
+import cv2
+import numpy as np
+
+from yolo_service import (
+    get_model, analizar_imagen_yolo, analizar_imagen_teselada, _iou_matrix
+)
+
+CONFIGS = [
+    # (tile_size, overlap, batch_size)
+    (1280, 0.20, 4),
+    (960, 0.20, 8),
+    (640, 0.20, 8),
+    (640, 0.30, 16),
+]
+
+def _etiquetas(carpeta: str, ruta_img: str, ancho: int, alto: int) -> np.ndarray:
+    base = os.path.splitext(os.path.basename(ruta_img))[0]
+    ruta = os.path.join(carpeta, base + ".txt")
+    if not os.path.exists(ruta):
+        return np.zeros((0, 4), dtype=np.float32)
+    cajas = []
+    with open(ruta) as f:
+        for linea in f:
+            partes = linea.split()
+            if len(partes) < 5:
+                continue
+            cx, cy, w, h = (float(v) for v in partes[1:5])
+            cajas.append([(cx - w / 2) * ancho, (cy - h / 2) * alto,
+                          (cx + w / 2) * ancho, (cy + h / 2) * alto])
+    return np.asarray(cajas, dtype=np.float32).reshape(-1, 4)
+
+def _recall(dets: List[Dict], gt: np.ndarray, umbral: float = 0.5) -> float:
+    if len(gt) == 0:
+        return float("nan")
+    if not dets:
+        return 0.0
+    pred = np.asarray([d["box"] for d in dets], dtype=np.float32)
+    iou = _iou_matrix(gt, pred)
+    return float((iou.max(axis=1) >= umbral).mean())
+
+def _correr(nombre: str, fn, rutas: List[str], carpeta_gt):
+    tiempos, recalls, conteos = [], [], []
+    for ruta in rutas:
+        img = cv2.imread(ruta)
+        t0 = time.perf_counter()
+        dets, _ = fn(img)
+        tiempos.append(time.perf_counter() - t0)
+        conteos.append(len(dets))
+        if carpeta_gt:
+            r = _recall(dets, _etiquetas(carpeta_gt, ruta, img.shape[1], img.shape[0]))
+            if r == r:  # no NaN
+                recalls.append(r)
+    rec = f"{statistics.mean(recalls):6.3f}" if recalls else "   n/d"
+    print(f"{nombre:28s} | {statistics.median(tiempos)*1000:9.1f} | {rec} | {sum(conteos):8d}")
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python bench_teselado.py <carpeta_imagenes> [carpeta_etiquetas]")
+        sys.exit(1)
+    carpeta = sys.argv[1]
+    carpeta_gt = sys.argv[2] if len(sys.argv) > 2 else None
+    rutas = sorted(os.path.join(carpeta, f) for f in os.listdir(carpeta)
+                   if f.lower().endswith((".jpg", ".jpeg", ".png")))
+    get_model()  # carga + warm-up fuera de la medición
+
+    print(f"Imágenes: {len(rutas)}")
+    print(f"{'modo':28s} | {'lat. (ms)':>9s} | {'recall':>6s} | {'detecc.':>8s}")
+    print("-" * 62)
+    _correr("imagen completa", lambda im: analizar_imagen_yolo(im, draw=False, usar_cache=False),
+            rutas, carpeta_gt)
+    for tam, solape, lote in CONFIGS:
+        _correr(f"teselas {tam}px solape {solape:.2f} lote {lote}",
+                lambda im, t=tam, s=solape, b=lote: analizar_imagen_teselada(
+                    im, draw=False, tile_size=t, overlap=s, batch_size=b, usar_cache=False),
+                rutas, carpeta_gt)
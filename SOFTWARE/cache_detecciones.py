@@ -0,0 +1,143 @@
+# cache_detecciones.py
+# Caché persistente de detecciones YOLO (SQLite local, desalojo LRU acotado).
+# Clave: hash del contenido de la imagen + hash del archivo de pesos +
+#        conf_threshold + iou_threshold  ->  detecciones finales (ya con NMS).
+# Un acierto evita volver a correr el modelo; la imagen anotada se redibuja
+# a partir de las detecciones guardadas.
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, List, Optional, Tuple
+
+RUTA_CACHE = os.getenv("AGROSCAN_CACHE_DETECCIONES",
+                       os.path.join("reports", "cache", "detecciones.db"))
+MAX_ENTRADAS = int(os.getenv("AGROSCAN_CACHE_MAX_ENTRADAS", "5000"))
+MAX_BYTES = int(os.getenv("AGROSCAN_CACHE_MAX_MB", "64")) * 1024 * 1024
+
+# ========================
+# Hashes
+# ========================
+
+def hash_bytes(data) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+_hash_archivos: Dict[Tuple[str, int, int], str] = {}
+_hash_lock = threading.Lock()
+
+def hash_archivo(path: str) -> str:
+    """SHA-256 del archivo, memorizado por (ruta, tamaño, mtime) durante el proceso."""
+    st = os.stat(path)
+    firma = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    with _hash_lock:
+        if firma in _hash_archivos:
+            return _hash_archivos[firma]
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    digest = h.hexdigest()
+    with _hash_lock:
+        _hash_archivos[firma] = digest
+    return digest
+
+# ========================
+# Caché
+# ========================
+
+class CacheDetecciones:
+    """Almacén clave -> detecciones con desalojo LRU por nº de entradas y bytes."""
+
+    def __init__(self, ruta: str = RUTA_CACHE,
+                 max_entradas: int = MAX_ENTRADAS, max_bytes: int = MAX_BYTES):
+        self.ruta = ruta
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        carpeta = os.path.dirname(ruta)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        self._db = sqlite3.connect(ruta, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS detecciones (
+                clave          TEXT PRIMARY KEY,
+                datos          TEXT NOT NULL,
+                tamano         INTEGER NOT NULL,
+                creado         REAL NOT NULL,
+                ultimo_acceso  REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS IX_detecciones_acceso ON detecciones(ultimo_acceso)")
+        self._db.commit()
+
+    @staticmethod
+    def clave(hash_imagen: str, hash_modelo: str,
+              conf_threshold: float, iou_threshold: float, extra: str = "") -> str:
+        """`extra` distingue modos de inferencia (p. ej. parámetros de teselado)."""
+        base = f"{hash_imagen}:{hash_modelo}:{conf_threshold:.4f}:{iou_threshold:.4f}"
+        return f"{base}:{extra}" if extra else base
+
+    def obtener(self, clave: str) -> Optional[List[Dict]]:
+        with self._lock:
+            row = self._db.execute("SELECT datos FROM detecciones WHERE clave = ?", (clave,)).fetchone()
+            if not row:
+                return None
+            self._db.execute("UPDATE detecciones SET ultimo_acceso = ? WHERE clave = ?",
+                             (time.time(), clave))
+            self._db.commit()
+        return json.loads(row[0])
+
+    def guardar(self, clave: str, detections: List[Dict]) -> None:
+        datos = json.dumps(detections, ensure_ascii=False)
+        ahora = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO detecciones(clave, datos, tamano, creado, ultimo_acceso) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (clave, datos, len(datos), ahora, ahora),
+            )
+            self._desalojar()
+            self._db.commit()
+
+    def _desalojar(self) -> None:
+        """Borra las entradas menos usadas hasta respetar ambos límites (con lock tomado)."""
+        n, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(tamano), 0) FROM detecciones").fetchone()
+        if n <= self.max_entradas and total <= self.max_bytes:
+            return
+        sobran_n = max(0, n - self.max_entradas)
+        sobran_b = max(0, total - self.max_bytes)
+        borrar, liberados = [], 0
+        for clave, tamano in self._db.execute(
+                "SELECT clave, tamano FROM detecciones ORDER BY ultimo_acceso ASC"):
+            if len(borrar) >= sobran_n and liberados >= sobran_b:
+                break
+            borrar.append((clave,))
+            liberados += tamano
+        self._db.executemany("DELETE FROM detecciones WHERE clave = ?", borrar)
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM detecciones")
+            self._db.commit()
+
+    def estadisticas(self) -> Dict[str, int]:
+        with self._lock:
+            n, total = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tamano), 0) FROM detecciones").fetchone()
+        return {"entradas": n, "bytes": total}
+
+_cache: Optional[CacheDetecciones] = None
+_cache_lock = threading.Lock()
+
+def obtener_cache() -> CacheDetecciones:
+    """Instancia compartida (se crea en el primer uso)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = CacheDetecciones()
+        return _cache
@@ -1,23 +1,33 @@
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QFileDialog,
-    QTextEdit, QLineEdit, QMessageBox, QFrame
+    QTextEdit, QLineEdit, QMessageBox, QFrame, QProgressBar
 )
 from PyQt5.QtGui import QPixmap, QIcon, QFont, QImage
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, pyqtSignal, QObject, QRunnable, QThreadPool
 # Proxy que apunta a SQL Server (database_mssql)
 from database import (
     guardar_reporte,                 # reporte clásico (PDF + metadatos)
     hectarea_activa_de_agricultor,   # obtener hectárea asignada
-    registrar_reporte_cosecha        # registrar aptos/no aptos para dashboards
+    registrar_reporte_cosecha,       # registrar aptos/no aptos para dashboards
+    registrar_reporte_cosecha_lote,  # mismo registro, varias sesiones en una transacción
+    es_pendiente                     # id de una escritura que sigue en la cola offline
 )
+from database_async import llamar    # consultas de la UI fuera del hilo principal
 from yolo_service import (
     analizar_imagen_yolo,
+    iterar_lote_yolo,                # ingesta masiva (lotes en streaming)
+    al_modelo_listo,                 # señal de modelo cargado (precarga en segundo plano)
     conteos_por_label,
     conteo_sanos_enfermos,           # atajo sanos/enfermos/total
 )
-from exportador import generar_pdf_reporte
+from exportador import generar_pdf_reporte, ruta_reporte
+from pdf_pool import generar
 import os
 import cv2
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # ======= CONFIG =======
 DEBUG_LABELS = False  # True para depurar en consola
@@ -65,11 +75,212 @@ QTextEdit {
 }
 """
 
+EXTENSIONES_IMAGEN = (".png", ".jpg", ".jpeg")
+LOTE_INGESTA = 8          # imágenes por pasada del modelo
+ESCRITORES_PNG = 4        # hilos que guardan PNG anotados en paralelo
+
 # 👉 Etiquetas exactas (normalizadas por yolo_service/clases.py)
 APTO_LABELS = {"Espárrago sano"}
 NO_APTO_LABELS = {"Espárrago enfermo"}
 
+# ======= ANÁLISIS EN SEGUNDO PLANO =======
+class AnalisisCancelado(Exception):
+    pass
+
+class _SenalesAnalisis(QObject):
+    # (id de trabajo, porcentaje, texto)
+    progreso = pyqtSignal(int, int, str)
+    # (id de trabajo, resultado)
+    resultado = pyqtSignal(int, dict)
+    # (id de trabajo, mensaje)
+    error = pyqtSignal(int, str)
+    # (id de trabajo) — siempre se emite al final, con o sin error/cancelación
+    terminado = pyqtSignal(int)
+
+class TrabajoAnalisis(QRunnable):
+    """
+    Análisis YOLO + PNG anotado + registro en BD fuera del hilo de la GUI.
+    La inferencia no se puede interrumpir a mitad; la cancelación se revisa
+    entre etapas y, si llega, no se escribe nada en disco ni en la BD.
+    """
+
+    def __init__(self, trabajo_id, file_path, usuario_id):
+        super().__init__()
+        self.trabajo_id = trabajo_id
+        self.file_path = file_path
+        self.usuario_id = usuario_id
+        self.senales = _SenalesAnalisis()
+        self._cancelado = threading.Event()
+
+    def cancelar(self):
+        self._cancelado.set()
+
+    def _paso(self, pct, texto):
+        if self._cancelado.is_set():
+            raise AnalisisCancelado()
+        self.senales.progreso.emit(self.trabajo_id, pct, texto)
+
+    def run(self):
+        try:
+            self._paso(5, "Analizando con IA…")
+            detections, image_with_boxes = analizar_imagen_yolo(
+                self.file_path, conf_threshold=0.25, iou_threshold=0.30, draw=True
+            )
+            res = {"file_path": self.file_path, "detections": detections,
+                   "image": image_with_boxes, "path_anotada": None,
+                   "aviso_guardado": None, "asig": None, "registro_id": None,
+                   "error_registro": None}
+            if image_with_boxes is None:
+                self._paso(100, "Listo")
+                self.senales.resultado.emit(self.trabajo_id, res)
+                return
+
+            # --- Guardar imagen anotada (para PDF y supervisor)
+            self._paso(60, "Guardando imagen anotada…")
+            try:
+                res["path_anotada"] = _guardar_anotada(self.file_path, image_with_boxes)
+            except Exception as e:
+                res["aviso_guardado"] = str(e)
+
+            # Registrar sesión en BD (dashboard) si hay hectárea asignada
+            self._paso(80, "Registrando sesión…")
+            totales = conteo_sanos_enfermos(detections)
+            try:
+                asig = hectarea_activa_de_agricultor(self.usuario_id)
+                res["asig"] = asig
+                if asig:
+                    res["registro_id"] = registrar_reporte_cosecha(
+                        agricultor_id=self.usuario_id,
+                        hectarea_id=asig["hectarea_id"],
+                        aptos=totales.get("sanos", 0),
+                        no_aptos=totales.get("enfermos", 0),
+                        fuente="YOLO"
+                    )
+            except Exception as e:
+                res["error_registro"] = str(e)
+
+            self.senales.progreso.emit(self.trabajo_id, 100, "Listo")
+            self.senales.resultado.emit(self.trabajo_id, res)
+        except AnalisisCancelado:
+            pass
+        except Exception as e:
+            self.senales.error.emit(self.trabajo_id, str(e))
+        finally:
+            self.senales.terminado.emit(self.trabajo_id)
+
+class _SenalesIngesta(QObject):
+    # (id de trabajo, procesadas, total, imágenes/s, segundos restantes)
+    progreso = pyqtSignal(int, int, int, float, float)
+    resultado = pyqtSignal(int, dict)
+    error = pyqtSignal(int, str)
+    terminado = pyqtSignal(int)
+
+def _guardar_anotada(file_path, image):
+    """
+    PNG anotado en reports/imagenes. El nombre lleva un hash corto de la ruta
+    completa: dos fotos homónimas de carpetas distintas no se pisan.
+    OSError si no se pudo escribir (cv2.imwrite no lanza, devuelve False).
+    """
+    os.makedirs("reports/imagenes", exist_ok=True)
+    base = os.path.splitext(os.path.basename(file_path))[0]
+    sufijo = hashlib.sha1(os.path.abspath(file_path).encode("utf-8")).hexdigest()[:8]
+    out_name = f"reports/imagenes/{base}_{sufijo}_anotada.png"
+    if not cv2.imwrite(out_name, image):
+        raise OSError(f"No se pudo escribir {out_name}")
+    return os.path.abspath(out_name)
+
+class TrabajoIngesta(QRunnable):
+    """
+    Ingesta de una carpeta (tarjeta SD) completa: inferencia por lotes en
+    streaming (solo un lote en memoria), PNG anotados escritos en paralelo y
+    todas las sesiones registradas al final en una sola transacción.
+    Si se cancela no se registra nada en la BD.
+    """
+
+    def __init__(self, trabajo_id, file_paths, usuario_id):
+        super().__init__()
+        self.trabajo_id = trabajo_id
+        self.file_paths = list(file_paths)
+        self.usuario_id = usuario_id
+        self.senales = _SenalesIngesta()
+        self._cancelado = threading.Event()
+
+    def cancelar(self):
+        self._cancelado.set()
+
+    def run(self):
+        try:
+            self._ingestar()
+        except AnalisisCancelado:
+            pass
+        except Exception as e:
+            self.senales.error.emit(self.trabajo_id, str(e))
+        finally:
+            self.senales.terminado.emit(self.trabajo_id)
+
+    def _ingestar(self):
+        total = len(self.file_paths)
+        res = {"procesadas": 0, "fallidas": [], "sanos": 0, "enfermos": 0,
+               "asig": None, "ids": [], "error_registro": None}
+        conteos = []  # (sanos, enfermos) por imagen leída y con su PNG escrito
+        # acota las imágenes anotadas pendientes de escribir (memoria)
+        cupo = threading.BoundedSemaphore(ESCRITORES_PNG * 2)
+        t0 = time.perf_counter()
+
+        def _escribir(path, image):
+            try:
+                _guardar_anotada(path, image)
+            finally:
+                cupo.release()
+
+        with ThreadPoolExecutor(max_workers=ESCRITORES_PNG) as escritores:
+            escrituras = []
+            for r in iterar_lote_yolo(self.file_paths, batch_size=LOTE_INGESTA, draw=True):
+                if self._cancelado.is_set():
+                    raise AnalisisCancelado()
+                res["procesadas"] += 1
+                if r["error"]:
+                    res["fallidas"].append(r["path"])
+                else:
+                    cupo.acquire()
+                    escrituras.append((r["path"], (r["conteo"]["sanos"], r["conteo"]["enfermos"]),
+                                       escritores.submit(_escribir, r["path"], r["annotated"])))
+                hechas = res["procesadas"]
+                velocidad = hechas / max(time.perf_counter() - t0, 1e-6)
+                self.senales.progreso.emit(self.trabajo_id, hechas, total, velocidad,
+                                           (total - hechas) / velocidad)
+            # solo se registra sesión de las imágenes cuyo PNG quedó en disco
+            for path, conteo, fut in escrituras:
+                if fut.exception() is not None:
+                    res["fallidas"].append(path)
+                else:
+                    conteos.append(conteo)
+
+        res["sanos"] = sum(s for s, _ in conteos)
+        res["enfermos"] = sum(e for _, e in conteos)
+        if self._cancelado.is_set():
+            raise AnalisisCancelado()
+
+        # Una sesión por imagen, todas en una transacción
+        asig = hectarea_activa_de_agricultor(self.usuario_id)
+        res["asig"] = asig
+        if asig and conteos:
+            try:
+                res["ids"] = registrar_reporte_cosecha_lote([
+                    {"agricultor_id": self.usuario_id, "hectarea_id": asig["hectarea_id"],
+                     "aptos": sanos, "no_aptos": enfermos, "fuente": "YOLO"}
+                    for sanos, enfermos in conteos
+                ])
+            except Exception as e:  # no se registró ninguna; el conteo sí se muestra
+                res["ids"] = None
+                res["error_registro"] = str(e)
+        res["segundos"] = time.perf_counter() - t0
+        self.senales.resultado.emit(self.trabajo_id, res)
+
 class AnalisisChatWindow(QWidget):
+    # Emitida (vía cola de eventos Qt) cuando termina la carga del modelo; "" = OK
+    modelo_cargado = pyqtSignal(str)
+
     def __init__(self, usuario_id, nombre_usuario):
         super().__init__()
         self.usuario_id = usuario_id
@@ -83,6 +294,11 @@ class AnalisisChatWindow(QWidget):
         self.aptos = 0
         self.no_aptos = 0
         self.total_detectados = 0
+        # Cola de imágenes por analizar y trabajo en curso
+        self._cola = []
+        self._trabajo = None
+        self._trabajo_seq = 0
+        self._pool = QThreadPool.globalInstance()
         self.setStyleSheet(BASE_STYLESHEET)
         self.init_ui()
 
@@ -103,12 +319,21 @@ class AnalisisChatWindow(QWidget):
         self.btn_cargar.setIcon(QIcon("iconos/icon-image-add.png"))
         self.btn_capturar = QPushButton("Capturar Imagen (simulado)")
         self.btn_capturar.setIcon(QIcon("iconos/icon-camera.png"))
+        self.btn_carpeta = QPushButton("Cargar carpeta")
+        self.btn_carpeta.setIcon(QIcon("iconos/icon-image-add.png"))
         btns.addWidget(self.btn_cargar)
         btns.addWidget(self.btn_capturar)
+        btns.addWidget(self.btn_carpeta)
 
         layout.addLayout(btns)
         layout.addWidget(self.img_label)
 
+        self.progreso = QProgressBar()
+        self.progreso.setRange(0, 100)
+        self.progreso.setTextVisible(True)
+        self.progreso.setVisible(False)
+        layout.addWidget(self.progreso)
+
         chat_label = QLabel("Chat con AgroScan")
         chat_label.setFont(QFont("Segoe UI", 11, QFont.Bold))
         layout.addWidget(chat_label)
@@ -137,27 +362,166 @@ class AnalisisChatWindow(QWidget):
 
         self.btn_cargar.clicked.connect(self.cargar_imagen)
         self.btn_capturar.clicked.connect(self.capturar_imagen)
+        self.btn_carpeta.clicked.connect(self.cargar_carpeta)
         self.send_btn.clicked.connect(self.enviar_pregunta)
         self.guardar_btn.clicked.connect(self.guardar_reporte)
 
+        # Hasta que el modelo esté listo no se puede analizar
+        self.btn_cargar.setEnabled(False)
+        self.btn_capturar.setEnabled(False)
+        self.btn_carpeta.setEnabled(False)
+        self.img_label.setText("Cargando modelo de IA…")
+        self.modelo_cargado.connect(self._on_modelo_cargado)
+        al_modelo_listo(lambda err: self.modelo_cargado.emit(str(err) if err else ""))
+
+    def _on_modelo_cargado(self, error):
+        self.btn_cargar.setEnabled(True)
+        self.btn_capturar.setEnabled(True)
+        self.btn_carpeta.setEnabled(True)
+        if error:
+            self.img_label.setText("No se pudo cargar el modelo de IA.")
+            self.chat_area.append(f"<span style='color:#ba1a1a;'>⚠️ Error al cargar el modelo: {error}</span>")
+        elif self.path_imagen is None:
+            self.img_label.setText("No hay imagen cargada")
+
     def cargar_imagen(self):
-        file_path, _ = QFileDialog.getOpenFileName(self, "Seleccionar imagen", "", "Imágenes (*.png *.jpg *.jpeg)")
-        if file_path:
-            self.mostrar_imagen(file_path)
+        file_paths, _ = QFileDialog.getOpenFileNames(self, "Seleccionar imágenes", "", "Imágenes (*.png *.jpg *.jpeg)")
+        if file_paths:
+            self.mostrar_imagen(*file_paths)
 
     def capturar_imagen(self):
         self.cargar_imagen()
 
-    def mostrar_imagen(self, file_path):
-        self.path_imagen = file_path
-        self.chat_area.append("<span style='color:#38761d;'>Imagen cargada. Analizando con IA...</span>")
-        self.guardar_btn.setEnabled(True)
+    def mostrar_imagen(self, *file_paths):
+        """
+        Encola las imágenes para analizarlas en segundo plano. Una selección
+        nueva cancela el análisis en curso y reemplaza lo que quedaba en cola.
+        """
+        self.cancelar_analisis()
+        self._cola = list(file_paths)
+        self._siguiente_en_cola()
+
+    def cargar_carpeta(self):
+        carpeta = QFileDialog.getExistingDirectory(self, "Seleccionar carpeta de imágenes")
+        if not carpeta:
+            return
+        file_paths = sorted(
+            e.path for e in os.scandir(carpeta)
+            if e.is_file() and e.name.lower().endswith(EXTENSIONES_IMAGEN)
+        )
+        if not file_paths:
+            QMessageBox.information(self, "Carpeta vacía", "La carpeta no contiene imágenes PNG/JPG.")
+            return
+        self.ingestar_imagenes(file_paths)
+
+    def ingestar_imagenes(self, file_paths):
+        """Analiza muchas imágenes en segundo plano (ver TrabajoIngesta)."""
+        self.cancelar_analisis()
+        self._trabajo_seq += 1
+        trabajo = TrabajoIngesta(self._trabajo_seq, file_paths, self.usuario_id)
+        trabajo.senales.progreso.connect(self._on_progreso_ingesta)
+        trabajo.senales.resultado.connect(self._on_resultado_ingesta)
+        trabajo.senales.error.connect(self._on_error)
+        trabajo.senales.terminado.connect(self._on_terminado)
+        self._trabajo = trabajo
+
+        self.chat_area.append(f"<span style='color:#38761d;'>Procesando {len(file_paths)} imágenes "
+                              f"de la carpeta...</span>")
+        self.progreso.setValue(0)
+        self.progreso.setFormat("Iniciando…")
+        self.progreso.setVisible(True)
+        self._pool.start(trabajo)
+
+    def _on_progreso_ingesta(self, trabajo_id, hechas, total, velocidad, restante):
+        if not self._es_actual(trabajo_id):
+            return
+        minutos, segundos = divmod(int(restante), 60)
+        self.progreso.setValue(int(100 * hechas / max(total, 1)))
+        self.progreso.setFormat(f"{hechas}/{total} · {velocidad:.1f} img/s · ETA {minutos:02d}:{segundos:02d}")
 
-        # ---- YOLO: análisis
-        detections, image_with_boxes = analizar_imagen_yolo(
-            file_path, conf_threshold=0.25, iou_threshold=0.30, draw=True
+    def _on_resultado_ingesta(self, trabajo_id, res):
+        if not self._es_actual(trabajo_id):
+            return
+        n = res["procesadas"]
+        self.chat_area.append(
+            f"<b>AgroScan IA:</b> {n} imágenes en {res['segundos']:.1f} s "
+            f"({n / max(res['segundos'], 1e-6):.1f} img/s)."
         )
+        self.chat_area.append(f"<i>Conteo: Sanos={res['sanos']} | Enfermos={res['enfermos']} | "
+                              f"Total={res['sanos'] + res['enfermos']}</i>")
+        if res["fallidas"]:
+            nombres = ", ".join(os.path.basename(p or "") for p in res["fallidas"][:5])
+            extra = "…" if len(res["fallidas"]) > 5 else ""
+            self.chat_area.append(f"<span style='color:#ba1a1a;'>⚠️ {len(res['fallidas'])} imagen(es) "
+                                  f"no se pudieron procesar o guardar: {nombres}{extra}</span>")
+        asig = res["asig"]
+        if not asig:
+            self.chat_area.append("<span style='color:#ba1a1a;'>⚠️ No tienes una hectárea asignada. Pide al supervisor que te asigne una.</span>")
+        elif res["ids"] and any(es_pendiente(i) for i in res["ids"]):
+            self.chat_area.append(f"<span style='color:#8a6d00;'>⏳ {len(res['ids'])} sesiones guardadas en {asig['codigo']}, "
+                                  f"pendientes de sincronizar.</span>")
+        elif res["ids"]:
+            self.chat_area.append(f"<span style='color:#1b5e20;'>✅ {len(res['ids'])} sesiones registradas en {asig['codigo']}.</span>")
+        elif res["ids"] is None:
+            self.chat_area.append("<span style='color:#ba1a1a;'>❌ No se pudieron registrar las sesiones en la base de datos: "
+                                  f"{res['error_registro']}</span>")
+
+    def cancelar_analisis(self):
+        self._cola = []
+        if self._trabajo is not None:
+            self._trabajo.cancelar()
+            self._trabajo = None  # sus señales tardías se ignoran por id
+        self.progreso.setVisible(False)
+
+    def _siguiente_en_cola(self):
+        if self._trabajo is not None or not self._cola:
+            return
+        file_path = self._cola.pop(0)
+        self._trabajo_seq += 1
+        trabajo = TrabajoAnalisis(self._trabajo_seq, file_path, self.usuario_id)
+        trabajo.senales.progreso.connect(self._on_progreso)
+        trabajo.senales.resultado.connect(self._on_resultado)
+        trabajo.senales.error.connect(self._on_error)
+        trabajo.senales.terminado.connect(self._on_terminado)
+        self._trabajo = trabajo
+
+        self.path_imagen = file_path
+        pendientes = f" ({len(self._cola)} en cola)" if self._cola else ""
+        self.chat_area.append(f"<span style='color:#38761d;'>Imagen cargada: {os.path.basename(file_path)}. "
+                              f"Analizando con IA...{pendientes}</span>")
+        self.guardar_btn.setEnabled(False)
+        self.progreso.setValue(0)
+        self.progreso.setVisible(True)
+        self._pool.start(trabajo)
+
+    def _es_actual(self, trabajo_id):
+        return self._trabajo is not None and self._trabajo.trabajo_id == trabajo_id
+
+    def _on_progreso(self, trabajo_id, pct, texto):
+        if self._es_actual(trabajo_id):
+            self.progreso.setValue(pct)
+            self.progreso.setFormat(f"{texto} %p%")
+
+    def _on_error(self, trabajo_id, mensaje):
+        if self._es_actual(trabajo_id):
+            self.chat_area.append(f"<span style='color:#ba1a1a;'>❌ Error al analizar la imagen: {mensaje}</span>")
+
+    def _on_terminado(self, trabajo_id):
+        if self._es_actual(trabajo_id):
+            self._trabajo = None
+            self.progreso.setVisible(False)
+            self._siguiente_en_cola()
+
+    def _on_resultado(self, trabajo_id, res):
+        if not self._es_actual(trabajo_id):
+            return
+        detections = res["detections"]
+        image_with_boxes = res["image"]
+        self.path_imagen = res["file_path"]
+        self.path_imagen_anotada = None
         self.yolo_detections = detections
+        self.guardar_btn.setEnabled(True)
+        self.guardar_btn.setText("Guardar reporte (PDF)")
 
         # Mostrar imagen anotada en la UI
         if image_with_boxes is not None:
@@ -171,16 +535,9 @@ class AnalisisChatWindow(QWidget):
             self.img_label.setText("No se pudo procesar la imagen.")
             return
 
-        # --- Guardar imagen anotada (para PDF y supervisor)
-        self.path_imagen_anotada = None
-        try:
-            os.makedirs("reports/imagenes", exist_ok=True)
-            base = os.path.splitext(os.path.basename(file_path))[0]
-            out_name = f"reports/imagenes/{base}_anotada.png"
-            cv2.imwrite(out_name, image_with_boxes)
-            self.path_imagen_anotada = os.path.abspath(out_name)
-        except Exception as e:
-            self.chat_area.append(f"<span style='color:#ba1a1a;'>⚠️ No pude guardar la imagen anotada: {e}</span>")
+        self.path_imagen_anotada = res["path_anotada"]
+        if res["aviso_guardado"]:
+            self.chat_area.append(f"<span style='color:#ba1a1a;'>⚠️ No pude guardar la imagen anotada: {res['aviso_guardado']}</span>")
 
         # Resumen por etiqueta y totales apto/no apto
         conteos = conteos_por_label(detections)
@@ -197,26 +554,22 @@ class AnalisisChatWindow(QWidget):
         self.chat_area.append(f"<b>AgroScan IA:</b> {resumen_legible}")
         self.chat_area.append(f"<i>Conteo: Sanos={self.aptos} | Enfermos={self.no_aptos} | Total={self.total_detectados}</i>")
 
-        # Registrar sesión en BD (dashboard) si hay hectárea asignada
-        asig = hectarea_activa_de_agricultor(self.usuario_id)
-        if not asig:
+        # Resultado del registro en BD (hecho en el trabajador)
+        asig = res["asig"]
+        if res["error_registro"]:
+            self.chat_area.append(f"<span style='color:#ba1a1a;'>❌ Error al registrar sesión: {res['error_registro']}</span>")
+        elif not asig:
             self.chat_area.append("<span style='color:#ba1a1a;'>⚠️ No tienes una hectárea asignada. Pide al supervisor que te asigne una.</span>")
-            return
+        elif es_pendiente(res["registro_id"]):
+            self.chat_area.append(f"<span style='color:#8a6d00;'>⏳ Sesión guardada en {asig['codigo']}, pendiente de sincronizar.</span>")
+        elif res["registro_id"]:
+            self.chat_area.append(f"<span style='color:#1b5e20;'>✅ Sesión registrada (id={res['registro_id']}) en {asig['codigo']}.</span>")
+        else:
+            self.chat_area.append("<span style='color:#ba1a1a;'>❌ No se pudo registrar la sesión en la base de datos.</span>")
 
-        try:
-            new_id = registrar_reporte_cosecha(
-                agricultor_id=self.usuario_id,
-                hectarea_id=asig["hectarea_id"],
-                aptos=self.aptos,
-                no_aptos=self.no_aptos,
-                fuente="YOLO"
-            )
-            if new_id:
-                self.chat_area.append(f"<span style='color:#1b5e20;'>✅ Sesión registrada (id={new_id}) en {asig['codigo']}.</span>")
-            else:
-                self.chat_area.append("<span style='color:#ba1a1a;'>❌ No se pudo registrar la sesión en la base de datos.</span>")
-        except Exception as e:
-            self.chat_area.append(f"<span style='color:#ba1a1a;'>❌ Error al registrar sesión: {e}</span>")
+    def closeEvent(self, event):
+        self.cancelar_analisis()
+        super().closeEvent(event)
 
     def resumir_resultados_yolo(self, detections):
         if not detections:
@@ -267,23 +620,36 @@ class AnalisisChatWindow(QWidget):
 
         resumen = self.resumir_resultados_yolo(self.yolo_detections)
 
-        # Hectárea (si existe) para añadir al PDF
-        asig = hectarea_activa_de_agricultor(self.usuario_id)
+        # Hectárea (si existe) para añadir al PDF; se consulta en el pool de BD
+        self.guardar_btn.setEnabled(False)
+        llamar(hectarea_activa_de_agricultor, self.usuario_id, coalescer=True).conectar(
+            lambda asig: self._guardar_con_hectarea(resumen, asig),
+            self._on_error_guardar,
+        )
+
+    def _on_error_guardar(self, e):
+        self.guardar_btn.setEnabled(True)
+        QMessageBox.critical(self, "Error", f"No se pudo guardar el reporte:\n{e}")
+
+    def _guardar_con_hectarea(self, resumen, asig):
         hectarea = asig["codigo"] if asig else None
 
         # Usar la imagen ANOTADA si existe; si no, la original
         img_para_pdf = self.path_imagen_anotada or self.path_imagen
 
-        # Generación de PDF (exportador.py)
-        path_pdf = generar_pdf_reporte(
-            self.nombre_usuario,
-            resumen,
-            img_para_pdf,
+        # Generación de PDF (exportador.py) en el pool de PDF; al terminar se guarda en BD
+        generar(
+            generar_pdf_reporte,
+            ruta_reporte(self.nombre_usuario),
+            nombre_usuario=self.nombre_usuario,
+            resumen=resumen,
+            path_imagen=img_para_pdf,
             aptos=self.aptos,
             no_aptos=self.no_aptos,
             hectarea=hectarea
-        )
+        ).conectar(self._guardar_en_bd, self._on_error_guardar)
 
+    def _guardar_en_bd(self, path_pdf):
         # --- Guardar reporte "clásico" en BD ---
         planta = "Espárrago"
         enfermedad = "Detectado espárrago enfermo" if self.no_aptos > 0 else "Cultivo saludable"
@@ -293,13 +659,15 @@ class AnalisisChatWindow(QWidget):
         # Guardar la ruta de la imagen ANOTADA (preferible para revisión del supervisor)
         img_rel = os.path.relpath(self.path_imagen_anotada or self.path_imagen, os.getcwd())
 
-        ok, msg = guardar_reporte(
-            self.usuario_id, planta, enfermedad, num_frutos, maduracion,
-            img_rel, path_pdf
-        )
+        llamar(guardar_reporte, self.usuario_id, planta, enfermedad, num_frutos, maduracion,
+               img_rel, path_pdf).conectar(self._on_reporte_guardado, self._on_error_guardar)
+
+    def _on_reporte_guardado(self, resultado):
+        ok, msg = resultado
         if ok:
             QMessageBox.information(self, "Éxito", "Reporte guardado correctamente como PDF.")
             self.guardar_btn.setEnabled(False)
             self.guardar_btn.setText("Guardado ✅")
         else:
+            self.guardar_btn.setEnabled(True)
             QMessageBox.critical(self, "Error", msg)
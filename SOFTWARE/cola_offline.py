@@ -0,0 +1,463 @@
+# cola_offline.py
+# Cola de salida (outbox) local para las escrituras del agricultor.
+# - registrar_reporte_cosecha(_lote), guardar_reporte y registrar_actividad_campo
+#   escriben PRIMERO en un diario SQLite local (solo se agregan filas; WAL +
+#   synchronous=FULL): si SQL Server no responde, el trabajo no se pierde.
+# - Un hilo de sincronización vacía la cola por lotes hacia SQL Server
+#   (database_mssql.sincronizar_*). Cada fila lleva una clave de idempotencia
+#   (GUID) que se guarda en el servidor: reintentar un lote ya aplicado no
+#   duplica filas (requiere BD/idempotencia cola offline.sql).
+# - Estando en línea, la escritura espera hasta SYNC_ESPERA_S a que se
+#   confirme y devuelve el id del servidor; si no, devuelve el id local de la
+#   cola NEGADO (los del servidor son IDENTITY > 0: un id < 0 significa
+#   "pendiente de sincronizar") y se envía después. Sin conexión no espera
+#   (reintento con backoff).
+# - Las filas de una misma escritura (p. ej. registrar_reporte_cosecha_lote)
+#   comparten `grupo`: se envían en el mismo lote y, si el servidor rechaza
+#   una, se rechazan todas (nunca se aplica un lote a medias).
+# - estado_cola() expone a la UI los pendientes y el retraso de sincronización
+#   (ver database_async.IndicadorCola).
+#
+# database.py reexporta estas funciones en lugar de las de database_mssql
+# (desactivar con AGROSCAN_COLA_OFFLINE=0).
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import pyodbc
+
+import database_mssql as _srv
+
+RUTA_COLA = os.getenv("AGROSCAN_COLA_BD", os.path.join("reports", "local", "cola_salida.db"))
+SYNC_INTERVALO_S = float(os.getenv("AGROSCAN_SYNC_INTERVALO_S", "15"))   # revisión periódica de la cola
+SYNC_LOTE = int(os.getenv("AGROSCAN_SYNC_LOTE", "500"))                  # filas por envío
+SYNC_ESPERA_S = float(os.getenv("AGROSCAN_SYNC_ESPERA_S", "2"))          # espera de confirmación al escribir
+SYNC_BACKOFF_MAX_S = float(os.getenv("AGROSCAN_SYNC_BACKOFF_MAX_S", "300"))
+RETENCION_DIAS = float(os.getenv("AGROSCAN_COLA_RETENCION_DIAS", "7"))   # las ya enviadas se purgan después
+
+# operación -> función que aplica un lote en el servidor ({clave: id})
+_APLICAR: Dict[str, Callable[[List[Dict]], Dict[str, int]]] = {
+    "reporte_cosecha": _srv.sincronizar_reportes_cosecha,
+    "reporte": _srv.sincronizar_reportes,
+    "actividad_campo": _srv.sincronizar_actividades,
+}
+
+# Errores propios del registro (no se arreglan reintentando): la fila se aparta
+# como rechazada para no bloquear la cola. Cualquier otro error se reintenta,
+# salvo _ERRORES_DE_ESQUEMA.
+_ERRORES_DE_DATOS = (pyodbc.IntegrityError, pyodbc.DataError, KeyError, ValueError, TypeError)
+# Falta algo en el servidor (p. ej. no se aplicó BD/idempotencia cola offline.sql
+# y no existe clave_idem): no es culpa de ninguna fila ni se arregla sola. La
+# sincronización se detiene (las filas siguen en la cola) y el motivo queda en
+# estado_cola()["detenido"] hasta reiniciar la aplicación.
+_ERRORES_DE_ESQUEMA = (pyodbc.ProgrammingError,)
+
+_CAMPOS_FECHA = ("ts", "fecha", "fecha_hora")
+
+def _a_json(datos: Dict) -> str:
+    return json.dumps(datos, ensure_ascii=False,
+                      default=lambda v: v.isoformat() if isinstance(v, datetime) else str(v))
+
+def _de_json(texto: str) -> Dict:
+    datos = json.loads(texto)
+    for campo in _CAMPOS_FECHA:
+        if isinstance(datos.get(campo), str):
+            datos[campo] = datetime.fromisoformat(datos[campo])
+    return datos
+
+def _ahora_utc() -> datetime:
+    return datetime.utcnow().replace(microsecond=0)
+
+# ========================
+# Diario local
+# ========================
+
+class ColaSalida:
+    """
+    Diario SQLite de escrituras pendientes. `salida` solo recibe INSERT; lo
+    enviado (con su id en el servidor) y lo rechazado se anotan aparte.
+    """
+
+    def __init__(self, ruta: str = RUTA_COLA):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        carpeta = os.path.dirname(ruta)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        self._db = sqlite3.connect(ruta, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=FULL")  # cada commit sobrevive a un corte de luz
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS salida (
+                id         INTEGER PRIMARY KEY AUTOINCREMENT,
+                clave      TEXT NOT NULL UNIQUE,
+                operacion  TEXT NOT NULL,
+                datos      TEXT NOT NULL,
+                creado     REAL NOT NULL,
+                grupo      TEXT
+            );
+            CREATE TABLE IF NOT EXISTS enviados (
+                salida_id   INTEGER PRIMARY KEY,
+                id_servidor INTEGER,
+                enviado     REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS rechazados (
+                salida_id INTEGER PRIMARY KEY,
+                error     TEXT NOT NULL,
+                fecha     REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS hectarea_conocida (
+                agricultor_id INTEGER PRIMARY KEY,
+                datos         TEXT NOT NULL,
+                fecha         REAL NOT NULL
+            );
+        """)
+        # diarios creados antes de `grupo`: sus filas quedan como grupos de una
+        if "grupo" not in {col[1] for col in self._db.execute("PRAGMA table_info(salida)")}:
+            self._db.execute("ALTER TABLE salida ADD COLUMN grupo TEXT")
+        self._db.commit()
+
+    _PENDIENTES = ("FROM salida s WHERE NOT EXISTS (SELECT 1 FROM enviados e WHERE e.salida_id = s.id) "
+                   "AND NOT EXISTS (SELECT 1 FROM rechazados r WHERE r.salida_id = s.id)")
+
+    def encolar(self, operacion: str, registros: Iterable[Dict]) -> List[int]:
+        """
+        Agrega los registros (una transacción) con una clave nueva cada uno y
+        un mismo grupo para todos. -> ids locales.
+        """
+        ahora = time.time()
+        grupo = str(uuid.uuid4())
+        with self._lock:
+            try:
+                ids = [self._db.execute(
+                    "INSERT INTO salida(clave, operacion, datos, creado, grupo) VALUES (?, ?, ?, ?, ?)",
+                    (str(uuid.uuid4()), operacion, _a_json(r), ahora, grupo)).lastrowid for r in registros]
+                self._db.commit()
+            except BaseException:
+                self._db.rollback()
+                raise
+        return ids
+
+    def pendientes(self, limite: int) -> List[Tuple[int, str, str, str, Dict]]:
+        """
+        (id, clave, grupo, operación, datos) en orden de llegada. Si el límite
+        corta un grupo, se completa con el resto (un grupo no se reparte en dos envíos).
+        """
+        columnas = "SELECT s.id, s.clave, COALESCE(s.grupo, s.clave), s.operacion, s.datos"
+        with self._lock:
+            filas = self._db.execute(f"{columnas} {self._PENDIENTES} ORDER BY s.id LIMIT ?",
+                                     (limite,)).fetchall()
+            if filas:
+                ultimo_id, _, ultimo_grupo, _, _ = filas[-1]
+                filas += self._db.execute(f"{columnas} {self._PENDIENTES} AND s.grupo = ? AND s.id > ? "
+                                          "ORDER BY s.id", (ultimo_grupo, ultimo_id)).fetchall()
+        return [(id_, clave, grupo, op, _de_json(datos)) for id_, clave, grupo, op, datos in filas]
+
+    def confirmar(self, pares: List[Tuple[int, int]]) -> None:
+        """Marca como enviadas: [(id local, id en el servidor)]."""
+        ahora = time.time()
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO enviados(salida_id, id_servidor, enviado) VALUES (?, ?, ?)",
+                                 [(local, servidor, ahora) for local, servidor in pares])
+            self._db.commit()
+
+    def rechazar(self, ids_locales: List[int], error: str) -> None:
+        """Aparta como rechazadas (una transacción) las filas de un grupo."""
+        ahora = time.time()
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO rechazados(salida_id, error, fecha) VALUES (?, ?, ?)",
+                                 [(id_, error, ahora) for id_ in ids_locales])
+            self._db.commit()
+
+    def _por_rango(self, sql: str, ids_locales: List[int]) -> Dict:
+        # los ids de un mismo encolar() son consecutivos: rango en vez de IN (...)
+        with self._lock:
+            filas = self._db.execute(sql, (min(ids_locales), max(ids_locales))).fetchall()
+        pedidos = set(ids_locales)
+        return {id_: v for id_, v in filas if id_ in pedidos}
+
+    def ids_servidor(self, ids_locales: List[int]) -> Dict[int, Optional[int]]:
+        """{id local: id en el servidor} de los ya enviados."""
+        return self._por_rango("SELECT salida_id, id_servidor FROM enviados WHERE salida_id BETWEEN ? AND ?",
+                               ids_locales)
+
+    def rechazos(self, ids_locales: List[int]) -> Dict[int, str]:
+        """{id local: error} de los que el servidor rechazó."""
+        return self._por_rango("SELECT salida_id, error FROM rechazados WHERE salida_id BETWEEN ? AND ?",
+                               ids_locales)
+
+    def resumen(self) -> Tuple[int, Optional[float], int]:
+        """(pendientes, momento de la más antigua pendiente, rechazados)."""
+        with self._lock:
+            n, mas_antigua = self._db.execute(f"SELECT COUNT(*), MIN(s.creado) {self._PENDIENTES}").fetchone()
+            rechazados = self._db.execute("SELECT COUNT(*) FROM rechazados").fetchone()[0]
+        return int(n), mas_antigua, int(rechazados)
+
+    def purgar(self, dias: float = RETENCION_DIAS) -> int:
+        """Borra del diario lo enviado hace más de `dias` (los rechazados se conservan)."""
+        limite = time.time() - dias * 86400
+        with self._lock:
+            borrados = self._db.execute(
+                "DELETE FROM salida WHERE id IN (SELECT salida_id FROM enviados WHERE enviado < ?)",
+                (limite,)).rowcount
+            self._db.execute("DELETE FROM enviados WHERE enviado < ?", (limite,))
+            self._db.commit()
+        return borrados
+
+    def guardar_hectarea(self, agricultor_id: int, datos: Optional[Dict]) -> None:
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO hectarea_conocida(agricultor_id, datos, fecha) VALUES (?, ?, ?)",
+                             (agricultor_id, _a_json(datos), time.time()))
+            self._db.commit()
+
+    def hectarea(self, agricultor_id: int) -> Tuple[bool, Optional[Dict]]:
+        """(se conoce, última hectárea activa vista en el servidor)."""
+        with self._lock:
+            row = self._db.execute("SELECT datos FROM hectarea_conocida WHERE agricultor_id = ?",
+                                   (agricultor_id,)).fetchone()
+        return (True, json.loads(row[0])) if row else (False, None)
+
+# ========================
+# Sincronización
+# ========================
+
+class Sincronizador:
+    """Hilo que vacía la cola hacia SQL Server por lotes, con backoff si no hay conexión."""
+
+    def __init__(self, cola: ColaSalida):
+        self.cola = cola
+        self._despertar = threading.Event()
+        self._cambio = threading.Condition()
+        self._hilo: Optional[threading.Thread] = None
+        self._fallos = 0
+        self._reintentar_en = 0.0              # time.monotonic(); antes de esto se asume sin conexión
+        self.ultimo_sync: Optional[float] = None   # time.time() de la última vuelta completa
+        self.ultimo_error: Optional[str] = None
+        self.detenido: Optional[str] = None        # motivo si se detuvo por _ERRORES_DE_ESQUEMA
+
+    def iniciar(self) -> None:
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._bucle, name="cola-offline", daemon=True)
+            self._hilo.start()
+
+    def despertar(self) -> None:
+        self._despertar.set()
+
+    def en_linea(self) -> bool:
+        return time.monotonic() >= self._reintentar_en
+
+    def _bucle(self) -> None:
+        try:
+            self.cola.purgar()
+        except sqlite3.Error:
+            pass
+        while True:
+            if self.en_linea():
+                self.sincronizar()
+            if self.detenido:
+                return
+            espera = SYNC_INTERVALO_S if self.en_linea() else self._reintentar_en - time.monotonic()
+            self._despertar.wait(max(0.0, espera))
+            self._despertar.clear()
+
+    def sincronizar(self) -> int:
+        """Envía todo lo pendiente (lotes de SYNC_LOTE). Devuelve cuántas filas se confirmaron."""
+        total = 0
+        try:
+            while True:
+                lote = self.cola.pendientes(SYNC_LOTE)
+                if not lote:
+                    break
+                # por operación, respetando el orden de llegada dentro de cada una
+                por_operacion: Dict[str, List[Tuple[int, str, str, Dict]]] = {}
+                for id_, clave, grupo, operacion, datos in lote:
+                    por_operacion.setdefault(operacion, []).append((id_, clave, grupo, datos))
+                for operacion, items in por_operacion.items():
+                    total += self._aplicar(operacion, items)
+        except _ERRORES_DE_ESQUEMA as e:
+            self._reintentar_en = float("inf")
+            self.ultimo_error = str(e)
+            self.detenido = ("El servidor no tiene el esquema de la cola offline "
+                             f"(¿falta BD/idempotencia cola offline.sql?): {e}")
+        except Exception as e:
+            self._fallos += 1
+            self._reintentar_en = time.monotonic() + min(SYNC_BACKOFF_MAX_S, 5 * 2 ** (self._fallos - 1))
+            self.ultimo_error = str(e)
+        else:
+            self._fallos = 0
+            self._reintentar_en = 0.0
+            self.ultimo_sync = time.time()
+            self.ultimo_error = None
+        with self._cambio:
+            self._cambio.notify_all()
+        return total
+
+    def _aplicar(self, operacion: str, items: List[Tuple[int, str, str, Dict]]) -> int:
+        """
+        Aplica un lote de una operación; si falla por datos, grupo a grupo para
+        apartar solo el culpable (un grupo se rechaza entero, nunca fila a fila).
+        """
+        aplicar = _APLICAR.get(operacion)
+        try:
+            if aplicar is None:
+                raise ValueError(f"Operación desconocida: {operacion}")
+            ids = aplicar([dict(datos, clave=clave) for _, clave, _, datos in items])
+        except _ERRORES_DE_DATOS as e:
+            grupos: Dict[str, List[Tuple[int, str, str, Dict]]] = {}
+            for item in items:
+                grupos.setdefault(item[2], []).append(item)
+            if len(grupos) > 1:
+                return sum(self._aplicar(operacion, g) for g in grupos.values())
+            self.cola.rechazar([id_ for id_, _, _, _ in items], str(e))
+            return 0
+        # una clave sin id en la respuesta no se da por enviada (ni se reintenta en bucle)
+        hechos = [(id_, ids[clave]) for id_, clave, _, _ in items if ids.get(clave) is not None]
+        faltan = [id_ for id_, clave, _, _ in items if ids.get(clave) is None]
+        if faltan:
+            self.cola.rechazar(faltan, f"El servidor no devolvió id para la fila ({operacion})")
+        self.cola.confirmar(hechos)
+        with self._cambio:
+            self._cambio.notify_all()
+        return len(hechos)
+
+    def esperar(self, ids_locales: List[int], timeout_s: float) -> Optional[List[Optional[int]]]:
+        """
+        Espera a que se envíen `ids_locales`; devuelve sus ids en el servidor o
+        None si no se confirmaron a tiempo (o se sabe que no hay conexión).
+        ValueError si el servidor rechazó alguno (error de datos).
+        """
+        limite = time.monotonic() + timeout_s
+        with self._cambio:
+            while True:
+                rechazos = self.cola.rechazos(ids_locales)
+                if rechazos:
+                    raise ValueError(next(iter(rechazos.values())))
+                hechos = self.cola.ids_servidor(ids_locales)
+                if len(hechos) == len(ids_locales):
+                    return [hechos[i] for i in ids_locales]
+                restante = limite - time.monotonic()
+                if restante <= 0 or not self.en_linea():
+                    return None
+                self._cambio.wait(restante)
+
+_COLA: Optional[ColaSalida] = None
+_SYNC: Optional[Sincronizador] = None
+_init_lock = threading.Lock()
+
+def _cola() -> Tuple[ColaSalida, Sincronizador]:
+    """Cola y sincronizador del proceso (se crean y arrancan en el primer uso)."""
+    global _COLA, _SYNC
+    with _init_lock:
+        if _SYNC is None:
+            _COLA = ColaSalida()
+            _SYNC = Sincronizador(_COLA)
+            _SYNC.iniciar()
+    return _COLA, _SYNC
+
+def _escribir(operacion: str, registros: List[Dict]) -> List[int]:
+    """
+    Encola y, si hay conexión, espera un poco la confirmación. -> ids del
+    servidor, o los locales negados si quedaron pendientes (database.es_pendiente).
+    """
+    if not registros:
+        return []
+    cola, sync = _cola()
+    locales = cola.encolar(operacion, registros)
+    sync.despertar()
+    servidor = sync.esperar(locales, SYNC_ESPERA_S)
+    return [-id_ for id_ in locales] if servidor is None else servidor
+
+# ========================
+# Mismas firmas que database_mssql
+# ========================
+
+def registrar_reporte_cosecha(agricultor_id: int, hectarea_id: int,
+                              aptos: int, no_aptos: int, fuente: str="YOLO") -> Optional[int]:
+    """
+    Encola una sesión de conteo (con la hora actual). Devuelve el id del
+    servidor si se sincronizó enseguida, el id local negado si quedó
+    pendiente (database.es_pendiente), o None si no se pudo encolar o el servidor la rechazó.
+    """
+    try:
+        return _escribir("reporte_cosecha", [{
+            "agricultor_id": agricultor_id, "hectarea_id": hectarea_id, "ts": _ahora_utc(),
+            "aptos": int(aptos), "no_aptos": int(no_aptos), "fuente": fuente}])[0]
+    except Exception:
+        return None
+
+def registrar_reporte_cosecha_lote(registros: Iterable[Dict]) -> List[int]:
+    """
+    Como registrar_reporte_cosecha, para varias sesiones: se encolan en una
+    transacción como un solo grupo y se aplican o rechazan todas juntas.
+    Si falla (no se pudo encolar o el servidor las rechazó) lanza la excepción
+    y no se inserta ninguna, como database_mssql.registrar_reporte_cosecha_lote.
+    """
+    ahora = _ahora_utc()
+    return _escribir("reporte_cosecha", [
+        {"agricultor_id": int(r["agricultor_id"]), "hectarea_id": int(r["hectarea_id"]),
+         "ts": r.get("ts") or ahora, "aptos": int(r["aptos"]), "no_aptos": int(r["no_aptos"]),
+         "fuente": r.get("fuente", "YOLO")}
+        for r in registros])
+
+def guardar_reporte(usuario_id: int, planta: str, enfermedad: str, num_frutos: int,
+                    maduracion: str, path_imagen: str, path_reporte: str):
+    """Encola un reporte 'pendiente' (fecha = ahora). Devuelve (True, msg) o (False, msg)."""
+    try:
+        _escribir("reporte", [{
+            "usuario_id": usuario_id, "fecha": _ahora_utc(), "planta": planta, "enfermedad": enfermedad,
+            "num_frutos": num_frutos, "maduracion": maduracion,
+            "path_imagen": path_imagen, "path_reporte": path_reporte}])
+        return True, "Reporte guardado correctamente."
+    except Exception as e:
+        return False, f"Error al guardar el reporte: {e}"
+
+def registrar_actividad_campo(agricultor_id: int, hectarea_id: int, tipo: str,
+                              fecha_hora: datetime, cantidad=None, unidad: Optional[str]=None,
+                              costo: float = 0.0, notas: Optional[str]=None,
+                              aptos: Optional[int]=None, no_aptos: Optional[int]=None,
+                              cajas=None, kilos=None) -> int:
+    """Encola una actividad (y su detalle si es 'cosecha'). Devuelve el id (servidor o local negado)."""
+    return _escribir("actividad_campo", [{
+        "agricultor_id": agricultor_id, "hectarea_id": hectarea_id, "tipo": tipo, "fecha_hora": fecha_hora,
+        "cantidad": cantidad, "unidad": unidad, "costo": costo, "notas": notas,
+        "aptos": aptos, "no_aptos": no_aptos, "cajas": cajas, "kilos": kilos}])[0]
+
+def hectarea_activa_de_agricultor(agricultor_id: int) -> Optional[Dict]:
+    """
+    Hectárea activa según el servidor; se recuerda la última vista para
+    poder seguir registrando sin conexión.
+    """
+    cola, _ = _cola()
+    try:
+        asig = _srv.hectarea_activa_de_agricultor(agricultor_id)
+    except Exception as e:
+        conocida, asig = cola.hectarea(agricultor_id)
+        if conocida and (_srv._es_error_conexion(e) or isinstance(e, TimeoutError)):
+            return asig
+        raise
+    cola.guardar_hectarea(agricultor_id, asig)
+    return asig
+
+def estado_cola() -> Dict:
+    """
+    Para la UI: pendientes, retraso_s (antigüedad del pendiente más viejo),
+    rechazados, en_linea, ultimo_sync (time.time() o None), ultimo_error y
+    detenido (motivo si la sincronización se detuvo por falta de esquema).
+    """
+    cola, sync = _cola()
+    pendientes, mas_antigua, rechazados = cola.resumen()
+    return {
+        "pendientes": pendientes,
+        "retraso_s": time.time() - mas_antigua if mas_antigua else 0.0,
+        "rechazados": rechazados,
+        "en_linea": sync.en_linea(),
+        "ultimo_sync": sync.ultimo_sync,
+        "ultimo_error": sync.ultimo_error,
+        "detenido": sync.detenido,
+    }
@@ -1,5 +1,29 @@
-# database.py  -> proxy hacia SQL Server
+# database.py  -> proxy hacia el backend de datos
 # No cambies los imports en el resto de archivos: este módulo reexporta
-# las mismas funciones que usabas en SQLite, pero ahora desde SQL Server.
+# las mismas funciones que usabas en SQLite, desde el backend elegido con
+# AGROSCAN_DB_BACKEND:
+#   - "mssql" (por defecto): SQL Server (database_mssql.py). Las escrituras
+#     del agricultor pasan antes por la cola offline (cola_offline.py) y se
+#     sincronizan en segundo plano; desactivar con AGROSCAN_COLA_OFFLINE=0.
+#   - "sqlite": BD local en WAL, sin red (database_sqlite.py), para equipos
+#     de campo sin conexión al servidor; ruta en AGROSCAN_SQLITE_BD.
 
-from database_mssql import *  # noqa: F401,F403
+import os
+
+if os.getenv("AGROSCAN_DB_BACKEND", "mssql").strip().lower() == "sqlite":
+    from database_sqlite import *  # noqa: F401,F403
+else:
+    from database_mssql import *  # noqa: F401,F403
+    if os.getenv("AGROSCAN_COLA_OFFLINE", "1") != "0":
+        from cola_offline import (  # noqa: F401
+            registrar_reporte_cosecha, registrar_reporte_cosecha_lote,
+            guardar_reporte, registrar_actividad_campo,
+            hectarea_activa_de_agricultor, estado_cola,
+        )
+
+def es_pendiente(id_) -> bool:
+    """
+    True si `id_` (devuelto por registrar_*) es de una escritura que sigue en
+    la cola offline sin sincronizar: la cola devuelve su id local negado.
+    """
+    return id_ is not None and id_ < 0
@@ -0,0 +1,237 @@
+# database_async.py
+# Fachada asíncrona sobre `database` para la UI PyQt: las consultas corren en
+# un QThreadPool propio (no el global, que usa el análisis YOLO) y el
+# resultado vuelve al hilo de la UI por señales, así un corte de red con
+# SQL Server no congela la ventana.
+# - llamar(fn, *args, **kwargs) -> Solicitud con señales listo(resultado) /
+#   fallo(excepción), emitidas en el hilo de la UI.
+# - Coalescencia (solo lecturas, llamar(..., coalescer=True)): si ya hay en
+#   curso una solicitud idéntica (misma función y mismos argumentos), se
+#   devuelve esa misma y no se consulta dos veces. Las escrituras nunca se
+#   agrupan: dos guardados iguales son dos escrituras.
+# - Canal: para una ventana que repite la misma consulta de LECTURA (cambio de
+#   fechas, Actualizar…), entrega solo el resultado de la ÚLTIMA solicitud
+#   pedida; sus consultas se coalescen.
+# - IndicadorCola: etiqueta con pendientes / retraso de la cola offline.
+#
+# Uso típico:
+#   from database import dashboard_supervisor_diario
+#   from database_async import Canal
+#   self._canal = Canal(self)
+#   self._canal.listo.connect(self._pintar)
+#   self._canal.fallo.connect(self._mostrar_error)
+#   self._canal.pedir(dashboard_supervisor_diario, desde, hasta)
+#
+# llamar() y Canal.pedir() se usan desde el hilo de la UI.
+
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal, pyqtSlot
+from PyQt5.QtWidgets import QLabel
+
+HILOS = int(os.getenv("AGROSCAN_DB_HILOS", "4"))
+
+_pool: Optional[QThreadPool] = None
+_EN_CURSO: Dict[tuple, "Solicitud"] = {}  # clave -> solicitud (solo coalescibles)
+_VIVAS: Set["Solicitud"] = set()          # referencias hasta que terminan
+
+def _pool_bd() -> QThreadPool:
+    global _pool
+    if _pool is None:
+        _pool = QThreadPool()
+        _pool.setMaxThreadCount(max(1, HILOS))
+    return _pool
+
+def _clave(fn: Callable, args: tuple, kwargs: dict) -> Optional[tuple]:
+    """Clave de coalescencia; None si algún argumento no es hashable (no se agrupa)."""
+    clave = (fn, args, tuple(sorted(kwargs.items())))
+    try:
+        hash(clave)
+    except TypeError:
+        return None
+    return clave
+
+class Solicitud(QObject):
+    """Una consulta en curso. listo/fallo se emiten una sola vez, en el hilo de la UI."""
+    listo = pyqtSignal(object)
+    fallo = pyqtSignal(object)
+    _fin = pyqtSignal(bool, object)  # del hilo de trabajo -> hilo de la UI (conexión en cola)
+
+    def __init__(self, clave: Optional[tuple]):
+        super().__init__()
+        self.clave = clave
+        self.terminada = False
+        self.resultado: Any = None
+        self.error: Optional[BaseException] = None
+        self._canales: List["Canal"] = []
+        self._fin.connect(self._terminar)
+
+    @pyqtSlot(bool, object)
+    def _terminar(self, ok: bool, valor: Any) -> None:
+        if self.clave is not None and _EN_CURSO.get(self.clave) is self:
+            del _EN_CURSO[self.clave]
+        _VIVAS.discard(self)
+        self.terminada = True
+        if ok:
+            self.resultado = valor
+            self.listo.emit(valor)
+        else:
+            self.error = valor
+            self.fallo.emit(valor)
+
+    def conectar(self, al_listo: Optional[Callable[[Any], None]] = None,
+                 al_fallo: Optional[Callable[[BaseException], None]] = None) -> "Solicitud":
+        """Conecta callbacks; si ya terminó, los llama enseguida."""
+        if self.terminada:
+            if self.error is None and al_listo:
+                al_listo(self.resultado)
+            elif self.error is not None and al_fallo:
+                al_fallo(self.error)
+            return self
+        if al_listo:
+            self.listo.connect(al_listo)
+        if al_fallo:
+            self.fallo.connect(al_fallo)
+        return self
+
+class _Trabajo(QRunnable):
+    def __init__(self, solicitud: Solicitud, fn: Callable, args: tuple, kwargs: dict):
+        super().__init__()
+        self.solicitud = solicitud
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+
+    def run(self):
+        try:
+            valor, ok = self.fn(*self.args, **self.kwargs), True
+        except Exception as e:
+            valor, ok = e, False
+        self.solicitud._fin.emit(ok, valor)
+
+def llamar(fn: Callable, *args, coalescer: bool = False, **kwargs) -> Solicitud:
+    """
+    Ejecuta fn(*args, **kwargs) en el pool de BD. Con coalescer=True (solo para
+    lecturas) se une a una solicitud idéntica en curso en lugar de repetirla.
+    """
+    clave = _clave(fn, args, kwargs) if coalescer else None
+    if clave is not None and clave in _EN_CURSO:
+        return _EN_CURSO[clave]
+    solicitud = Solicitud(clave)
+    _VIVAS.add(solicitud)
+    if clave is not None:
+        _EN_CURSO[clave] = solicitud
+    _pool_bd().start(_Trabajo(solicitud, fn, args, kwargs))
+    return solicitud
+
+def en_curso() -> int:
+    """Nº de solicitudes todavía sin terminar."""
+    return len(_VIVAS)
+
+class Canal(QObject):
+    """
+    Consultas repetidas de una misma ventana: cada pedir() reemplaza a la
+    anterior y solo se entrega el resultado de la última (las respuestas
+    viejas que lleguen tarde se descartan). ocupado(bool) sirve para
+    deshabilitar botones mientras tanto.
+    """
+    listo = pyqtSignal(object)
+    fallo = pyqtSignal(object)
+    ocupado = pyqtSignal(bool)
+
+    def __init__(self, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self._actual: Optional[Solicitud] = None
+
+    def pedir(self, fn: Callable, *args, **kwargs) -> Solicitud:
+        """`fn` debe ser una lectura: se coalesce con una idéntica en curso."""
+        solicitud = llamar(fn, *args, coalescer=True, **kwargs)
+        estaba_libre = self._actual is None
+        self._actual = solicitud
+        if self not in solicitud._canales:
+            solicitud._canales.append(self)
+            solicitud.listo.connect(self._on_listo)
+            solicitud.fallo.connect(self._on_fallo)
+        if estaba_libre:
+            self.ocupado.emit(True)
+        return solicitud
+
+    def cancelar(self) -> None:
+        """Ignora la respuesta pendiente (la consulta en sí no se interrumpe)."""
+        if self._actual is not None:
+            self._actual = None
+            self.ocupado.emit(False)
+
+    def ocupado_ahora(self) -> bool:
+        return self._actual is not None
+
+    def _on_listo(self, valor: Any) -> None:
+        if self.sender() is self._actual:
+            self._actual = None
+            self.ocupado.emit(False)
+            self.listo.emit(valor)
+
+    def _on_fallo(self, error: BaseException) -> None:
+        if self.sender() is self._actual:
+            self._actual = None
+            self.ocupado.emit(False)
+            self.fallo.emit(error)
+
+def _hace(segundos: float) -> str:
+    if segundos < 60:
+        return f"{segundos:.0f} s"
+    if segundos < 3600:
+        return f"{segundos / 60:.0f} min"
+    return f"{segundos / 3600:.1f} h"
+
+class IndicadorCola(QLabel):
+    """
+    Estado de la cola offline (database.estado_cola): escrituras pendientes de
+    enviar a SQL Server y antigüedad de la más vieja. Se refresca cada
+    `intervalo_ms` (lee el diario SQLite local, no va al servidor). Queda
+    oculto si el backend no usa cola.
+    """
+
+    def __init__(self, parent=None, intervalo_ms: int = 2000):
+        super().__init__(parent)
+        import database
+        self._estado = getattr(database, "estado_cola", None)
+        if self._estado is None:
+            self.hide()
+            return
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.actualizar)
+        self._timer.start(intervalo_ms)
+        self.actualizar()
+
+    def actualizar(self) -> None:
+        try:
+            e = self._estado()
+        except Exception as ex:
+            self.setText("⚠ Cola local no disponible")
+            self.setToolTip(str(ex))
+            return
+        if e["detenido"]:
+            texto = f"⚠ Sincronización detenida: {e['pendientes']} pendiente(s)"
+            color = "#ba1a1a"
+        elif e["pendientes"]:
+            estado = "Sin conexión" if not e["en_linea"] else "Sincronizando"
+            texto = f"⏳ {estado}: {e['pendientes']} pendiente(s), hace {_hace(e['retraso_s'])}"
+            color = "#ba1a1a" if not e["en_linea"] else "#b26a00"
+        else:
+            texto, color = "☁ Sincronizado", "#1b5e20"
+        if e["rechazados"]:
+            texto += f" · {e['rechazados']} rechazado(s)"
+            color = "#ba1a1a"
+        self.setText(texto)
+        self.setStyleSheet(f"color: {color};")
+        ayuda = []
+        if e["ultimo_sync"]:
+            ayuda.append("Última sincronización: " + time.strftime("%H:%M:%S", time.localtime(e["ultimo_sync"])))
+        if e["detenido"]:
+            ayuda.append(e["detenido"])
+        elif e["ultimo_error"]:
+            ayuda.append(f"Último error: {e['ultimo_error']}")
+        self.setToolTip("\n".join(ayuda))
@@ -6,9 +6,15 @@
 #   path_imagen, path_reporte, estado(TEXT), comentario_supervisor
 
 import os
+import time
 import hashlib
-from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+from datetime import date, datetime, timedelta
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, List, Dict, Optional, Tuple
 import pyodbc
 
 # ========================
@@ -36,9 +42,163 @@ CONN_STR = (
 #     "Encrypt=yes;TrustServerCertificate=yes;"
 # )
 
+# ========================
+# Pool de conexiones
+# ========================
+# Abrir una conexión (Windows Auth + TLS) cuesta mucho más que la consulta;
+# las conexiones se reutilizan entre llamadas y entre hilos (una a la vez).
+
+POOL_MIN = int(os.getenv("MSSQL_POOL_MIN", "1"))
+POOL_MAX = int(os.getenv("MSSQL_POOL_MAX", "8"))
+POOL_IDLE_S = float(os.getenv("MSSQL_POOL_IDLE_S", "300"))       # cierra las ociosas (por encima de POOL_MIN)
+POOL_PING_S = float(os.getenv("MSSQL_POOL_PING_S", "5"))         # SELECT 1 al prestar si estuvo ociosa más que esto
+POOL_TIMEOUT_S = float(os.getenv("MSSQL_POOL_TIMEOUT_S", "30"))  # espera máxima por una conexión libre
+
+# SQLSTATE de conexión caída / no establecida
+_SQLSTATE_CONEXION = ("08S01", "08001", "08003", "08004", "08007", "HYT00", "HYT01")
+
+def _es_error_conexion(e: BaseException) -> bool:
+    return isinstance(e, pyodbc.Error) and bool(e.args) and str(e.args[0]) in _SQLSTATE_CONEXION
+
+class PoolConexiones:
+    """
+    Pool thread-safe de conexiones pyodbc (sin autocommit).
+    - prestar()/devolver(): máximo `maximo` conexiones abiertas a la vez.
+    - Al prestar, una conexión ociosa más de `ping_s` se valida con SELECT 1;
+      si falló, se descarta y se abre otra (reconexión).
+    - Las ociosas más de `idle_s` se cierran, conservando `minimo`.
+    """
+
+    def __init__(self, conn_str: str, minimo: int = POOL_MIN, maximo: int = POOL_MAX,
+                 idle_s: float = POOL_IDLE_S, ping_s: float = POOL_PING_S,
+                 timeout_s: float = POOL_TIMEOUT_S):
+        self.conn_str = conn_str
+        self.minimo = max(0, minimo)
+        self.maximo = max(1, maximo, self.minimo)
+        self.idle_s = idle_s
+        self.ping_s = ping_s
+        self.timeout_s = timeout_s
+        self._libres: List[Tuple[pyodbc.Connection, float]] = []  # (conexión, momento de devolución)
+        self._lock = threading.Lock()
+        self._cupos = threading.BoundedSemaphore(self.maximo)
+        self._calentado = False
+
+    def _abrir(self) -> "pyodbc.Connection":
+        return pyodbc.connect(self.conn_str, autocommit=False)
+
+    @staticmethod
+    def _cerrar(conn) -> None:
+        try:
+            conn.close()
+        except pyodbc.Error:
+            pass
+
+    @staticmethod
+    def _sana(conn) -> bool:
+        try:
+            conn.cursor().execute("SELECT 1").fetchone()
+            return True
+        except pyodbc.Error:
+            return False
+
+    def _calentar(self) -> None:
+        """Abre en segundo plano hasta `minimo` conexiones (una sola vez)."""
+        def _run():
+            for _ in range(self.minimo - len(self._libres)):
+                if not self._cupos.acquire(blocking=False):
+                    return
+                try:
+                    conn = self._abrir()
+                except pyodbc.Error:
+                    self._cupos.release()
+                    return
+                self.devolver(conn)
+        threading.Thread(target=_run, name="mssql-pool", daemon=True).start()
+
+    def _purgar_ociosas(self, ahora: float) -> List:
+        """Saca (con lock tomado) las conexiones ociosas de más, para cerrarlas fuera."""
+        if not self.idle_s or len(self._libres) <= self.minimo:
+            return []
+        viejas = [i for i, (_, t) in enumerate(self._libres) if ahora - t > self.idle_s]
+        viejas = viejas[:len(self._libres) - self.minimo]
+        sacadas = [self._libres[i][0] for i in viejas]
+        for i in reversed(viejas):
+            del self._libres[i]
+        return sacadas
+
+    def prestar(self) -> "pyodbc.Connection":
+        if not self._cupos.acquire(timeout=self.timeout_s):
+            raise TimeoutError(f"Sin conexiones libres a SQL Server tras {self.timeout_s:.0f} s "
+                               f"(máximo {self.maximo}).")
+        try:
+            while True:
+                ahora = time.monotonic()
+                with self._lock:
+                    cerrar = self._purgar_ociosas(ahora)
+                    conn, desde = self._libres.pop() if self._libres else (None, ahora)
+                for viejo in cerrar:
+                    self._cerrar(viejo)
+                if conn is None:
+                    conn = self._abrir()
+                    break
+                if ahora - desde <= self.ping_s or self._sana(conn):
+                    break
+                self._cerrar(conn)  # caída: se descarta y se prueba la siguiente / una nueva
+        except BaseException:
+            self._cupos.release()
+            raise
+        if not self._calentado:
+            self._calentado = True
+            if self.minimo > 1:
+                self._calentar()
+        return conn
+
+    def devolver(self, conn, descartar: bool = False) -> None:
+        try:
+            if descartar:
+                self._cerrar(conn)
+            else:
+                with self._lock:
+                    self._libres.append((conn, time.monotonic()))
+        finally:
+            self._cupos.release()
+
+    def descartar_libres(self) -> None:
+        """Cierra todas las conexiones ociosas (p. ej. tras una caída del servidor)."""
+        with self._lock:
+            libres, self._libres = self._libres, []
+        for conn, _ in libres:
+            self._cerrar(conn)
+
+    def cerrar(self) -> None:
+        self.descartar_libres()
+
+_POOL = PoolConexiones(CONN_STR)
+
+@contextmanager
 def _conn():
-    """Obtiene conexión pyodbc (sin autocommit)."""
-    return pyodbc.connect(CONN_STR, autocommit=False)
+    """
+    Presta una conexión pyodbc (sin autocommit) del pool; se usa igual que antes:
+    `with _conn() as c:`. Al salir hace commit (o rollback si hubo excepción) y
+    la devuelve al pool; si el error fue de conexión, la descarta.
+    """
+    conn = _POOL.prestar()
+    try:
+        yield conn
+        conn.commit()
+    except BaseException as e:
+        caida = _es_error_conexion(e)
+        if not caida:
+            try:
+                conn.rollback()
+            except pyodbc.Error:
+                caida = True  # no se pudo dejar limpia: no vuelve al pool
+        _POOL.devolver(conn, descartar=caida)
+        if caida:
+            _POOL.descartar_libres()  # probablemente también estén caídas
+        raise
+    else:
+        _POOL.devolver(conn)
 
 # ========================
 # Utilidades
@@ -55,6 +215,69 @@ def _rows_to_dicts(cur) -> List[Dict]:
     cols = [c[0] for c in cur.description]
     return [dict(zip(cols, r)) for r in cur.fetchall()]
 
+# ========================
+# Caché de catálogos (roles, estados de reporte)
+# ========================
+# Tablas pequeñas y casi estáticas: se cargan una vez y se refrescan al
+# vencer el TTL o con invalidar_catalogos(). Un nombre/id que no está fuerza
+# a lo sumo UNA recarga por ventana de TTL (por si se agregó recién); los
+# siguientes fallos devuelven None sin consultar, así una entrada inválida
+# repetida (p. ej. un estado mal escrito en el filtro) no golpea la BD.
+
+CATALOGO_TTL_S = float(os.getenv("MSSQL_CATALOGO_TTL_S", "600"))
+
+class _Catalogo:
+    def __init__(self, tabla: str, columna: str, ttl_s: float = CATALOGO_TTL_S):
+        self.tabla = tabla
+        self.columna = columna
+        self.ttl_s = ttl_s
+        self._por_nombre: Dict[str, int] = {}
+        self._por_id: Dict[int, str] = {}
+        self._cargado = 0.0  # time.monotonic() de la última carga; 0 = nunca
+        self._recargo_por_fallo = False  # ya se recargó en esta ventana por un faltante
+        self._lock = threading.Lock()
+
+    def _recargar(self) -> None:
+        with _conn() as c:
+            filas = c.cursor().execute(f"SELECT id, {self.columna} FROM {self.tabla}").fetchall()
+        self._por_nombre = {str(nombre): int(id_) for id_, nombre in filas}
+        self._por_id = {v: k for k, v in self._por_nombre.items()}
+        self._cargado = time.monotonic()
+
+    def _vigente(self) -> bool:
+        return self._cargado > 0 and time.monotonic() - self._cargado < self.ttl_s
+
+    def _refrescar(self, falta: bool) -> None:
+        """Con el lock tomado: recarga si venció el TTL o, una vez por ventana, si `falta`."""
+        if not self._vigente():
+            self._recargar()
+            self._recargo_por_fallo = False
+        elif falta and not self._recargo_por_fallo:
+            self._recargar()
+            self._recargo_por_fallo = True
+
+    def id_de(self, nombre: str) -> Optional[int]:
+        with self._lock:
+            self._refrescar(nombre not in self._por_nombre)
+            return self._por_nombre.get(nombre)
+
+    def nombre_de(self, id_: int) -> Optional[str]:
+        with self._lock:
+            self._refrescar(id_ not in self._por_id)
+            return self._por_id.get(id_)
+
+    def invalidar(self) -> None:
+        with self._lock:
+            self._cargado = 0.0
+
+_ROLES = _Catalogo("dbo.roles", "rol")
+_ESTADOS = _Catalogo("dbo.reporte_estados", "estado")
+
+def invalidar_catalogos() -> None:
+    """Fuerza a releer roles y estados en el próximo uso (p. ej. tras editarlos en la BD)."""
+    _ROLES.invalidar()
+    _ESTADOS.invalidar()
+
 # ========================
 # Funciones usadas por la app (existentes)
 # ========================
@@ -66,18 +289,17 @@ def registrar_usuario(username: str, email: str, password: str, rol_texto: str):
     """
     pw = _sha256_hex(password)
     try:
+        rol_id = _ROLES.id_de(rol_texto)
+        if rol_id is None:
+            return False, f"Rol inválido: {rol_texto}"
         with _conn() as c:
             cur = c.cursor()
-            rol = _one(cur, "SELECT id FROM dbo.roles WHERE rol = ?", (rol_texto,))
-            if not rol:
-                return False, f"Rol inválido: {rol_texto}"
-
             cur.execute(
                 """
                 INSERT INTO dbo.usuarios (username, email, password_hash, rol_id, fecha_registro, is_active)
                 VALUES (?, ?, ?, ?, SYSUTCDATETIME(), 1)
                 """,
-                (username, email, pw, rol.id),
+                (username, email, pw, rol_id),
             )
             c.commit()
         return True, "Usuario registrado exitosamente."
@@ -118,9 +340,9 @@ def guardar_reporte(
     Inserta un reporte con estado 'pendiente'.
     """
     try:
+        estado_pend = _ESTADOS.id_de("pendiente")
         with _conn() as c:
             cur = c.cursor()
-            estado_pend = _one(cur, "SELECT id FROM dbo.reporte_estados WHERE estado='pendiente'").id
             cur.execute(
                 """
                 INSERT INTO dbo.reportes
@@ -159,16 +381,49 @@ def listar_reportes(usuario_id: int | None = None, rol: str = "agricultor"):
         filas = cur.fetchall()
         return [tuple(f) for f in filas]
 
+def listar_reportes_pagina(usuario_id: Optional[int] = None,
+                           after_fecha: Optional[datetime] = None,
+                           after_id: Optional[int] = None,
+                           limit: int = 50) -> List[Tuple]:
+    """
+    Una página de reportes (mismas 11 columnas que listar_reportes), ordenada
+    por fecha DESC, id DESC. Paginación por clave (keyset): para la página
+    siguiente se pasa (fecha, id) de la última fila recibida.
+    - usuario_id: filtra por agricultor (usa IX_reportes_usuario_fecha);
+      None lista todos (usa IX_reportes_fecha_id, ver BD/indices paginacion.sql).
+    """
+    where, params = [], []
+    if usuario_id is not None:
+        where.append("r.usuario_id = ?")
+        params.append(usuario_id)
+    if after_fecha is not None and after_id is not None:
+        where.append("(r.fecha < ? OR (r.fecha = ? AND r.id < ?))")
+        params += [after_fecha, after_fecha, after_id]
+    sql = (
+        "SELECT TOP (?) r.id, r.usuario_id, r.fecha, r.planta, r.enfermedad, r.num_frutos, r.maduracion, "
+        "       r.path_imagen, r.path_reporte, e.estado, r.comentario_supervisor "
+        "FROM dbo.reportes r "
+        "JOIN dbo.reporte_estados e ON e.id = r.estado_id "
+        + ("WHERE " + " AND ".join(where) + " " if where else "")
+        + "ORDER BY r.fecha DESC, r.id DESC"
+    )
+    with _conn() as c:
+        cur = c.cursor()
+        rows = cur.execute(sql, [int(limit)] + params).fetchall()
+        return [tuple(r) for r in rows]
+
 def obtener_agricultores():
     """
     Devuelve lista de agricultores (id, username, email).
     """
+    rol_id = _ROLES.id_de("agricultor")
     with _conn() as c:
         cur = c.cursor()
         rows = cur.execute(
             "SELECT id, username, email FROM dbo.usuarios "
-            "WHERE rol_id = (SELECT id FROM dbo.roles WHERE rol='agricultor') "
-            "ORDER BY username"
+            "WHERE rol_id = ? "
+            "ORDER BY username",
+            (rol_id,),
         ).fetchall()
         return [tuple(r) for r in rows]
 
@@ -189,18 +444,110 @@ def obtener_reportes_agricultor(agricultor_id: int):
         ).fetchall()
         return [tuple(r) for r in rows]
 
+# ---- Explorador de reportes (supervisor) ----
+
+def _hasta_exclusivo(hasta):
+    """`hasta` como fecha (date) incluye todo ese día."""
+    if isinstance(hasta, date) and not isinstance(hasta, datetime):
+        return datetime.combine(hasta, datetime.min.time()) + timedelta(days=1)
+    return hasta
+
+def _like(texto: str) -> str:
+    """Patrón LIKE que busca `texto` literal (escapa %, _, [ y \\)."""
+    for ch in ("\\", "%", "_", "["):
+        texto = texto.replace(ch, "\\" + ch)
+    return f"%{texto}%"
+
+def _filtro_reportes(estado: Optional[str], desde, hasta, hectarea_id: Optional[int],
+                     agricultor_id: Optional[int], texto: Optional[str]) -> Tuple[List[str], List]:
+    """WHERE común de buscar_reportes / contar_reportes_por_estado."""
+    where, params = [], []
+    if estado:
+        where.append("r.estado_id = ?")
+        params.append(_ESTADOS.id_de(estado) or -1)
+    if desde is not None:
+        where.append("r.fecha >= ?")
+        params.append(desde)
+    if hasta is not None:
+        where.append("r.fecha < ?")
+        params.append(_hasta_exclusivo(hasta))
+    if agricultor_id is not None:
+        where.append("r.usuario_id = ?")
+        params.append(agricultor_id)
+    if hectarea_id is not None:
+        # los reportes no guardan hectárea: la del agricultor en la fecha del reporte
+        where.append(
+            "EXISTS (SELECT 1 FROM dbo.asignaciones a "
+            "        WHERE a.agricultor_id = r.usuario_id AND a.hectarea_id = ? "
+            "          AND a.inicio <= CAST(r.fecha AS DATE) "
+            "          AND (a.fin IS NULL OR a.fin >= CAST(r.fecha AS DATE)))")
+        params.append(hectarea_id)
+    if texto and texto.strip():
+        where.append("r.comentario_supervisor LIKE ? ESCAPE '\\'")
+        params.append(_like(texto.strip()))
+    return where, params
+
+def buscar_reportes(estado: Optional[str] = None, desde=None, hasta=None,
+                    hectarea_id: Optional[int] = None, agricultor_id: Optional[int] = None,
+                    texto: Optional[str] = None,
+                    after_fecha: Optional[datetime] = None, after_id: Optional[int] = None,
+                    limit: int = 50) -> List[Tuple]:
+    """
+    Reportes de todos los agricultores filtrados en el servidor, por páginas
+    (keyset por fecha DESC, id DESC, igual que listar_reportes_pagina).
+    Columnas: las 11 de listar_reportes + username del agricultor.
+    - estado: texto ('pendiente', ...); None = todos
+    - desde / hasta: datetime, o date (hasta incluye ese día)
+    - hectarea_id: hectárea asignada al agricultor en la fecha del reporte
+    - texto: busca en el comentario del supervisor
+    """
+    where, params = _filtro_reportes(estado, desde, hasta, hectarea_id, agricultor_id, texto)
+    if after_fecha is not None and after_id is not None:
+        where.append("(r.fecha < ? OR (r.fecha = ? AND r.id < ?))")
+        params += [after_fecha, after_fecha, after_id]
+    sql = (
+        "SELECT TOP (?) r.id, r.usuario_id, r.fecha, r.planta, r.enfermedad, r.num_frutos, r.maduracion, "
+        "       r.path_imagen, r.path_reporte, e.estado, r.comentario_supervisor, u.username "
+        "FROM dbo.reportes r "
+        "JOIN dbo.reporte_estados e ON e.id = r.estado_id "
+        "JOIN dbo.usuarios u ON u.id = r.usuario_id "
+        + ("WHERE " + " AND ".join(where) + " " if where else "")
+        + "ORDER BY r.fecha DESC, r.id DESC"
+    )
+    with _conn() as c:
+        rows = c.cursor().execute(sql, [int(limit)] + params).fetchall()
+        return [tuple(r) for r in rows]
+
+def contar_reportes_por_estado(desde=None, hasta=None, hectarea_id: Optional[int] = None,
+                               agricultor_id: Optional[int] = None,
+                               texto: Optional[str] = None) -> Dict[str, int]:
+    """
+    {estado: cantidad} con los mismos filtros que buscar_reportes (salvo el
+    estado), agrupado en el servidor. Incluye los estados sin reportes (0).
+    """
+    where, params = _filtro_reportes(None, desde, hasta, hectarea_id, agricultor_id, texto)
+    sql = (
+        "SELECT e.estado, COUNT(r.id) "
+        "FROM dbo.reporte_estados e "
+        "LEFT JOIN dbo.reportes r ON r.estado_id = e.id "
+        + ("AND " + " AND ".join(where) + " " if where else "")
+        + "GROUP BY e.estado"
+    )
+    with _conn() as c:
+        return {str(est): int(n) for est, n in c.cursor().execute(sql, params).fetchall()}
+
 def actualizar_estado_reporte(reporte_id: int, nuevo_estado: str, comentario_supervisor: str = ""):
     """
     Actualiza estado (texto) y comentario de un reporte.
     """
+    estado_id = _ESTADOS.id_de(nuevo_estado)
+    if estado_id is None:
+        return False
     with _conn() as c:
         cur = c.cursor()
-        estado = _one(cur, "SELECT id FROM dbo.reporte_estados WHERE estado = ?", (nuevo_estado,))
-        if not estado:
-            return False
         cur.execute(
             "UPDATE dbo.reportes SET estado_id = ?, comentario_supervisor = ? WHERE id = ?",
-            (estado.id, comentario_supervisor, reporte_id),
+            (estado_id, comentario_supervisor, reporte_id),
         )
         c.commit()
     return True
@@ -210,32 +557,28 @@ def eliminar_reporte(reporte_id: int, usuario_id: int):
     Elimina un reporte SOLO si pertenece al usuario y está en estado 'pendiente'.
     Mantiene la lógica original de tu app.
     """
+    estado_pend = _ESTADOS.id_de("pendiente")
     with _conn() as c:
         cur = c.cursor()
-        row = _one(
-            cur,
-            "SELECT r.id "
-            "FROM dbo.reportes r "
-            "JOIN dbo.reporte_estados e ON e.id = r.estado_id "
-            "WHERE r.id = ? AND r.usuario_id = ? AND e.estado = 'pendiente'",
-            (reporte_id, usuario_id),
+        cur.execute(
+            "DELETE FROM dbo.reportes WHERE id = ? AND usuario_id = ? AND estado_id = ?",
+            (reporte_id, usuario_id, estado_pend),
         )
-        if row:
-            cur.execute("DELETE FROM dbo.reportes WHERE id = ? AND usuario_id = ?", (reporte_id, usuario_id))
-            c.commit()
-            return True
-    return False
+        borrados = cur.rowcount
+        c.commit()
+    return borrados > 0
 
 def eliminar_agricultor(agricultor_id: int):
     """
     Elimina un agricultor (ON DELETE CASCADE borra sus reportes).
     """
+    rol_id = _ROLES.id_de("agricultor")
     with _conn() as c:
         cur = c.cursor()
         cur.execute(
             "DELETE FROM dbo.usuarios "
-            "WHERE id = ? AND rol_id = (SELECT id FROM dbo.roles WHERE rol='agricultor')",
-            (agricultor_id,),
+            "WHERE id = ? AND rol_id = ?",
+            (agricultor_id, rol_id),
         )
         c.commit()
     return True
@@ -308,9 +651,12 @@ def registrar_reporte_cosecha(agricultor_id: int, hectarea_id: int,
     try:
         with _conn() as c:
             cur = c.cursor()
+            # SCOPE_IDENTITY y no OUTPUT: reporte_cosecha tiene trigger (rollup diario)
             cur.execute("""
+                SET NOCOUNT ON;
                 INSERT INTO dbo.reporte_cosecha(agricultor_id, hectarea_id, aptos, no_aptos, fuente)
-                OUTPUT INSERTED.id VALUES (?,?,?,?,?);
+                VALUES (?,?,?,?,?);
+                SELECT CAST(SCOPE_IDENTITY() AS BIGINT);
             """, (agricultor_id, hectarea_id, int(aptos), int(no_aptos), fuente))
             new_id = int(cur.fetchone()[0])
             c.commit()
@@ -318,6 +664,117 @@ def registrar_reporte_cosecha(agricultor_id: int, hectarea_id: int,
     except Exception:
         return None
 
+# ========================
+# Inserción masiva (TVP)
+# ========================
+# Requiere BD/insercion masiva.sql (tipos tt_* + SPs *Lote). Cada llamada al
+# SP envía hasta LOTE_TVP filas; todas las llamadas van en UNA transacción.
+
+LOTE_TVP = int(os.getenv("MSSQL_LOTE_TVP", "10000"))
+
+def _en_bloques(registros: Iterable, n: int) -> Iterator[List]:
+    it = iter(registros)
+    while True:
+        bloque = list(islice(it, n))
+        if not bloque:
+            return
+        yield bloque
+
+def _insertar_tvp(cur, sp: str, registros: Iterable, a_fila: Callable[[int, Any], tuple]) -> List[int]:
+    """Llama `sp` con bloques de filas (fila, ...) y junta los ids devueltos en orden."""
+    ids: List[int] = []
+    for bloque in _en_bloques(registros, LOTE_TVP):
+        filas = [a_fila(i, r) for i, r in enumerate(bloque)]
+        cur.execute(f"{{CALL {sp} (?)}}", (filas,))
+        ids.extend(int(r[0]) for r in cur.fetchall())
+    return ids
+
+def registrar_reporte_cosecha_lote(registros: Iterable[Dict]) -> List[int]:
+    """
+    Inserta muchas sesiones de conteo en UNA transacción con
+    sp_RegistrarReporteCosechaLote (TVP). Acepta cualquier iterable (se envía
+    por bloques de LOTE_TVP). Cada registro:
+    {agricultor_id, hectarea_id, aptos, no_aptos, fuente?, ts?}.
+    Devuelve los ids insertados (mismo orden); si falla lanza la excepción y
+    no se inserta ninguno (igual que registrar_actividad_campo_lote).
+    """
+    def _fila(i: int, r: Dict) -> tuple:
+        return (i, int(r["agricultor_id"]), int(r["hectarea_id"]), r.get("ts"),
+                int(r["aptos"]), int(r["no_aptos"]), r.get("fuente", "YOLO"))
+    with _conn() as c:
+        return _insertar_tvp(c.cursor(), "dbo.sp_RegistrarReporteCosechaLote", registros, _fila)
+
+# ========================
+# Caché de resultados de dashboards
+# ========================
+# Las pestañas refrescan el dashboard en cada cambio de pestaña y de fecha.
+# El resultado se guarda por (función, argumentos) junto con un token de
+# cambios de reporte_cosecha: dbo.reporte_cosecha_version, que
+# trg_reporte_cosecha_diario sube en cada INSERT / UPDATE / DELETE
+# (BD/rollup dashboard.sql). Mientras el token no cambie se devuelve lo
+# guardado; DASHBOARD_TTL_S acota cuánto pueden quedar desactualizados los
+# nombres (usuarios / hectáreas) del resultado.
+
+DASHBOARD_TTL_S = float(os.getenv("MSSQL_DASHBOARD_TTL_S", "300"))
+DASHBOARD_CACHE_MAX = int(os.getenv("MSSQL_DASHBOARD_CACHE_MAX", "64"))
+
+def token_reporte_cosecha() -> int:
+    """Versión de reporte_cosecha: cambia con cada alta, baja o edición."""
+    with _conn() as c:
+        row = c.cursor().execute(
+            "SELECT version FROM dbo.reporte_cosecha_version WHERE id = 1;").fetchone()
+    return int(row[0]) if row else 0
+
+class _CacheResultados:
+    """LRU thread-safe de resultados validados por un token de cambios."""
+
+    def __init__(self, token: Callable[[], Any], ttl_s: float = DASHBOARD_TTL_S,
+                 maximo: int = DASHBOARD_CACHE_MAX):
+        self.token = token
+        self.ttl_s = ttl_s
+        self.maximo = max(1, maximo)
+        self._datos: "OrderedDict[Tuple, Tuple[Any, float, List[Dict]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, clave: Tuple, calcular: Callable[[], List[Dict]]) -> List[Dict]:
+        token = self.token()
+        ahora = time.monotonic()
+        with self._lock:
+            guardado = self._datos.get(clave)
+            if guardado and guardado[0] == token and ahora - guardado[1] < self.ttl_s:
+                self._datos.move_to_end(clave)
+                self.aciertos += 1
+                return [dict(r) for r in guardado[2]]
+            self.fallos += 1
+        filas = calcular()
+        with self._lock:
+            self._datos[clave] = (token, ahora, filas)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maximo:
+                self._datos.popitem(last=False)
+        return [dict(r) for r in filas]
+
+    def invalidar(self) -> None:
+        with self._lock:
+            self._datos.clear()
+
+_CACHE_DASHBOARD = _CacheResultados(token_reporte_cosecha)
+
+def _cache_dashboard(fn):
+    """Decora una consulta de dashboard: mismos argumentos + mismo token => mismo resultado."""
+    @wraps(fn)
+    def envoltura(*args, **kwargs):
+        clave = (fn.__name__, args, tuple(sorted(kwargs.items())))
+        return _CACHE_DASHBOARD.obtener(clave, lambda: fn(*args, **kwargs))
+    return envoltura
+
+def invalidar_cache_dashboard() -> None:
+    """Descarta los resultados de dashboard guardados (p. ej. tras editar nombres en la BD)."""
+    _CACHE_DASHBOARD.invalidar()
+
+@_cache_dashboard
 def dashboard_agricultor(agricultor_id: int,
                          date_from: Optional[str]=None,
                          date_to: Optional[str]=None) -> List[Dict]:
@@ -341,6 +798,7 @@ def dashboard_agricultor(agricultor_id: int,
             """, (agricultor_id,))
         return _rows_to_dicts(cur)
 
+@_cache_dashboard
 def dashboard_supervisor(date_from: Optional[str]=None,
                          date_to: Optional[str]=None) -> List[Dict]:
     """Lee la vista vw_dashboard_supervisor (resumen por hectárea)."""
@@ -356,6 +814,69 @@ def dashboard_supervisor(date_from: Optional[str]=None,
             cur.execute("SELECT * FROM dbo.vw_dashboard_supervisor ORDER BY hectarea_id;")
         return _rows_to_dicts(cur)
 
+# =========================================================
+# Dashboards desde el rollup diario (dbo.reporte_cosecha_diario)
+#   -> Requiere BD/rollup dashboard.sql (tabla + trigger)
+#   Suman solo los días del rango pedido; mismas columnas que las vistas.
+#   date_from / date_to: 'YYYY-MM-DD' (o 'YYYY-MM-DD hh:mm:ss'), inclusivos
+#   por día completo. Sin rango = todo el histórico.
+# =========================================================
+
+@_cache_dashboard
+def dashboard_agricultor_diario(agricultor_id: int,
+                                date_from: Optional[str]=None,
+                                date_to: Optional[str]=None) -> List[Dict]:
+    """Resumen por hectárea del agricultor, sumando el rollup del rango de días."""
+    filtro, params = "WHERE d.agricultor_id=?", [agricultor_id]
+    if date_from and date_to:
+        filtro += " AND d.dia BETWEEN CAST(? AS DATE) AND CAST(? AS DATE)"
+        params += [date_from, date_to]
+    with _conn() as c:
+        cur = c.cursor()
+        cur.execute(f"""
+            SELECT d.agricultor_id, u.username AS usuario, u.email, u.is_active,
+                   d.hectarea_id, h.codigo AS codigo_hectarea, h.nombre AS nombre_hectarea,
+                   SUM(d.aptos)      AS total_aptos,
+                   SUM(d.no_aptos)   AS total_no_aptos,
+                   SUM(d.aptos + d.no_aptos) AS total_registrados,
+                   CAST(100.0 * NULLIF(SUM(d.aptos), 0) / NULLIF(SUM(d.aptos + d.no_aptos), 0) AS DECIMAL(5,2)) AS pct_aptos,
+                   MIN(d.primera_ts) AS primera_fecha,
+                   MAX(d.ultima_ts)  AS ultima_fecha
+            FROM dbo.reporte_cosecha_diario d
+            JOIN dbo.usuarios  u ON u.id = d.agricultor_id
+            JOIN dbo.hectareas h ON h.id = d.hectarea_id
+            {filtro}
+            GROUP BY d.agricultor_id, u.username, u.email, u.is_active, d.hectarea_id, h.codigo, h.nombre
+            ORDER BY d.hectarea_id;
+        """, params)
+        return _rows_to_dicts(cur)
+
+@_cache_dashboard
+def dashboard_supervisor_diario(date_from: Optional[str]=None,
+                                date_to: Optional[str]=None) -> List[Dict]:
+    """Resumen por hectárea (todos los agricultores), sumando el rollup del rango de días."""
+    filtro, params = "", []
+    if date_from and date_to:
+        filtro, params = "WHERE d.dia BETWEEN CAST(? AS DATE) AND CAST(? AS DATE)", [date_from, date_to]
+    with _conn() as c:
+        cur = c.cursor()
+        cur.execute(f"""
+            SELECT d.hectarea_id, h.codigo AS codigo_hectarea, h.nombre AS nombre_hectarea,
+                   SUM(d.aptos)      AS total_aptos,
+                   SUM(d.no_aptos)   AS total_no_aptos,
+                   SUM(d.aptos + d.no_aptos) AS total_registrados,
+                   CAST(100.0 * NULLIF(SUM(d.aptos), 0) / NULLIF(SUM(d.aptos + d.no_aptos), 0) AS DECIMAL(5,2)) AS pct_aptos,
+                   COUNT(DISTINCT d.agricultor_id) AS agricultores_participantes,
+                   MIN(d.primera_ts) AS primera_fecha,
+                   MAX(d.ultima_ts)  AS ultima_fecha
+            FROM dbo.reporte_cosecha_diario d
+            JOIN dbo.hectareas h ON h.id = d.hectarea_id
+            {filtro}
+            GROUP BY d.hectarea_id, h.codigo, h.nombre
+            ORDER BY d.hectarea_id;
+        """, params)
+        return _rows_to_dicts(cur)
+
 # =========================================================
 # NUEVO: Control de Cosecha (Transaccional - Actividad Campo)
 #   -> Requiere los SPs: sp_RegistrarActividadCampo,
@@ -384,6 +905,20 @@ def registrar_actividad_campo(agricultor_id: int, hectarea_id: int, tipo: str,
         c.commit()
         return int(row[0]) if row else 0
 
+def registrar_actividad_campo_lote(registros: Iterable[Dict]) -> List[int]:
+    """
+    Inserta muchas actividades (con su detalle si son 'cosecha') en UNA
+    transacción con sp_RegistrarActividadCampoLote (TVP). Cada registro usa
+    las mismas claves que los argumentos de registrar_actividad_campo.
+    Devuelve los ids (mismo orden); si falla no se inserta ninguna.
+    """
+    def _fila(i: int, r: Dict) -> tuple:
+        return (i, int(r["agricultor_id"]), int(r["hectarea_id"]), r["tipo"], r["fecha_hora"],
+                r.get("cantidad"), r.get("unidad"), r.get("costo", 0.0), r.get("notas"),
+                r.get("aptos"), r.get("no_aptos"), r.get("cajas"), r.get("kilos"))
+    with _conn() as c:
+        return _insertar_tvp(c.cursor(), "dbo.sp_RegistrarActividadCampoLote", registros, _fila)
+
 def listar_actividades_agricultor(agricultor_id: int,
                                   desde: Optional[datetime]=None,
                                   hasta: Optional[datetime]=None) -> List[Dict]:
@@ -423,6 +958,115 @@ def eliminar_actividad(actividad_id: int, agricultor_id: int) -> bool:
         rows_affected = int(row[0]) if row else 0
         return rows_affected > 0
 
+# =========================================================
+# Sincronización idempotente (cola_offline.py)
+#   -> Requiere BD/idempotencia cola offline.sql (columnas clave_idem)
+#   Cada registro trae "clave" (GUID generado al encolar). El lote se carga
+#   en una tabla temporal y se inserta solo lo que aún no existe, en UNA
+#   transacción: reenviar un lote ya aplicado no duplica filas.
+#   Devuelven {clave: id en el servidor} para todas las claves del lote.
+# =========================================================
+
+def _cargar_temporal(cur, tabla: str, columnas: str, filas: List[tuple]) -> None:
+    cur.execute(f"IF OBJECT_ID('tempdb..{tabla}') IS NOT NULL DROP TABLE {tabla}; "
+                f"CREATE TABLE {tabla} ({columnas});")
+    cur.fast_executemany = True
+    cur.executemany(f"INSERT INTO {tabla} VALUES ({','.join('?' * len(filas[0]))});", filas)
+    cur.fast_executemany = False
+
+def _ids_por_clave(cur, sql: str) -> Dict[str, int]:
+    return {str(clave).lower(): int(id_) for clave, id_ in cur.execute(sql).fetchall()}
+
+def sincronizar_reportes_cosecha(registros: List[Dict]) -> Dict[str, int]:
+    """Sesiones de conteo: {clave, agricultor_id, hectarea_id, ts, aptos, no_aptos, fuente}."""
+    if not registros:
+        return {}
+    filas = [(r["clave"], int(r["agricultor_id"]), int(r["hectarea_id"]), r.get("ts"),
+              int(r["aptos"]), int(r["no_aptos"]), r.get("fuente") or "YOLO") for r in registros]
+    with _conn() as c:
+        cur = c.cursor()
+        _cargar_temporal(cur, "#sync_rc", "clave UNIQUEIDENTIFIER PRIMARY KEY, agricultor_id INT, "
+                         "hectarea_id INT, ts DATETIME2(0), aptos INT, no_aptos INT, fuente NVARCHAR(30)", filas)
+        cur.execute("""
+            INSERT INTO dbo.reporte_cosecha(agricultor_id, hectarea_id, ts, aptos, no_aptos, fuente, clave_idem)
+            SELECT t.agricultor_id, t.hectarea_id, ISNULL(t.ts, SYSUTCDATETIME()), t.aptos, t.no_aptos, t.fuente, t.clave
+            FROM #sync_rc t
+            WHERE NOT EXISTS (SELECT 1 FROM dbo.reporte_cosecha r WITH (UPDLOCK, HOLDLOCK)
+                              WHERE r.clave_idem = t.clave);
+        """)
+        return _ids_por_clave(cur, """
+            SELECT t.clave, r.id FROM #sync_rc t JOIN dbo.reporte_cosecha r ON r.clave_idem = t.clave;
+            DROP TABLE #sync_rc;
+        """)
+
+def sincronizar_reportes(registros: List[Dict]) -> Dict[str, int]:
+    """
+    Reportes clásicos (estado 'pendiente'): {clave, usuario_id, fecha, planta,
+    enfermedad, num_frutos, maduracion, path_imagen, path_reporte}.
+    """
+    if not registros:
+        return {}
+    filas = [(r["clave"], int(r["usuario_id"]), r.get("fecha"), r.get("planta"), r.get("enfermedad"),
+              r.get("num_frutos"), r.get("maduracion"), r.get("path_imagen"), r.get("path_reporte"))
+             for r in registros]
+    estado_pend = _ESTADOS.id_de("pendiente")
+    with _conn() as c:
+        cur = c.cursor()
+        _cargar_temporal(cur, "#sync_rep", "clave UNIQUEIDENTIFIER PRIMARY KEY, usuario_id INT, "
+                         "fecha DATETIME2(0), planta NVARCHAR(120), enfermedad NVARCHAR(120), num_frutos INT, "
+                         "maduracion NVARCHAR(60), path_imagen NVARCHAR(300), path_reporte NVARCHAR(300)", filas)
+        cur.execute("""
+            INSERT INTO dbo.reportes
+              (usuario_id, fecha, planta, enfermedad, num_frutos, maduracion,
+               path_imagen, path_reporte, estado_id, comentario_supervisor, clave_idem)
+            SELECT t.usuario_id, ISNULL(t.fecha, SYSUTCDATETIME()), t.planta, t.enfermedad, t.num_frutos,
+                   t.maduracion, t.path_imagen, t.path_reporte, ?, NULL, t.clave
+            FROM #sync_rep t
+            WHERE NOT EXISTS (SELECT 1 FROM dbo.reportes r WITH (UPDLOCK, HOLDLOCK)
+                              WHERE r.clave_idem = t.clave);
+        """, (estado_pend,))
+        return _ids_por_clave(cur, """
+            SELECT t.clave, r.id FROM #sync_rep t JOIN dbo.reportes r ON r.clave_idem = t.clave;
+            DROP TABLE #sync_rep;
+        """)
+
+def sincronizar_actividades(registros: List[Dict]) -> Dict[str, int]:
+    """
+    Actividades de campo (y su detalle si son 'cosecha'): {clave, agricultor_id,
+    hectarea_id, tipo, fecha_hora, cantidad, unidad, costo, notas, aptos,
+    no_aptos, cajas, kilos}; mismas reglas que sp_RegistrarActividadCampo.
+    """
+    if not registros:
+        return {}
+    filas = [(r["clave"], int(r["agricultor_id"]), int(r["hectarea_id"]), r["tipo"], r["fecha_hora"],
+              r.get("cantidad"), r.get("unidad"), r.get("costo") or 0.0, r.get("notas"),
+              r.get("aptos"), r.get("no_aptos"), r.get("cajas"), r.get("kilos")) for r in registros]
+    with _conn() as c:
+        cur = c.cursor()
+        _cargar_temporal(cur, "#sync_ac", "clave UNIQUEIDENTIFIER PRIMARY KEY, agricultor_id INT, "
+                         "hectarea_id INT, tipo VARCHAR(20), fecha_hora DATETIME, cantidad DECIMAL(10,2), "
+                         "unidad NVARCHAR(20), costo DECIMAL(12,2), notas NVARCHAR(500), aptos INT, "
+                         "no_aptos INT, cajas DECIMAL(10,2), kilos DECIMAL(10,2)", filas)
+        cur.execute("""
+            INSERT INTO dbo.actividad_campo
+              (agricultor_id, hectarea_id, tipo, fecha_hora, cantidad, unidad, costo, notas, clave_idem)
+            SELECT t.agricultor_id, t.hectarea_id, t.tipo, t.fecha_hora, t.cantidad, t.unidad, t.costo, t.notas, t.clave
+            FROM #sync_ac t
+            WHERE NOT EXISTS (SELECT 1 FROM dbo.actividad_campo a WITH (UPDLOCK, HOLDLOCK)
+                              WHERE a.clave_idem = t.clave);
+
+            INSERT INTO dbo.cosecha_detalle(actividad_id, aptos, no_aptos, cajas, kilos)
+            SELECT a.id, ISNULL(t.aptos, 0), ISNULL(t.no_aptos, 0), t.cajas, t.kilos
+            FROM #sync_ac t
+            JOIN dbo.actividad_campo a ON a.clave_idem = t.clave
+            WHERE t.tipo = 'cosecha'
+              AND NOT EXISTS (SELECT 1 FROM dbo.cosecha_detalle d WHERE d.actividad_id = a.id);
+        """)
+        return _ids_por_clave(cur, """
+            SELECT t.clave, a.id FROM #sync_ac t JOIN dbo.actividad_campo a ON a.clave_idem = t.clave;
+            DROP TABLE #sync_ac;
+        """)
+
 # ==============
 # Prueba manual
 # ==============
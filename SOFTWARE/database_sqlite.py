@@ -0,0 +1,950 @@
+# database_sqlite.py
+# Backend SQLite local para AgroScan (equipos de campo sin red)
+# - Mismas funciones y mismos formatos de retorno que database_mssql.py;
+#   se elige con AGROSCAN_DB_BACKEND=sqlite (ver database.py).
+# - Mismo esquema que BD/Creacion BD.sql + BD/rollup dashboard.sql: vistas
+#   de dashboard, rollup diario y triggers en SQL; los stored procedures de
+#   actividad de campo son funciones Python con la misma lógica.
+# - WAL: lecturas concurrentes con una escritura; una conexión por hilo
+#   (database_async consulta desde varios hilos).
+# - SELECT de reportes devuelve EXACTAMENTE 11 columnas en este orden:
+#   id, usuario_id, fecha, planta, enfermedad, num_frutos, maduracion,
+#   path_imagen, path_reporte, estado(TEXT), comentario_supervisor
+
+import os
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# ========================
+# Configuración
+# ========================
+
+RUTA_BD = os.getenv("AGROSCAN_SQLITE_BD", os.path.join("reports", "local", "agroscan.db"))
+BUSY_TIMEOUT_MS = int(os.getenv("AGROSCAN_SQLITE_BUSY_MS", "5000"))  # espera por el bloqueo de escritura
+
+# Fechas como 'YYYY-MM-DD HH:MM:SS' (igual que CURRENT_TIMESTAMP y DATETIME2(0));
+# las columnas de fecha vuelven como datetime / date. La conversión la hacen
+# las conexiones de este módulo (_Conexion), no sqlite3.register_adapter /
+# register_converter: esos son globales del proceso y alcanzarían a
+# cola_offline y cache_detecciones. Se reconocen por nombre de columna.
+_COLUMNAS_FECHA_HORA = frozenset({
+    "fecha", "fecha_registro", "created_at", "updated_at", "ts", "fecha_hora",
+    "fecha_creacion", "fecha_actualizacion", "fecha_revision",
+    "primera_fecha", "ultima_fecha", "primera_ts", "ultima_ts",
+})
+_COLUMNAS_FECHA = frozenset({"inicio", "fin", "dia"})
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS roles (
+  id  INTEGER PRIMARY KEY AUTOINCREMENT,
+  rol TEXT NOT NULL UNIQUE
+);
+INSERT OR IGNORE INTO roles(rol) VALUES ('agricultor'), ('supervisor');
+
+CREATE TABLE IF NOT EXISTS reporte_estados (
+  id     INTEGER PRIMARY KEY AUTOINCREMENT,
+  estado TEXT NOT NULL UNIQUE
+);
+INSERT OR IGNORE INTO reporte_estados(estado) VALUES ('pendiente'), ('aprobado'), ('rechazado');
+
+CREATE TABLE IF NOT EXISTS usuarios (
+  id             INTEGER PRIMARY KEY AUTOINCREMENT,
+  username       TEXT      NOT NULL UNIQUE,
+  email          TEXT      NOT NULL UNIQUE,
+  password_hash  TEXT      NOT NULL,
+  rol_id         INTEGER   NOT NULL REFERENCES roles(id),
+  fecha_registro TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  is_active      INTEGER   NOT NULL DEFAULT 1,
+  created_at     TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  updated_at     TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS reportes (
+  id                    INTEGER PRIMARY KEY AUTOINCREMENT,
+  usuario_id            INTEGER   NOT NULL REFERENCES usuarios(id) ON DELETE CASCADE,
+  fecha                 TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  planta                TEXT,
+  enfermedad            TEXT,
+  num_frutos            INTEGER,
+  maduracion            TEXT,
+  path_imagen           TEXT,
+  path_reporte          TEXT,
+  estado_id             INTEGER   NOT NULL REFERENCES reporte_estados(id),
+  comentario_supervisor TEXT,
+  created_at            TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  updated_at            TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS IX_reportes_usuario_fecha ON reportes(usuario_id, fecha DESC, id DESC);
+CREATE INDEX IF NOT EXISTS IX_reportes_fecha_id ON reportes(fecha DESC, id DESC);
+CREATE INDEX IF NOT EXISTS IX_reportes_estado_fecha ON reportes(estado_id, fecha DESC, id DESC);
+
+CREATE TRIGGER IF NOT EXISTS trg_reportes_updated AFTER UPDATE ON reportes
+BEGIN
+  UPDATE reportes SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+END;
+
+CREATE TABLE IF NOT EXISTS hectareas (
+  id         INTEGER PRIMARY KEY AUTOINCREMENT,
+  codigo     TEXT      NOT NULL UNIQUE,
+  nombre     TEXT      NOT NULL,
+  area_ha    REAL      NOT NULL DEFAULT 1.00,
+  ubicacion  TEXT,
+  activa     INTEGER   NOT NULL DEFAULT 1,
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+INSERT OR IGNORE INTO hectareas(codigo, nombre) VALUES
+  ('H1', 'Hectárea 1'), ('H2', 'Hectárea 2'), ('H3', 'Hectárea 3'),
+  ('H4', 'Hectárea 4'), ('H5', 'Hectárea 5');
+
+CREATE TABLE IF NOT EXISTS asignaciones (
+  id            INTEGER PRIMARY KEY AUTOINCREMENT,
+  agricultor_id INTEGER   NOT NULL REFERENCES usuarios(id),
+  hectarea_id   INTEGER   NOT NULL REFERENCES hectareas(id),
+  inicio        DATE      NOT NULL DEFAULT (date('now')),
+  fin           DATE,
+  activo        INTEGER   NOT NULL DEFAULT 1,
+  created_at    TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE UNIQUE INDEX IF NOT EXISTS UX_asig_agricultor_activo ON asignaciones(agricultor_id) WHERE activo = 1;
+CREATE UNIQUE INDEX IF NOT EXISTS UX_asig_hectarea_activa   ON asignaciones(hectarea_id)   WHERE activo = 1;
+
+CREATE TABLE IF NOT EXISTS reporte_cosecha (
+  id            INTEGER PRIMARY KEY AUTOINCREMENT,
+  agricultor_id INTEGER   NOT NULL REFERENCES usuarios(id),
+  hectarea_id   INTEGER   NOT NULL REFERENCES hectareas(id),
+  ts            TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  aptos         INTEGER   NOT NULL CHECK (aptos    >= 0),
+  no_aptos      INTEGER   NOT NULL CHECK (no_aptos >= 0),
+  fuente        TEXT      NOT NULL DEFAULT 'YOLO',
+  created_at    TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS IX_repC_agricultor_ts ON reporte_cosecha(agricultor_id, ts DESC);
+CREATE INDEX IF NOT EXISTS IX_repC_hectarea_ts   ON reporte_cosecha(hectarea_id, agricultor_id, ts);
+
+-- Rollup diario (BD/rollup dashboard.sql)
+CREATE TABLE IF NOT EXISTS reporte_cosecha_diario (
+  dia           DATE      NOT NULL,
+  hectarea_id   INTEGER   NOT NULL,
+  agricultor_id INTEGER   NOT NULL,
+  aptos         INTEGER   NOT NULL,
+  no_aptos      INTEGER   NOT NULL,
+  sesiones      INTEGER   NOT NULL,
+  primera_ts    TIMESTAMP NOT NULL,
+  ultima_ts     TIMESTAMP NOT NULL,
+  PRIMARY KEY (dia, hectarea_id, agricultor_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS IX_repC_diario_agricultor ON reporte_cosecha_diario(agricultor_id, dia);
+
+-- Inserción: suma el delta; UPDATE / DELETE: recalcula los grupos tocados
+CREATE TRIGGER IF NOT EXISTS trg_reporte_cosecha_diario_ins AFTER INSERT ON reporte_cosecha
+BEGIN
+  INSERT INTO reporte_cosecha_diario
+    (dia, hectarea_id, agricultor_id, aptos, no_aptos, sesiones, primera_ts, ultima_ts)
+  VALUES (date(NEW.ts), NEW.hectarea_id, NEW.agricultor_id, NEW.aptos, NEW.no_aptos, 1, NEW.ts, NEW.ts)
+  ON CONFLICT (dia, hectarea_id, agricultor_id) DO UPDATE SET
+    aptos      = aptos + excluded.aptos,
+    no_aptos   = no_aptos + excluded.no_aptos,
+    sesiones   = sesiones + 1,
+    primera_ts = MIN(primera_ts, excluded.primera_ts),
+    ultima_ts  = MAX(ultima_ts, excluded.ultima_ts);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_reporte_cosecha_diario_del AFTER DELETE ON reporte_cosecha
+BEGIN
+  DELETE FROM reporte_cosecha_diario
+   WHERE dia = date(OLD.ts) AND hectarea_id = OLD.hectarea_id AND agricultor_id = OLD.agricultor_id;
+  INSERT INTO reporte_cosecha_diario
+    (dia, hectarea_id, agricultor_id, aptos, no_aptos, sesiones, primera_ts, ultima_ts)
+  SELECT date(OLD.ts), OLD.hectarea_id, OLD.agricultor_id,
+         SUM(aptos), SUM(no_aptos), COUNT(*), MIN(ts), MAX(ts)
+  FROM reporte_cosecha
+  WHERE hectarea_id = OLD.hectarea_id AND agricultor_id = OLD.agricultor_id
+    AND ts >= date(OLD.ts) AND ts < date(OLD.ts, '+1 day')
+  HAVING COUNT(*) > 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_reporte_cosecha_diario_upd
+AFTER UPDATE OF ts, hectarea_id, agricultor_id, aptos, no_aptos ON reporte_cosecha
+BEGIN
+  DELETE FROM reporte_cosecha_diario
+   WHERE (dia = date(OLD.ts) AND hectarea_id = OLD.hectarea_id AND agricultor_id = OLD.agricultor_id)
+      OR (dia = date(NEW.ts) AND hectarea_id = NEW.hectarea_id AND agricultor_id = NEW.agricultor_id);
+  INSERT INTO reporte_cosecha_diario
+    (dia, hectarea_id, agricultor_id, aptos, no_aptos, sesiones, primera_ts, ultima_ts)
+  SELECT date(rc.ts), rc.hectarea_id, rc.agricultor_id,
+         SUM(rc.aptos), SUM(rc.no_aptos), COUNT(*), MIN(rc.ts), MAX(rc.ts)
+  FROM reporte_cosecha rc
+  WHERE (rc.hectarea_id = OLD.hectarea_id AND rc.agricultor_id = OLD.agricultor_id
+         AND rc.ts >= date(OLD.ts) AND rc.ts < date(OLD.ts, '+1 day'))
+     OR (rc.hectarea_id = NEW.hectarea_id AND rc.agricultor_id = NEW.agricultor_id
+         AND rc.ts >= date(NEW.ts) AND rc.ts < date(NEW.ts, '+1 day'))
+  GROUP BY date(rc.ts), rc.hectarea_id, rc.agricultor_id;
+END;
+
+-- Versión de reporte_cosecha: token de cambios (token_reporte_cosecha)
+CREATE TABLE IF NOT EXISTS reporte_cosecha_version (
+  id      INTEGER PRIMARY KEY CHECK (id = 1),
+  version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO reporte_cosecha_version(id, version) VALUES (1, 0);
+CREATE TRIGGER IF NOT EXISTS trg_reporte_cosecha_version_ins AFTER INSERT ON reporte_cosecha
+BEGIN
+  UPDATE reporte_cosecha_version SET version = version + 1 WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_reporte_cosecha_version_upd AFTER UPDATE ON reporte_cosecha
+BEGIN
+  UPDATE reporte_cosecha_version SET version = version + 1 WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_reporte_cosecha_version_del AFTER DELETE ON reporte_cosecha
+BEGIN
+  UPDATE reporte_cosecha_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TABLE IF NOT EXISTS actividad_campo (
+  id                    INTEGER PRIMARY KEY AUTOINCREMENT,
+  agricultor_id         INTEGER   NOT NULL REFERENCES usuarios(id),
+  hectarea_id           INTEGER   NOT NULL REFERENCES hectareas(id),
+  tipo                  TEXT      NOT NULL CHECK (tipo IN ('siembra','riego','fumigacion','cosecha','otros')),
+  fecha_hora            TIMESTAMP NOT NULL,
+  cantidad              REAL,
+  unidad                TEXT,
+  costo                 REAL      NOT NULL DEFAULT 0,
+  notas                 TEXT,
+  estado                TEXT      NOT NULL DEFAULT 'pendiente'
+                                  CHECK (estado IN ('pendiente','aprobado','rechazado')),
+  supervisor_id         INTEGER,
+  comentario_supervisor TEXT,
+  activo                INTEGER   NOT NULL DEFAULT 1,
+  fecha_creacion        TIMESTAMP NOT NULL DEFAULT (datetime('now','localtime')),
+  fecha_actualizacion   TIMESTAMP NOT NULL DEFAULT (datetime('now','localtime')),
+  fecha_revision        TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS IX_actividad_campo_agricultor_fecha ON actividad_campo(agricultor_id, fecha_hora DESC);
+CREATE INDEX IF NOT EXISTS IX_actividad_campo_hectarea_fecha   ON actividad_campo(hectarea_id, fecha_hora DESC);
+CREATE INDEX IF NOT EXISTS IX_actividad_campo_estado ON actividad_campo(estado) WHERE estado = 'pendiente';
+
+CREATE TABLE IF NOT EXISTS cosecha_detalle (
+  actividad_id INTEGER PRIMARY KEY REFERENCES actividad_campo(id) ON DELETE CASCADE,
+  aptos        INTEGER NOT NULL DEFAULT 0,
+  no_aptos     INTEGER NOT NULL DEFAULT 0,
+  cajas        REAL,
+  kilos        REAL
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_actividad_campo_touch AFTER UPDATE ON actividad_campo
+BEGIN
+  UPDATE actividad_campo SET fecha_actualizacion = datetime('now','localtime') WHERE id = NEW.id;
+END;
+
+-- Cosecha aprobada => sesión en reporte_cosecha (y de ahí al rollup)
+CREATE TRIGGER IF NOT EXISTS trg_actividad_to_reportes_cosecha AFTER UPDATE OF estado ON actividad_campo
+WHEN NEW.activo = 1 AND NEW.tipo = 'cosecha' AND NEW.estado = 'aprobado'
+     AND (OLD.estado <> 'aprobado' OR OLD.estado IS NULL)
+BEGIN
+  INSERT INTO reporte_cosecha(agricultor_id, hectarea_id, ts, aptos, no_aptos, fuente)
+  VALUES (NEW.agricultor_id, NEW.hectarea_id, NEW.fecha_hora,
+          IFNULL((SELECT aptos    FROM cosecha_detalle WHERE actividad_id = NEW.id), 0),
+          IFNULL((SELECT no_aptos FROM cosecha_detalle WHERE actividad_id = NEW.id), 0),
+          'ACTIVIDAD');
+END;
+
+CREATE VIEW IF NOT EXISTS vw_dashboard_agricultor AS
+SELECT
+  rc.agricultor_id,
+  u.username      AS usuario,
+  u.email,
+  u.is_active,
+  rc.hectarea_id,
+  h.codigo        AS codigo_hectarea,
+  h.nombre        AS nombre_hectarea,
+  SUM(rc.aptos)      AS total_aptos,
+  SUM(rc.no_aptos)   AS total_no_aptos,
+  SUM(rc.aptos + rc.no_aptos) AS total_registrados,
+  ROUND(100.0 * NULLIF(SUM(rc.aptos), 0) / NULLIF(SUM(rc.aptos + rc.no_aptos), 0), 2) AS pct_aptos,
+  MIN(rc.ts)      AS primera_fecha,
+  MAX(rc.ts)      AS ultima_fecha
+FROM reporte_cosecha rc
+JOIN usuarios  u ON u.id = rc.agricultor_id
+JOIN hectareas h ON h.id = rc.hectarea_id
+GROUP BY rc.agricultor_id, u.username, u.email, u.is_active, rc.hectarea_id, h.codigo, h.nombre;
+
+CREATE VIEW IF NOT EXISTS vw_dashboard_supervisor AS
+SELECT
+  rc.hectarea_id,
+  h.codigo        AS codigo_hectarea,
+  h.nombre        AS nombre_hectarea,
+  SUM(rc.aptos)      AS total_aptos,
+  SUM(rc.no_aptos)   AS total_no_aptos,
+  SUM(rc.aptos + rc.no_aptos) AS total_registrados,
+  ROUND(100.0 * NULLIF(SUM(rc.aptos), 0) / NULLIF(SUM(rc.aptos + rc.no_aptos), 0), 2) AS pct_aptos,
+  COUNT(DISTINCT rc.agricultor_id) AS agricultores_participantes,
+  MIN(rc.ts)      AS primera_fecha,
+  MAX(rc.ts)      AS ultima_fecha
+FROM reporte_cosecha rc
+JOIN hectareas h ON h.id = rc.hectarea_id
+GROUP BY rc.hectarea_id, h.codigo, h.nombre;
+"""
+
+# ========================
+# Conexiones (una por hilo)
+# ========================
+
+def _a_sql(v):
+    if isinstance(v, datetime):
+        return v.isoformat(" ", "seconds")
+    if isinstance(v, date):
+        return v.isoformat()
+    return v
+
+def _parametros(params):
+    if isinstance(params, dict):
+        return {k: _a_sql(v) for k, v in params.items()}
+    return tuple(_a_sql(v) for v in params)
+
+def _de_sql(columna: str, v):
+    if isinstance(v, str):
+        if columna in _COLUMNAS_FECHA_HORA:
+            return datetime.fromisoformat(v)
+        if columna in _COLUMNAS_FECHA:
+            return date.fromisoformat(v[:10])
+    return v
+
+def _convertir_fila(cursor: sqlite3.Cursor, fila: tuple) -> tuple:
+    return tuple(_de_sql(col[0], v) for col, v in zip(cursor.description, fila))
+
+class _Cursor(sqlite3.Cursor):
+    """Pasa datetime / date de los parámetros a texto (ver _a_sql)."""
+
+    def execute(self, sql, params=()):
+        return super().execute(sql, _parametros(params))
+
+    def executemany(self, sql, seq_params):
+        return super().executemany(sql, (_parametros(p) for p in seq_params))
+
+class _Conexion(sqlite3.Connection):
+    """Conexión cuyos cursores convierten fechas en ambos sentidos."""
+
+    def cursor(self, factory=_Cursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_params):
+        return self.cursor().executemany(sql, seq_params)
+
+_local = threading.local()
+_esquema_lock = threading.Lock()
+_esquemas_listos = set()  # rutas (absolutas) cuyo esquema ya se creó en este proceso
+
+def _abrir(ruta: str) -> sqlite3.Connection:
+    carpeta = os.path.dirname(ruta)
+    if carpeta:
+        os.makedirs(carpeta, exist_ok=True)
+    # isolation_level=None: sin transacciones implícitas; las escrituras abren
+    # BEGIN IMMEDIATE en _conn(escritura=True)
+    c = sqlite3.connect(ruta, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None, factory=_Conexion)
+    c.row_factory = _convertir_fila
+    c.execute("PRAGMA journal_mode=WAL")
+    c.execute("PRAGMA synchronous=NORMAL")
+    c.execute("PRAGMA foreign_keys=ON")
+    with _esquema_lock:
+        if os.path.abspath(ruta) not in _esquemas_listos:
+            c.executescript(ESQUEMA)
+            _esquemas_listos.add(os.path.abspath(ruta))
+    return c
+
+@contextmanager
+def _conn(escritura: bool = False):
+    """
+    Conexión del hilo actual: `with _conn() as c:` igual que en database_mssql.
+    Con escritura=True todo el bloque es UNA transacción (BEGIN IMMEDIATE:
+    toma el bloqueo de escritura al entrar, así no falla a mitad por otro
+    escritor); commit al salir o rollback si hubo excepción.
+    """
+    c = getattr(_local, "conexion", None)
+    if c is None or _local.ruta != RUTA_BD:  # primera vez en el hilo, o cambió RUTA_BD
+        if c is not None:
+            c.close()
+        c = _local.conexion = _abrir(RUTA_BD)
+        _local.ruta = RUTA_BD
+    if not escritura:
+        yield c
+        return
+    c.execute("BEGIN IMMEDIATE")
+    try:
+        yield c
+    except BaseException:
+        c.rollback()
+        raise
+    c.commit()
+
+# ========================
+# Utilidades
+# ========================
+
+def _sha256_hex(texto: str) -> str:
+    return hashlib.sha256(texto.encode()).hexdigest()
+
+def _rows_to_dicts(cur) -> List[Dict]:
+    cols = [c[0] for c in cur.description]
+    return [dict(zip(cols, r)) for r in cur.fetchall()]
+
+def invalidar_catalogos() -> None:
+    """Sin caché de catálogos en local (roles/estados se resuelven en la misma consulta)."""
+    # nada que invalidar; existe para tener las mismas funciones que database_mssql
+
+_SELECT_REPORTES = (
+    "SELECT r.id, r.usuario_id, r.fecha, r.planta, r.enfermedad, r.num_frutos, r.maduracion, "
+    "       r.path_imagen, r.path_reporte, e.estado, r.comentario_supervisor "
+    "FROM reportes r "
+    "JOIN reporte_estados e ON e.id = r.estado_id "
+)
+
+# ========================
+# Funciones usadas por la app (existentes)
+# ========================
+
+def registrar_usuario(username: str, email: str, password: str, rol_texto: str):
+    """
+    Crea usuario. rol_texto debe existir en roles (agricultor/supervisor).
+    Devuelve (True, msg) o (False, msg).
+    """
+    pw = _sha256_hex(password)
+    try:
+        with _conn(escritura=True) as c:
+            row = c.execute("SELECT id FROM roles WHERE rol = ?", (rol_texto,)).fetchone()
+            if row is None:
+                return False, f"Rol inválido: {rol_texto}"
+            c.execute(
+                "INSERT INTO usuarios (username, email, password_hash, rol_id) VALUES (?, ?, ?, ?)",
+                (username, email, pw, row[0]),
+            )
+        return True, "Usuario registrado exitosamente."
+    except sqlite3.IntegrityError:
+        return False, "Nombre de usuario o email ya existe."
+    except Exception as e:
+        return False, f"Error al registrar usuario: {e}"
+
+def login_usuario(email: str, password: str):
+    """
+    Login por email + password (sha256 hex).
+    Devuelve (True, id, username, rol_texto) o (False, msg).
+    """
+    pw = _sha256_hex(password)
+    with _conn() as c:
+        row = c.execute(
+            "SELECT u.id, u.username, r.rol "
+            "FROM usuarios u JOIN roles r ON r.id = u.rol_id "
+            "WHERE u.email = ? AND u.password_hash = ? AND u.is_active = 1",
+            (email, pw),
+        ).fetchone()
+    if row:
+        return True, row[0], row[1], row[2]
+    return False, "Credenciales incorrectas."
+
+def guardar_reporte(
+    usuario_id: int,
+    planta: str,
+    enfermedad: str,
+    num_frutos: int,
+    maduracion: str,
+    path_imagen: str,
+    path_reporte: str,
+):
+    """
+    Inserta un reporte con estado 'pendiente'.
+    """
+    try:
+        with _conn(escritura=True) as c:
+            c.execute(
+                """
+                INSERT INTO reportes
+                (usuario_id, fecha, planta, enfermedad, num_frutos, maduracion,
+                 path_imagen, path_reporte, estado_id, comentario_supervisor)
+                VALUES (?, CURRENT_TIMESTAMP, ?, ?, ?, ?, ?, ?,
+                        (SELECT id FROM reporte_estados WHERE estado = 'pendiente'), NULL)
+                """,
+                (usuario_id, planta, enfermedad, num_frutos, maduracion, path_imagen, path_reporte),
+            )
+        return True, "Reporte guardado correctamente."
+    except Exception as e:
+        return False, f"Error al guardar el reporte: {e}"
+
+def listar_reportes(usuario_id: int | None = None, rol: str = "agricultor"):
+    """
+    Devuelve EXACTAMENTE 11 columnas (ver cabecera).
+    - Si rol == 'supervisor' o usuario_id es None: lista todos.
+    - Si rol == 'agricultor': filtra por usuario_id.
+    """
+    order = " ORDER BY r.fecha DESC"
+    with _conn() as c:
+        if rol == "supervisor" or usuario_id is None:
+            filas = c.execute(_SELECT_REPORTES + order).fetchall()
+        else:
+            filas = c.execute(_SELECT_REPORTES + " WHERE r.usuario_id = ?" + order, (usuario_id,)).fetchall()
+        return [tuple(f) for f in filas]
+
+def listar_reportes_pagina(usuario_id: Optional[int] = None,
+                           after_fecha: Optional[datetime] = None,
+                           after_id: Optional[int] = None,
+                           limit: int = 50) -> List[Tuple]:
+    """
+    Una página de reportes (mismas 11 columnas que listar_reportes), ordenada
+    por fecha DESC, id DESC. Paginación por clave (keyset): para la página
+    siguiente se pasa (fecha, id) de la última fila recibida.
+    """
+    where, params = [], []
+    if usuario_id is not None:
+        where.append("r.usuario_id = ?")
+        params.append(usuario_id)
+    if after_fecha is not None and after_id is not None:
+        where.append("(r.fecha < ? OR (r.fecha = ? AND r.id < ?))")
+        params += [after_fecha, after_fecha, after_id]
+    sql = (
+        _SELECT_REPORTES
+        + ("WHERE " + " AND ".join(where) + " " if where else "")
+        + "ORDER BY r.fecha DESC, r.id DESC LIMIT ?"
+    )
+    with _conn() as c:
+        return [tuple(r) for r in c.execute(sql, params + [int(limit)]).fetchall()]
+
+def obtener_agricultores():
+    """
+    Devuelve lista de agricultores (id, username, email).
+    """
+    with _conn() as c:
+        rows = c.execute(
+            "SELECT u.id, u.username, u.email FROM usuarios u "
+            "JOIN roles r ON r.id = u.rol_id "
+            "WHERE r.rol = 'agricultor' "
+            "ORDER BY u.username"
+        ).fetchall()
+        return [tuple(r) for r in rows]
+
+def obtener_reportes_agricultor(agricultor_id: int):
+    """
+    Mismo formato de 11 columnas que listar_reportes, pero filtrado por usuario.
+    """
+    with _conn() as c:
+        rows = c.execute(_SELECT_REPORTES + "WHERE r.usuario_id = ? ORDER BY r.fecha DESC",
+                         (agricultor_id,)).fetchall()
+        return [tuple(r) for r in rows]
+
+# ---- Explorador de reportes (supervisor) ----
+
+def _filtro_reportes(estado: Optional[str], desde, hasta, hectarea_id: Optional[int],
+                     agricultor_id: Optional[int], texto: Optional[str]) -> Tuple[List[str], List]:
+    """WHERE común de buscar_reportes / contar_reportes_por_estado."""
+    where, params = [], []
+    if estado:
+        where.append("r.estado_id = (SELECT id FROM reporte_estados WHERE estado = ?)")
+        params.append(estado)
+    if desde is not None:
+        where.append("r.fecha >= ?")
+        params.append(desde)
+    if hasta is not None:
+        if isinstance(hasta, date) and not isinstance(hasta, datetime):
+            hasta = datetime.combine(hasta, datetime.min.time()) + timedelta(days=1)
+        where.append("r.fecha < ?")
+        params.append(hasta)
+    if agricultor_id is not None:
+        where.append("r.usuario_id = ?")
+        params.append(agricultor_id)
+    if hectarea_id is not None:
+        where.append(
+            "EXISTS (SELECT 1 FROM asignaciones a "
+            "        WHERE a.agricultor_id = r.usuario_id AND a.hectarea_id = ? "
+            "          AND a.inicio <= date(r.fecha) "
+            "          AND (a.fin IS NULL OR a.fin >= date(r.fecha)))")
+        params.append(hectarea_id)
+    if texto and texto.strip():
+        literal = texto.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        where.append("r.comentario_supervisor LIKE ? ESCAPE '\\'")
+        params.append(f"%{literal}%")
+    return where, params
+
+def buscar_reportes(estado: Optional[str] = None, desde=None, hasta=None,
+                    hectarea_id: Optional[int] = None, agricultor_id: Optional[int] = None,
+                    texto: Optional[str] = None,
+                    after_fecha: Optional[datetime] = None, after_id: Optional[int] = None,
+                    limit: int = 50) -> List[Tuple]:
+    """
+    Reportes filtrados, por páginas (keyset por fecha DESC, id DESC).
+    Columnas: las 11 de listar_reportes + username del agricultor.
+    """
+    where, params = _filtro_reportes(estado, desde, hasta, hectarea_id, agricultor_id, texto)
+    if after_fecha is not None and after_id is not None:
+        where.append("(r.fecha < ? OR (r.fecha = ? AND r.id < ?))")
+        params += [after_fecha, after_fecha, after_id]
+    sql = (
+        "SELECT r.id, r.usuario_id, r.fecha, r.planta, r.enfermedad, r.num_frutos, r.maduracion, "
+        "       r.path_imagen, r.path_reporte, e.estado, r.comentario_supervisor, u.username "
+        "FROM reportes r "
+        "JOIN reporte_estados e ON e.id = r.estado_id "
+        "JOIN usuarios u ON u.id = r.usuario_id "
+        + ("WHERE " + " AND ".join(where) + " " if where else "")
+        + "ORDER BY r.fecha DESC, r.id DESC LIMIT ?"
+    )
+    with _conn() as c:
+        return [tuple(r) for r in c.execute(sql, params + [int(limit)]).fetchall()]
+
+def contar_reportes_por_estado(desde=None, hasta=None, hectarea_id: Optional[int] = None,
+                               agricultor_id: Optional[int] = None,
+                               texto: Optional[str] = None) -> Dict[str, int]:
+    """{estado: cantidad} con los mismos filtros que buscar_reportes (salvo el estado)."""
+    where, params = _filtro_reportes(None, desde, hasta, hectarea_id, agricultor_id, texto)
+    sql = (
+        "SELECT e.estado, COUNT(r.id) "
+        "FROM reporte_estados e "
+        "LEFT JOIN reportes r ON r.estado_id = e.id "
+        + ("AND " + " AND ".join(where) + " " if where else "")
+        + "GROUP BY e.estado"
+    )
+    with _conn() as c:
+        return {str(est): int(n) for est, n in c.execute(sql, params).fetchall()}
+
+def actualizar_estado_reporte(reporte_id: int, nuevo_estado: str, comentario_supervisor: str = ""):
+    """
+    Actualiza estado (texto) y comentario de un reporte.
+    """
+    with _conn(escritura=True) as c:
+        row = c.execute("SELECT id FROM reporte_estados WHERE estado = ?", (nuevo_estado,)).fetchone()
+        if row is None:
+            return False
+        c.execute(
+            "UPDATE reportes SET estado_id = ?, comentario_supervisor = ? WHERE id = ?",
+            (row[0], comentario_supervisor, reporte_id),
+        )
+    return True
+
+def eliminar_reporte(reporte_id: int, usuario_id: int):
+    """
+    Elimina un reporte SOLO si pertenece al usuario y está en estado 'pendiente'.
+    """
+    with _conn(escritura=True) as c:
+        borrados = c.execute(
+            "DELETE FROM reportes WHERE id = ? AND usuario_id = ? "
+            "AND estado_id = (SELECT id FROM reporte_estados WHERE estado = 'pendiente')",
+            (reporte_id, usuario_id),
+        ).rowcount
+    return borrados > 0
+
+def eliminar_agricultor(agricultor_id: int):
+    """
+    Elimina un agricultor (ON DELETE CASCADE borra sus reportes).
+    """
+    with _conn(escritura=True) as c:
+        c.execute(
+            "DELETE FROM usuarios "
+            "WHERE id = ? AND rol_id = (SELECT id FROM roles WHERE rol = 'agricultor')",
+            (agricultor_id,),
+        )
+    return True
+
+# ========================
+# Hectáreas, Asignaciones y Dashboards
+# ========================
+
+def hectareas_disponibles() -> List[Dict]:
+    """Listado de hectáreas con su agricultor asignado (si lo hay)."""
+    with _conn() as c:
+        return _rows_to_dicts(c.execute("""
+            SELECT h.id, h.codigo, h.nombre, h.activa,
+                   IFNULL(a.agricultor_id, 0) AS agricultor_asignado
+            FROM hectareas h
+            LEFT JOIN asignaciones a ON a.hectarea_id = h.id AND a.activo = 1
+            ORDER BY h.id;
+        """))
+
+def asignar_hectarea(agricultor_id: int, hectarea_id: int) -> bool:
+    """
+    Asigna una hectárea a un agricultor:
+    - Cierra asignaciones activas previas (del agricultor o de la hectárea).
+    - Crea una nueva asignación activa.
+    """
+    try:
+        with _conn(escritura=True) as c:
+            c.execute("""
+                UPDATE asignaciones
+                   SET activo = 0, fin = date('now')
+                 WHERE activo = 1 AND (agricultor_id = ? OR hectarea_id = ?);
+            """, (agricultor_id, hectarea_id))
+            c.execute("INSERT INTO asignaciones(agricultor_id, hectarea_id) VALUES (?, ?);",
+                      (agricultor_id, hectarea_id))
+        return True
+    except Exception:
+        return False
+
+def hectarea_activa_de_agricultor(agricultor_id: int) -> Optional[Dict]:
+    """Devuelve la hectárea activa (si existe) del agricultor."""
+    with _conn() as c:
+        filas = _rows_to_dicts(c.execute("""
+            SELECT a.id AS asignacion_id, h.id AS hectarea_id, h.codigo, h.nombre
+            FROM asignaciones a
+            JOIN hectareas h ON h.id = a.hectarea_id
+            WHERE a.activo = 1 AND a.agricultor_id = ?
+            ORDER BY a.inicio DESC
+            LIMIT 1;
+        """, (agricultor_id,)))
+    return filas[0] if filas else None
+
+_INSERT_REPORTE_COSECHA = """
+    INSERT INTO reporte_cosecha(agricultor_id, hectarea_id, ts, aptos, no_aptos, fuente)
+    VALUES (?, ?, IFNULL(?, CURRENT_TIMESTAMP), ?, ?, IFNULL(?, 'YOLO'))
+"""
+
+def registrar_reporte_cosecha(agricultor_id: int, hectarea_id: int,
+                              aptos: int, no_aptos: int, fuente: str="YOLO") -> Optional[int]:
+    """
+    Inserta una sesión de conteo (aptos/no aptos) para dashboards.
+    Devuelve el id del registro insertado o None si falla.
+    """
+    try:
+        with _conn(escritura=True) as c:
+            return c.execute(_INSERT_REPORTE_COSECHA,
+                             (agricultor_id, hectarea_id, None, int(aptos), int(no_aptos), fuente)).lastrowid
+    except Exception:
+        return None
+
+def registrar_reporte_cosecha_lote(registros: Iterable[Dict]) -> List[int]:
+    """
+    Inserta muchas sesiones de conteo en UNA transacción. Cada registro:
+    {agricultor_id, hectarea_id, aptos, no_aptos, fuente?, ts?}.
+    Devuelve los ids insertados (mismo orden); si falla lanza la excepción y
+    no se inserta ninguno.
+    """
+    with _conn(escritura=True) as c:
+        return [c.execute(_INSERT_REPORTE_COSECHA,
+                          (int(r["agricultor_id"]), int(r["hectarea_id"]), r.get("ts"),
+                           int(r["aptos"]), int(r["no_aptos"]), r.get("fuente", "YOLO"))).lastrowid
+                for r in registros]
+
+def token_reporte_cosecha() -> int:
+    """Versión de reporte_cosecha: cambia con cada alta, baja o edición."""
+    with _conn() as c:
+        row = c.execute("SELECT version FROM reporte_cosecha_version WHERE id = 1").fetchone()
+    return int(row[0]) if row else 0
+
+def invalidar_cache_dashboard() -> None:
+    """Sin caché de dashboards en local: las consultas no cruzan la red."""
+    # nada que invalidar; existe para tener las mismas funciones que database_mssql
+
+_COLS_DASH_AGRICULTOR = (
+    "agricultor_id, usuario, email, is_active, hectarea_id, codigo_hectarea, nombre_hectarea, "
+    "total_aptos, total_no_aptos, total_registrados, pct_aptos, "
+    'primera_fecha, ultima_fecha'
+)
+_COLS_DASH_SUPERVISOR = (
+    "hectarea_id, codigo_hectarea, nombre_hectarea, "
+    "total_aptos, total_no_aptos, total_registrados, pct_aptos, agricultores_participantes, "
+    'primera_fecha, ultima_fecha'
+)
+
+def dashboard_agricultor(agricultor_id: int,
+                         date_from: Optional[str]=None,
+                         date_to: Optional[str]=None) -> List[Dict]:
+    """
+    Lee la vista vw_dashboard_agricultor.
+    date_from / date_to formato 'YYYY-MM-DD' (opcional).
+    """
+    with _conn() as c:
+        if date_from and date_to:
+            cur = c.execute(f"""
+                SELECT {_COLS_DASH_AGRICULTOR} FROM vw_dashboard_agricultor
+                WHERE agricultor_id = ? AND ultima_fecha BETWEEN ? AND ?
+                ORDER BY hectarea_id;
+            """, (agricultor_id, date_from, date_to))
+        else:
+            cur = c.execute(f"""
+                SELECT {_COLS_DASH_AGRICULTOR} FROM vw_dashboard_agricultor
+                WHERE agricultor_id = ?
+                ORDER BY hectarea_id;
+            """, (agricultor_id,))
+        return _rows_to_dicts(cur)
+
+def dashboard_supervisor(date_from: Optional[str]=None,
+                         date_to: Optional[str]=None) -> List[Dict]:
+    """Lee la vista vw_dashboard_supervisor (resumen por hectárea)."""
+    with _conn() as c:
+        if date_from and date_to:
+            cur = c.execute(f"""
+                SELECT {_COLS_DASH_SUPERVISOR} FROM vw_dashboard_supervisor
+                WHERE ultima_fecha BETWEEN ? AND ?
+                ORDER BY hectarea_id;
+            """, (date_from, date_to))
+        else:
+            cur = c.execute(f"SELECT {_COLS_DASH_SUPERVISOR} FROM vw_dashboard_supervisor ORDER BY hectarea_id;")
+        return _rows_to_dicts(cur)
+
+# Dashboards desde el rollup diario: suman solo los días del rango pedido
+# (inclusivos por día completo); sin rango = todo el histórico.
+
+def dashboard_agricultor_diario(agricultor_id: int,
+                                date_from: Optional[str]=None,
+                                date_to: Optional[str]=None) -> List[Dict]:
+    """Resumen por hectárea del agricultor, sumando el rollup del rango de días."""
+    filtro, params = "WHERE d.agricultor_id = ?", [agricultor_id]
+    if date_from and date_to:
+        filtro += " AND d.dia BETWEEN date(?) AND date(?)"
+        params += [date_from, date_to]
+    with _conn() as c:
+        return _rows_to_dicts(c.execute(f"""
+            SELECT d.agricultor_id, u.username AS usuario, u.email, u.is_active,
+                   d.hectarea_id, h.codigo AS codigo_hectarea, h.nombre AS nombre_hectarea,
+                   SUM(d.aptos)      AS total_aptos,
+                   SUM(d.no_aptos)   AS total_no_aptos,
+                   SUM(d.aptos + d.no_aptos) AS total_registrados,
+                   ROUND(100.0 * NULLIF(SUM(d.aptos), 0) / NULLIF(SUM(d.aptos + d.no_aptos), 0), 2) AS pct_aptos,
+                   MIN(d.primera_ts) AS primera_fecha,
+                   MAX(d.ultima_ts)  AS ultima_fecha
+            FROM reporte_cosecha_diario d
+            JOIN usuarios  u ON u.id = d.agricultor_id
+            JOIN hectareas h ON h.id = d.hectarea_id
+            {filtro}
+            GROUP BY d.agricultor_id, u.username, u.email, u.is_active, d.hectarea_id, h.codigo, h.nombre
+            ORDER BY d.hectarea_id;
+        """, params))
+
+def dashboard_supervisor_diario(date_from: Optional[str]=None,
+                                date_to: Optional[str]=None) -> List[Dict]:
+    """Resumen por hectárea (todos los agricultores), sumando el rollup del rango de días."""
+    filtro, params = "", []
+    if date_from and date_to:
+        filtro, params = "WHERE d.dia BETWEEN date(?) AND date(?)", [date_from, date_to]
+    with _conn() as c:
+        return _rows_to_dicts(c.execute(f"""
+            SELECT d.hectarea_id, h.codigo AS codigo_hectarea, h.nombre AS nombre_hectarea,
+                   SUM(d.aptos)      AS total_aptos,
+                   SUM(d.no_aptos)   AS total_no_aptos,
+                   SUM(d.aptos + d.no_aptos) AS total_registrados,
+                   ROUND(100.0 * NULLIF(SUM(d.aptos), 0) / NULLIF(SUM(d.aptos + d.no_aptos), 0), 2) AS pct_aptos,
+                   COUNT(DISTINCT d.agricultor_id) AS agricultores_participantes,
+                   MIN(d.primera_ts) AS primera_fecha,
+                   MAX(d.ultima_ts)  AS ultima_fecha
+            FROM reporte_cosecha_diario d
+            JOIN hectareas h ON h.id = d.hectarea_id
+            {filtro}
+            GROUP BY d.hectarea_id, h.codigo, h.nombre
+            ORDER BY d.hectarea_id;
+        """, params))
+
+# =========================================================
+# Control de Cosecha (Transaccional - Actividad Campo)
+#   Equivalentes de sp_RegistrarActividadCampo, sp_ListarActividades*,
+#   sp_ActualizarEstadoActividad y sp_EliminarActividad.
+# =========================================================
+
+def _insertar_actividad(c, agricultor_id, hectarea_id, tipo, fecha_hora, cantidad, unidad,
+                        costo, notas, aptos, no_aptos, cajas, kilos) -> int:
+    new_id = c.execute(
+        "INSERT INTO actividad_campo(agricultor_id, hectarea_id, tipo, fecha_hora, cantidad, unidad, costo, notas) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (agricultor_id, hectarea_id, tipo, fecha_hora, cantidad, unidad, costo, notas),
+    ).lastrowid
+    if tipo == "cosecha":
+        c.execute(
+            "INSERT INTO cosecha_detalle(actividad_id, aptos, no_aptos, cajas, kilos) VALUES (?, ?, ?, ?, ?)",
+            (new_id, aptos or 0, no_aptos or 0, cajas, kilos),
+        )
+    return new_id
+
+def registrar_actividad_campo(agricultor_id: int, hectarea_id: int, tipo: str,
+                              fecha_hora: datetime, cantidad=None, unidad: Optional[str]=None,
+                              costo: float = 0.0, notas: Optional[str]=None,
+                              aptos: Optional[int]=None, no_aptos: Optional[int]=None,
+                              cajas=None, kilos=None) -> int:
+    """
+    Inserta una actividad (y si es 'cosecha', su detalle). Devuelve el id.
+    """
+    with _conn(escritura=True) as c:
+        return _insertar_actividad(c, agricultor_id, hectarea_id, tipo, fecha_hora, cantidad, unidad,
+                                   costo, notas, aptos, no_aptos, cajas, kilos)
+
+def registrar_actividad_campo_lote(registros: Iterable[Dict]) -> List[int]:
+    """
+    Inserta muchas actividades (con su detalle si son 'cosecha') en UNA
+    transacción. Cada registro usa las mismas claves que los argumentos de
+    registrar_actividad_campo. Devuelve los ids (mismo orden); si falla no se
+    inserta ninguna.
+    """
+    with _conn(escritura=True) as c:
+        return [_insertar_actividad(c, int(r["agricultor_id"]), int(r["hectarea_id"]), r["tipo"],
+                                    r["fecha_hora"], r.get("cantidad"), r.get("unidad"),
+                                    r.get("costo", 0.0), r.get("notas"), r.get("aptos"),
+                                    r.get("no_aptos"), r.get("cajas"), r.get("kilos"))
+                for r in registros]
+
+_SELECT_ACTIVIDADES = """
+    SELECT ac.id, ac.agricultor_id, ac.hectarea_id, ac.tipo, ac.fecha_hora,
+           ac.cantidad, ac.unidad, ac.costo, ac.notas,
+           ac.estado, ac.supervisor_id, ac.comentario_supervisor,
+           ac.activo, ac.fecha_creacion, ac.fecha_actualizacion, ac.fecha_revision,
+           {extra}h.codigo AS codigo_hectarea,
+           cd.aptos, cd.no_aptos, cd.cajas, cd.kilos
+    FROM actividad_campo ac
+    JOIN hectareas h ON h.id = ac.hectarea_id
+    {join}LEFT JOIN cosecha_detalle cd ON cd.actividad_id = ac.id
+    WHERE ac.activo = 1
+      AND (:desde IS NULL OR ac.fecha_hora >= :desde)
+      AND (:hasta IS NULL OR ac.fecha_hora <= :hasta)
+      {filtro}
+    ORDER BY ac.fecha_hora DESC;
+"""
+
+def listar_actividades_agricultor(agricultor_id: int,
+                                  desde: Optional[datetime]=None,
+                                  hasta: Optional[datetime]=None) -> List[Dict]:
+    """Listado del agricultor (rango opcional)."""
+    sql = _SELECT_ACTIVIDADES.format(extra="", join="", filtro="AND ac.agricultor_id = :agricultor_id")
+    with _conn() as c:
+        return _rows_to_dicts(c.execute(sql, {"agricultor_id": agricultor_id, "desde": desde, "hasta": hasta}))
+
+def listar_actividades_supervisor(estado: Optional[str]=None,
+                                  desde: Optional[datetime]=None,
+                                  hasta: Optional[datetime]=None) -> List[Dict]:
+    """Listado para supervisor (filtro por estado + rango)."""
+    sql = _SELECT_ACTIVIDADES.format(extra="u.username AS agricultor, ",
+                                     join="JOIN usuarios u ON u.id = ac.agricultor_id\n    ",
+                                     filtro="AND (:estado IS NULL OR ac.estado = :estado)")
+    with _conn() as c:
+        return _rows_to_dicts(c.execute(sql, {"estado": estado, "desde": desde, "hasta": hasta}))
+
+def actualizar_estado_actividad(actividad_id: int, estado: str,
+                                supervisor_id: int, comentario: Optional[str]=None) -> bool:
+    """Aprueba/Rechaza/Pendiente + comentario. Devuelve True si actualizó."""
+    if estado not in ("pendiente", "aprobado", "rechazado"):
+        raise ValueError("Estado inválido")
+    with _conn(escritura=True) as c:
+        rows_affected = c.execute("""
+            UPDATE actividad_campo
+               SET estado = ?, supervisor_id = ?, comentario_supervisor = ?,
+                   fecha_revision = datetime('now','localtime')
+             WHERE id = ? AND activo = 1;
+        """, (estado, supervisor_id, comentario, actividad_id)).rowcount
+    return rows_affected > 0
+
+def eliminar_actividad(actividad_id: int, agricultor_id: int) -> bool:
+    """Borrado lógico por el agricultor si está 'pendiente'."""
+    with _conn(escritura=True) as c:
+        rows_affected = c.execute("""
+            UPDATE actividad_campo
+               SET activo = 0
+             WHERE id = ? AND agricultor_id = ? AND estado = 'pendiente' AND activo = 1;
+        """, (actividad_id, agricultor_id)).rowcount
+    return rows_affected > 0
+
+# ==============
+# Prueba manual
+# ==============
+if __name__ == "__main__":
+    with _conn() as c:
+        print("BD local:", os.path.abspath(RUTA_BD),
+              "| journal_mode:", c.execute("PRAGMA journal_mode").fetchone()[0])
+    print("Reportes (clásicos):", len(listar_reportes(usuario_id=None, rol="supervisor")))
+    print("Hectáreas:", hectareas_disponibles())
+    print("Dashboard supervisor:", dashboard_supervisor())
@@ -0,0 +1,286 @@
+# explorador_reportes.py
+# Pestaña del supervisor para revisar reportes de TODOS los agricultores:
+# filtros por estado, rango de fechas, hectárea, agricultor y texto del
+# comentario, resueltos en el servidor (buscar_reportes) por páginas, con el
+# conteo por estado (contar_reportes_por_estado) en el mismo combo de estado.
+# Evita abrir una GestionReportesWindow por agricultor para hacer el triaje.
+# "Exportar…" genera en segundo plano un PDF único o un ZIP con todos los
+# reportes del filtro actual (exportacion_lote.py).
+
+import threading
+from functools import partial
+from typing import Any, Dict, Optional
+
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QDateEdit, QCheckBox,
+    QLineEdit, QPushButton, QTableView, QHeaderView, QMessageBox, QFileDialog, QProgressDialog
+)
+from PyQt5.QtCore import Qt, QDate, QTimer, QObject, QRunnable, QThreadPool, pyqtSignal
+
+from database import (
+    buscar_reportes, contar_reportes_por_estado, actualizar_estado_reporte,
+    obtener_agricultores, hectareas_disponibles,
+)
+from database_async import Canal, llamar
+from exportacion_lote import ExportacionCancelada, exportar_reportes
+from gestion_reportes import (
+    BASE_STYLESHEET, ESTADOS, TAM_PAGINA, _coerce_rep, _tiene_imagen, regenerar_pdf, ver_detalle
+)
+from tabla_virtual import Boton, Columna, FuentePaginadaAsync, ModeloTablaVirtual, configurar_vista
+
+DEBOUNCE_FILTROS_MS = 400  # espera tras teclear / cambiar fechas antes de consultar
+
+def _pagina(filtros: Dict[str, Any], ultima, limite):
+    """Página siguiente con los filtros fijados al buscar. Corre en el pool de BD."""
+    filas = buscar_reportes(
+        after_fecha=ultima["fecha"] if ultima else None,
+        after_id=ultima["reporte_id"] if ultima else None,
+        limit=limite,
+        **filtros,
+    )
+    reps = [_coerce_rep(f) for f in filas]
+    for rep in reps:
+        _tiene_imagen(rep)
+    return reps
+
+class _SenalesExportacion(QObject):
+    progreso = pyqtSignal(int, int)   # (hechos, total)
+    resultado = pyqtSignal(dict)
+    error = pyqtSignal(str)
+    terminado = pyqtSignal()          # siempre al final, con o sin error/cancelación
+
+class TrabajoExportacion(QRunnable):
+    """exportar_reportes fuera del hilo de la GUI; se cancela entre reportes."""
+
+    def __init__(self, filtros: Dict[str, Any], salida: str):
+        super().__init__()
+        self.filtros = filtros
+        self.salida = salida
+        self.senales = _SenalesExportacion()
+        self._cancelado = threading.Event()
+
+    def cancelar(self):
+        self._cancelado.set()
+
+    def run(self):
+        try:
+            res = exportar_reportes(self.filtros, self.salida,
+                                    progreso=self.senales.progreso.emit,
+                                    cancelado=self._cancelado.is_set)
+            self.senales.resultado.emit(res)
+        except ExportacionCancelada:
+            pass
+        except Exception as e:
+            self.senales.error.emit(str(e))
+        finally:
+            self.senales.terminado.emit()
+
+class ExploradorReportesWindow(QWidget):
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("Explorador de reportes - AgroScan")
+        self.setStyleSheet(BASE_STYLESHEET)
+        self._detalles = []   # Mantener referencias a subventanas
+        self._filtros: Dict[str, Any] = {}
+        self._build_ui()
+        self._cargar_catalogos()
+        self.buscar()
+
+    def _build_ui(self):
+        root = QVBoxLayout()
+        lbl = QLabel("Reportes de agricultores")
+        lbl.setObjectName("heading")
+        lbl.setAlignment(Qt.AlignCenter)
+        root.addWidget(lbl)
+
+        # ---- Filtros ----
+        bar = QHBoxLayout()
+        self.cmb_estado = QComboBox()
+        self.cmb_estado.addItem("(todos)", None)
+        for est in ESTADOS:
+            self.cmb_estado.addItem(est, est)
+        self.cmb_estado.setCurrentIndex(1)  # pendientes: lo habitual para el triaje
+
+        self.chk_fechas = QCheckBox("Desde:")
+        self.dp_desde = QDateEdit(); self.dp_desde.setCalendarPopup(True)
+        self.dp_desde.setDate(QDate.currentDate().addMonths(-1))
+        self.dp_hasta = QDateEdit(); self.dp_hasta.setCalendarPopup(True)
+        self.dp_hasta.setDate(QDate.currentDate())
+        self.dp_desde.setEnabled(False); self.dp_hasta.setEnabled(False)
+
+        self.cmb_hectarea = QComboBox(); self.cmb_hectarea.addItem("(todas)", None)
+        self.cmb_agricultor = QComboBox(); self.cmb_agricultor.addItem("(todos)", None)
+        self.txt_buscar = QLineEdit(); self.txt_buscar.setPlaceholderText("Buscar en comentarios…")
+        self.btn_buscar = QPushButton("Buscar")
+        self.btn_exportar = QPushButton("Exportar…")
+        self.btn_exportar.setToolTip("PDF único o ZIP con todos los reportes del filtro actual")
+
+        bar.addWidget(QLabel("Estado:")); bar.addWidget(self.cmb_estado)
+        bar.addWidget(self.chk_fechas); bar.addWidget(self.dp_desde)
+        bar.addWidget(QLabel("Hasta:")); bar.addWidget(self.dp_hasta)
+        bar.addWidget(QLabel("Hectárea:")); bar.addWidget(self.cmb_hectarea)
+        bar.addWidget(QLabel("Agricultor:")); bar.addWidget(self.cmb_agricultor)
+        bar.addWidget(self.txt_buscar, 1); bar.addWidget(self.btn_buscar); bar.addWidget(self.btn_exportar)
+        root.addLayout(bar)
+
+        self.lbl_total = QLabel("")
+        root.addWidget(self.lbl_total)
+
+        # ---- Tabla (modelo virtual, páginas de TAM_PAGINA) ----
+        self.modelo = ModeloTablaVirtual([
+            Columna("ID", lambda r: r["reporte_id"] or ""),
+            Columna("Fecha", lambda r: r["fecha"] or ""),
+            Columna("Agricultor", lambda r: r["agricultor"] or r["usuario_id"]),
+            Columna("Planta", lambda r: r["planta"] or ""),
+            Columna("Estado", lambda r: r["enfermedad"] or ""),
+            Columna("Evaluacion", lambda r: (r["estado"] or "pendiente").lower(),
+                    tipo="combo", clave="estado", opciones=ESTADOS),
+            Columna("Comentario", lambda r: r["comentario"] or "", tipo="linea", clave="comentario",
+                    placeholder="Observaciones del supervisor…"),
+            Columna("Guardar", tipo="botones", botones=[
+                Boton("Guardar", self._on_guardar, fondo="#4da6ff", borde="#2b85d3", color="white",
+                      con_modelo=True, icono="iconos/icon-save.png"),
+            ]),
+            Columna("Ver", tipo="botones", botones=[
+                Boton("Ver", lambda r: self._detalles.append(ver_detalle(r)),
+                      fondo="#ffcc00", borde="#e6b800", color="black", icono="iconos/icon-eye.png"),
+            ]),
+            Columna("Imagen", _tiene_imagen),
+        ], parent=self)
+        self.tabla = QTableView()
+        configurar_vista(self.tabla, self.modelo)
+        header = self.tabla.horizontalHeader()
+        for i in range(self.modelo.columnCount()):
+            header.setSectionResizeMode(i, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(4, QHeaderView.Stretch)
+        header.setSectionResizeMode(6, QHeaderView.Stretch)
+        root.addWidget(self.tabla)
+        self.setLayout(root)
+
+        # ---- Consultas en el pool de BD ----
+        self._canal_conteo = Canal(self)
+        self._canal_conteo.listo.connect(self._mostrar_conteo)
+        self._canal_conteo.fallo.connect(self._error_carga)
+
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(DEBOUNCE_FILTROS_MS)
+        self._debounce.timeout.connect(self.buscar)
+
+        self.btn_buscar.clicked.connect(self.buscar)
+        self.btn_exportar.clicked.connect(self.exportar)
+        self.txt_buscar.returnPressed.connect(self.buscar)
+        self.txt_buscar.textChanged.connect(lambda _: self._debounce.start())
+        self.cmb_estado.currentIndexChanged.connect(lambda _: self.buscar())
+        self.cmb_hectarea.currentIndexChanged.connect(lambda _: self.buscar())
+        self.cmb_agricultor.currentIndexChanged.connect(lambda _: self.buscar())
+        self.chk_fechas.toggled.connect(self._on_rango)
+        self.dp_desde.dateChanged.connect(lambda _: self._debounce.start())
+        self.dp_hasta.dateChanged.connect(lambda _: self._debounce.start())
+
+    def _on_rango(self, activo: bool):
+        self.dp_desde.setEnabled(activo)
+        self.dp_hasta.setEnabled(activo)
+        self.buscar()
+
+    def _cargar_catalogos(self):
+        llamar(obtener_agricultores, coalescer=True).conectar(
+            lambda filas: self._llenar(self.cmb_agricultor, [(f[0], f[1]) for f in filas]), self._error_carga)
+        llamar(hectareas_disponibles, coalescer=True).conectar(
+            lambda filas: self._llenar(self.cmb_hectarea, [(h["id"], h["codigo"]) for h in filas]),
+            self._error_carga)
+
+    def _llenar(self, combo: QComboBox, items):
+        combo.blockSignals(True)  # llenar no es cambiar el filtro
+        for id_, texto in items:
+            combo.addItem(str(texto), id_)
+        combo.blockSignals(False)
+
+    # ---- Búsqueda ----
+    def _leer_filtros(self) -> Dict[str, Any]:
+        texto = self.txt_buscar.text().strip()
+        filtros = {
+            "hectarea_id": self.cmb_hectarea.currentData(),
+            "agricultor_id": self.cmb_agricultor.currentData(),
+            "texto": texto or None,
+        }
+        if self.chk_fechas.isChecked():
+            filtros["desde"] = self.dp_desde.date().toPyDate()
+            filtros["hasta"] = self.dp_hasta.date().toPyDate()
+        return filtros
+
+    def buscar(self):
+        """Aplica los filtros: primera página de la tabla y conteo por estado."""
+        self._debounce.stop()
+        filtros = self._leer_filtros()
+        self._canal_conteo.pedir(contar_reportes_por_estado, **filtros)
+        self._filtros = dict(filtros, estado=self.cmb_estado.currentData())
+        self.modelo.cambiar_fuente(
+            FuentePaginadaAsync(partial(_pagina, self._filtros), TAM_PAGINA, al_fallo=self._error_carga))
+
+    def _mostrar_conteo(self, conteo: Dict[str, int]):
+        self.cmb_estado.blockSignals(True)
+        for i in range(self.cmb_estado.count()):
+            est: Optional[str] = self.cmb_estado.itemData(i)
+            n = sum(conteo.values()) if est is None else conteo.get(est, 0)
+            self.cmb_estado.setItemText(i, f"{est or '(todos)'} ({n})")
+        self.cmb_estado.blockSignals(False)
+        est = self.cmb_estado.currentData()
+        n = sum(conteo.values()) if est is None else conteo.get(est, 0)
+        self.lbl_total.setText(f"{n} reporte(s) con estos filtros")
+
+    def _error_carga(self, e):
+        QMessageBox.critical(self, "Error", f"No se pudieron cargar los reportes:\n{e}")
+
+    # ---- Acciones por fila ----
+    def _on_guardar(self, rep: Dict[str, Any], modelo: ModeloTablaVirtual, fila: int):
+        estado, comentario = modelo.valor(fila, "estado"), modelo.valor(fila, "comentario")
+        llamar(actualizar_estado_reporte, rep["reporte_id"], estado, comentario).conectar(
+            lambda _: self._guardado(rep, estado, comentario),
+            lambda e: QMessageBox.critical(self, "Error", f"No se pudo guardar el estado/comentario:\n{e}"),
+        )
+
+    def _guardado(self, rep: Dict[str, Any], estado: str, comentario: str):
+        # La fila queda en la tabla (no se recarga para no perder la posición);
+        # solo se actualizan sus datos y el conteo por estado.
+        rep["estado"], rep["comentario"] = estado, comentario
+        self._canal_conteo.pedir(contar_reportes_por_estado,
+                                 **{k: v for k, v in self._filtros.items() if k != "estado"})
+        regenerar_pdf(rep, rep["agricultor"] or str(rep["usuario_id"]), estado, comentario).conectar(
+            None,
+            lambda e: QMessageBox.warning(
+                self, "PDF", f"Se guardó el estado/comentario, pero no se pudo regenerar el PDF:\n{e}"),
+        )
+
+    # ---- Exportación por lotes ----
+    def exportar(self):
+        salida, filtro = QFileDialog.getSaveFileName(
+            self, "Exportar reportes", "reportes.pdf",
+            "PDF único (*.pdf);;ZIP con un PDF por reporte (*.zip)")
+        if not salida:
+            return
+        extension = ".zip" if "zip" in filtro.lower() else ".pdf"
+        if not salida.lower().endswith(extension):
+            salida += extension
+
+        trabajo = TrabajoExportacion(dict(self._filtros), salida)
+        dlg = QProgressDialog("Exportando reportes…", "Cancelar", 0, 0, self)
+        dlg.setWindowTitle("Exportar")
+        dlg.setWindowModality(Qt.WindowModal)
+        dlg.setMinimumDuration(0)
+        dlg.canceled.connect(trabajo.cancelar)
+        trabajo.senales.progreso.connect(lambda hechos, total: (dlg.setMaximum(total), dlg.setValue(hechos)))
+        trabajo.senales.resultado.connect(self._exportado)
+        trabajo.senales.error.connect(lambda msg: QMessageBox.critical(self, "Exportar", msg))
+        trabajo.senales.terminado.connect(dlg.reset)
+        trabajo.senales.terminado.connect(lambda: self.btn_exportar.setEnabled(True))
+        self._exportacion = trabajo  # referencia hasta que termine
+        self.btn_exportar.setEnabled(False)
+        QThreadPool.globalInstance().start(trabajo)
+
+    def _exportado(self, res: Dict[str, Any]):
+        msg = f"{res['exportados']} reporte(s) exportados en:\n{res['salida']}"
+        if res["fallidos"]:
+            ids = ", ".join(str(i) for i in res["fallidos"][:10])
+            msg += f"\n\nNo se pudieron generar {len(res['fallidos'])}: {ids}{'…' if len(res['fallidos']) > 10 else ''}"
+        QMessageBox.information(self, "Exportar", msg)
@@ -0,0 +1,185 @@
+# exportacion_lote.py
+# Exportación por lotes de reportes (supervisor): todos los que cumplen un
+# filtro de buscar_reportes (agricultor, hectárea, rango de fechas, estado,
+# texto) en
+#   - un solo PDF de varias páginas (salida *.pdf): un canvas compartido, así
+#     fuentes e imágenes repetidas se incrustan una sola vez; los procesos de
+#     trabajo preparan las imágenes (re-muestreo + JPEG, exportador) en
+#     paralelo y este hilo dibuja las páginas en orden.
+#   - un ZIP con un PDF por reporte (salida *.zip): los procesos generan cada
+#     PDF y se agregan al ZIP a medida que terminan (y se borran del disco).
+# Las filas se leen de la BD por páginas (keyset) y solo hay una ventana
+# acotada de reportes en vuelo. En ZIP la memoria no depende del total; en
+# PDF único reportlab retiene las páginas ya comprimidas hasta save() (unos
+# KB de texto + la imagen ya reducida por reporte), para miles de reportes
+# conviene el ZIP. La salida se escribe en un temporal y se renombra al final
+# (nada a medias si se cancela).
+#
+# Uso:  exportar_reportes({"estado": "aprobado", "agricultor_id": 3}, "aprobados.zip",
+#                         progreso=lambda hechos, total: ..., cancelado=evento.is_set)
+
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+import exportador
+from database import buscar_reportes, contar_reportes_por_estado
+
+PROCESOS = int(os.getenv("AGROSCAN_EXPORT_PROCESOS", str(os.cpu_count() or 2)))
+LOTE_BD = 500  # filas por consulta
+
+class ExportacionCancelada(Exception):
+    pass
+
+# ========================
+# Filas -> datos del PDF
+# ========================
+
+def _datos_pdf(fila: tuple) -> Dict[str, Any]:
+    """Fila de buscar_reportes -> argumentos de generar_pdf_reporte_detallado."""
+    (_id, usuario_id, fecha, planta, enfermedad, num_frutos, maduracion,
+     path_imagen, _path_reporte, estado, comentario, username) = fila[:12]
+    abs_img = os.path.abspath(path_imagen) if path_imagen else None
+    return {
+        "nombre_usuario": username or str(usuario_id),
+        "fecha": fecha,
+        "planta": planta,
+        "enfermedad": enfermedad,
+        "num_frutos": num_frutos,
+        "maduracion": maduracion,
+        "estado": estado,
+        "comentario_supervisor": comentario,
+        "path_imagen": abs_img if abs_img and os.path.exists(abs_img) else None,
+    }
+
+def _nombre_en_zip(fila: tuple) -> str:
+    fecha = fila[2].strftime("%Y%m%d_%H%M%S") if hasattr(fila[2], "strftime") else str(fila[2])
+    agricultor = re.sub(r"[^\w.-]+", "_", str(fila[11] or fila[1]))
+    return f"{fecha}_{agricultor}_reporte_{fila[0]}.pdf"
+
+def _reportes(filtros: Dict[str, Any]) -> Iterator[tuple]:
+    """Todas las filas del filtro, leídas de LOTE_BD en LOTE_BD (keyset por fecha, id)."""
+    ultima = None
+    while True:
+        filas = buscar_reportes(after_fecha=ultima[2] if ultima else None,
+                                after_id=ultima[0] if ultima else None,
+                                limit=LOTE_BD, **filtros)
+        yield from filas
+        if len(filas) < LOTE_BD:
+            return
+        ultima = filas[-1]
+
+def contar(filtros: Dict[str, Any]) -> int:
+    """Nº de reportes que exportaría `filtros` (para el progreso)."""
+    conteo = contar_reportes_por_estado(**{k: v for k, v in filtros.items() if k != "estado"})
+    estado = filtros.get("estado")
+    return conteo.get(estado, 0) if estado else sum(conteo.values())
+
+# ========================
+# Trabajo en los procesos
+# ========================
+
+def _preparar(datos: Dict[str, Any]) -> Dict[str, Any]:
+    """Deja lista (en la caché de exportador) la imagen del reporte; devuelve los datos a dibujar."""
+    if datos["path_imagen"]:
+        datos = dict(datos, path_imagen=exportador.preparar_imagen_reporte(datos["path_imagen"]))
+    return datos
+
+def _pdf_individual(args: Tuple[Dict[str, Any], str]) -> str:
+    datos, destino = args
+    return exportador.generar_pdf_reporte_detallado(destino=destino, **datos)
+
+def _en_paralelo(pool: ProcessPoolExecutor, fn: Callable, items: Iterable[Tuple[Any, Any]],
+                 ventana: int) -> Iterator[Tuple[Any, Any, Optional[BaseException]]]:
+    """
+    fn(arg) en el pool para cada (etiqueta, arg), con a lo sumo `ventana` en
+    vuelo; entrega (etiqueta, resultado, error) en el orden de entrada.
+    """
+    en_vuelo = deque()
+
+    def _sacar():
+        etiqueta, fut = en_vuelo.popleft()
+        error = fut.exception()
+        return etiqueta, None if error else fut.result(), error
+
+    for etiqueta, arg in items:
+        en_vuelo.append((etiqueta, pool.submit(fn, arg)))
+        if len(en_vuelo) >= ventana:
+            yield _sacar()
+    while en_vuelo:
+        yield _sacar()
+
+# ========================
+# Exportación
+# ========================
+
+def exportar_reportes(filtros: Dict[str, Any], salida: str,
+                      progreso: Optional[Callable[[int, int], None]] = None,
+                      cancelado: Optional[Callable[[], bool]] = None) -> Dict[str, Any]:
+    """
+    Exporta los reportes de `filtros` (argumentos de buscar_reportes) a
+    `salida`: un PDF único si termina en .pdf, un ZIP de PDF si termina en .zip.
+    Devuelve {"exportados", "fallidos": [ids], "salida"}.
+    ValueError si no hay reportes; ExportacionCancelada si `cancelado()`.
+    """
+    zip_ = salida.lower().endswith(".zip")
+    total = contar(filtros)
+    if not total:
+        raise ValueError("No hay reportes con esos filtros.")
+    res = {"exportados": 0, "fallidos": [], "salida": salida}
+
+    def _avance(fila, error):
+        if cancelado and cancelado():
+            raise ExportacionCancelada()
+        if error is None:
+            res["exportados"] += 1
+        else:
+            res["fallidos"].append(fila[0])
+        if progreso:
+            progreso(res["exportados"] + len(res["fallidos"]), total)
+
+    tmp = exportador._ruta_temporal(salida)
+    procesos = max(1, PROCESOS)
+    carpeta = tempfile.mkdtemp(prefix="agroscan_export_") if zip_ else None
+    pool = ProcessPoolExecutor(max_workers=procesos)
+    try:
+        try:
+            if zip_:
+                trabajos = ((f, (_datos_pdf(f), os.path.join(carpeta, f"{f[0]}.pdf"))) for f in _reportes(filtros))
+                with zipfile.ZipFile(tmp, "w", zipfile.ZIP_STORED, allowZip64=True) as z:
+                    for fila, pdf, error in _en_paralelo(pool, _pdf_individual, trabajos, procesos * 2):
+                        if error is None:
+                            z.write(pdf, _nombre_en_zip(fila))  # ZIP_STORED: el PDF ya va comprimido
+                            os.remove(pdf)
+                        _avance(fila, error)
+            else:
+                c = canvas.Canvas(tmp, pagesize=letter)
+                trabajos = ((f, _datos_pdf(f)) for f in _reportes(filtros))
+                for fila, datos, error in _en_paralelo(pool, _preparar, trabajos, procesos * 4):
+                    if error is not None:  # imagen ilegible: se dibuja igual, exportador la omite
+                        datos, error = _datos_pdf(fila), None
+                    try:
+                        exportador.dibujar_reporte_detallado(c, **datos)
+                    except Exception as e:
+                        error = e
+                    c.showPage()
+                    _avance(fila, error)
+                c.save()
+        finally:
+            # descarta lo que no empezó y espera a los que están escribiendo en `carpeta`
+            pool.shutdown(wait=True, cancel_futures=True)
+        os.replace(tmp, salida)
+    finally:
+        if carpeta:
+            shutil.rmtree(carpeta, ignore_errors=True)
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return res
@@ -1,11 +1,62 @@
 # exportador.py
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
-from reportlab.lib.utils import ImageReader
 from reportlab.lib import colors
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Tuple
+import math
 import os
+import time
+
+from PIL import Image
+
+from cache_detecciones import hash_archivo
+
+# Imágenes: se re-muestrean al tamaño con que se dibujan (PDF_DPI) y se
+# re-codifican como JPEG (PDF_JPEG_CALIDAD) antes de incrustarlas; una foto
+# de 12 MP o un PNG anotado sin pérdida no entran a resolución completa.
+# El derivado se guarda en CACHE_IMAGENES por hash del original, así
+# regenerar el PDF (cambio de estado/comentario) no vuelve a procesarlo.
+# La carpeta se acota a CACHE_IMAGENES_MAX_BYTES con desalojo LRU (como
+# cache_detecciones; aquí el mtime de cada derivado hace de último acceso).
+# PDF_DPI <= 0 incrusta el original como antes.
+PDF_DPI = int(os.getenv("AGROSCAN_PDF_DPI", "150"))
+PDF_JPEG_CALIDAD = int(os.getenv("AGROSCAN_PDF_JPEG_CALIDAD", "80"))
+CACHE_IMAGENES = os.getenv("AGROSCAN_CACHE_PDF_IMAGENES", os.path.join("reports", "cache", "pdf_imagenes"))
+CACHE_IMAGENES_MAX_BYTES = int(os.getenv("AGROSCAN_CACHE_PDF_MAX_MB", "256")) * 1024 * 1024
+TMP_HUERFANO_S = 3600  # temporales de un proceso que murió a mitad de un save
+
+# Los PDF se escriben en un temporal junto al destino y se renombran al final
+# (os.replace es atómico en el mismo volumen): un corte a mitad de la
+# generación nunca deja un PDF a medio escribir en la ruta final.
+# pdf_pool.py llama a estas funciones desde procesos de trabajo.
+
+def ruta_reporte(nombre_usuario) -> str:
+    """Ruta por defecto de un reporte del agricultor (reports/...)."""
+    fecha_str = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return f"reports/reporte_usuario_{str(nombre_usuario).replace(' ', '_')}_{fecha_str}.pdf"
+
+def ruta_actividad(tipo: str, actividad_id: Optional[int] = None) -> str:
+    """Ruta por defecto del comprobante de una actividad (reports/...)."""
+    fecha_str = datetime.now().strftime("%Y%m%d_%H%M%S")
+    sufijo = f"{actividad_id}_" if actividad_id is not None else ""
+    return f"reports/actividad_{tipo}_{sufijo}{fecha_str}.pdf"
+
+def _ruta_temporal(destino: str) -> str:
+    """Temporal en la misma carpeta que `destino` (os.replace no cruza volúmenes)."""
+    carpeta = os.path.dirname(os.path.abspath(destino))
+    os.makedirs(carpeta, exist_ok=True)
+    return os.path.join(carpeta, f".{os.path.basename(destino)}.{os.getpid()}.tmp")
+
+def _guardar(c, destino: str) -> None:
+    """Escribe el canvas (creado sobre _ruta_temporal(destino)) y lo publica en `destino`."""
+    tmp = _ruta_temporal(destino)
+    try:
+        c.save()
+        os.replace(tmp, destino)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
 
 def generar_pdf_reporte(
     nombre_usuario,
@@ -18,16 +69,17 @@ def generar_pdf_reporte(
     hectarea: Optional[str] = None,
     # NUEVO: imagen anotada opcional
     path_imagen_anotada: Optional[str] = None,
+    destino: Optional[str] = None,
 ):
     """
     PDF generado por el agricultor.
     Retro-compatible; si pasas path_imagen_anotada se mostrarán 2 imágenes.
+    Sin `destino` se usa ruta_reporte(nombre_usuario).
     """
     os.makedirs("reports", exist_ok=True)
-    fecha_str = datetime.now().strftime("%Y%m%d_%H%M%S")
-    nombre_archivo = f"reports/reporte_usuario_{str(nombre_usuario).replace(' ', '_')}_{fecha_str}.pdf"
+    nombre_archivo = destino or ruta_reporte(nombre_usuario)
 
-    c = canvas.Canvas(nombre_archivo, pagesize=letter)
+    c = canvas.Canvas(_ruta_temporal(nombre_archivo), pagesize=letter)
     width, height = letter
     margin = 50
     y = height - margin
@@ -116,7 +168,7 @@ def generar_pdf_reporte(
         titulo_anotada="Imagen anotada (detecciones)"
     )
 
-    c.save()
+    _guardar(c, nombre_archivo)
     return nombre_archivo
 
 
@@ -144,13 +196,41 @@ def generar_pdf_reporte_detallado(
     Retro-compatible; si pasas path_imagen_anotada se mostrarán 2 imágenes.
     """
     os.makedirs("reports", exist_ok=True)
-    if destino:
-        nombre_archivo = destino
-    else:
-        fecha_str = datetime.now().strftime("%Y%m%d_%H%M%S")
-        nombre_archivo = f"reports/reporte_usuario_{str(nombre_usuario).replace(' ', '_')}_{fecha_str}.pdf"
+    nombre_archivo = destino or ruta_reporte(nombre_usuario)
+
+    c = canvas.Canvas(_ruta_temporal(nombre_archivo), pagesize=letter)
+    dibujar_reporte_detallado(
+        c, nombre_usuario, fecha, planta, enfermedad, num_frutos, maduracion, estado,
+        comentario_supervisor, path_imagen, nombre,
+        aptos=aptos, no_aptos=no_aptos, hectarea=hectarea, path_imagen_anotada=path_imagen_anotada,
+    )
+    _guardar(c, nombre_archivo)
+    return nombre_archivo
+
 
-    c = canvas.Canvas(nombre_archivo, pagesize=letter)
+def dibujar_reporte_detallado(
+    c,
+    nombre_usuario,
+    fecha,
+    planta,
+    enfermedad,
+    num_frutos,
+    maduracion,
+    estado,
+    comentario_supervisor,
+    path_imagen: Optional[str] = None,
+    nombre: str = "AgroScan",
+    *,
+    aptos: Optional[int] = None,
+    no_aptos: Optional[int] = None,
+    hectarea: Optional[str] = None,
+    path_imagen_anotada: Optional[str] = None,
+):
+    """
+    Dibuja el reporte detallado en el canvas `c` (desde una página nueva), sin
+    guardar. La exportación por lotes pone muchos reportes en un mismo canvas:
+    fuentes e imágenes repetidas se incrustan una sola vez.
+    """
     width, height = letter
     margin = 50
     y = height - margin
@@ -240,8 +320,6 @@ def generar_pdf_reporte_detallado(
         titulo_anotada="Imagen anotada (detecciones)"
     )
 
-    c.save()
-    return nombre_archivo
 
 
 # ============================
@@ -270,10 +348,9 @@ def generar_pdf_actividad(
     """
     os.makedirs("reports", exist_ok=True)
     if not destino:
-        fecha_str = datetime.now().strftime("%Y%m%d_%H%M%S")
-        destino = f"reports/actividad_{tipo}_{fecha_str}.pdf"
+        destino = ruta_actividad(tipo)
 
-    c = canvas.Canvas(destino, pagesize=letter)
+    c = canvas.Canvas(_ruta_temporal(destino), pagesize=letter)
     w, h = letter
     m = 50
     y = h - m
@@ -327,7 +404,7 @@ def generar_pdf_actividad(
         if kilos is not None: row("Kilos", kilos)
         row("% Aprobación", f"{pct}%")
 
-    c.save()
+    _guardar(c, destino)
     return destino
 
 
@@ -368,6 +445,96 @@ def _scale_to_fit(img_w, img_h, max_w, max_h):
         disp_w = disp_h / aspect if aspect else max_w
     return disp_w, disp_h
 
+def preparar_imagen_reporte(path: str) -> str:
+    """
+    Derivado de `path` tal como lo usa dibujar_reporte_detallado con una sola
+    imagen (ancho de página, 300 pt de alto). Lo usa la exportación por lotes
+    para preparar imágenes en paralelo antes de dibujar.
+    """
+    w, h = _tamano_imagen(path)
+    return _preparar_imagen(path, *_scale_to_fit(w, h, letter[0] - 2 * 50, 300))
+
+def _tamano_imagen(path: str) -> Tuple[int, int]:
+    """Ancho/alto en píxeles (solo lee la cabecera)."""
+    with Image.open(path) as im:
+        return im.size
+
+def _preparar_imagen(path: str, disp_w: float, disp_h: float) -> str:
+    """
+    Ruta de la imagen a incrustar para un recuadro de disp_w x disp_h puntos:
+    un JPEG re-muestreado a PDF_DPI (en caché por hash del original) o el
+    original si ya es un JPEG de ese tamaño o menor. Si algo falla, el original.
+    """
+    if PDF_DPI <= 0:
+        return path
+    try:
+        w = max(1, math.ceil(disp_w / 72.0 * PDF_DPI))
+        h = max(1, math.ceil(disp_h / 72.0 * PDF_DPI))
+        destino = os.path.join(CACHE_IMAGENES, f"{hash_archivo(path)}_{w}x{h}_q{PDF_JPEG_CALIDAD}.jpg")
+        try:
+            os.utime(destino)  # acierto: pasa a ser el más reciente para el LRU
+            return destino
+        except FileNotFoundError:
+            pass
+        with Image.open(path) as im:
+            if im.format == "JPEG" and im.width <= w + 1 and im.height <= h + 1:
+                return path  # ya es un derivado (o una foto pequeña): ±1 px por redondeo
+            im.draft("RGB", (w, h))  # JPEG: decodifica ya reducido (DCT), mucho más rápido
+            if im.mode in ("RGBA", "LA") or (im.mode == "P" and "transparency" in im.info):
+                fondo = Image.new("RGB", im.size, "white")
+                fondo.paste(im.convert("RGBA"), mask=im.convert("RGBA").getchannel("A"))
+                im = fondo
+            else:
+                im = im.convert("RGB")
+            if im.width > w or im.height > h:
+                im = im.resize((min(w, im.width), min(h, im.height)), Image.LANCZOS)
+            os.makedirs(CACHE_IMAGENES, exist_ok=True)
+            tmp = f"{destino}.{os.getpid()}.tmp"
+            try:
+                im.save(tmp, "JPEG", quality=PDF_JPEG_CALIDAD, optimize=True)
+                os.replace(tmp, destino)  # varios procesos de pdf_pool pueden preparar la misma
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+        _desalojar_imagenes()
+        return destino
+    except Exception as e:
+        print(f"No se pudo preparar la imagen para el PDF ({e}); se usa el original.")
+        return path
+
+def _desalojar_imagenes() -> None:
+    """
+    Borra los derivados usados hace más tiempo (mtime) hasta que CACHE_IMAGENES
+    quepa en CACHE_IMAGENES_MAX_BYTES, y los temporales huérfanos.
+    """
+    derivados, huerfanos, total = [], [], 0
+    limite_tmp = time.time() - TMP_HUERFANO_S
+    with os.scandir(CACHE_IMAGENES) as it:
+        for entrada in it:
+            try:
+                st = entrada.stat()
+            except OSError:
+                continue  # otro proceso lo acaba de borrar
+            if not entrada.name.endswith(".tmp"):
+                derivados.append((st.st_mtime, st.st_size, entrada.path))
+                total += st.st_size
+            elif st.st_mtime < limite_tmp:
+                huerfanos.append(entrada.path)
+    for ruta in huerfanos:
+        _borrar_si_existe(ruta)
+    for _, tamano, ruta in sorted(derivados):
+        if total <= CACHE_IMAGENES_MAX_BYTES:
+            break
+        if _borrar_si_existe(ruta):
+            total -= tamano
+
+def _borrar_si_existe(ruta: str) -> bool:
+    try:
+        os.remove(ruta)
+        return True
+    except OSError:
+        return False  # ya borrado por otro proceso (o abierto, en Windows)
+
 def _dibujar_imagenes(
     c, width, height, margin, y,
     *,
@@ -378,7 +545,8 @@ def _dibujar_imagenes(
 ):
     """
     Dibuja 0, 1 o 2 imágenes. Con dos: intenta colocarlas lado a lado,
-    si no entra, pasa a nueva página.
+    si no entra, pasa a nueva página. Se dibujan por ruta: reportlab incrusta
+    el JPEG tal cual y reutiliza el mismo objeto si la ruta se repite en el canvas.
     """
     paths = []
     if path_original and os.path.exists(path_original):
@@ -402,9 +570,9 @@ def _dibujar_imagenes(
         # Una imagen centrada
         kind, pth, title = paths[0]
         try:
-            img = ImageReader(pth)
-            img_w, img_h = img.getSize()
+            img_w, img_h = _tamano_imagen(pth)
             disp_w, disp_h = _scale_to_fit(img_w, img_h, max_w_page, max_h_block)
+            img = _preparar_imagen(pth, disp_w, disp_h)
 
             # Título
             c.setFont("Helvetica-Bold", 12)
@@ -422,10 +590,12 @@ def _dibujar_imagenes(
     col_w = (max_w_page - gutter) / 2.0
 
     try:
-        i1 = ImageReader(p1); w1, h1 = i1.getSize()
-        i2 = ImageReader(p2); w2, h2 = i2.getSize()
+        w1, h1 = _tamano_imagen(p1)
+        w2, h2 = _tamano_imagen(p2)
         d1_w, d1_h = _scale_to_fit(w1, h1, col_w, max_h_block)
         d2_w, d2_h = _scale_to_fit(w2, h2, col_w, max_h_block)
+        i1 = _preparar_imagen(p1, d1_w, d1_h)
+        i2 = _preparar_imagen(p2, d2_w, d2_h)
         row_h = max(d1_h, d2_h)
 
         # Si no cabe, nueva página
@@ -2,12 +2,15 @@
 import os
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QDateEdit, QComboBox, QPushButton,
-    QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox, QLineEdit
+    QTableView, QHeaderView, QMessageBox
 )
 from PyQt5.QtCore import Qt, QDate, QUrl
 from PyQt5.QtGui import QDesktopServices
 from database import listar_actividades_supervisor, actualizar_estado_actividad
-from exportador import generar_pdf_actividad
+from database_async import Canal, llamar
+from exportador import generar_pdf_actividad, ruta_actividad
+from pdf_pool import generar
+from tabla_virtual import Boton, Columna, FuenteLista, ModeloTablaVirtual, configurar_vista
 
 BASE_STYLESHEET = """
 QWidget { font-family: 'Segoe UI', Arial, sans-serif; font-size: 13px; }
@@ -16,6 +19,10 @@ QPushButton { background: #a7c957; border: 1.5px solid #6a994e; color: #222; bor
 QPushButton:hover { background: #386641; color: #fff; }
 """
 
+def _texto(clave):
+    """Columna de texto simple: valor del dict o vacío."""
+    return lambda r: str(r.get(clave) or "")
+
 class GestionActividadesWindow(QWidget):
     def __init__(self, supervisor_id: int, nombre_supervisor: str):
         super().__init__()
@@ -44,11 +51,38 @@ class GestionActividadesWindow(QWidget):
         bar.addStretch(1); bar.addWidget(self.btn_ref)
         root.addLayout(bar)
 
-        self.tbl = QTableWidget(0, 12)
-        self.tbl.setHorizontalHeaderLabels(["ID","Fecha","Hect.","Agricultor","Tipo","Cant.","Unidad","Aptos","No aptos","Estado","Comentario","Acción"])
+        # Tabla virtual: comentario y botones pintados (sin widgets por fila)
+        self.modelo = ModeloTablaVirtual([
+            Columna("ID", lambda r: str(r.get("id"))),
+            Columna("Fecha", lambda r: str(r.get("fecha_hora"))),
+            Columna("Hect.", lambda r: str(r.get("codigo_hectarea") or "-")),
+            Columna("Agricultor", lambda r: str(r.get("agricultor") or r.get("agricultor_id"))),
+            Columna("Tipo", lambda r: str(r.get("tipo") or "-")),
+            Columna("Cant.", _texto("cantidad")),
+            Columna("Unidad", _texto("unidad")),
+            Columna("Aptos", _texto("aptos")),
+            Columna("No aptos", _texto("no_aptos")),
+            Columna("Estado", _texto("estado")),
+            Columna("Comentario", lambda r: r.get("comentario_supervisor") or "", tipo="linea",
+                    clave="comentario", alineacion=Qt.AlignLeft),
+            Columna("Acción", tipo="botones", botones=[
+                Boton("Aprobar", lambda r, m, n: self._set_estado(r["id"], "aprobado", m.valor(n, "comentario"), r),
+                      con_modelo=True),
+                Boton("Rechazar", lambda r, m, n: self._set_estado(r["id"], "rechazado", m.valor(n, "comentario"), r),
+                      con_modelo=True),
+            ]),
+        ], parent=self)
+        self.tbl = QTableView()
+        configurar_vista(self.tbl, self.modelo)
+
+        # Listado en el pool de BD: solo se pinta la respuesta de la última consulta
+        self._canal = Canal(self)
+        self._canal.listo.connect(lambda rows: self.modelo.cambiar_fuente(FuenteLista(rows)))
+        self._canal.fallo.connect(
+            lambda e: QMessageBox.critical(self, "Error", f"No se pudo cargar actividades:\n{e}"))
+        self._canal.ocupado.connect(lambda ocupado: self.btn_ref.setEnabled(not ocupado))
         h = self.tbl.horizontalHeader()
         for i in range(12): h.setSectionResizeMode(i, QHeaderView.ResizeToContents)
-        self.tbl.setAlternatingRowColors(True)
         root.addWidget(self.tbl)
 
         self.setLayout(root)
@@ -57,82 +91,44 @@ class GestionActividadesWindow(QWidget):
         desde = self.dp_desde.date().toString("yyyy-MM-dd") + " 00:00:00"
         hasta = self.dp_hasta.date().toString("yyyy-MM-dd") + " 23:59:59"
         estado = None if self.cmb_estado.currentText() == "(todos)" else self.cmb_estado.currentText()
-        try:
-            rows = listar_actividades_supervisor(estado, desde, hasta)
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"No se pudo cargar actividades:\n{e}")
-            return
-
-        self.tbl.setRowCount(len(rows))
-        for i, r in enumerate(rows):
-            # columnas que usamos luego para el PDF:
-            agricultor_nombre = r.get("agricultor") or str(r.get("agricultor_id"))
-            codigo_hectarea   = r.get("codigo_hectarea") or "-"
-            tipo              = r.get("tipo") or "-"
-            # celdas visibles
-            cells = [
-                str(r.get("id")),
-                str(r.get("fecha_hora")),
-                str(codigo_hectarea),
-                str(agricultor_nombre),
-                str(tipo),
-                str(r.get("cantidad") or ""),
-                str(r.get("unidad") or ""),
-                str(r.get("aptos") or ""),
-                str(r.get("no_aptos") or ""),
-                str(r.get("estado") or ""),
-            ]
-            for j, txt in enumerate(cells):
-                it = QTableWidgetItem(txt); it.setTextAlignment(Qt.AlignCenter); self.tbl.setItem(i, j, it)
-
-            # Comentario + botones aprobar/rechazar
-            ed = QLineEdit(r.get("comentario_supervisor") or "")
-            self.tbl.setCellWidget(i, 10, ed)
-
-            b_ap = QPushButton("Aprobar")
-            b_re = QPushButton("Rechazar")
-            # capturar variables por defecto en lambda:
-            b_ap.clicked.connect(lambda _, rid=r["id"], ed=ed, rr=r: self._set_estado(rid, "aprobado", ed.text(), rr))
-            b_re.clicked.connect(lambda _, rid=r["id"], ed=ed, rr=r: self._set_estado(rid, "rechazado", ed.text(), rr))
-            lay = QHBoxLayout(); lay.addWidget(b_ap); lay.addWidget(b_re); lay.setContentsMargins(0,0,0,0)
-            w = QWidget(); w.setLayout(lay)
-            self.tbl.setCellWidget(i, 11, w)
+        self._canal.pedir(listar_actividades_supervisor, estado, desde, hasta)
 
     def _set_estado(self, actividad_id: int, estado: str, comentario: str, row: dict):
-        try:
-            ok = actualizar_estado_actividad(actividad_id, estado, self.supervisor_id, comentario or None)
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"No se pudo actualizar:\n{e}")
-            return
+        llamar(actualizar_estado_actividad, actividad_id, estado, self.supervisor_id, comentario or None).conectar(
+            lambda ok: self._on_estado(ok, estado, comentario, row),
+            lambda e: QMessageBox.critical(self, "Error", f"No se pudo actualizar:\n{e}"),
+        )
 
+    def _on_estado(self, ok, estado: str, comentario: str, row: dict):
         if not ok:
             QMessageBox.warning(self, "Sin cambios", "La actividad no se actualizó (¿ya no está activa?).")
             return
 
-        # Si aprobamos, generamos automáticamente el PDF de comprobante
+        # Si aprobamos, generamos el PDF de comprobante en el pool de PDF y se abre al terminar
         if estado == "aprobado":
-            try:
-                pdf_path = generar_pdf_actividad(
-                    nombre_agricultor = row.get("agricultor") or str(row.get("agricultor_id")),
-                    codigo_hectarea   = row.get("codigo_hectarea") or "-",
-                    tipo              = row.get("tipo") or "",
-                    fecha_hora        = row.get("fecha_hora"),
-                    cantidad          = row.get("cantidad"),
-                    unidad            = row.get("unidad"),
-                    costo             = row.get("costo"),
-                    notas             = row.get("notas"),
-                    estado            = estado,
-                    comentario_supervisor = comentario or "",
-                    aptos             = row.get("aptos"),
-                    no_aptos          = row.get("no_aptos"),
-                    cajas             = row.get("cajas"),
-                    kilos             = row.get("kilos"),
-                )
-                # abrir PDF
-                self._open_file(pdf_path)
-            except Exception as e:
+            tipo = row.get("tipo") or ""
+            generar(
+                generar_pdf_actividad, ruta_actividad(tipo, row.get("id")),
+                nombre_agricultor = row.get("agricultor") or str(row.get("agricultor_id")),
+                codigo_hectarea   = row.get("codigo_hectarea") or "-",
+                tipo              = tipo,
+                fecha_hora        = row.get("fecha_hora"),
+                cantidad          = row.get("cantidad"),
+                unidad            = row.get("unidad"),
+                costo             = row.get("costo"),
+                notas             = row.get("notas"),
+                estado            = estado,
+                comentario_supervisor = comentario or "",
+                aptos             = row.get("aptos"),
+                no_aptos          = row.get("no_aptos"),
+                cajas             = row.get("cajas"),
+                kilos             = row.get("kilos"),
+            ).conectar(
+                self._open_file,
                 # No bloquea el flujo si falla el PDF
-                QMessageBox.warning(self, "PDF", f"Actividad aprobada, pero hubo un problema al generar/abrir el PDF:\n{e}")
+                lambda e: QMessageBox.warning(
+                    self, "PDF", f"Actividad aprobada, pero hubo un problema al generar el PDF:\n{e}"),
+            )
 
         QMessageBox.information(self, "OK", f"Actividad {estado}.")
         self._load()
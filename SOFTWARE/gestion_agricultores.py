@@ -1,11 +1,12 @@
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QLabel, QTableWidget, QTableWidgetItem,
-    QPushButton, QMessageBox, QHBoxLayout, QHeaderView
+    QWidget, QVBoxLayout, QLabel, QTableView, QMessageBox, QHeaderView
 )
-from PyQt5.QtGui import QIcon, QColor, QFont
+from PyQt5.QtGui import QFont
 from PyQt5.QtCore import Qt
 from database import obtener_agricultores, eliminar_agricultor
+from database_async import Canal, llamar
 from gestion_reportes import GestionReportesWindow
+from tabla_virtual import Boton, Columna, FuenteLista, ModeloTablaVirtual, configurar_vista
 
 class GestionAgricultoresWindow(QWidget):
     def __init__(self):
@@ -24,12 +25,31 @@ class GestionAgricultoresWindow(QWidget):
         title.setStyleSheet("color: #386641; margin-bottom: 10px; margin-top: 8px;")
         layout.addWidget(title)
 
-        self.tabla = QTableWidget()
+        # Tabla virtual: botones pintados por el delegado (sin widgets por fila)
+        self.modelo = ModeloTablaVirtual([
+            Columna("ID", lambda a: a[0]),
+            Columna("Usuario", lambda a: a[1]),
+            Columna("Correo", lambda a: a[2]),
+            Columna("Opciones", tipo="botones", botones=[
+                Boton("Ver reportes", lambda a: self.abrir_reportes(a[0], a[1]),
+                      fondo="#f9c74f", borde="#d6ad39", color="#333"),
+                Boton("Eliminar", lambda a: self.eliminar_agricultor(a[0]),
+                      fondo="#ef233c", borde="#ba181b", color="white"),
+            ]),
+        ], parent=self)
+        self.tabla = QTableView()
+        configurar_vista(self.tabla, self.modelo)
+        header = self.tabla.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(1, QHeaderView.Stretch)
+        header.setSectionResizeMode(2, QHeaderView.Stretch)
+        header.setSectionResizeMode(3, QHeaderView.ResizeToContents)
+        header.setHighlightSections(False)
+        self.tabla.setFont(QFont("Segoe UI", 10))
         layout.addWidget(self.tabla)
         self.setLayout(layout)
-        self.tabla.setAlternatingRowColors(True)
         self.tabla.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background-color: #fafafa;
                 alternate-background-color: #e8f6ef;
                 border: 1px solid #b7b7b7;
@@ -43,101 +63,28 @@ class GestionAgricultoresWindow(QWidget):
                 border: 1px solid #b7b7b7;
             }
         """)
+
+        # Listado en el pool de BD (la ventana no espera a SQL Server)
+        self._canal = Canal(self)
+        self._canal.listo.connect(lambda agricultores: self.modelo.cambiar_fuente(FuenteLista(agricultores)))
+        self._canal.fallo.connect(
+            lambda e: QMessageBox.critical(self, "Error", f"No se pudieron cargar los agricultores:\n{e}"))
         self.cargar_agricultores()
 
     def cargar_agricultores(self):
-        agricultores = obtener_agricultores()
-        self.tabla.setRowCount(len(agricultores))
-        self.tabla.setColumnCount(4)
-        self.tabla.setHorizontalHeaderLabels(["ID", "Usuario", "Correo", "Opciones"])
-
-        # Ajustar columnas de forma proporcional
-        header = self.tabla.horizontalHeader()
-        header.setSectionResizeMode(0, QHeaderView.ResizeToContents)
-        header.setSectionResizeMode(1, QHeaderView.Stretch)
-        header.setSectionResizeMode(2, QHeaderView.Stretch)
-        header.setSectionResizeMode(3, QHeaderView.ResizeToContents)
-
-        for i, (agri_id, username, email) in enumerate(agricultores):
-            item_id = QTableWidgetItem(str(agri_id))
-            item_id.setTextAlignment(Qt.AlignCenter)
-            item_id.setFont(QFont("Segoe UI", 10))
-            item_id.setFlags(Qt.ItemIsSelectable | Qt.ItemIsEnabled)
-
-            item_username = QTableWidgetItem(username)
-            item_username.setTextAlignment(Qt.AlignCenter)
-            item_username.setFont(QFont("Segoe UI", 10))
-            item_username.setFlags(Qt.ItemIsSelectable | Qt.ItemIsEnabled)
-
-            item_email = QTableWidgetItem(email)
-            item_email.setTextAlignment(Qt.AlignCenter)
-            item_email.setFont(QFont("Segoe UI", 10))
-            item_email.setFlags(Qt.ItemIsSelectable | Qt.ItemIsEnabled)
-
-            self.tabla.setItem(i, 0, item_id)
-            self.tabla.setItem(i, 1, item_username)
-            self.tabla.setItem(i, 2, item_email)
-
-            # Opciones con botones estilizados y alineados horizontalmente
-            cell_widget = QWidget()
-            hbox = QHBoxLayout()
-            hbox.setContentsMargins(2, 1, 2, 1)
-            hbox.setSpacing(10)
-
-            btn_reportes = QPushButton("Ver reportes")
-            # Si quieres iconos, descomenta y agrega el archivo .png
-            # btn_reportes.setIcon(QIcon("iconos/icon-report.png"))
-            btn_reportes.setCursor(Qt.PointingHandCursor)
-            btn_reportes.setStyleSheet("""
-                QPushButton {
-                    background-color: #f9c74f; 
-                    border: 1px solid #d6ad39;
-                    color: #333;
-                    border-radius: 5px;
-                    padding: 3px 8px;
-                }
-                QPushButton:hover {
-                    background-color: #fff3cd;
-                }
-            """)
-            btn_reportes.clicked.connect(lambda _, uid=agri_id, uname=username: self.abrir_reportes(uid, uname))
-
-            btn_eliminar = QPushButton("Eliminar")
-            # btn_eliminar.setIcon(QIcon("iconos/icon-trash.png"))
-            btn_eliminar.setCursor(Qt.PointingHandCursor)
-            btn_eliminar.setStyleSheet("""
-                QPushButton {
-                    background-color: #ef233c;
-                    color: white;
-                    border: 1px solid #ba181b;
-                    border-radius: 5px;
-                    padding: 3px 8px;
-                }
-                QPushButton:hover {
-                    background-color: #ff7b7b;
-                    color: #222;
-                }
-            """)
-            btn_eliminar.clicked.connect(lambda _, uid=agri_id: self.eliminar_agricultor(uid))
-
-            hbox.addWidget(btn_reportes)
-            hbox.addWidget(btn_eliminar)
-            hbox.setAlignment(Qt.AlignCenter)
-            cell_widget.setLayout(hbox)
-            self.tabla.setCellWidget(i, 3, cell_widget)
-
-        self.tabla.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.tabla.horizontalHeader().setHighlightSections(False)
-        self.tabla.verticalHeader().setVisible(False)
-        self.tabla.setSelectionBehavior(QTableWidget.SelectRows)
-        self.tabla.setSelectionMode(QTableWidget.SingleSelection)
+        self._canal.pedir(obtener_agricultores)
 
     def eliminar_agricultor(self, agricultor_id):
         resp = QMessageBox.question(self, "Confirmar", "¿Eliminar agricultor y todos sus reportes?", QMessageBox.Yes | QMessageBox.No)
         if resp == QMessageBox.Yes:
-            eliminar_agricultor(agricultor_id)
-            QMessageBox.information(self, "Listo", "Agricultor eliminado correctamente.")
-            self.cargar_agricultores()
+            llamar(eliminar_agricultor, agricultor_id).conectar(
+                lambda _: self._on_eliminado(),
+                lambda e: QMessageBox.critical(self, "Error", f"No se pudo eliminar el agricultor:\n{e}"),
+            )
+
+    def _on_eliminado(self):
+        QMessageBox.information(self, "Listo", "Agricultor eliminado correctamente.")
+        self.cargar_agricultores()
 
     def abrir_reportes(self, agricultor_id, username):
         self.rep_win = GestionReportesWindow(agricultor_id, username)
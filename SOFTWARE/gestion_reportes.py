@@ -4,15 +4,16 @@ import os
 from typing import Any, Dict, Tuple
 
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QLabel, QTableWidget, QTableWidgetItem, QPushButton,
-    QMessageBox, QLineEdit, QHeaderView, QComboBox
+    QWidget, QVBoxLayout, QLabel, QTableView, QMessageBox, QHeaderView
 )
-from PyQt5.QtGui import QIcon
 from PyQt5.QtCore import Qt
 
-from database import obtener_reportes_agricultor, actualizar_estado_reporte
+from database import listar_reportes_pagina, actualizar_estado_reporte
+from database_async import llamar
 from vista_reporte import VistaReporteWindow
-from exportador import generar_pdf_reporte_detallado  # Regenerar PDF con estado/comentario/imagen
+from exportador import generar_pdf_reporte_detallado, ruta_reporte  # Regenerar PDF con estado/comentario/imagen
+from pdf_pool import TrabajoPdf, generar
+from tabla_virtual import Boton, Columna, FuentePaginadaAsync, ModeloTablaVirtual, configurar_vista
 
 BASE_STYLESHEET = """
 QWidget {
@@ -27,7 +28,7 @@ QLabel#heading {
     margin-top: 7px;
     qproperty-alignment: AlignCenter;
 }
-QTableWidget {
+QTableView {
     background-color: #f6fff7;
     alternate-background-color: #e8f6ef;
     border: 1px solid #b7b7b7;
@@ -51,6 +52,8 @@ QPushButton:hover { background-color: #386641; color: white; }
 QPushButton:disabled { background-color: #e0e0e0; color: #888; }
 """
 
+TAM_PAGINA = 50   # filas por consulta; se piden más al acercarse al final del scroll
+
 # ---- Helpers ---------------------------------------------------------------
 
 def _get_value(row: Any, key: str, pos_fallback: int, default=None):
@@ -92,8 +95,64 @@ def _coerce_rep(row: Any) -> Dict[str, Any]:
         "path_reporte":      _get_value(row, "path_reporte",   8),
         "estado":            _get_value(row, "estado",         9, "pendiente"),
         "comentario":        _get_value(row, "comentario",    10, ""),
+        "agricultor":        _get_value(row, "username",      11, ""),   # solo buscar_reportes
     }
 
+def _tiene_imagen(rep: Dict[str, Any]) -> str:
+    """
+    'Sí'/'No' según exista la imagen; se recuerda en la fila. Las funciones
+    de página lo calculan en el pool de BD para no tocar el disco al pintar.
+    """
+    if "_tiene_imagen" not in rep:
+        abs_img = os.path.abspath(rep["path_imagen"]) if rep["path_imagen"] else ""
+        rep["_tiene_imagen"] = "Sí" if (abs_img and os.path.exists(abs_img)) else "No"
+    return rep["_tiene_imagen"]
+
+ESTADOS = ["pendiente", "aprobado", "rechazado", "objetado"]
+
+def regenerar_pdf(rep: Dict[str, Any], nombre_usuario: str, estado: str, comentario: str) -> TrabajoPdf:
+    """
+    Regenera el PDF del reporte (sobrescribe path_reporte) con estado/comentario
+    nuevos, en el pool de PDF. Devuelve el trabajo (listo(ruta) / fallo(error)).
+    """
+    path_imagen = rep.get("path_imagen")
+    path_reporte = rep.get("path_reporte")
+    abs_img = os.path.abspath(path_imagen) if path_imagen else None
+    if abs_img and not os.path.exists(abs_img):
+        abs_img = None  # Evita fallos si la imagen no existe
+
+    return generar(
+        generar_pdf_reporte_detallado,
+        os.path.abspath(path_reporte) if path_reporte else ruta_reporte(nombre_usuario),
+        nombre_usuario=nombre_usuario,
+        fecha=rep.get("fecha"),
+        planta=rep.get("planta"),
+        enfermedad=rep.get("enfermedad"),
+        num_frutos=rep.get("num_frutos"),
+        maduracion=rep.get("maduracion"),
+        estado=estado,
+        comentario_supervisor=comentario,
+        path_imagen=abs_img,
+    )
+
+def ver_detalle(rep: Dict[str, Any]) -> VistaReporteWindow:
+    """Abre la vista de detalle de una fila normalizada con _coerce_rep."""
+    win = VistaReporteWindow({
+        "id": rep.get("reporte_id"),
+        "usuario_id": rep.get("usuario_id"),
+        "fecha": rep.get("fecha"),
+        "planta": rep.get("planta"),
+        "enfermedad": rep.get("enfermedad"),
+        "num_frutos": rep.get("num_frutos"),
+        "maduracion": rep.get("maduracion"),
+        "path_imagen": rep.get("path_imagen"),
+        "path_reporte": rep.get("path_reporte"),
+        "estado": rep.get("estado"),
+        "comentario_supervisor": rep.get("comentario"),
+    })
+    win.show()
+    return win
+
 # ---- UI --------------------------------------------------------------------
 
 class GestionReportesWindow(QWidget):
@@ -114,18 +173,31 @@ class GestionReportesWindow(QWidget):
         lbl.setAlignment(Qt.AlignCenter)
         layout.addWidget(lbl)
 
-        self.tabla = QTableWidget()
-        self.tabla.setAlternatingRowColors(True)
-        self.tabla.setSelectionBehavior(QTableWidget.SelectRows)
-        self.tabla.setSelectionMode(QTableWidget.SingleSelection)
+        # Tabla (modelo virtual: filas por páginas; combo, comentario y botones pintados)
+        self.modelo = ModeloTablaVirtual([
+            Columna("ID", lambda r: r["reporte_id"] or ""),
+            Columna("Planta", lambda r: r["planta"] or ""),
+            Columna("Estado", lambda r: r["enfermedad"] or ""),
+            Columna("Fecha", lambda r: r["fecha"] or ""),
+            Columna("Evaluacion", lambda r: (r["estado"] or "pendiente").lower(),
+                    tipo="combo", clave="estado", opciones=ESTADOS),
+            Columna("Comentario", lambda r: r["comentario"] or "", tipo="linea", clave="comentario",
+                    placeholder="Observaciones del supervisor…"),
+            Columna("Guardar", tipo="botones", botones=[
+                Boton("Guardar", self._on_guardar, fondo="#4da6ff", borde="#2b85d3", color="white",
+                      con_modelo=True, icono="iconos/icon-save.png"),
+            ]),
+            Columna("Ver", tipo="botones", botones=[
+                Boton("Ver", self._ver_detalle, fondo="#ffcc00", borde="#e6b800", color="black",
+                      icono="iconos/icon-eye.png"),
+            ]),
+            Columna("Imagen", _tiene_imagen),
+        ], FuentePaginadaAsync(self._pagina, TAM_PAGINA, al_fallo=self._error_carga), parent=self)
+        self.tabla = QTableView()
+        configurar_vista(self.tabla, self.modelo)
         layout.addWidget(self.tabla)
         self.setLayout(layout)
 
-        # Config tabla
-        self.tabla.setColumnCount(9)
-        self.tabla.setHorizontalHeaderLabels([
-            "ID", "Planta", "Estado", "Fecha", "Evaluacion", "Comentario", "Guardar", "Ver", "Imagen"
-        ])
         header = self.tabla.horizontalHeader()
         header.setSectionResizeMode(0, QHeaderView.ResizeToContents)
         header.setSectionResizeMode(1, QHeaderView.ResizeToContents)
@@ -136,154 +208,51 @@ class GestionReportesWindow(QWidget):
         header.setSectionResizeMode(6, QHeaderView.ResizeToContents)
         header.setSectionResizeMode(7, QHeaderView.ResizeToContents)
         header.setSectionResizeMode(8, QHeaderView.ResizeToContents)
-        self.tabla.verticalHeader().setVisible(False)
 
         self.cargar_reportes()
 
-    def cargar_reportes(self):
-        try:
-            reportes = obtener_reportes_agricultor(self.agricultor_id)
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"No se pudieron cargar los reportes:\n{e}")
-            reportes = []
-
-        self.tabla.setRowCount(len(reportes))
-
-        estados = ["pendiente", "aprobado", "rechazado", "objetado"]
-
-        for fila, raw in enumerate(reportes):
-            rep = _coerce_rep(raw)
-
-            # ID
-            it_id = QTableWidgetItem(str(rep["reporte_id"] or ""))
-            it_id.setTextAlignment(Qt.AlignCenter)
-            self.tabla.setItem(fila, 0, it_id)
+    def _pagina(self, ultima, limite):
+        """Página siguiente a la fila `ultima` (keyset por fecha, id). Corre en el pool de BD."""
+        filas = listar_reportes_pagina(
+            usuario_id=self.agricultor_id,
+            after_fecha=ultima["fecha"] if ultima else None,
+            after_id=ultima["reporte_id"] if ultima else None,
+            limit=limite,
+        )
+        reps = [_coerce_rep(f) for f in filas]
+        for rep in reps:
+            _tiene_imagen(rep)
+        return reps
+
+    def _error_carga(self, e):
+        QMessageBox.critical(self, "Error", f"No se pudieron cargar los reportes:\n{e}")
 
-            # Planta
-            it_planta = QTableWidgetItem(rep["planta"] or "")
-            it_planta.setTextAlignment(Qt.AlignCenter)
-            self.tabla.setItem(fila, 1, it_planta)
-
-            # Enfermedad
-            it_enf = QTableWidgetItem(rep["enfermedad"] or "")
-            it_enf.setTextAlignment(Qt.AlignCenter)
-            self.tabla.setItem(fila, 2, it_enf)
-
-            # Fecha
-            it_fecha = QTableWidgetItem(str(rep["fecha"] or ""))
-            it_fecha.setTextAlignment(Qt.AlignCenter)
-            self.tabla.setItem(fila, 3, it_fecha)
-
-            # Estado (ComboBox)
-            combo_estado = QComboBox()
-            combo_estado.addItems(estados)
-            estado_norm = (rep["estado"] or "pendiente").lower()
-            idx = combo_estado.findText(estado_norm)
-            combo_estado.setCurrentIndex(idx if idx >= 0 else 0)
-            self.tabla.setCellWidget(fila, 4, combo_estado)
-
-            # Comentario (editable)
-            comentario_edit = QLineEdit(rep["comentario"] or "")
-            comentario_edit.setPlaceholderText("Observaciones del supervisor…")
-            self.tabla.setCellWidget(fila, 5, comentario_edit)
-
-            # Guardar
-            btn_guardar = QPushButton("Guardar")
-            btn_guardar.setIcon(QIcon("iconos/icon-save.png"))
-            btn_guardar.setStyleSheet("""
-                QPushButton {
-                    background-color: #4da6ff;
-                    border: 1.5px solid #2b85d3;
-                    color: white;
-                    border-radius: 7px;
-                    padding: 4px 10px;
-                    font-size: 13px;
-                    font-weight: bold;
-                }
-                QPushButton:hover { background-color: #1f78d1; }
-            """)
-            btn_guardar.clicked.connect(
-                lambda _, rid=rep["reporte_id"], ce=comentario_edit, cb=combo_estado, rdict=rep:
-                    self._guardar_y_pdf(rid, cb.currentText(), ce.text(), rdict)
-            )
-            self.tabla.setCellWidget(fila, 6, btn_guardar)
-
-            # Ver detalle
-            btn_ver = QPushButton("Ver")
-            btn_ver.setIcon(QIcon("iconos/icon-eye.png"))
-            btn_ver.setStyleSheet("""
-                QPushButton {
-                    background-color: #ffcc00;
-                    border: 1.5px solid #e6b800;
-                    color: black;
-                    border-radius: 7px;
-                    padding: 4px 10px;
-                    font-size: 13px;
-                    font-weight: bold;
-                }
-                QPushButton:hover { background-color: #e6b800; }
-            """)
-            btn_ver.clicked.connect(lambda _, rr=rep: self._ver_detalle(rr))
-            self.tabla.setCellWidget(fila, 7, btn_ver)
-
-            # Indicador de imagen
-            abs_img = os.path.abspath(rep["path_imagen"]) if rep["path_imagen"] else ""
-            it_img = QTableWidgetItem("Sí" if (abs_img and os.path.exists(abs_img)) else "No")
-            it_img.setTextAlignment(Qt.AlignCenter)
-            self.tabla.setItem(fila, 8, it_img)
+    def cargar_reportes(self):
+        """Primera página; el resto se pide sola al hacer scroll (fetchMore)."""
+        self.modelo.recargar()
 
-        self.tabla.setEditTriggers(QTableWidget.NoEditTriggers)
+    def _on_guardar(self, rep: Dict[str, Any], modelo: ModeloTablaVirtual, fila: int):
+        self._guardar_y_pdf(rep["reporte_id"], modelo.valor(fila, "estado"),
+                            modelo.valor(fila, "comentario"), rep)
 
     def _guardar_y_pdf(self, reporte_id, nuevo_estado, comentario, rep_dict: Dict[str, Any]):
-        # 1) Guardar en BD
-        try:
-            actualizar_estado_reporte(reporte_id, nuevo_estado, comentario)
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"No se pudo guardar el estado/comentario:\n{e}")
-            return
-
-        # 2) Regenerar el PDF (sobrescribe si hay ruta guardada)
-        path_imagen = rep_dict.get("path_imagen")
-        path_reporte = rep_dict.get("path_reporte")
-        abs_img = os.path.abspath(path_imagen) if path_imagen else None
-        if abs_img and not os.path.exists(abs_img):
-            abs_img = None  # Evita fallos si la imagen no existe
-
-        destino = os.path.abspath(path_reporte) if path_reporte else None
-
-        try:
-            generar_pdf_reporte_detallado(
-                nombre_usuario=self.agricultor_nombre,
-                fecha=rep_dict.get("fecha"),
-                planta=rep_dict.get("planta"),
-                enfermedad=rep_dict.get("enfermedad"),
-                num_frutos=rep_dict.get("num_frutos"),
-                maduracion=rep_dict.get("maduracion"),
-                estado=nuevo_estado,
-                comentario_supervisor=comentario,
-                path_imagen=abs_img,
-                destino=destino,
-            )
-        except Exception as e:
-            QMessageBox.warning(self, "PDF", f"Se guardó el estado/comentario, pero no se pudo regenerar el PDF:\n{e}")
-        else:
-            QMessageBox.information(self, "Guardado", "Estado y comentario guardados. PDF actualizado.")
-            self.cargar_reportes()
+        # 1) Guardar en BD (en el pool de BD); 2) al confirmarse, regenerar el PDF
+        llamar(actualizar_estado_reporte, reporte_id, nuevo_estado, comentario).conectar(
+            lambda _: self._regenerar_pdf(nuevo_estado, comentario, rep_dict),
+            lambda e: QMessageBox.critical(self, "Error", f"No se pudo guardar el estado/comentario:\n{e}"),
+        )
+
+    def _regenerar_pdf(self, nuevo_estado, comentario, rep_dict: Dict[str, Any]):
+        # Regenerar el PDF (sobrescribe si hay ruta guardada) fuera del hilo de la UI
+        regenerar_pdf(rep_dict, self.agricultor_nombre, nuevo_estado, comentario).conectar(
+            lambda _: self._pdf_regenerado(),
+            lambda e: QMessageBox.warning(
+                self, "PDF", f"Se guardó el estado/comentario, pero no se pudo regenerar el PDF:\n{e}"),
+        )
+
+    def _pdf_regenerado(self):
+        QMessageBox.information(self, "Guardado", "Estado y comentario guardados. PDF actualizado.")
+        self.cargar_reportes()
 
     def _ver_detalle(self, rep: Dict[str, Any]):
-        datos = {
-            "id": rep.get("reporte_id"),
-            "usuario_id": rep.get("usuario_id"),
-            "fecha": rep.get("fecha"),
-            "planta": rep.get("planta"),
-            "enfermedad": rep.get("enfermedad"),
-            "num_frutos": rep.get("num_frutos"),
-            "maduracion": rep.get("maduracion"),
-            "path_imagen": rep.get("path_imagen"),
-            "path_reporte": rep.get("path_reporte"),
-            "estado": rep.get("estado"),
-            "comentario_supervisor": rep.get("comentario"),
-        }
-        win = VistaReporteWindow(datos)
-        self._detalles.append(win)
-        win.show()
+        self._detalles.append(ver_detalle(rep))
@@ -4,12 +4,14 @@ import os
 import webbrowser
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
-    QTableWidget, QTableWidgetItem, QMessageBox, QHeaderView
+    QTableView, QMessageBox, QHeaderView
 )
 from PyQt5.QtGui import QIcon
 from PyQt5.QtCore import Qt
-from database import listar_reportes, eliminar_reporte
+from database import listar_reportes_pagina, eliminar_reporte
+from database_async import llamar
 from vista_reporte import VistaReporteWindow
+from tabla_virtual import Boton, Columna, FuentePaginadaAsync, ModeloTablaVirtual, configurar_vista
 
 # Estilo visual
 BASE_STYLESHEET = """
@@ -25,7 +27,7 @@ QLabel#heading {
     margin-top: 8px;
     qproperty-alignment: AlignCenter;
 }
-QTableWidget {
+QTableView {
     background-color: #f6fff7;
     alternate-background-color: #e8f6ef;
     border: 1px solid #b7b7b7;
@@ -49,6 +51,8 @@ QPushButton:disabled {
 }
 """
 
+TAM_PAGINA = 50   # filas por consulta; se piden más al acercarse al final del scroll
+
 class HistorialReportesAgricultor(QWidget):
     def __init__(self, usuario_id):
         super().__init__()
@@ -85,16 +89,29 @@ class HistorialReportesAgricultor(QWidget):
 
         layout.addLayout(head)
 
-        # Tabla
-        self.tabla = QTableWidget()
-        self.tabla.setAlternatingRowColors(True)
-        self.tabla.setSelectionBehavior(QTableWidget.SelectRows)
-        self.tabla.setSelectionMode(QTableWidget.SingleSelection)
-        self.tabla.verticalHeader().setVisible(False)
-        self.tabla.setColumnCount(8)
-        self.tabla.setHorizontalHeaderLabels([
-            "ID", "Planta", "Estado", "Fecha", "Evaluacion", "Comentario supervisor", "Eliminar", "Ver"
-        ])
+        # Tabla (modelo virtual: filas por páginas, botones pintados)
+        # Columnas de la fila: id, usuario_id, fecha, planta, enfermedad, num_frutos,
+        #                      maduracion, path_imagen, path_reporte, estado, comentario
+        self.modelo = ModeloTablaVirtual([
+            Columna("ID", lambda r: r[0]),
+            Columna("Planta", lambda r: r[3]),
+            Columna("Estado", lambda r: r[4]),
+            Columna("Fecha", lambda r: r[2]),
+            Columna("Evaluacion", lambda r: r[9]),
+            Columna("Comentario supervisor", lambda r: r[10] or "", alineacion=Qt.AlignLeft),
+            Columna("Eliminar", tipo="botones", botones=[
+                Boton("🗑 Eliminar", lambda r: self.eliminar_reporte(r[0]),
+                      fondo="#d62828", borde="#a4161a", color="white",
+                      habilitado=lambda r: r[9] == "pendiente"),
+            ]),
+            Columna("Ver", tipo="botones", botones=[
+                Boton("👁 Ver", self.ver_reporte, fondo="#fcbf49", borde="#f77f00", color="#222"),
+            ]),
+        ], FuentePaginadaAsync(self._pagina, TAM_PAGINA, al_fallo=self._error_carga), parent=self)
+        self.modelo.cargando.connect(self._on_cargando)
+        self._restaurar = None  # (scroll, fila seleccionada) a reponer tras recargar
+        self.tabla = QTableView()
+        configurar_vista(self.tabla, self.modelo)  # orden de la consulta: fecha DESC
         header = self.tabla.horizontalHeader()
         header.setSectionResizeMode(0, QHeaderView.ResizeToContents)
         header.setSectionResizeMode(1, QHeaderView.ResizeToContents)
@@ -114,105 +131,62 @@ class HistorialReportesAgricultor(QWidget):
     # ---------- Carga / Recarga ----------
     def recargar_historial(self):
         """Refresca la tabla sin cerrar sesión."""
-        self.btn_actualizar.setEnabled(False)
-        self.btn_actualizar.setText("Actualizando…")
-        try:
-            # Guardar estado visual (scroll y selección)
-            scroll_val = self.tabla.verticalScrollBar().value()
-            selected_row = self.tabla.currentRow()
-
-            self.cargar_reportes()
+        # Guardar estado visual (scroll y selección); se repone al llegar la página
+        self._restaurar = (self.tabla.verticalScrollBar().value(), self.tabla.currentIndex().row())
+        self.cargar_reportes()
 
-            # Restaurar estado
+    def _on_cargando(self, cargando: bool):
+        self.btn_actualizar.setEnabled(not cargando)
+        if cargando:
+            if self._restaurar is not None:
+                self.btn_actualizar.setText("Actualizando…")
+            return
+        if self._restaurar is not None:
+            scroll_val, selected_row = self._restaurar
+            self._restaurar = None
             self.tabla.verticalScrollBar().setValue(scroll_val)
-            if 0 <= selected_row < self.tabla.rowCount():
+            if 0 <= selected_row < self.modelo.rowCount():
                 self.tabla.selectRow(selected_row)
-
             self.btn_actualizar.setText("Actualizado ✓")
-        except Exception as e:
-            QMessageBox.warning(self, "Actualizar", f"No se pudo actualizar el historial:\n{e}")
-            self.btn_actualizar.setText("Actualizar")
-        finally:
-            self.btn_actualizar.setEnabled(True)
+
+    def _error_carga(self, e):
+        self._restaurar = None
+        self.btn_actualizar.setText("Actualizar")
+        QMessageBox.warning(self, "Actualizar", f"No se pudo actualizar el historial:\n{e}")
+
+    def _pagina(self, ultima, limite):
+        """Página siguiente a la fila `ultima` (keyset por fecha, id). Corre en el pool de BD."""
+        return listar_reportes_pagina(
+            usuario_id=self.usuario_id,
+            after_fecha=ultima[2] if ultima else None,
+            after_id=ultima[0] if ultima else None,
+            limit=limite,
+        )
 
     def cargar_reportes(self):
-        reportes = listar_reportes(usuario_id=self.usuario_id, rol='agricultor')
-
-        self.tabla.setSortingEnabled(False)
-        self.tabla.clearContents()
-        self.tabla.setRowCount(len(reportes))
-
-        for i, rep in enumerate(reportes):
-            (reporte_id, usuario_id, fecha, planta, enfermedad, num_frutos,
-             maduracion, path_imagen, path_reporte, estado, comentario) = rep
-
-            self.tabla.setItem(i, 0, self.centrado(str(reporte_id)))
-            self.tabla.setItem(i, 1, self.centrado(planta))
-            self.tabla.setItem(i, 2, self.centrado(enfermedad))
-            self.tabla.setItem(i, 3, self.centrado(str(fecha)))
-            self.tabla.setItem(i, 4, self.centrado(estado))
-            self.tabla.setItem(i, 5, QTableWidgetItem(comentario or ""))
-
-            # Botón Eliminar
-            btn_eliminar = QPushButton("🗑 Eliminar")
-            btn_eliminar.setCursor(Qt.PointingHandCursor)
-            btn_eliminar.setStyleSheet("""
-                QPushButton {
-                    background-color: #d62828;
-                    color: white;
-                    border: 1px solid #a4161a;
-                    font-weight: bold;
-                    border-radius: 6px;
-                    padding: 4px 10px;
-                }
-                QPushButton:hover { background-color: #9d0208; }
-            """)
-            if estado != "pendiente":
-                btn_eliminar.setEnabled(False)
-            else:
-                btn_eliminar.clicked.connect(lambda _, rid=reporte_id: self.eliminar_reporte(rid))
-            self.tabla.setCellWidget(i, 6, btn_eliminar)
-
-            # Botón Ver
-            btn_ver = QPushButton("👁 Ver")
-            btn_ver.setCursor(Qt.PointingHandCursor)
-            btn_ver.setStyleSheet("""
-                QPushButton {
-                    background-color: #fcbf49;
-                    color: #222;
-                    border: 1px solid #f77f00;
-                    font-weight: bold;
-                    border-radius: 6px;
-                    padding: 4px 8px;
-                }
-                QPushButton:hover { background-color: #f77f00; color: white; }
-            """)
-            btn_ver.clicked.connect(lambda _, rep=rep: self.ver_reporte(rep))
-            self.tabla.setCellWidget(i, 7, btn_ver)
-
-        self.tabla.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.tabla.setSortingEnabled(True)
+        """Primera página; el resto se pide sola al hacer scroll (fetchMore)."""
+        self.modelo.recargar()
         # Ordenar por fecha (columna 3) descendente
-        self.tabla.sortItems(3, Qt.DescendingOrder)
+        self.tabla.sortByColumn(3, Qt.DescendingOrder)
 
     # ---------- Utils / Actions ----------
-    def centrado(self, texto):
-        item = QTableWidgetItem(texto)
-        item.setTextAlignment(Qt.AlignCenter)
-        return item
-
     def eliminar_reporte(self, reporte_id):
         confirmado = QMessageBox.question(
             self, "Confirmar", "¿Seguro que quieres eliminar este reporte?",
             QMessageBox.Yes | QMessageBox.No
         )
         if confirmado == QMessageBox.Yes:
-            exito = eliminar_reporte(reporte_id, self.usuario_id)
-            if exito:
-                QMessageBox.information(self, "Eliminado", "Reporte eliminado correctamente.")
-                self.recargar_historial()  # refrescar tras eliminar
-            else:
-                QMessageBox.warning(self, "No permitido", "Solo puedes eliminar reportes pendientes propios.")
+            llamar(eliminar_reporte, reporte_id, self.usuario_id).conectar(
+                self._on_eliminado,
+                lambda e: QMessageBox.warning(self, "Error", f"No se pudo eliminar el reporte:\n{e}"),
+            )
+
+    def _on_eliminado(self, exito):
+        if exito:
+            QMessageBox.information(self, "Eliminado", "Reporte eliminado correctamente.")
+            self.recargar_historial()  # refrescar tras eliminar
+        else:
+            QMessageBox.warning(self, "No permitido", "Solo puedes eliminar reportes pendientes propios.")
 
     def ver_reporte(self, reporte):
         datos = {
@@ -10,7 +10,10 @@ from database import registrar_usuario, login_usuario
 import os, platform, ctypes
 from importlib.util import find_spec
 
-if platform.system() == "Windows":
+# Precarga de c10.dll (Windows) para que torch pueda cargarse después de PyQt5.
+# torch ya NO se importa aquí: lo importa yolo_service en segundo plano tras el login.
+# Con el backend ONNX (AGROSCAN_BACKEND=onnx) torch no se usa y se omite.
+if platform.system() == "Windows" and os.getenv("AGROSCAN_BACKEND", "torch").strip().lower() != "onnx":
     try:
         spec = find_spec("torch")
         if spec and spec.origin:
@@ -19,8 +22,6 @@ if platform.system() == "Windows":
     except Exception:
         pass
 
-import torch
-
 
 BASE_STYLESHEET = """
 QWidget {
@@ -7,8 +7,9 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt, QDateTime
 from database import (
     hectarea_activa_de_agricultor,
-    registrar_actividad_campo, listar_actividades_agricultor, eliminar_actividad
+    registrar_actividad_campo, listar_actividades_agricultor, eliminar_actividad, es_pendiente
 )
+from database_async import Canal, llamar
 
 BASE_STYLESHEET = """
 QWidget { font-family: 'Segoe UI', Arial, sans-serif; font-size: 13px; }
@@ -17,6 +18,14 @@ QPushButton { background: #a7c957; border: 1.5px solid #6a994e; color: #222; bor
 QPushButton:hover { background: #386641; color: #fff; }
 """
 
+def _registrar_en_hectarea_activa(agricultor_id: int, **campos):
+    """Busca la hectárea asignada y registra ahí la actividad (en el pool de BD). -> (asig, id)"""
+    asig = hectarea_activa_de_agricultor(agricultor_id)
+    if not asig:
+        return None, None
+    return asig, registrar_actividad_campo(agricultor_id=agricultor_id,
+                                           hectarea_id=asig["hectarea_id"], **campos)
+
 class OperacionesAgricultorWindow(QWidget):
     def __init__(self, agricultor_id: int, nombre_usuario: str):
         super().__init__()
@@ -24,6 +33,12 @@ class OperacionesAgricultorWindow(QWidget):
         self.nombre = nombre_usuario
         self.setStyleSheet(BASE_STYLESHEET)
         self._build_ui()
+        # Listado en el pool de BD: solo se pinta la respuesta de la última consulta
+        self._canal = Canal(self)
+        self._canal.listo.connect(self._fill_table)
+        self._canal.fallo.connect(
+            lambda e: QMessageBox.critical(self, "Error", f"No se pudieron cargar las actividades:\n{e}"))
+        self._canal.ocupado.connect(lambda ocupado: self.btn_refrescar.setEnabled(not ocupado))
         self._load_table()
 
     def _build_ui(self):
@@ -79,29 +94,36 @@ class OperacionesAgricultorWindow(QWidget):
         self.sp_noapt.setEnabled(is_cosecha)
 
     def _guardar(self):
-        asig = hectarea_activa_de_agricultor(self.agricultor_id)
+        tipo = self.cmb_tipo.currentText()
+        campos = dict(
+            tipo=tipo,
+            fecha_hora=self.dt.dateTime().toPyDateTime(),
+            cantidad=float(self.sp_cant.value()) if self.sp_cant.value() else None,
+            unidad=self.txt_unid.text().strip() or None,
+            costo=float(self.sp_costo.value()) if self.sp_costo.value() else 0.0,
+            notas=self.txt_notas.text().strip() or None,
+            aptos=int(self.sp_aptos.value()) if tipo=="cosecha" else None,
+            no_aptos=int(self.sp_noapt.value()) if tipo=="cosecha" else None
+        )
+        self.btn_guardar.setEnabled(False)
+        llamar(_registrar_en_hectarea_activa, self.agricultor_id, **campos).conectar(
+            self._on_guardado, self._on_error_guardar)
+
+    def _on_error_guardar(self, e):
+        self.btn_guardar.setEnabled(True)
+        QMessageBox.critical(self, "Error", f"No se pudo registrar la actividad:\n{e}")
+
+    def _on_guardado(self, resultado):
+        self.btn_guardar.setEnabled(True)
+        asig, new_id = resultado
         if not asig:
             QMessageBox.warning(self, "Hectárea", "No tienes una hectárea asignada.")
             return
-        hect_id = asig["hectarea_id"]
-
-        tipo = self.cmb_tipo.currentText()
-        try:
-            new_id = registrar_actividad_campo(
-                agricultor_id=self.agricultor_id, hectarea_id=hect_id, tipo=tipo,
-                fecha_hora=self.dt.dateTime().toPyDateTime(),
-                cantidad=float(self.sp_cant.value()) if self.sp_cant.value() else None,
-                unidad=self.txt_unid.text().strip() or None,
-                costo=float(self.sp_costo.value()) if self.sp_costo.value() else 0.0,
-                notas=self.txt_notas.text().strip() or None,
-                aptos=int(self.sp_aptos.value()) if tipo=="cosecha" else None,
-                no_aptos=int(self.sp_noapt.value()) if tipo=="cosecha" else None
-            )
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"No se pudo registrar la actividad:\n{e}")
-            return
 
-        if new_id:
+        if es_pendiente(new_id):
+            QMessageBox.information(self, "OK", "Actividad guardada, pendiente de sincronizar con el servidor.")
+            self._load_table()
+        elif new_id:
             QMessageBox.information(self, "OK", f"Actividad registrada (id={new_id}).")
             self._load_table()
         else:
@@ -111,8 +133,9 @@ class OperacionesAgricultorWindow(QWidget):
         # rango amplio por defecto (último mes)
         desde = QDateTime.currentDateTime().addMonths(-1).toPyDateTime().replace(hour=0, minute=0, second=0)
         hasta = QDateTime.currentDateTime().toPyDateTime().replace(hour=23, minute=59, second=59)
-        rows = listar_actividades_agricultor(self.agricultor_id, desde, hasta)
+        self._canal.pedir(listar_actividades_agricultor, self.agricultor_id, desde, hasta)
 
+    def _fill_table(self, rows):
         self.table.setRowCount(len(rows))
         for i, r in enumerate(rows):
             cells = [
@@ -0,0 +1,144 @@
+# pdf_pool.py
+# Cola de trabajos PDF sobre un pool de PROCESOS: reportlab y la
+# re-codificación de imágenes a resolución completa no corren en el hilo de
+# la UI ni compiten por el GIL con el análisis YOLO.
+# - generar(fn, destino, **kwargs) -> TrabajoPdf con señales listo(ruta) /
+#   fallo(excepción), emitidas en el hilo de la UI. `fn` es una función de
+#   exportador (se llama en el proceso de trabajo como fn(destino=..., **kwargs)).
+# - Un trabajo por destino: si ya se está generando esa misma ruta con los
+#   mismos datos se devuelve ese trabajo; con datos distintos el nuevo queda
+#   en espera (reemplazando a otro que esperara) y se genera al terminar el
+#   actual, así dos clics seguidos nunca escriben el mismo archivo a la vez.
+# - La escritura atómica (temporal + os.replace) la hace exportador.
+#
+# Uso típico:
+#   from exportador import generar_pdf_actividad, ruta_actividad
+#   generar(generar_pdf_actividad, ruta_actividad(tipo), ...).conectar(self._abrir, self._error_pdf)
+#
+# generar() se usa desde el hilo de la UI.
+
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Set
+
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+
+PROCESOS = int(os.getenv("AGROSCAN_PDF_PROCESOS", "2"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_EN_CURSO: Dict[str, "TrabajoPdf"] = {}   # destino normalizado -> trabajo enviado al pool
+_EN_ESPERA: Dict[str, "TrabajoPdf"] = {}  # destino normalizado -> siguiente trabajo (solo el último)
+_VIVOS: Set["TrabajoPdf"] = set()          # referencias hasta que terminan
+
+def _pool_pdf() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=max(1, PROCESOS))
+    return _pool
+
+def _clave(destino: str) -> str:
+    return os.path.normcase(os.path.abspath(destino))
+
+def _ejecutar(fn: Callable[..., str], destino: str, kwargs: Dict[str, Any]) -> str:
+    """Corre en el proceso de trabajo."""
+    return fn(destino=destino, **kwargs)
+
+class TrabajoPdf(QObject):
+    """Un PDF pedido. listo(ruta)/fallo(excepción) se emiten una sola vez, en el hilo de la UI."""
+    listo = pyqtSignal(str)
+    fallo = pyqtSignal(object)
+    _fin = pyqtSignal(bool, object)  # del hilo del pool -> hilo de la UI (conexión en cola)
+
+    def __init__(self, fn: Callable[..., str], destino: str, kwargs: Dict[str, Any]):
+        super().__init__()
+        self.fn = fn
+        self.destino = destino
+        self.kwargs = kwargs
+        self.clave = _clave(destino)
+        self.terminado = False
+        self.ruta: Optional[str] = None
+        self.error: Optional[BaseException] = None
+        self._fin.connect(self._terminar)
+        _VIVOS.add(self)
+
+    def _mismo(self, fn: Callable[..., str], kwargs: Dict[str, Any]) -> bool:
+        return self.fn is fn and self.kwargs == kwargs
+
+    def _al_terminar(self, futuro: Future) -> None:
+        error = futuro.exception()
+        self._fin.emit(error is None, error if error is not None else futuro.result())
+
+    @pyqtSlot(bool, object)
+    def _terminar(self, ok: bool, valor: Any) -> None:
+        if self.terminado:
+            return
+        if _EN_CURSO.get(self.clave) is self:
+            del _EN_CURSO[self.clave]
+            siguiente = _EN_ESPERA.pop(self.clave, None)
+            if siguiente is not None:
+                _lanzar(siguiente)
+        if isinstance(valor, BrokenProcessPool):
+            _reiniciar_pool()
+        _VIVOS.discard(self)
+        self.terminado = True
+        if ok:
+            self.ruta = valor
+            self.listo.emit(valor)
+        else:
+            self.error = valor
+            self.fallo.emit(valor)
+
+    def conectar(self, al_listo: Optional[Callable[[str], None]] = None,
+                 al_fallo: Optional[Callable[[BaseException], None]] = None) -> "TrabajoPdf":
+        """Conecta callbacks; si ya terminó, los llama enseguida."""
+        if self.terminado:
+            if self.error is None and al_listo:
+                al_listo(self.ruta)
+            elif self.error is not None and al_fallo:
+                al_fallo(self.error)
+            return self
+        if al_listo:
+            self.listo.connect(al_listo)
+        if al_fallo:
+            self.fallo.connect(al_fallo)
+        return self
+
+def _reiniciar_pool() -> None:
+    """Un proceso murió (BrokenProcessPool): el próximo trabajo crea un pool nuevo."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False)
+        _pool = None
+
+def _lanzar(trabajo: TrabajoPdf) -> TrabajoPdf:
+    _EN_CURSO[trabajo.clave] = trabajo
+    try:
+        futuro = _pool_pdf().submit(_ejecutar, trabajo.fn, trabajo.destino, trabajo.kwargs)
+    except Exception as e:  # pool roto o apagándose
+        trabajo._fin.emit(False, e)
+        return trabajo
+    futuro.add_done_callback(trabajo._al_terminar)
+    return trabajo
+
+def generar(fn: Callable[..., str], destino: str, **kwargs) -> TrabajoPdf:
+    """Encola fn(destino=destino, **kwargs) en el pool de procesos (o se une a uno igual)."""
+    clave = _clave(destino)
+    actual = _EN_CURSO.get(clave)
+    if actual is None:
+        return _lanzar(TrabajoPdf(fn, destino, kwargs))
+    if actual._mismo(fn, kwargs):
+        return actual
+    previo = _EN_ESPERA.get(clave)
+    if previo is not None and previo._mismo(fn, kwargs):
+        return previo
+    nuevo = TrabajoPdf(fn, destino, kwargs)
+    _EN_ESPERA[clave] = nuevo
+    if previo is not None:
+        # el que esperaba ya no se genera: recibe el resultado del que lo reemplaza
+        nuevo._fin.connect(previo._terminar)
+    return nuevo
+
+def pendientes() -> int:
+    """Nº de PDF todavía sin terminar."""
+    return len(_VIVOS)
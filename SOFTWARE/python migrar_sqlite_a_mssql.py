@@ -1,6 +1,25 @@
-import sqlite3, pyodbc
+# Migración SQLite (agroassistant.db) -> SQL Server, por streaming y reanudable.
+# - Lee SQLite por bloques (keyset por id, sin fetchall) y escribe con
+#   fast_executemany; cada bloque se confirma junto con su checkpoint en
+#   dbo.migracion_checkpoint, así un corte a mitad no pierde lo ya migrado y
+#   volver a ejecutar el script sigue desde el último id confirmado.
+# - Conserva los ids (IDENTITY_INSERT) y migra usuarios antes que reportes (FK).
+# - Al final valida, por tabla, nº de filas y checksum (SHA-256 de las filas
+#   normalizadas en ambos lados, comparadas por id).
+# - --reiniciar deshace lo ya migrado (filas y checkpoints) antes de empezar.
+#
+# Uso:  python "python migrar_sqlite_a_mssql.py" [--sqlite agroassistant.db] [--lote 5000]
+#                                                [--reiniciar] [--solo-validar]
+
+import sys
+import time
+import sqlite3
+import hashlib
+import argparse
 from datetime import datetime
 
+import pyodbc
+
 # --- Origen (SQLite) ---
 SQLITE = "agroassistant.db"
 
@@ -13,67 +32,274 @@ CONN_MSSQL = (
     "Encrypt=yes;TrustServerCertificate=yes;"
 )
 
+LOTE = 5000  # filas por bloque (una transacción + checkpoint por bloque)
+
+# Fecha para filas sin fecha en SQLite (fija durante la corrida)
+AHORA = datetime.utcnow().replace(microsecond=0)
+
 def parse_dt(text):
     if not text:
-        return datetime.utcnow()
+        return AHORA
     text = text.replace("T", " ")
-    # Acepta 'YYYY-MM-DD HH:MM:SS'
-    return datetime.strptime(text, "%Y-%m-%d %H:%M:%S")
-
-# 1) Lee datos de SQLite
-sconn = sqlite3.connect(SQLITE)
-sconn.row_factory = sqlite3.Row
-scur = sconn.cursor()
-
-usuarios = scur.execute(
-    "SELECT id, username, email, password_hash, rol, fecha_registro FROM usuarios"
-).fetchall()
-
-reportes = scur.execute(
-    """SELECT id, usuario_id, fecha, planta, enfermedad, num_frutos, maduracion,
-              path_imagen, path_reporte, estado, comentario_supervisor
-       FROM reportes"""
-).fetchall()
-
-# 2) Conecta a SQL Server
-mconn = pyodbc.connect(CONN_MSSQL, autocommit=False)
-mcur  = mconn.cursor()
-
-# 2.1) Mapas de catálogos
-rol_map    = {r.rol: r.id for r in mcur.execute("SELECT id, rol FROM dbo.roles")}
-estado_map = {e.estado: e.id for e in mcur.execute("SELECT id, estado FROM dbo.reporte_estados")}
-
-# 3) Migra usuarios (conservar IDs)
-mcur.execute("SET IDENTITY_INSERT dbo.usuarios ON;")
-for u in usuarios:
-    rol_id = rol_map.get(u["rol"], rol_map["agricultor"])
-    f = parse_dt(u["fecha_registro"])
+    # Acepta 'YYYY-MM-DD HH:MM:SS' (y con fracción); las columnas son DATETIME2(0)
+    try:
+        return datetime.strptime(text, "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return datetime.fromisoformat(text).replace(microsecond=0, tzinfo=None)
+
+# ---------------------------------------------------------------------------
+# Tablas a migrar: columnas de origen, INSERT de destino y conversión de fila.
+# `a_destino` devuelve la tupla tal como se inserta (y como se relee al validar);
+# `fecha` es la posición de la columna de fecha en esa tupla.
+# ---------------------------------------------------------------------------
+
+def _usuario(u, rol_map, estado_map):
+    return (u["id"], u["username"], u["email"], u["password_hash"],
+            rol_map.get(u["rol"], rol_map["agricultor"]), parse_dt(u["fecha_registro"]))
+
+def _reporte(r, rol_map, estado_map):
+    return (r["id"], r["usuario_id"], parse_dt(r["fecha"]), r["planta"], r["enfermedad"],
+            r["num_frutos"], r["maduracion"], r["path_imagen"], r["path_reporte"],
+            estado_map.get(r["estado"], estado_map["pendiente"]), r["comentario_supervisor"])
+
+TABLAS = [
+    {
+        "tabla": "usuarios",
+        "origen": "SELECT id, username, email, password_hash, rol, fecha_registro FROM usuarios",
+        "destino": "id, username, email, password_hash, rol_id, fecha_registro",
+        "insert": """
+            INSERT INTO dbo.usuarios
+              (id, username, email, password_hash, rol_id, fecha_registro, is_active, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, 1, SYSUTCDATETIME(), SYSUTCDATETIME())
+        """,
+        "a_destino": _usuario,
+        "fecha": (5, "fecha_registro"),
+    },
+    {
+        "tabla": "reportes",
+        "origen": """SELECT id, usuario_id, fecha, planta, enfermedad, num_frutos, maduracion,
+                            path_imagen, path_reporte, estado, comentario_supervisor
+                     FROM reportes""",
+        "destino": ("id, usuario_id, fecha, planta, enfermedad, num_frutos, maduracion, "
+                    "path_imagen, path_reporte, estado_id, comentario_supervisor"),
+        "insert": """
+            INSERT INTO dbo.reportes
+              (id, usuario_id, fecha, planta, enfermedad, num_frutos, maduracion,
+               path_imagen, path_reporte, estado_id, comentario_supervisor,
+               created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, SYSUTCDATETIME(), SYSUTCDATETIME())
+        """,
+        "a_destino": _reporte,
+        "fecha": (2, "fecha"),
+    },
+]
+
+# ---------------------------------------------------------------------------
+# Checkpoint
+# ---------------------------------------------------------------------------
+
+def _crear_checkpoint(mcur):
     mcur.execute("""
-        INSERT INTO dbo.usuarios
-          (id, username, email, password_hash, rol_id, fecha_registro, is_active, created_at, updated_at)
-        VALUES (?,  ?,        ?,     ?,            ?,      ?,             1,        SYSUTCDATETIME(), SYSUTCDATETIME())
-    """, (u["id"], u["username"], u["email"], u["password_hash"], rol_id, f))
-mcur.execute("SET IDENTITY_INSERT dbo.usuarios OFF;")
-
-# 4) Migra reportes (conservar IDs)
-mcur.execute("SET IDENTITY_INSERT dbo.reportes ON;")
-for r in reportes:
-    f = parse_dt(r["fecha"])
-    estado_id = estado_map.get(r["estado"], estado_map["pendiente"])
+        IF OBJECT_ID('dbo.migracion_checkpoint','U') IS NULL
+          CREATE TABLE dbo.migracion_checkpoint (
+            tabla       SYSNAME       NOT NULL PRIMARY KEY,
+            ultimo_id   INT           NOT NULL,
+            filas       BIGINT        NOT NULL,
+            actualizado DATETIME2(0)  NOT NULL DEFAULT SYSUTCDATETIME()
+          );
+    """)
+
+def _leer_checkpoint(mcur, tabla):
+    fila = mcur.execute(
+        "SELECT ultimo_id, filas FROM dbo.migracion_checkpoint WHERE tabla = ?;", (tabla,)
+    ).fetchone()
+    return (int(fila[0]), int(fila[1])) if fila else (0, 0)
+
+def _guardar_checkpoint(mcur, tabla, ultimo_id, filas):
     mcur.execute("""
-        INSERT INTO dbo.reportes
-          (id, usuario_id, fecha, planta, enfermedad, num_frutos, maduracion,
-           path_imagen, path_reporte, estado_id, comentario_supervisor,
-           created_at, updated_at)
-        VALUES (?,  ?,          ?,     ?,      ?,          ?,         ?,
-                ?,           ?,           ?,         ?,
-                SYSUTCDATETIME(), SYSUTCDATETIME())
-    """, (r["id"], r["usuario_id"], f, r["planta"], r["enfermedad"], r["num_frutos"], r["maduracion"],
-          r["path_imagen"], r["path_reporte"], estado_id, r["comentario_supervisor"]))
-mcur.execute("SET IDENTITY_INSERT dbo.reportes OFF;")
-
-mconn.commit()
-mconn.close()
-sconn.close()
-print("✅ Migración completada por Named Pipes.")
+        MERGE dbo.migracion_checkpoint WITH (HOLDLOCK) AS t
+        USING (SELECT ? AS tabla) AS s ON t.tabla = s.tabla
+        WHEN MATCHED THEN UPDATE SET ultimo_id = ?, filas = ?, actualizado = SYSUTCDATETIME()
+        WHEN NOT MATCHED THEN INSERT (tabla, ultimo_id, filas) VALUES (?, ?, ?);
+    """, (tabla, ultimo_id, filas, tabla, ultimo_id, filas))
+
+# ---------------------------------------------------------------------------
+# Migración
+# ---------------------------------------------------------------------------
+
+def _bloques(scur, sql, desde_id, lote):
+    """Filas de SQLite con id > desde_id, ordenadas por id, de `lote` en `lote`."""
+    scur.execute(f"{sql} WHERE id > ? ORDER BY id", (desde_id,))
+    while True:
+        filas = scur.fetchmany(lote)
+        if not filas:
+            return
+        yield filas
+
+def migrar_tabla(sconn, mconn, t, rol_map, estado_map, lote):
+    tabla = t["tabla"]
+    mcur = mconn.cursor()
+    mcur.fast_executemany = True
+    ultimo_id, hechas = _leer_checkpoint(mcur, tabla)
+    total = sconn.execute(f"SELECT COUNT(*) FROM {tabla} WHERE id > ?", (ultimo_id,)).fetchone()[0]
+    if ultimo_id:
+        print(f"[{tabla}] reanudando desde id > {ultimo_id} ({hechas} filas ya migradas)")
+    if not total:
+        print(f"[{tabla}] nada que migrar")
+        return hechas
+
+    t0 = time.perf_counter()
+    nuevas = 0
+    mcur.execute(f"SET IDENTITY_INSERT dbo.{tabla} ON;")
+    try:
+        for filas in _bloques(sconn.cursor(), t["origen"], ultimo_id, lote):
+            valores = [t["a_destino"](f, rol_map, estado_map) for f in filas]
+            try:
+                mcur.executemany(t["insert"], valores)
+                ultimo_id = valores[-1][0]
+                nuevas += len(valores)
+                _guardar_checkpoint(mcur, tabla, ultimo_id, hechas + nuevas)
+                mconn.commit()
+            except Exception:
+                mconn.rollback()
+                print(f"\n[{tabla}] error en el bloque tras id {ultimo_id}; "
+                      f"vuelve a ejecutar el script para reanudar.")
+                raise
+            seg = time.perf_counter() - t0
+            print(f"\r[{tabla}] {nuevas}/{total} ({nuevas / seg:.0f} filas/s)", end="", flush=True)
+    finally:
+        mcur.execute(f"SET IDENTITY_INSERT dbo.{tabla} OFF;")
+    print(f"\n[{tabla}] {nuevas} filas en {time.perf_counter() - t0:.1f} s")
+    return hechas + nuevas
+
+def reiniciar(sconn, mconn, lote):
+    """
+    Deshace lo migrado: borra de destino los ids de origen que el checkpoint
+    da por confirmados (reportes antes que usuarios, por la FK) y los
+    checkpoints, en UNA transacción. Si otras filas de destino ya referencian
+    alguno (p. ej. reportes nuevos de un usuario migrado), no borra nada.
+    """
+    mcur = mconn.cursor()
+    mcur.fast_executemany = True
+    try:
+        for t in reversed(TABLAS):
+            tabla = t["tabla"]
+            ultimo_id, _ = _leer_checkpoint(mcur, tabla)
+            borradas = 0
+            if ultimo_id:
+                for filas in _bloques(sconn.cursor(), f"SELECT id FROM {tabla}", 0, lote):
+                    ids = [(f["id"],) for f in filas if f["id"] <= ultimo_id]
+                    if ids:
+                        mcur.executemany(f"DELETE FROM dbo.{tabla} WHERE id = ?;", ids)
+                        borradas += len(ids)
+                    if filas[-1]["id"] >= ultimo_id:
+                        break
+            print(f"[{tabla}] reinicio: {borradas} filas migradas borradas de destino")
+        mcur.execute("DELETE FROM dbo.migracion_checkpoint;")
+        mconn.commit()
+    except pyodbc.Error:
+        mconn.rollback()
+        print("No se pudo reiniciar (¿filas de destino que referencian lo migrado?); no se borró nada.")
+        raise
+
+# ---------------------------------------------------------------------------
+# Validación
+# ---------------------------------------------------------------------------
+
+def validar_tabla(sconn, mconn, t, rol_map, estado_map, lote):
+    """
+    Recorre el origen por bloques y relee el mismo rango de ids en destino.
+    Compara fila a fila (ya convertidas) y acumula un checksum por lado.
+    Las fechas vacías en SQLite se excluyen de la comparación (en destino
+    quedaron con la fecha de la corrida).
+    """
+    tabla = t["tabla"]
+    pos_fecha = t["fecha"][0]
+    h_origen, h_destino = hashlib.sha256(), hashlib.sha256()
+    n_origen = n_destino = 0
+    faltan, sobran, difieren = [], [], []
+    mcur = mconn.cursor()
+
+    for filas in _bloques(sconn.cursor(), t["origen"], 0, lote):
+        origen = {}
+        for f in filas:
+            v = list(t["a_destino"](f, rol_map, estado_map))
+            if not f[t["fecha"][1]]:
+                v[pos_fecha] = None
+            origen[v[0]] = tuple(v)
+        lo, hi = filas[0]["id"], filas[-1]["id"]
+        destino = {}
+        for r in mcur.execute(f"SELECT {t['destino']} FROM dbo.{tabla} WHERE id BETWEEN ? AND ? ORDER BY id;",
+                              (lo, hi)):
+            v = list(r)
+            if v[0] in origen and origen[v[0]][pos_fecha] is None:
+                v[pos_fecha] = None
+            destino[v[0]] = tuple(v)
+
+        for id_, v in origen.items():
+            n_origen += 1
+            h_origen.update(repr(v).encode("utf-8"))
+            if id_ not in destino:
+                faltan.append(id_)
+            elif destino[id_] != v:
+                difieren.append(id_)
+        for id_, v in destino.items():
+            if id_ in origen:
+                n_destino += 1
+                h_destino.update(repr(v).encode("utf-8"))
+            else:
+                sobran.append(id_)
+
+    total_destino = mcur.execute(f"SELECT COUNT(*) FROM dbo.{tabla};").fetchone()[0]
+    ok = not (faltan or sobran or difieren) and h_origen.digest() == h_destino.digest()
+    print(f"[{tabla}] filas origen {n_origen} | destino {n_destino} (total en tabla {total_destino}) | "
+          f"checksum {h_origen.hexdigest()[:16]} / {h_destino.hexdigest()[:16]} | {'OK' if ok else 'DIFIERE'}")
+    for nombre, ids in (("faltan en destino", faltan), ("sobran en destino", sobran), ("difieren", difieren)):
+        if ids:
+            print(f"    {nombre}: {len(ids)} (p. ej. ids {ids[:10]})")
+    return ok
+
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Migración SQLite -> SQL Server (reanudable)")
+    parser.add_argument("--sqlite", default=SQLITE)
+    parser.add_argument("--mssql", default=CONN_MSSQL, help="cadena de conexión ODBC de destino")
+    parser.add_argument("--lote", type=int, default=LOTE)
+    parser.add_argument("--reiniciar", action="store_true",
+                        help="borra de destino lo ya migrado y los checkpoints, y empieza desde el primer id")
+    parser.add_argument("--solo-validar", action="store_true")
+    args = parser.parse_args()
+
+    sconn = sqlite3.connect(args.sqlite)
+    sconn.row_factory = sqlite3.Row
+    mconn = pyodbc.connect(args.mssql, autocommit=False)
+    try:
+        mcur = mconn.cursor()
+        _crear_checkpoint(mcur)
+        mconn.commit()
+        if args.reiniciar:
+            reiniciar(sconn, mconn, args.lote)
+
+        # Mapas de catálogos
+        rol_map    = {r.rol: r.id for r in mcur.execute("SELECT id, rol FROM dbo.roles")}
+        estado_map = {e.estado: e.id for e in mcur.execute("SELECT id, estado FROM dbo.reporte_estados")}
+
+        if not args.solo_validar:
+            t0 = time.perf_counter()
+            total = sum(migrar_tabla(sconn, mconn, t, rol_map, estado_map, args.lote) for t in TABLAS)
+            print(f"Migración: {total} filas migradas en total ({time.perf_counter() - t0:.1f} s)")
+
+        print("Validando…")
+        ok = all([validar_tabla(sconn, mconn, t, rol_map, estado_map, args.lote) for t in TABLAS])
+    finally:
+        mconn.close()
+        sconn.close()
+    if not ok:
+        print("❌ La validación encontró diferencias.")
+        return 1
+    print("✅ Migración completada y validada.")
+    return 0
 
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,316 @@
+# servidor_inferencia.py
+# Servidor local de inferencia YOLO (opcional).
+# - Un proceso servidor atiende a los clientes PyQt por una tubería con nombre
+#   (Windows) o un socket local, y reparte el trabajo a un pool pequeño de
+#   procesos trabajadores; cada trabajador es dueño de UNA copia del modelo.
+# - Las imágenes no viajan por la tubería: el cliente las deja en memoria
+#   compartida (multiprocessing.shared_memory) y solo envía nombre/forma/dtype.
+# - yolo_service usa el servidor si está levantado y, si no, infiere en proceso.
+#   Todo espera con tiempo límite: si el servidor o sus trabajadores no
+#   responden, inferir_remoto devuelve None y se infiere en proceso.
+# - Los mensajes son pickles: el canal se autentica con una clave secreta
+#   (AGROSCAN_INFERENCIA_CLAVE o, si no está, un secreto aleatorio por
+#   instalación que el servidor genera al primer arranque en un archivo que
+#   solo puede leer su dueño). No hay clave por defecto.
+#
+# Uso:  python servidor_inferencia.py [--workers N]
+
+import os
+import sys
+import time
+import argparse
+import secrets
+import threading
+import itertools
+import multiprocessing as mp
+from multiprocessing.connection import Listener, Client
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# ========================
+# Configuración
+# ========================
+
+if sys.platform == "win32":
+    DIRECCION = os.getenv("AGROSCAN_INFERENCIA_DIR", r"\\.\pipe\agroscan_yolo")
+    FAMILIA = "AF_PIPE"
+else:
+    DIRECCION = ("127.0.0.1", int(os.getenv("AGROSCAN_INFERENCIA_PUERTO", "50555")))
+    FAMILIA = "AF_INET"
+
+RUTA_CLAVE = os.getenv("AGROSCAN_INFERENCIA_CLAVE_ARCHIVO",
+                       os.path.join(os.path.expanduser("~"), ".agroscan", "inferencia.clave"))
+REINTENTO_S = 10.0  # tras un fallo de conexión, no reintentar antes de esto
+TIMEOUT_S = float(os.getenv("AGROSCAN_INFERENCIA_TIMEOUT_S", "60"))  # por lote de imágenes
+PING_S = 2.0        # espera máxima de la respuesta a un ping
+REINICIO_S = 10.0   # un trabajador caído no se reinicia más de una vez en este lapso
+
+def _clave(crear: bool = False) -> Optional[bytes]:
+    """
+    Clave de autenticación del canal: AGROSCAN_INFERENCIA_CLAVE si está
+    definida; si no, el secreto de RUTA_CLAVE (con crear=True se genera si no
+    existe). None si no hay clave. PermissionError si el archivo es legible
+    por otros usuarios.
+    """
+    env = os.getenv("AGROSCAN_INFERENCIA_CLAVE")
+    if env:
+        return env.encode()
+    if crear and not os.path.exists(RUTA_CLAVE):
+        os.makedirs(os.path.dirname(RUTA_CLAVE), mode=0o700, exist_ok=True)
+        try:
+            fd = os.open(RUTA_CLAVE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            pass  # otro proceso la creó a la vez
+        else:
+            with os.fdopen(fd, "w") as f:
+                f.write(secrets.token_hex(32))
+    try:
+        if os.name == "posix" and os.stat(RUTA_CLAVE).st_mode & 0o077:
+            raise PermissionError(f"{RUTA_CLAVE} es accesible por otros usuarios (chmod 600)")
+        with open(RUTA_CLAVE, encoding="ascii") as f:
+            clave = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return clave.encode() or None
+
+# ========================
+# Trabajadores (cada uno con su modelo)
+# ========================
+
+def _adjuntar(nombre: str) -> shared_memory.SharedMemory:
+    shm = shared_memory.SharedMemory(name=nombre)
+    if os.name == "posix":
+        # El segmento es del cliente (él hace unlink); que el resource_tracker
+        # de este proceso no lo reclame ni avise de "fugas" al salir.
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+def _bucle_trabajador(cola_trabajos, cola_resultados):
+    os.environ["AGROSCAN_SERVIDOR"] = "0"  # el trabajador siempre infiere en proceso
+    import yolo_service
+    yolo_service.get_model()
+    while True:
+        trabajo = cola_trabajos.get()
+        if trabajo is None:
+            break
+        trabajo_id, imagenes, conf = trabajo
+        cola_resultados.put((trabajo_id, None, os.getpid()))  # lo toma este proceso
+        try:
+            arrays = []
+            for nombre, forma, dtype in imagenes:
+                shm = _adjuntar(nombre)
+                try:
+                    # copia: Ultralytics guarda referencias al último lote y la
+                    # memoria compartida no puede cerrarse con buffers exportados
+                    arrays.append(np.ndarray(forma, dtype=dtype, buffer=shm.buf).copy())
+                finally:
+                    shm.close()
+            dets = yolo_service._run_model_batch(arrays, conf_threshold=conf)
+            cola_resultados.put((trabajo_id, True, dets))
+        except Exception as e:
+            cola_resultados.put((trabajo_id, False, f"{type(e).__name__}: {e}"))
+
+# ========================
+# Servidor
+# ========================
+
+class ServidorInferencia:
+    def __init__(self, workers: int = 1):
+        self.cola_trabajos = mp.Queue()
+        self.cola_resultados = mp.Queue()
+        self.procesos = [self._trabajador(i) for i in range(max(1, workers))]
+        self._reinicios: Dict[int, float] = {}  # índice -> último reinicio (monotonic)
+        self._ids = itertools.count(1)
+        self._pendientes: Dict[int, list] = {}  # id -> [Event, ok, payload]
+        self._en_curso: Dict[int, int] = {}     # id -> pid del trabajador que lo procesa
+        self._lock = threading.Lock()
+
+    def _trabajador(self, i: int) -> mp.Process:
+        return mp.Process(target=_bucle_trabajador, args=(self.cola_trabajos, self.cola_resultados),
+                          name=f"yolo-worker-{i}", daemon=True)
+
+    def _hay_trabajadores(self) -> bool:
+        return any(p.is_alive() for p in self.procesos)
+
+    def _detener(self, pid: Optional[int]):
+        """Termina el trabajador colgado en un trabajo vencido; _vigilar lo reemplaza."""
+        for p in self.procesos:
+            if pid is not None and p.pid == pid and p.is_alive():
+                print(f"{p.name} no respondió en {TIMEOUT_S:.0f} s; se detiene")
+                p.terminate()
+
+    def _vigilar(self):
+        """Reinicia los trabajadores que mueren (su trabajo en curso vence por TIMEOUT_S)."""
+        while True:
+            time.sleep(1.0)
+            for i, p in enumerate(self.procesos):
+                ahora = time.monotonic()
+                if p.is_alive() or ahora - self._reinicios.get(i, -REINICIO_S) < REINICIO_S:
+                    continue
+                print(f"{p.name} terminó (código {p.exitcode}); se reinicia")
+                self._reinicios[i] = ahora
+                self.procesos[i] = self._trabajador(i)
+                self.procesos[i].start()
+
+    def _despachar_resultados(self):
+        while True:
+            trabajo_id, ok, payload = self.cola_resultados.get()
+            with self._lock:
+                if ok is None:
+                    if trabajo_id in self._pendientes:
+                        self._en_curso[trabajo_id] = payload
+                    continue
+                self._en_curso.pop(trabajo_id, None)
+                slot = self._pendientes.pop(trabajo_id, None)
+            if slot:
+                slot[1], slot[2] = ok, payload
+                slot[0].set()
+
+    def _atender(self, conn):
+        with conn:
+            while True:
+                try:
+                    req = conn.recv()
+                except (EOFError, OSError):
+                    return
+                if req.get("op") == "ping":
+                    conn.send({"ok": self._hay_trabajadores()})
+                    continue
+                slot = [threading.Event(), False, None]
+                trabajo_id = next(self._ids)
+                with self._lock:
+                    self._pendientes[trabajo_id] = slot
+                self.cola_trabajos.put((trabajo_id, req["imagenes"], req.get("conf", 0.25)))
+                limite = time.monotonic() + TIMEOUT_S
+                caido = None
+                while caido is None and not slot[0].wait(0.5):
+                    if not self._hay_trabajadores():
+                        caido = "no hay trabajadores vivos"
+                    elif time.monotonic() > limite:
+                        caido = f"sin respuesta en {TIMEOUT_S:.0f} s"
+                if caido is not None:
+                    with self._lock:
+                        self._pendientes.pop(trabajo_id, None)
+                        pid = self._en_curso.pop(trabajo_id, None)
+                    self._detener(pid)
+                    # el cliente infiere en proceso
+                    conn.send({"ok": False, "caido": True, "error": caido})
+                elif slot[1]:
+                    conn.send({"ok": True, "detecciones": slot[2]})
+                else:
+                    conn.send({"ok": False, "error": slot[2]})
+
+    def servir(self):
+        clave = _clave(crear=True)
+        for p in self.procesos:
+            p.start()
+        threading.Thread(target=self._despachar_resultados, daemon=True).start()
+        threading.Thread(target=self._vigilar, daemon=True).start()
+        with Listener(DIRECCION, family=FAMILIA, authkey=clave) as listener:
+            print(f"Servidor de inferencia AgroScan en {DIRECCION} ({len(self.procesos)} trabajador/es)")
+            while True:
+                try:
+                    conn = listener.accept()
+                except (OSError, EOFError):
+                    continue  # cliente con clave errónea o que se desconectó al conectar
+                threading.Thread(target=self._atender, args=(conn,), daemon=True).start()
+
+# ========================
+# Cliente (lo usa yolo_service)
+# ========================
+
+_local = threading.local()
+_ultimo_fallo = 0.0
+
+def _conexion():
+    """Conexión del hilo actual al servidor, o None si no está disponible."""
+    global _ultimo_fallo
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        return conn
+    if time.monotonic() - _ultimo_fallo < REINTENTO_S:
+        return None
+    try:
+        clave = _clave()
+        if clave is None:  # el servidor nunca arrancó en esta instalación
+            raise FileNotFoundError(RUTA_CLAVE)
+        conn = Client(DIRECCION, family=FAMILIA, authkey=clave)
+    except (OSError, EOFError, mp.AuthenticationError):
+        _ultimo_fallo = time.monotonic()
+        return None
+    _local.conn = conn
+    return conn
+
+def _descartar_conexion():
+    global _ultimo_fallo
+    conn = getattr(_local, "conn", None)
+    _local.conn = None
+    _ultimo_fallo = time.monotonic()
+    if conn is not None:
+        try:
+            conn.close()
+        except OSError:
+            pass
+
+def servidor_disponible() -> bool:
+    conn = _conexion()
+    if conn is None:
+        return False
+    try:
+        conn.send({"op": "ping"})
+        if not conn.poll(PING_S):
+            raise TimeoutError("el servidor de inferencia no responde")
+        return bool(conn.recv().get("ok"))
+    except (OSError, EOFError):
+        _descartar_conexion()
+        return False
+
+def inferir_remoto(imagenes: List[np.ndarray], conf_threshold: float = 0.25) -> Optional[List[List[Dict]]]:
+    """
+    Detecciones crudas (antes de NMS) por imagen, calculadas en el servidor.
+    Devuelve None si no hay servidor o no respondió a tiempo (el llamador
+    debe inferir en proceso).
+    """
+    conn = _conexion()
+    if conn is None:
+        return None
+    segmentos = []
+    try:
+        meta = []
+        for img in imagenes:
+            img = np.ascontiguousarray(img)
+            shm = shared_memory.SharedMemory(create=True, size=max(1, img.nbytes))
+            segmentos.append(shm)
+            np.ndarray(img.shape, dtype=img.dtype, buffer=shm.buf)[...] = img
+            meta.append((shm.name, img.shape, img.dtype.str))
+        conn.send({"op": "inferir", "imagenes": meta, "conf": conf_threshold})
+        # margen sobre TIMEOUT_S: normalmente responde antes el propio servidor
+        if not conn.poll(TIMEOUT_S + 5.0):
+            raise TimeoutError("el servidor de inferencia no responde")
+        resp = conn.recv()
+    except (OSError, EOFError):
+        _descartar_conexion()
+        return None
+    finally:
+        for shm in segmentos:
+            shm.close()
+            shm.unlink()
+    if not resp.get("ok") and resp.get("caido"):
+        _descartar_conexion()
+        return None
+    if not resp.get("ok"):
+        raise RuntimeError(f"Error en el servidor de inferencia: {resp.get('error')}")
+    return resp["detecciones"]
+
+# ==============
+# Arranque
+# ==============
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor local de inferencia YOLO de AgroScan")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("AGROSCAN_INFERENCIA_WORKERS", "1")),
+                        help="procesos trabajadores (cada uno carga el modelo una vez)")
+    args = parser.parse_args()
+    ServidorInferencia(args.workers).servir()
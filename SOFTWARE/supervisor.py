@@ -8,6 +8,7 @@ from supervisor_dashboard import SupervisorDashboardWindow
 from gestion_agricultores import GestionAgricultoresWindow  # pestaña de gestión de usuarios/agricultores
 # 👉 NUEVO: pestaña de gestión de actividades (aprobar/rechazar + PDF)
 from gestion_actividades import GestionActividadesWindow
+from explorador_reportes import ExploradorReportesWindow  # reportes de todos los agricultores, con filtros
 
 BASE_STYLESHEET = """
 QWidget {
@@ -65,6 +66,10 @@ class MainSupervisorWindow(QMainWindow):
         self.tab_gestion = GestionAgricultoresWindow()
         self.tabs.addTab(self.tab_gestion, QIcon("iconos/icon-users.png"), "Gestión")
 
+        # Pestaña: Reportes (filtros y conteos en el servidor, sin abrir uno por agricultor)
+        self.tab_reportes = ExploradorReportesWindow()
+        self.tabs.addTab(self.tab_reportes, QIcon("iconos/icon-report.png"), "Reportes")
+
         # 👉 Pestaña 3: Actividades (transaccional)
         self.tab_actividades = GestionActividadesWindow(self.user_id, self.username)
         # Si tienes un icono, colócalo en iconos/icon-activities.png
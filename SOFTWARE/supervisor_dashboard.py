@@ -1,29 +1,34 @@
 # supervisor_dashboard.py — Dashboard global del Supervisor
-# - Resumen por hectárea (vw_dashboard_supervisor)
+# - Resumen por hectárea (rollup diario reporte_cosecha_diario)
 # - Gráfico de barras (Aptos / No aptos por hectárea)
 # - Panel de asignación: Agricultor ↔ Hectárea
 #
 # Requiere en database_mssql.py (expuestos vía database.py):
-#   - dashboard_supervisor(date_from=None, date_to=None)
+#   - dashboard_supervisor_diario(date_from=None, date_to=None)
 #   - hectareas_disponibles()
 #   - obtener_agricultores()
 #   - asignar_hectarea(agricultor_id, hectarea_id)
+# Las consultas corren en el pool de database_async (la ventana no se congela).
 
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QTableWidget, QTableWidgetItem,
     QHeaderView, QDateEdit, QPushButton, QMessageBox, QFrame, QComboBox, QGroupBox
 )
-from PyQt5.QtCore import Qt, QDate
+from PyQt5.QtCore import Qt, QDate, QTimer
 from PyQt5.QtGui import QFont, QIcon
 from database import (
-    dashboard_supervisor, hectareas_disponibles,
+    dashboard_supervisor_diario, hectareas_disponibles,
     obtener_agricultores, asignar_hectarea
 )
+from database_async import Canal, llamar
 
 # Matplotlib embebido
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 
+# Espera tras el último cambio de fecha antes de consultar (ráfagas => 1 consulta)
+DEBOUNCE_FECHAS_MS = 400
+
 BASE_STYLESHEET = """
 QWidget { font-family: 'Segoe UI', Arial, sans-serif; font-size: 13px; }
 QLabel#title { font-size: 20px; font-weight: 700; color: #386641; }
@@ -36,6 +41,10 @@ QGroupBox { border: 1px solid #d2e59e; border-radius: 8px; margin-top: 10px; }
 QGroupBox::title { subcontrol-origin: margin; left: 10px; padding: 0 5px; color: #386641; }
 """
 
+def _datos_asignacion():
+    """Hectáreas y agricultores para los combos (una sola tarea en el pool de BD)."""
+    return hectareas_disponibles(), obtener_agricultores()
+
 class SupervisorDashboardWindow(QWidget):
     """
     Dashboard global del supervisor:
@@ -140,9 +149,23 @@ class SupervisorDashboardWindow(QWidget):
 
         self.setLayout(root)
 
-        # Auto–refresh al cambiar fechas
-        self.dt_from.dateChanged.connect(self._on_refresh)
-        self.dt_to.dateChanged.connect(self._on_refresh)
+        # Auto–refresh al cambiar fechas (con debounce)
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(DEBOUNCE_FECHAS_MS)
+        self._debounce.timeout.connect(self._on_refresh)
+        self.dt_from.dateChanged.connect(lambda _: self._debounce.start())
+        self.dt_to.dateChanged.connect(lambda _: self._debounce.start())
+
+        # Consultas en segundo plano: solo se pinta la respuesta de la última
+        self._canal_dash = Canal(self)
+        self._canal_dash.listo.connect(self._on_datos)
+        self._canal_dash.fallo.connect(self._on_error_datos)
+        self._canal_dash.ocupado.connect(self._on_ocupado)
+        self._canal_asig = Canal(self)
+        self._canal_asig.listo.connect(self._llenar_combos)
+        self._canal_asig.fallo.connect(
+            lambda e: QMessageBox.critical(self, "Error", f"No se pudo cargar datos de asignación:\n{e}"))
 
     def _make_kpi(self, label: str, num: str) -> QFrame:
         card = QFrame()
@@ -169,25 +192,28 @@ class SupervisorDashboardWindow(QWidget):
 
     # ---------------- DATA ----------------
     def _on_refresh(self):
-        self.btn_refresh.setEnabled(False)
-        self.btn_refresh.setText("Actualizando…")
-        try:
-            self.refrescar_dashboard()
-            self.btn_refresh.setText("Actualizado ✓")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"No se pudo cargar el dashboard:\n{e}")
-            self.btn_refresh.setText("Actualizar")
-        finally:
-            self.btn_refresh.setEnabled(True)
+        self._debounce.stop()
+        self.refrescar_dashboard()
+
+    def _on_ocupado(self, ocupado: bool):
+        self.btn_refresh.setEnabled(not ocupado)
+        if ocupado:
+            self.btn_refresh.setText("Actualizando…")
+
+    def _on_error_datos(self, e):
+        self.btn_refresh.setText("Actualizar")
+        QMessageBox.critical(self, "Error", f"No se pudo cargar el dashboard:\n{e}")
 
     def refrescar_dashboard(self):
-        """Público: para llamarlo desde fuera si hace falta."""
+        """Público: para llamarlo desde fuera si hace falta (no bloquea)."""
         self._load_data()
 
     def _load_data(self):
         date_from, date_to = self._range_strings_inclusive()
+        self._canal_dash.pedir(dashboard_supervisor_diario, date_from, date_to)  # resumen por hectárea
 
-        rows = dashboard_supervisor(date_from, date_to)  # resumen por hectárea
+    def _on_datos(self, rows):
+        self.btn_refresh.setText("Actualizado ✓")
 
         # KPIs globales
         total_aptos = sum(int(r.get("total_aptos") or 0) for r in rows)
@@ -256,12 +282,10 @@ class SupervisorDashboardWindow(QWidget):
     # ----------- Asignación -----------
     def _load_assign_ui(self):
         """Carga combos con las hectáreas (y estado actual) y los agricultores."""
-        try:
-            hects = hectareas_disponibles()
-            agricultores = obtener_agricultores()
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"No se pudo cargar datos de asignación:\n{e}")
-            return
+        self._canal_asig.pedir(_datos_asignacion)
+
+    def _llenar_combos(self, datos):
+        hects, agricultores = datos
 
         # Hectáreas: mostrar "H1 — LIBRE / Asignado (id=..)"
         self.cbx_hectarea.clear()
@@ -290,12 +314,16 @@ class SupervisorDashboardWindow(QWidget):
         hect_id = self._hect_id_by_index[self.cbx_hectarea.currentIndex()]
         agri_id = self._agri_id_by_index[self.cbx_agricultor.currentIndex()]
 
-        try:
-            ok = asignar_hectarea(agri_id, hect_id)
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"No se pudo asignar:\n{e}")
-            return
+        self.btn_asignar.setEnabled(False)
+        llamar(asignar_hectarea, agri_id, hect_id).conectar(
+            self._on_asignado, self._on_error_asignar)
+
+    def _on_error_asignar(self, e):
+        self.btn_asignar.setEnabled(True)
+        QMessageBox.critical(self, "Error", f"No se pudo asignar:\n{e}")
 
+    def _on_asignado(self, ok):
+        self.btn_asignar.setEnabled(True)
         if ok:
             QMessageBox.information(self, "Éxito", "Asignación aplicada.")
             self.refrescar_dashboard()  # refrescar dashboard
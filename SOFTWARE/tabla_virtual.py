@@ -0,0 +1,498 @@
+# tabla_virtual.py
+# Capa compartida para tablas grandes (reportes, actividades, agricultores).
+# - ModeloTablaVirtual (QAbstractTableModel): las filas vienen de una "fuente"
+#   que se lee por páginas con canFetchMore/fetchMore a medida que se hace scroll.
+# - DelegadoTabla (QStyledItemDelegate): PINTA botones, combos y campos de texto
+#   en lugar de crear un widget por celda; el editor real (QComboBox/QLineEdit)
+#   solo existe mientras se edita una celda. Así el costo depende de las filas
+#   visibles y no del total.
+#
+# Uso típico:
+#   columnas = [Columna("ID", lambda f: f[0]),
+#               Columna("Estado", lambda f: f[9], tipo="combo", opciones=[...], clave="estado"),
+#               Columna("Ver", tipo="botones", botones=[Boton("Ver", accion)])]
+#   modelo = ModeloTablaVirtual(columnas, FuentePaginada(fn_pagina, 50))
+#   configurar_vista(tabla, modelo)   # tabla: QTableView
+# Con FuentePaginadaAsync las páginas se leen en el pool de database_async y
+# el modelo las agrega cuando llegan (la UI no espera a la BD).
+# Ordenar por columna (clic en la cabecera) solo se permite con FuenteLista:
+# las filas ya están en memoria y se ordenan todas. Con fuentes paginadas el
+# orden lo da la consulta (keyset); ordenar en el cliente solo reordenaría lo
+# cargado hasta ahora y las filas saltarían al llegar cada página.
+
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from PyQt5.QtWidgets import (
+    QStyledItemDelegate, QStyle, QStyleOptionViewItem, QComboBox, QLineEdit,
+    QTableView, QAbstractItemView, QHeaderView
+)
+from PyQt5.QtGui import QColor, QPen, QBrush, QFont, QFontMetrics, QPainter, QIcon
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QRect, QEvent, QVariant, pyqtSignal
+
+from database_async import Canal
+
+TAM_PAGINA = 200  # filas que se exponen por cada fetchMore
+
+# ========================
+# Fuentes de filas
+# ========================
+
+class FuenteLista:
+    """Filas ya en memoria; se exponen a la vista por páginas."""
+
+    def __init__(self, filas: Sequence[Any] = ()):
+        self._filas = list(filas)
+        self._pos = 0
+
+    def reiniciar(self) -> None:
+        self._pos = 0
+
+    def hay_mas(self) -> bool:
+        return self._pos < len(self._filas)
+
+    def siguiente(self, limite: int) -> List[Any]:
+        pagina = self._filas[self._pos:self._pos + limite]
+        self._pos += len(pagina)
+        return pagina
+
+class FuentePaginada:
+    """
+    Filas leídas de la BD por páginas. `fn_pagina(ultima_fila, limite)` devuelve
+    hasta `limite` filas a continuación de `ultima_fila` (None = primera página).
+    """
+
+    def __init__(self, fn_pagina: Callable[[Optional[Any], int], List[Any]], tam_pagina: int = 50):
+        self.fn_pagina = fn_pagina
+        self.tam_pagina = tam_pagina
+        self.reiniciar()
+
+    def reiniciar(self) -> None:
+        self._ultima = None
+        self._agotada = False
+
+    def hay_mas(self) -> bool:
+        return not self._agotada
+
+    def siguiente(self, limite: int) -> List[Any]:
+        pagina = self.fn_pagina(self._ultima, min(limite, self.tam_pagina))
+        if len(pagina) < min(limite, self.tam_pagina):
+            self._agotada = True
+        if pagina:
+            self._ultima = pagina[-1]
+        return pagina
+
+class FuentePaginadaAsync(FuentePaginada):
+    """
+    Como FuentePaginada, pero `fn_pagina` corre en el pool de database_async:
+    el modelo llama a pedir(limite, entregar) y recibe la página después, en
+    el hilo de la UI. Si la consulta falla se llama `al_fallo(excepcion)` y
+    la fuente se da por agotada (se reintenta con recargar()).
+    """
+
+    def __init__(self, fn_pagina: Callable[[Optional[Any], int], List[Any]], tam_pagina: int = 50,
+                 al_fallo: Optional[Callable[[BaseException], None]] = None):
+        self._canal = Canal()
+        self._canal.listo.connect(self._recibir)
+        self._canal.fallo.connect(self._fallar)
+        self._entregar: Optional[Callable[[List[Any]], None]] = None
+        self._limite = tam_pagina
+        self.al_fallo = al_fallo
+        super().__init__(fn_pagina, tam_pagina)
+
+    def reiniciar(self) -> None:
+        super().reiniciar()
+        self._canal.cancelar()  # una página vieja que llegue tarde se descarta
+        self._entregar = None
+
+    def pedir(self, limite: int, entregar: Callable[[List[Any]], None]) -> None:
+        self._limite = min(limite, self.tam_pagina)
+        self._entregar = entregar
+        self._canal.pedir(self.fn_pagina, self._ultima, self._limite)
+
+    def _recibir(self, pagina: List[Any]) -> None:
+        if len(pagina) < self._limite:
+            self._agotada = True
+        if pagina:
+            self._ultima = pagina[-1]
+        entregar, self._entregar = self._entregar, None
+        if entregar:
+            entregar(pagina)
+
+    def _fallar(self, error: BaseException) -> None:
+        self._agotada = True
+        entregar, self._entregar = self._entregar, None
+        if entregar:
+            entregar([])
+        if self.al_fallo:
+            self.al_fallo(error)
+
+# ========================
+# Columnas
+# ========================
+
+class Boton:
+    """
+    Botón pintado. `accion(fila)` se llama al hacer clic; `habilitado(fila)`
+    decide si está activo. Con con_modelo=True la acción recibe
+    (fila, modelo, nº de fila), para leer lo editado en la misma fila.
+    """
+
+    def __init__(self, texto: str, accion: Callable[..., None],
+                 fondo: str = "#a7c957", borde: str = "#6a994e", color: str = "#222",
+                 habilitado: Optional[Callable[[Any], bool]] = None, con_modelo: bool = False,
+                 icono: Optional[str] = None):
+        self.texto = texto
+        self.icono = QIcon(icono) if icono else None
+        self.accion = accion
+        self.fondo = QColor(fondo)
+        self.borde = QColor(borde)
+        self.color = QColor(color)
+        self.habilitado = habilitado
+        self.con_modelo = con_modelo
+
+class Columna:
+    """
+    tipo: "texto" | "combo" | "linea" | "botones".
+    `valor(fila)` da el valor mostrado; para combo/linea `clave` identifica
+    lo editado (ModeloTablaVirtual.valor(n, clave)).
+    """
+
+    def __init__(self, titulo: str, valor: Optional[Callable[[Any], Any]] = None,
+                 tipo: str = "texto", clave: Optional[str] = None,
+                 opciones: Sequence[str] = (), placeholder: str = "",
+                 botones: Sequence[Boton] = (), alineacion=Qt.AlignCenter):
+        self.titulo = titulo
+        self.valor = valor or (lambda fila: "")
+        self.tipo = tipo
+        self.clave = clave or titulo
+        self.opciones = list(opciones)
+        self.placeholder = placeholder
+        self.botones = list(botones)
+        self.alineacion = alineacion
+
+# ========================
+# Modelo
+# ========================
+
+class ModeloTablaVirtual(QAbstractTableModel):
+    cargando = pyqtSignal(bool)  # True al pedir una página asíncrona, False al llegar
+
+    def __init__(self, columnas: Sequence[Columna], fuente=None, parent=None,
+                 tam_pagina: int = TAM_PAGINA):
+        super().__init__(parent)
+        self.columnas = list(columnas)
+        self.fuente = fuente if fuente is not None else FuenteLista()
+        self.tam_pagina = tam_pagina
+        self._filas: List[Any] = []
+        self._ediciones: Dict[tuple, Any] = {}  # (id(fila), clave) -> valor editado
+        self._orden: Optional[tuple] = None     # (columna, Qt.SortOrder)
+        self._cargando = False                  # página asíncrona pedida y sin llegar
+
+    # ---- datos ----
+    def fila(self, n: int) -> Any:
+        return self._filas[n]
+
+    def filas(self) -> List[Any]:
+        return list(self._filas)
+
+    def valor(self, n: int, clave: str) -> Any:
+        """Valor de la columna `clave` en la fila n (lo editado si se editó)."""
+        fila = self._filas[n]
+        k = (id(fila), clave)
+        if k in self._ediciones:
+            return self._ediciones[k]
+        for col in self.columnas:
+            if col.clave == clave:
+                return col.valor(fila)
+        return None
+
+    def fila_de(self, fila: Any) -> int:
+        """Nº de fila actual de un objeto fila (cambia al ordenar), o -1."""
+        for n, f in enumerate(self._filas):
+            if f is fila:
+                return n
+        return -1
+
+    def cambiar_fuente(self, fuente) -> None:
+        self.fuente = fuente
+        self.recargar()
+
+    def recargar(self) -> None:
+        """Vacía la tabla y carga la primera página."""
+        self.beginResetModel()
+        self._filas = []
+        self._ediciones = {}
+        if self._cargando:
+            self._cargando = False
+            self.cargando.emit(False)
+        self.fuente.reiniciar()
+        self.endResetModel()
+        if self.canFetchMore(QModelIndex()):
+            self.fetchMore(QModelIndex())
+        if self._orden is not None:
+            self.sort(*self._orden)
+
+    def ordenable(self) -> bool:
+        """True si se puede ordenar en el cliente (todas las filas en memoria)."""
+        return not isinstance(self.fuente, FuentePaginada)
+
+    # ---- QAbstractTableModel ----
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._filas)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columnas)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._cargando and self.fuente.hay_mas()
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._cargando:
+            return
+        if hasattr(self.fuente, "pedir"):
+            fuente = self.fuente
+            self._cargando = True
+            self.cargando.emit(True)
+            fuente.pedir(self.tam_pagina, lambda filas: self._recibir(fuente, filas))
+            return
+        self._agregar(self.fuente.siguiente(self.tam_pagina))
+
+    def _recibir(self, fuente, filas: List[Any]) -> None:
+        if fuente is not self.fuente:  # se cambió de fuente mientras tanto
+            return
+        self._cargando = False
+        self._agregar(filas)
+        self.cargando.emit(False)
+
+    def _agregar(self, nuevas: List[Any]) -> None:
+        if not nuevas:
+            return
+        inicio = len(self._filas)
+        self.beginInsertRows(QModelIndex(), inicio, inicio + len(nuevas) - 1)
+        self._filas.extend(nuevas)
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return QVariant()
+        col = self.columnas[index.column()]
+        if role in (Qt.DisplayRole, Qt.EditRole, Qt.ToolTipRole):
+            if col.tipo == "botones":
+                return QVariant()
+            v = self.valor(index.row(), col.clave)
+            return "" if v is None else str(v)
+        if role == Qt.TextAlignmentRole:
+            return int(col.alineacion | Qt.AlignVCenter)
+        return QVariant()
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole:
+            return False
+        col = self.columnas[index.column()]
+        self._ediciones[(id(self._filas[index.row()]), col.clave)] = value
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole])
+        return True
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        base = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        if self.columnas[index.column()].tipo in ("combo", "linea"):
+            base |= Qt.ItemIsEditable
+        return base
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.columnas[section].titulo
+        return QVariant()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        col = self.columnas[column]
+        if col.tipo == "botones" or not self.ordenable():
+            return
+        # se exponen las filas que faltan: ordenar solo las cargadas dejaría
+        # las páginas siguientes fuera de orden
+        resto: List[Any] = []
+        while self.fuente.hay_mas():
+            resto.extend(self.fuente.siguiente(self.tam_pagina))
+        self._agregar(resto)
+        self._orden = (column, order)
+        self.layoutAboutToBeChanged.emit()
+        self._filas.sort(key=lambda f: _clave_orden(col.valor(f)), reverse=(order == Qt.DescendingOrder))
+        self.layoutChanged.emit()
+
+def _clave_orden(v):
+    # números antes que texto; None al final
+    if v is None:
+        return (2, "")
+    if isinstance(v, (int, float)):
+        return (0, v)
+    return (1, str(v))
+
+# ========================
+# Delegado
+# ========================
+
+_MARGEN = 3
+_SEPARACION = 6
+_RELLENO_H = 10
+_ICONO = 16
+
+class DelegadoTabla(QStyledItemDelegate):
+    """Pinta botones/combos/campos de texto y abre el editor real solo al editar."""
+
+    def __init__(self, modelo: ModeloTablaVirtual, parent=None):
+        super().__init__(parent)
+        self.modelo = modelo
+
+    # ---- geometría de botones ----
+    def _rects_botones(self, col: Columna, rect: QRect, fm: QFontMetrics) -> List[QRect]:
+        anchos = [fm.horizontalAdvance(b.texto) + 2 * _RELLENO_H + (_ICONO + 4 if b.icono else 0)
+                  for b in col.botones]
+        total = sum(anchos) + _SEPARACION * (len(anchos) - 1)
+        x = rect.x() + max(_MARGEN, (rect.width() - total) // 2)
+        rects = []
+        for w in anchos:
+            rects.append(QRect(x, rect.y() + _MARGEN, w, rect.height() - 2 * _MARGEN))
+            x += w + _SEPARACION
+        return rects
+
+    def _habilitado(self, boton: Boton, fila) -> bool:
+        return boton.habilitado is None or bool(boton.habilitado(fila))
+
+    # ---- pintura ----
+    def paint(self, painter, option, index):
+        col = self.modelo.columnas[index.column()]
+        if col.tipo == "texto":
+            super().paint(painter, option, index)
+            return
+
+        # fondo (alternado / selección) sin texto
+        opt = QStyleOptionViewItem(option)
+        self.initStyleOption(opt, index)
+        opt.text = ""
+        estilo = opt.widget.style() if opt.widget else None
+        if estilo:
+            estilo.drawControl(QStyle.CE_ItemViewItem, opt, painter, opt.widget)
+
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing, True)
+        if col.tipo == "botones":
+            fila = self.modelo.fila(index.row())
+            fuente = QFont(painter.font())
+            fuente.setBold(True)
+            painter.setFont(fuente)
+            for boton, r in zip(col.botones, self._rects_botones(col, option.rect, QFontMetrics(fuente))):
+                activo = self._habilitado(boton, fila)
+                painter.setPen(QPen(boton.borde if activo else QColor("#c8c8c8"), 1.2))
+                painter.setBrush(QBrush(boton.fondo if activo else QColor("#e0e0e0")))
+                painter.drawRoundedRect(r, 6, 6)
+                painter.setPen(boton.color if activo else QColor("#888"))
+                if boton.icono:
+                    icono = QRect(r.x() + _RELLENO_H, r.center().y() - _ICONO // 2 + 1, _ICONO, _ICONO)
+                    boton.icono.paint(painter, icono, Qt.AlignCenter,
+                                      QIcon.Normal if activo else QIcon.Disabled)
+                    r = r.adjusted(_ICONO + 4, 0, 0, 0)
+                painter.drawText(r, Qt.AlignCenter, boton.texto)
+        else:
+            r = option.rect.adjusted(_MARGEN, _MARGEN, -_MARGEN, -_MARGEN)
+            painter.setPen(QPen(QColor("#b7b7b7"), 1))
+            painter.setBrush(QBrush(QColor("#ffffff")))
+            painter.drawRoundedRect(r, 4, 4)
+            texto = index.data(Qt.DisplayRole) or ""
+            area = r.adjusted(6, 0, -6, 0)
+            if col.tipo == "combo":
+                flecha = QRect(area.right() - 12, area.y(), 12, area.height())
+                painter.setPen(QColor("#555"))
+                painter.drawText(flecha, Qt.AlignCenter, "▾")
+                area.setRight(flecha.left() - 4)
+            if not texto and col.placeholder:
+                painter.setPen(QColor("#999"))
+                texto = col.placeholder
+            else:
+                painter.setPen(option.palette.text().color())
+            painter.drawText(area, Qt.AlignVCenter | Qt.AlignLeft,
+                             painter.fontMetrics().elidedText(texto, Qt.ElideRight, area.width()))
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        s = super().sizeHint(option, index)
+        col = self.modelo.columnas[index.column()]
+        if col.tipo == "botones":
+            fuente = QFont(option.font)
+            fuente.setBold(True)
+            rects = self._rects_botones(col, QRect(0, 0, 0, 30), QFontMetrics(fuente))
+            s.setWidth(sum(r.width() for r in rects) + _SEPARACION * (len(rects) - 1) + 2 * _MARGEN)
+            s.setHeight(max(s.height(), 30))
+        elif col.tipo == "combo":
+            s.setWidth(s.width() + 30)
+        return s
+
+    # ---- clics en botones ----
+    def editorEvent(self, event, model, option, index):
+        col = self.modelo.columnas[index.column()]
+        if col.tipo != "botones" or event.type() != QEvent.MouseButtonRelease \
+                or event.button() != Qt.LeftButton:
+            return super().editorEvent(event, model, option, index)
+        fuente = QFont(option.font)
+        fuente.setBold(True)
+        fila = self.modelo.fila(index.row())
+        for boton, r in zip(col.botones, self._rects_botones(col, option.rect, QFontMetrics(fuente))):
+            if r.contains(event.pos()) and self._habilitado(boton, fila):
+                if boton.con_modelo:
+                    boton.accion(fila, self.modelo, index.row())
+                else:
+                    boton.accion(fila)
+                return True
+        return False
+
+    # ---- editores reales (solo mientras se edita) ----
+    def createEditor(self, parent, option, index):
+        col = self.modelo.columnas[index.column()]
+        if col.tipo == "combo":
+            combo = QComboBox(parent)
+            combo.addItems(col.opciones)
+            return combo
+        if col.tipo == "linea":
+            edit = QLineEdit(parent)
+            edit.setPlaceholderText(col.placeholder)
+            return edit
+        return None
+
+    def setEditorData(self, editor, index):
+        texto = index.data(Qt.EditRole) or ""
+        if isinstance(editor, QComboBox):
+            i = editor.findText(texto)
+            editor.setCurrentIndex(i if i >= 0 else 0)
+            editor.showPopup()
+        elif isinstance(editor, QLineEdit):
+            editor.setText(texto)
+
+    def setModelData(self, editor, model, index):
+        if isinstance(editor, QComboBox):
+            model.setData(index, editor.currentText(), Qt.EditRole)
+        elif isinstance(editor, QLineEdit):
+            model.setData(index, editor.text(), Qt.EditRole)
+
+    def updateEditorGeometry(self, editor, option, index):
+        editor.setGeometry(option.rect.adjusted(1, 1, -1, -1))
+
+def configurar_vista(vista: QTableView, modelo: ModeloTablaVirtual,
+                     altura_fila: int = 34, ordenable: bool = False) -> DelegadoTabla:
+    """
+    Conecta modelo + delegado a un QTableView con los ajustes comunes de la app.
+    `ordenable` se ignora si el modelo no puede ordenar en el cliente (fuente paginada).
+    """
+    vista.setModel(modelo)
+    delegado = DelegadoTabla(modelo, vista)
+    vista.setItemDelegate(delegado)
+    vista.setEditTriggers(QAbstractItemView.CurrentChanged | QAbstractItemView.SelectedClicked)
+    vista.setSelectionBehavior(QAbstractItemView.SelectRows)
+    vista.setSelectionMode(QAbstractItemView.SingleSelection)
+    vista.setAlternatingRowColors(True)
+    vista.verticalHeader().setVisible(False)
+    # altura fija: la vista no mide cada fila (clave con 100k filas)
+    vista.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+    vista.verticalHeader().setDefaultSectionSize(altura_fila)
+    vista.setSortingEnabled(ordenable and modelo.ordenable())
+    return delegado
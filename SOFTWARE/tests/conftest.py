@@ -0,0 +1,8 @@
+# conftest.py
+# Los módulos de SOFTWARE se importan entre sí por nombre (import database,
+# import exportador...): las pruebas corren con SOFTWARE en sys.path.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,88 @@
+# test_backend_onnx.py
+# Paridad del backend ONNX Runtime con Ultralytics sobre una foto de campo
+# SIN anotar (entrada real del modelo): mismas cajas (misma clase, IoU >= 0.9).
+# La foto es tests/imagenes/esparragos.jpg o la de AGROSCAN_IMAGEN_PRUEBA;
+# nunca una salida de reports/ (esas ya traen cajas y etiquetas dibujadas).
+# Necesita ultralytics, los pesos (AGROSCAN_MODELO) y la foto; si no, se omite.
+# Las pruebas de _postproceso no necesitan pesos.
+
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+import backend_onnx
+import yolo_service
+from yolo_service import _iou_matrix
+
+IMAGEN = os.getenv("AGROSCAN_IMAGEN_PRUEBA", os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "imagenes", "esparragos.jpg"))
+
+def _con_pesos():
+    pytest.importorskip("ultralytics")
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("onnx")
+    if not os.path.exists(yolo_service.RUTA_MODELO):
+        pytest.skip(f"sin pesos en {yolo_service.RUTA_MODELO}")
+
+def _emparejadas(a: np.ndarray, b: np.ndarray, umbral: float = 0.9) -> int:
+    """Filas [x1,y1,x2,y2,conf,cls] de `a` con pareja en `b` (misma clase, IoU >= umbral)."""
+    if not len(a) or not len(b):
+        return 0
+    iou = _iou_matrix(a[:, :4], b[:, :4])
+    iou[a[:, 5][:, None] != b[:, 5][None, :]] = 0.0
+    usados = set()
+    for i in np.argsort(-iou.max(axis=1)):
+        for j in np.argsort(-iou[i]):
+            if iou[i, j] < umbral:
+                break
+            if j not in usados:
+                usados.add(j)
+                break
+    return len(usados)
+
+@pytest.fixture(scope="module")
+def modelos(tmp_path_factory):
+    _con_pesos()
+    from ultralytics import YOLO
+    ruta_onnx = backend_onnx.ruta_onnx_para(yolo_service.RUTA_MODELO)
+    if not os.path.exists(ruta_onnx):
+        ruta_onnx = backend_onnx.exportar_onnx(
+            yolo_service.RUTA_MODELO, str(tmp_path_factory.mktemp("onnx") / "modelo.onnx"))
+    return YOLO(yolo_service.RUTA_MODELO), backend_onnx.ModeloOnnx(ruta_onnx)
+
+def test_paridad_con_ultralytics(modelos):
+    torch_, onnx_ = modelos
+    if not os.path.exists(IMAGEN):
+        pytest.skip(f"sin foto de prueba en {IMAGEN}")
+    assert "_anotada" not in os.path.basename(IMAGEN), "usar la foto original, no la anotada"
+    img = cv2.imread(IMAGEN)
+    assert img is not None, IMAGEN
+    ref = torch_(img, conf=0.25, verbose=False)[0].boxes.data.cpu().numpy()
+    res = onnx_(img, conf=0.25)[0].boxes.data
+    assert len(ref) > 0
+    # Ultralytics rellena al múltiplo de 32 y ONNX al cuadrado: tolerancia pequeña
+    assert _emparejadas(ref, res) >= 0.9 * len(ref)
+    assert _emparejadas(res, ref) >= 0.9 * len(res)
+    assert onnx_.names == torch_.names
+
+def test_int8_conserva_nombres_de_clase(modelos, tmp_path):
+    torch_, _ = modelos
+    ruta = backend_onnx.exportar_onnx(yolo_service.RUTA_MODELO, str(tmp_path / "modelo.int8.onnx"), int8=True)
+    assert backend_onnx.ModeloOnnx(ruta).names == torch_.names
+
+def test_postproceso_a_coordenadas_originales():
+    # una caja 100x50 centrada en (320, 320) del lienzo 640, imagen 1280x640 -> r=0.5, pad vertical 160
+    pred = np.zeros((4 + 2, 3), dtype=np.float32)
+    pred[:, 0] = [320, 320, 100, 50, 0.1, 0.9]   # clase 1
+    pred[:, 1] = [322, 321, 100, 50, 0.8, 0.05]  # clase 0, otra clase: no se suprime
+    pred[:, 2] = [320, 320, 98, 50, 0.02, 0.6]   # clase 1 solapada: la suprime el NMS
+    filas = backend_onnx._postproceso(pred, 0.25, 0.5, (0.0, 160.0), (640, 1280))
+    assert filas.shape == (2, 6)
+    np.testing.assert_allclose(filas[0], [540, 270, 740, 370, 0.9, 1], atol=1e-4)
+    assert filas[1, 5] == 0
+
+def test_postproceso_sin_detecciones():
+    pred = np.zeros((6, 5), dtype=np.float32)
+    assert backend_onnx._postproceso(pred, 0.25, 1.0, (0.0, 0.0), (640, 640)).shape == (0, 6)
@@ -0,0 +1,54 @@
+# test_cache_detecciones.py
+# Caché persistente de detecciones: aciertos, persistencia y desalojo LRU.
+
+import itertools
+import os
+import types
+
+import cache_detecciones
+from cache_detecciones import CacheDetecciones, hash_archivo
+
+DETS = [{"name": "sano", "label": "Espárrago sano", "box": [1, 2, 3, 4], "confidence": 0.5}]
+
+def test_guardar_obtener_y_persistir(tmp_path):
+    ruta = str(tmp_path / "cache.db")
+    cache = CacheDetecciones(ruta)
+    clave = CacheDetecciones.clave("img", "modelo", 0.25, 0.3)
+    assert cache.obtener(clave) is None
+    cache.guardar(clave, DETS)
+    assert cache.obtener(clave) == DETS
+    assert CacheDetecciones(ruta).obtener(clave) == DETS
+
+def test_la_clave_distingue_umbrales_y_modo():
+    claves = {CacheDetecciones.clave("img", "m", 0.25, 0.3),
+              CacheDetecciones.clave("img", "m", 0.30, 0.3),
+              CacheDetecciones.clave("img", "m", 0.25, 0.5),
+              CacheDetecciones.clave("img", "m", 0.25, 0.3, "tesela=640/0.200")}
+    assert len(claves) == 4
+
+def test_desaloja_la_menos_usada(tmp_path, monkeypatch):
+    reloj = itertools.count(1)  # accesos en orden estricto
+    monkeypatch.setattr(cache_detecciones, "time", types.SimpleNamespace(time=lambda: next(reloj)))
+    cache = CacheDetecciones(str(tmp_path / "cache.db"), max_entradas=2)
+    cache.guardar("a", DETS)
+    cache.guardar("b", DETS)
+    cache.obtener("a")  # "b" queda como la menos usada
+    cache.guardar("c", DETS)
+    assert cache.obtener("b") is None
+    assert cache.obtener("a") == DETS and cache.obtener("c") == DETS
+    assert cache.estadisticas()["entradas"] == 2
+
+def test_limite_de_bytes(tmp_path):
+    cache = CacheDetecciones(str(tmp_path / "cache.db"), max_bytes=300)
+    for i in range(5):
+        cache.guardar(str(i), DETS)
+    assert cache.estadisticas()["bytes"] <= 300
+    assert cache.obtener("4") == DETS
+
+def test_hash_archivo_cambia_con_el_contenido(tmp_path):
+    ruta = tmp_path / "img.jpg"
+    ruta.write_bytes(b"uno")
+    h1 = hash_archivo(str(ruta))
+    ruta.write_bytes(b"dos!")
+    os.utime(ruta, ns=(1, 10 ** 9))
+    assert hash_archivo(str(ruta)) != h1
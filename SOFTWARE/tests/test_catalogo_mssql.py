@@ -0,0 +1,44 @@
+# test_catalogo_mssql.py
+# Caché de catálogos de database_mssql (_Catalogo) sin SQL Server: se
+# reemplaza la carga y se cuentan las consultas.
+
+import time
+
+import pytest
+
+pytest.importorskip("pyodbc")
+
+import database_mssql as m
+
+class _CatalogoContado(m._Catalogo):
+    def __init__(self, ttl_s=600):
+        super().__init__("dbo.reporte_estados", "estado", ttl_s)
+        self.cargas = 0
+
+    def _recargar(self):
+        self.cargas += 1
+        self._por_nombre = {"pendiente": 1, "revisado": 2}
+        self._por_id = {1: "pendiente", 2: "revisado"}
+        self._cargado = time.monotonic()
+
+def test_aciertos_sin_consultar():
+    cat = _CatalogoContado()
+    assert cat.id_de("pendiente") == 1
+    assert cat.nombre_de(2) == "revisado"
+    assert cat.cargas == 1
+
+def test_faltantes_recargan_una_vez_por_ventana():
+    cat = _CatalogoContado()
+    cat.id_de("pendiente")
+    assert [cat.id_de("pendiete") for _ in range(10)] == [None] * 10
+    assert cat.nombre_de(99) is None and cat.id_de("otro") is None
+    assert cat.cargas == 2
+    cat.invalidar()
+    assert cat.id_de("pendiete") is None
+    assert cat.cargas == 3
+
+def test_ttl_vencido_recarga():
+    cat = _CatalogoContado(ttl_s=0)
+    cat.id_de("pendiente")
+    cat.id_de("pendiente")
+    assert cat.cargas == 2
@@ -0,0 +1,91 @@
+# test_cola_offline.py
+# Cola de salida local con un servidor simulado (se reemplaza _APLICAR): ids
+# pendientes distinguibles y lotes que se aplican o rechazan enteros.
+
+import pytest
+
+pytest.importorskip("pyodbc")
+
+import cola_offline as co
+
+class _Servidor:
+    """Aplica listas de registros como un solo INSERT: todo o nada."""
+
+    def __init__(self):
+        self.filas = []
+        self.envios = []
+
+    def __call__(self, registros):
+        self.envios.append(len(registros))
+        if any(r["aptos"] < 0 for r in registros):
+            raise ValueError("aptos negativo")
+        ids = {}
+        for r in registros:
+            self.filas.append(r)
+            ids[r["clave"]] = len(self.filas)
+        return ids
+
+@pytest.fixture
+def servidor(monkeypatch):
+    srv = _Servidor()
+    monkeypatch.setitem(co._APLICAR, "reporte_cosecha", srv)
+    return srv
+
+@pytest.fixture
+def cola(tmp_path):
+    return co.ColaSalida(str(tmp_path / "cola.db"))
+
+def _sesion(aptos):
+    return {"agricultor_id": 1, "hectarea_id": 1, "aptos": aptos, "no_aptos": 0, "fuente": "YOLO"}
+
+def test_ids_pendientes_negativos(cola, monkeypatch):
+    sync = co.Sincronizador(cola)
+    sync._reintentar_en = float("inf")     # sin conexión: no espera
+    monkeypatch.setattr(co, "_cola", lambda: (cola, sync))
+    ids = co.registrar_reporte_cosecha_lote([_sesion(3), _sesion(4)])
+    assert len(ids) == 2 and all(i < 0 for i in ids)
+    assert co.registrar_reporte_cosecha(1, 1, 5, 0) < 0
+    assert cola.resumen()[0] == 3
+
+def test_lote_se_rechaza_entero(cola, servidor):
+    malo = cola.encolar("reporte_cosecha", [_sesion(1), _sesion(-1), _sesion(2)])
+    bueno = cola.encolar("reporte_cosecha", [_sesion(7)])
+    sync = co.Sincronizador(cola)
+    assert sync.sincronizar() == 1
+    # el grupo con la fila mala no deja ninguna aplicada; el otro sí pasa
+    assert [r["aptos"] for r in servidor.filas] == [7]
+    assert set(cola.rechazos(malo)) == set(malo)
+    assert cola.ids_servidor(bueno) == {bueno[0]: 1}
+    with pytest.raises(ValueError):
+        sync.esperar(malo, 0)
+
+def test_pendientes_no_corta_un_grupo(cola, servidor, monkeypatch):
+    monkeypatch.setattr(co, "SYNC_LOTE", 2)
+    grupo = cola.encolar("reporte_cosecha", [_sesion(i) for i in range(3)])
+    cola.encolar("reporte_cosecha", [_sesion(9)])
+    assert [p[0] for p in cola.pendientes(2)] == grupo
+    assert co.Sincronizador(cola).sincronizar() == 4
+    assert servidor.envios == [3, 1]
+
+def test_sin_esquema_se_detiene_sin_perder_filas(cola, monkeypatch):
+    def sin_clave_idem(registros):
+        raise co.pyodbc.ProgrammingError("Invalid column name 'clave_idem'.")
+
+    monkeypatch.setitem(co._APLICAR, "reporte_cosecha", sin_clave_idem)
+    ids = cola.encolar("reporte_cosecha", [_sesion(1), _sesion(2)])
+    sync = co.Sincronizador(cola)
+    assert sync.sincronizar() == 0
+    assert "clave_idem" in sync.detenido and not sync.en_linea()
+    assert cola.resumen()[0] == 2 and not cola.rechazos(ids)
+    assert sync.esperar(ids, 5) is None      # no espera a un servidor que no puede aplicar
+
+def test_clave_sin_id_no_se_confirma(cola, monkeypatch):
+    def pierde_una(registros):
+        return {r["clave"]: i + 1 for i, r in enumerate(registros[:-1])}
+
+    monkeypatch.setitem(co._APLICAR, "reporte_cosecha", pierde_una)
+    ids = cola.encolar("reporte_cosecha", [_sesion(1), _sesion(2)])
+    assert co.Sincronizador(cola).sincronizar() == 1
+    assert cola.ids_servidor(ids) == {ids[0]: 1}
+    assert list(cola.rechazos(ids)) == [ids[1]]
+    assert cola.resumen()[0] == 0
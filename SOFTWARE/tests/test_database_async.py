@@ -0,0 +1,52 @@
+# test_database_async.py
+# llamar(): las escrituras siempre lanzan su propio trabajo; solo las lecturas
+# con coalescer=True se unen a una idéntica en curso.
+
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("PyQt5")
+
+from PyQt5.QtCore import QCoreApplication
+
+import database_async
+
+@pytest.fixture(scope="module")
+def app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+def _esperar(app, solicitudes, timeout_s=5.0):
+    limite = time.monotonic() + timeout_s
+    while not all(s.terminada for s in solicitudes):
+        assert time.monotonic() < limite, "la solicitud no terminó"
+        app.processEvents()
+        time.sleep(0.005)
+
+def _funcion_bloqueada():
+    llamadas, soltar = [], threading.Event()
+
+    def fn(*args):
+        llamadas.append(args)
+        soltar.wait(5)
+        return len(llamadas)
+    return fn, llamadas, soltar
+
+def test_escrituras_iguales_no_se_agrupan(app):
+    guardar, llamadas, soltar = _funcion_bloqueada()
+    a = database_async.llamar(guardar, 1, "pendiente")
+    b = database_async.llamar(guardar, 1, "pendiente")
+    assert a is not b
+    soltar.set()
+    _esperar(app, [a, b])
+    assert len(llamadas) == 2
+
+def test_lecturas_coalescidas(app):
+    leer, llamadas, soltar = _funcion_bloqueada()
+    a = database_async.llamar(leer, 7, coalescer=True)
+    b = database_async.llamar(leer, 7, coalescer=True)
+    assert a is b
+    soltar.set()
+    _esperar(app, [a])
+    assert len(llamadas) == 1 and a.resultado == 1
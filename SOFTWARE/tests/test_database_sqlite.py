@@ -0,0 +1,187 @@
+# test_database_sqlite.py
+# Backend local (database_sqlite) sobre una BD temporal: mismas funciones y
+# formas de retorno que database_mssql, sin SQL Server.
+
+import importlib
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+import database_sqlite as db
+from tabla_virtual import FuentePaginada
+
+@pytest.fixture
+def bd(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "RUTA_BD", str(tmp_path / "agroscan.db"))
+    monkeypatch.setattr(db, "_local", threading.local())
+    yield db
+    conexion = getattr(db._local, "conexion", None)
+    if conexion is not None:
+        conexion.close()
+
+def _usuario(bd, nombre, rol="agricultor"):
+    ok, _ = bd.registrar_usuario(nombre, f"{nombre}@agroscan.pe", "clave", rol)
+    assert ok
+    ok, uid, *_ = bd.login_usuario(f"{nombre}@agroscan.pe", "clave")
+    assert ok
+    return uid
+
+def _hectarea(bd):
+    return bd.hectareas_disponibles()[0]["id"]
+
+# ---- Usuarios ----
+
+def test_registro_y_login(bd):
+    assert bd.registrar_usuario("ana", "ana@agroscan.pe", "secreta", "agricultor")[0]
+    ok, uid, username, rol = bd.login_usuario("ana@agroscan.pe", "secreta")
+    assert ok and username == "ana" and rol == "agricultor"
+    assert bd.login_usuario("ana@agroscan.pe", "otra") == (False, "Credenciales incorrectas.")
+    assert [a[0] for a in bd.obtener_agricultores()] == [uid]
+
+def test_registro_duplicado_o_rol_invalido(bd):
+    assert bd.registrar_usuario("ana", "ana@agroscan.pe", "x", "agricultor")[0]
+    assert not bd.registrar_usuario("ana", "otra@agroscan.pe", "x", "agricultor")[0]
+    assert not bd.registrar_usuario("beto", "beto@agroscan.pe", "x", "jefe")[0]
+
+# ---- Reportes ----
+
+def test_paginacion_de_reportes_por_clave(bd):
+    ana, beto = _usuario(bd, "ana"), _usuario(bd, "beto")
+    for i in range(7):  # misma fecha (CURRENT_TIMESTAMP): desempata el id
+        assert bd.guardar_reporte(ana if i % 3 else beto, "Espárrago", "Cultivo saludable",
+                                  i, "No aplica", "", "")[0]
+    todos = bd.listar_reportes(rol="supervisor")
+    assert len(todos) == 7 and all(len(r) == 11 for r in todos)
+
+    vistos, ultima = [], None
+    while True:
+        pagina = bd.listar_reportes_pagina(after_fecha=ultima[2] if ultima else None,
+                                           after_id=ultima[0] if ultima else None, limit=3)
+        vistos += [r[0] for r in pagina]
+        if len(pagina) < 3:
+            break
+        ultima = pagina[-1]
+    assert vistos == sorted((r[0] for r in todos), reverse=True)
+
+    de_ana = bd.listar_reportes_pagina(usuario_id=ana, limit=50)
+    assert {r[1] for r in de_ana} == {ana} and len(de_ana) == 4
+
+def test_fuente_paginada_recorre_todos_los_reportes(bd):
+    ana = _usuario(bd, "ana")
+    for i in range(5):
+        bd.guardar_reporte(ana, "Espárrago", "Cultivo saludable", i, "No aplica", "", "")
+    fuente = FuentePaginada(lambda ultima, limite: bd.listar_reportes_pagina(
+        after_fecha=ultima[2] if ultima else None, after_id=ultima[0] if ultima else None,
+        limit=limite), tam_pagina=2)
+    ids = []
+    while fuente.hay_mas():
+        ids += [r[0] for r in fuente.siguiente(10)]
+    assert ids == [5, 4, 3, 2, 1]
+
+def test_estado_y_busqueda_de_reportes(bd):
+    ana = _usuario(bd, "ana")
+    for _ in range(3):
+        bd.guardar_reporte(ana, "Espárrago", "Cultivo saludable", 1, "No aplica", "", "")
+    assert bd.actualizar_estado_reporte(1, "aprobado", "Revisar roya")
+    assert bd.actualizar_estado_reporte(3, "pendiente", "¿Roya? 100%")
+    assert not bd.actualizar_estado_reporte(2, "inexistente")
+    assert bd.contar_reportes_por_estado() == {"pendiente": 2, "aprobado": 1, "rechazado": 0}
+    assert [r[0] for r in bd.buscar_reportes(estado="pendiente", texto="roya")] == [3]
+    assert [r[0] for r in bd.buscar_reportes(texto="roya")] == [3, 1]
+    assert [r[0] for r in bd.buscar_reportes(texto="%")] == [3]  # % literal, no comodín
+    assert [r[11] for r in bd.buscar_reportes(agricultor_id=ana)] == ["ana"] * 3
+    assert not bd.eliminar_reporte(1, ana)  # ya no está pendiente
+    assert bd.eliminar_reporte(2, ana)
+
+# ---- Cosecha -> rollup -> dashboards ----
+
+def test_sesiones_de_cosecha_llegan_al_rollup_y_dashboards(bd):
+    ana, beto = _usuario(bd, "ana"), _usuario(bd, "beto")
+    h = _hectarea(bd)
+    token = bd.token_reporte_cosecha()
+    assert bd.registrar_reporte_cosecha(ana, h, 10, 2) is not None
+    assert bd.registrar_reporte_cosecha(ana, h, 5, 3) is not None
+    ayer = datetime.now() - timedelta(days=1)
+    ids = bd.registrar_reporte_cosecha_lote([
+        {"agricultor_id": beto, "hectarea_id": h, "aptos": 1, "no_aptos": 1, "ts": ayer},
+        {"agricultor_id": beto, "hectarea_id": h, "aptos": 4, "no_aptos": 0, "ts": ayer},
+    ])
+    assert len(ids) == 2
+    assert bd.token_reporte_cosecha() != token
+    # un registro inválido: lanza y no queda ninguno del lote
+    with pytest.raises(KeyError):
+        bd.registrar_reporte_cosecha_lote([
+            {"agricultor_id": beto, "hectarea_id": h, "aptos": 9, "no_aptos": 9},
+            {"agricultor_id": beto, "hectarea_id": h, "aptos": 9},
+        ])
+
+    (fila,) = bd.dashboard_agricultor_diario(ana)
+    assert (fila["total_aptos"], fila["total_no_aptos"], fila["total_registrados"]) == (15, 5, 20)
+    assert fila["pct_aptos"] == 75.0
+    vista = bd.dashboard_agricultor(ana)[0]
+    assert {k: vista[k] for k in ("total_aptos", "total_no_aptos")} == {"total_aptos": 15, "total_no_aptos": 5}
+
+    (sup,) = bd.dashboard_supervisor_diario()
+    assert (sup["total_aptos"], sup["agricultores_participantes"]) == (20, 2)
+    dia = ayer.strftime("%Y-%m-%d")
+    (solo_ayer,) = bd.dashboard_supervisor_diario(dia, dia)
+    assert (solo_ayer["total_aptos"], solo_ayer["agricultores_participantes"]) == (5, 1)
+
+def test_edicion_de_sesion_recalcula_el_rollup(bd):
+    ana = _usuario(bd, "ana")
+    h = _hectarea(bd)
+    rid = bd.registrar_reporte_cosecha(ana, h, 10, 2)
+    token = bd.token_reporte_cosecha()
+    with bd._conn(escritura=True) as c:
+        c.execute("UPDATE reporte_cosecha SET aptos = 1 WHERE id = ?", (rid,))
+    assert bd.token_reporte_cosecha() != token
+    assert bd.dashboard_agricultor_diario(ana)[0]["total_aptos"] == 1
+
+# ---- Actividades ----
+
+def test_aprobar_cosecha_crea_sesion_en_reporte_cosecha(bd):
+    ana, sup = _usuario(bd, "ana"), _usuario(bd, "sup", "supervisor")
+    h = _hectarea(bd)
+    cosecha = bd.registrar_actividad_campo(ana, h, "cosecha", datetime(2025, 3, 1, 8, 0),
+                                           aptos=30, no_aptos=6, cajas=2, kilos=40)
+    riego = bd.registrar_actividad_campo(ana, h, "riego", datetime(2025, 3, 1, 9, 0), cantidad=5, unidad="m3")
+
+    def sesiones():
+        with bd._conn() as c:
+            return c.execute("SELECT agricultor_id, hectarea_id, aptos, no_aptos, fuente "
+                             "FROM reporte_cosecha").fetchall()
+
+    assert sesiones() == []
+    assert [a["id"] for a in bd.listar_actividades_supervisor(estado="pendiente")] == [riego, cosecha]
+    assert bd.actualizar_estado_actividad(riego, "aprobado", sup)
+    assert bd.actualizar_estado_actividad(cosecha, "aprobado", sup, "ok")
+    assert bd.actualizar_estado_actividad(cosecha, "aprobado", sup, "otra vez")  # no duplica
+    assert sesiones() == [(ana, h, 30, 6, "ACTIVIDAD")]
+    assert bd.dashboard_agricultor_diario(ana, "2025-03-01", "2025-03-01")[0]["total_aptos"] == 30
+    assert not bd.eliminar_actividad(cosecha, ana)  # ya revisada
+    with pytest.raises(ValueError):
+        bd.actualizar_estado_actividad(cosecha, "archivado", sup)
+
+# ---- Conexiones ----
+
+def test_no_toca_adaptadores_globales_de_sqlite3():
+    antes = (dict(sqlite3.adapters), dict(sqlite3.converters))
+    importlib.reload(db)
+    assert (dict(sqlite3.adapters), dict(sqlite3.converters)) == antes
+
+def test_fechas_vuelven_como_datetime(bd):
+    ana = _usuario(bd, "ana")
+    bd.guardar_reporte(ana, "Espárrago", "sano", 3, "madura", "a.png", "a.pdf")
+    (fila,) = bd.listar_reportes_pagina(usuario_id=ana)
+    assert isinstance(fila[2], datetime)
+    # y un datetime como parámetro se compara bien con CURRENT_TIMESTAMP
+    assert bd.listar_reportes_pagina(usuario_id=ana, after_fecha=fila[2] + timedelta(seconds=1),
+                                     after_id=fila[0]) == [fila]
+
+def test_esquema_por_ruta(bd, tmp_path, monkeypatch):
+    _usuario(bd, "ana")
+    monkeypatch.setattr(bd, "RUTA_BD", str(tmp_path / "otra.db"))
+    assert bd.obtener_agricultores() == []        # BD nueva: se crea su esquema
+    assert _usuario(bd, "beto")
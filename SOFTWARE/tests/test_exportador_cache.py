@@ -0,0 +1,66 @@
+# test_exportador_cache.py
+# Derivados JPEG de exportador._preparar_imagen: caché acotada con desalojo
+# LRU por mtime y sin temporales sueltos si el guardado falla.
+
+import os
+import time
+
+import pytest
+from PIL import Image
+
+import exportador
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    carpeta = tmp_path / "cache"
+    monkeypatch.setattr(exportador, "CACHE_IMAGENES", str(carpeta))
+    monkeypatch.setattr(exportador, "PDF_DPI", 72)   # 1 pt = 1 px
+    return carpeta
+
+def _png(tmp_path, nombre, color):
+    ruta = tmp_path / nombre
+    Image.new("RGB", (400, 300), color).save(ruta)
+    return str(ruta)
+
+def test_derivado_en_cache_y_acierto(tmp_path, cache):
+    original = _png(tmp_path, "a.png", "red")
+    derivado = exportador._preparar_imagen(original, 200, 150)
+    assert derivado != original and os.path.dirname(derivado) == str(cache)
+    with Image.open(derivado) as im:
+        assert im.format == "JPEG" and im.size == (200, 150)
+    os.utime(derivado, (1, 1))
+    assert exportador._preparar_imagen(original, 200, 150) == derivado
+    assert os.path.getmtime(derivado) > 1   # el acierto lo marca como reciente
+
+def test_desalojo_lru(tmp_path, cache, monkeypatch):
+    rutas = []
+    for i, color in enumerate(["red", "green", "blue"]):
+        rutas.append(exportador._preparar_imagen(_png(tmp_path, f"{i}.png", color), 200, 150))
+        os.utime(rutas[-1], (1000 + i, 1000 + i))
+    os.utime(rutas[0], (2000, 2000))       # el primero se volvió a usar
+    tamano = os.path.getsize(rutas[1])
+    monkeypatch.setattr(exportador, "CACHE_IMAGENES_MAX_BYTES",
+                        sum(os.path.getsize(r) for r in rutas) - tamano // 2)
+    exportador._desalojar_imagenes()
+    assert [os.path.exists(r) for r in rutas] == [True, False, True]
+
+def test_temporales_huerfanos(cache):
+    os.makedirs(cache)
+    viejo, reciente = cache / "x.jpg.1.tmp", cache / "y.jpg.2.tmp"
+    viejo.write_bytes(b"0"); reciente.write_bytes(b"0")
+    antes = time.time() - exportador.TMP_HUERFANO_S - 10
+    os.utime(viejo, (antes, antes))
+    exportador._desalojar_imagenes()
+    assert not viejo.exists() and reciente.exists()   # el reciente puede estar en uso
+
+def test_fallo_al_guardar_no_deja_tmp(tmp_path, cache, monkeypatch):
+    original = _png(tmp_path, "a.png", "red")
+
+    def save_roto(self, fp, *args, **kwargs):
+        with open(fp, "wb") as f:
+            f.write(b"a medias")
+        raise OSError("disco lleno")
+
+    monkeypatch.setattr(Image.Image, "save", save_roto)
+    assert exportador._preparar_imagen(original, 200, 150) == original
+    assert os.listdir(cache) == []
@@ -0,0 +1,76 @@
+# test_ingesta.py
+# PNG anotados de carga_agricultor: nombres únicos por ruta, fallo de
+# escritura detectado y sesiones registradas solo de las imágenes guardadas.
+
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("PyQt5")
+os.environ.setdefault("AGROSCAN_DB_BACKEND", "sqlite")  # database.py sin SQL Server
+
+import carga_agricultor as ca
+
+@pytest.fixture(autouse=True)
+def en_tmp(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)   # reports/imagenes se crea relativo al cwd
+
+def _imagen():
+    return np.zeros((8, 8, 3), dtype=np.uint8)
+
+def test_homonimas_no_se_pisan(tmp_path):
+    a = ca._guardar_anotada(str(tmp_path / "sd1" / "IMG_0001.jpg"), _imagen())
+    b = ca._guardar_anotada(str(tmp_path / "sd2" / "IMG_0001.jpg"), _imagen())
+    assert a != b and os.path.exists(a) and os.path.exists(b)
+    assert os.path.basename(a).startswith("IMG_0001_")
+
+def test_imwrite_fallido_lanza(monkeypatch):
+    monkeypatch.setattr(ca.cv2, "imwrite", lambda *a, **k: False)
+    with pytest.raises(OSError):
+        ca._guardar_anotada("foto.jpg", _imagen())
+
+def test_ingesta_no_registra_imagenes_sin_png(monkeypatch):
+    resultados = [
+        {"path": "ok.jpg", "error": None, "conteo": {"sanos": 3, "enfermos": 1}, "annotated": _imagen()},
+        {"path": "mala.jpg", "error": "no se pudo leer", "conteo": None, "annotated": None},
+        {"path": "sin_disco.jpg", "error": None, "conteo": {"sanos": 5, "enfermos": 5}, "annotated": _imagen()},
+    ]
+    monkeypatch.setattr(ca, "iterar_lote_yolo", lambda *a, **k: iter(resultados))
+    real = ca._guardar_anotada
+
+    def guardar(path, image):
+        if path == "sin_disco.jpg":
+            raise OSError("disco lleno")
+        return real(path, image)
+
+    monkeypatch.setattr(ca, "_guardar_anotada", guardar)
+    monkeypatch.setattr(ca, "hectarea_activa_de_agricultor", lambda uid: {"hectarea_id": 7, "codigo": "H-7"})
+    registrados = []
+    monkeypatch.setattr(ca, "registrar_reporte_cosecha_lote",
+                        lambda regs: registrados.extend(regs) or list(range(1, len(regs) + 1)))
+
+    trabajo = ca.TrabajoIngesta(1, [r["path"] for r in resultados], usuario_id=42)
+    res = []
+    trabajo.senales.resultado.connect(lambda _id, r: res.append(r))
+    trabajo._ingestar()
+
+    assert [(r["aptos"], r["no_aptos"]) for r in registrados] == [(3, 1)]
+    assert sorted(res[0]["fallidas"]) == ["mala.jpg", "sin_disco.jpg"]
+    assert (res[0]["sanos"], res[0]["enfermos"]) == (3, 1)
+
+def test_ingesta_con_fallo_al_registrar(monkeypatch):
+    resultados = [{"path": "ok.jpg", "error": None, "conteo": {"sanos": 2, "enfermos": 0}, "annotated": _imagen()}]
+    monkeypatch.setattr(ca, "iterar_lote_yolo", lambda *a, **k: iter(resultados))
+    monkeypatch.setattr(ca, "hectarea_activa_de_agricultor", lambda uid: {"hectarea_id": 7, "codigo": "H-7"})
+
+    def lote_caido(regs):
+        raise RuntimeError("sin conexión")
+
+    monkeypatch.setattr(ca, "registrar_reporte_cosecha_lote", lote_caido)
+    trabajo = ca.TrabajoIngesta(1, ["ok.jpg"], usuario_id=42)
+    res = []
+    trabajo.senales.resultado.connect(lambda _id, r: res.append(r))
+    trabajo._ingestar()
+    assert res[0]["ids"] is None and res[0]["error_registro"] == "sin conexión"
+    assert res[0]["sanos"] == 2
@@ -0,0 +1,65 @@
+# test_nms.py
+# NMS vectorizado (_nms_arrays / _group_and_nms) contra una versión de
+# referencia caja a caja.
+
+import numpy as np
+import pytest
+
+import yolo_service
+from yolo_service import _group_and_nms, _nms_arrays
+
+def _iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+def _nms_referencia(boxes, scores, umbral):
+    orden = sorted(range(len(boxes)), key=lambda i: -scores[i])
+    keep = []
+    for i in orden:
+        if all(_iou(boxes[i], boxes[j]) <= umbral for j in keep):
+            keep.append(i)
+    return keep
+
+def _cajas(n, semilla):
+    rng = np.random.default_rng(semilla)
+    xy = rng.uniform(0, 500, size=(n, 2))
+    wh = rng.uniform(10, 120, size=(n, 2))
+    return np.hstack([xy, xy + wh]).astype(np.float32), rng.uniform(0.25, 1.0, size=n)
+
+@pytest.mark.parametrize("semilla", range(5))
+def test_igual_que_la_referencia(semilla):
+    boxes, scores = _cajas(300, semilla)
+    assert _nms_arrays(boxes, scores, 0.3).tolist() == _nms_referencia(boxes.tolist(), scores.tolist(), 0.3)
+
+def test_sin_matriz_completa_da_lo_mismo(monkeypatch):
+    boxes, scores = _cajas(200, 7)
+    esperado = _nms_arrays(boxes, scores, 0.3).tolist()
+    monkeypatch.setattr(yolo_service, "_NMS_MATRIX_MAX", 10)  # fuerza el cálculo fila a fila
+    assert _nms_arrays(boxes, scores, 0.3).tolist() == esperado
+
+def test_vacio():
+    assert len(_nms_arrays(np.zeros((0, 4), np.float32), np.zeros(0), 0.3)) == 0
+    assert _group_and_nms([]) == []
+
+def test_clases_distintas_no_se_suprimen():
+    dets = [
+        {"label": "Espárrago sano", "box": [10, 10, 100, 100], "confidence": 0.9},
+        {"label": "Espárrago enfermo", "box": [12, 12, 100, 100], "confidence": 0.8},
+        {"label": "Espárrago sano", "box": [11, 11, 101, 101], "confidence": 0.7},
+    ]
+    assert [d["confidence"] for d in _group_and_nms(dets)] == [0.9, 0.8]
+
+def test_resultado_agrupado_por_etiqueta():
+    dets = [
+        {"label": "Espárrago sano", "box": [0, 0, 10, 10], "confidence": 0.5},
+        {"label": "Espárrago enfermo", "box": [50, 50, 60, 60], "confidence": 0.9},
+        {"label": "Espárrago sano", "box": [100, 100, 110, 110], "confidence": 0.8},
+        {"label": "Espárrago enfermo", "box": [200, 200, 210, 210], "confidence": 0.6},
+    ]
+    assert [(d["label"], d["confidence"]) for d in _group_and_nms(dets)] == [
+        ("Espárrago sano", 0.8), ("Espárrago sano", 0.5),
+        ("Espárrago enfermo", 0.9), ("Espárrago enfermo", 0.6),
+    ]
@@ -0,0 +1,44 @@
+# test_servidor_inferencia.py
+# Clave del canal cliente/servidor: nunca una por defecto, secreto por
+# instalación solo legible por su dueño.
+
+import os
+import stat
+
+import numpy as np
+import pytest
+
+import servidor_inferencia as si
+
+@pytest.fixture
+def ruta_clave(tmp_path, monkeypatch):
+    ruta = str(tmp_path / "agroscan" / "inferencia.clave")
+    monkeypatch.setattr(si, "RUTA_CLAVE", ruta)
+    monkeypatch.delenv("AGROSCAN_INFERENCIA_CLAVE", raising=False)
+    return ruta
+
+def test_sin_archivo_no_hay_clave_ni_servidor(ruta_clave, monkeypatch):
+    monkeypatch.setattr(si, "_ultimo_fallo", 0.0)
+    assert si._clave() is None
+    assert si.inferir_remoto([np.zeros((4, 4, 3), np.uint8)]) is None
+
+def test_el_servidor_genera_un_secreto_aleatorio(ruta_clave):
+    clave = si._clave(crear=True)
+    assert clave and len(clave) >= 32
+    assert si._clave() == clave
+    if os.name == "posix":
+        assert stat.S_IMODE(os.stat(ruta_clave).st_mode) == 0o600
+    os.remove(ruta_clave)
+    assert si._clave(crear=True) != clave
+
+@pytest.mark.skipif(os.name != "posix", reason="permisos POSIX")
+def test_rechaza_clave_legible_por_otros(ruta_clave):
+    si._clave(crear=True)
+    os.chmod(ruta_clave, 0o644)
+    with pytest.raises(PermissionError):
+        si._clave()
+
+def test_variable_de_entorno_tiene_prioridad(ruta_clave, monkeypatch):
+    monkeypatch.setenv("AGROSCAN_INFERENCIA_CLAVE", "secreto-de-prueba")
+    assert si._clave(crear=True) == b"secreto-de-prueba"
+    assert not os.path.exists(ruta_clave)
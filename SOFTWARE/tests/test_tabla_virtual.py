@@ -0,0 +1,42 @@
+# test_tabla_virtual.py
+# Orden en el cliente de ModeloTablaVirtual: con FuenteLista ordena todas las
+# filas (no solo la página cargada); con fuentes paginadas no se reordena.
+
+import pytest
+
+pytest.importorskip("PyQt5")
+
+from PyQt5.QtCore import Qt, QModelIndex
+
+from tabla_virtual import Columna, FuenteLista, FuentePaginada, ModeloTablaVirtual
+
+def _columnas():
+    return [Columna("N", lambda f: f)]
+
+def test_fuente_lista_ordena_todas_las_filas():
+    modelo = ModeloTablaVirtual(_columnas(), FuenteLista(range(25)), tam_pagina=10)
+    modelo.recargar()
+    assert modelo.rowCount() == 10
+    modelo.sort(0, Qt.DescendingOrder)
+    assert modelo.filas() == list(range(24, -1, -1))
+    assert not modelo.canFetchMore(QModelIndex())
+
+def test_recargar_conserva_el_orden():
+    modelo = ModeloTablaVirtual(_columnas(), FuenteLista([3, 1, 2]), tam_pagina=2)
+    modelo.sort(0, Qt.AscendingOrder)
+    modelo.cambiar_fuente(FuenteLista([9, 7, 8]))
+    assert modelo.filas() == [7, 8, 9]
+
+def test_fuente_paginada_no_se_ordena_en_el_cliente():
+    datos = list(range(100, 0, -1))      # orden de la consulta: descendente
+
+    def pagina(ultima, limite):
+        inicio = 0 if ultima is None else datos.index(ultima) + 1
+        return datos[inicio:inicio + limite]
+
+    modelo = ModeloTablaVirtual(_columnas(), FuentePaginada(pagina, 10), tam_pagina=10)
+    modelo.recargar()
+    assert not modelo.ordenable()
+    modelo.sort(0, Qt.AscendingOrder)
+    modelo.fetchMore(QModelIndex())
+    assert modelo.filas() == datos[:20]
@@ -0,0 +1,62 @@
+# test_teselado.py
+# _detectar_teselado con un detector simulado: cada tesela "ve" la parte de
+# cada objeto que cae dentro de ella (como YOLO con un objeto cortado).
+
+import numpy as np
+import pytest
+
+import yolo_service
+
+ETIQUETA = "Espárrago sano"
+
+def _detector(objetos, teselas_vistas):
+    """_inferir_lote falso: devuelve, por recorte, los objetos recortados a la tesela."""
+    def _inferir(recortes, conf_threshold=0.25):
+        salida = []
+        for recorte in recortes:
+            x0, y0 = teselas_vistas.pop(0)
+            alto, ancho = recorte.shape[:2]
+            dets = []
+            for ox1, oy1, ox2, oy2 in objetos:
+                bx1, by1 = max(ox1 - x0, 0), max(oy1 - y0, 0)
+                bx2, by2 = min(ox2 - x0, ancho), min(oy2 - y0, alto)
+                if bx2 - bx1 > 4 and by2 - by1 > 4:
+                    dets.append({"name": "sano", "label": ETIQUETA,
+                                 "box": [bx1, by1, bx2, by2], "confidence": 0.9})
+            salida.append(dets)
+        return salida
+    return _inferir
+
+def _detectar(monkeypatch, objetos, alto=1200, ancho=1200, tam=640, solape=0.2):
+    teselas = yolo_service._teselas(alto, ancho, tam, solape)
+    monkeypatch.setattr(yolo_service, "_inferir_lote",
+                        _detector(objetos, [(t[0], t[1]) for t in teselas]))
+    img = np.zeros((alto, ancho, 3), dtype=np.uint8)
+    return yolo_service._detectar_teselado(img, 0.25, 0.30, tam, solape, 8)
+
+def test_objeto_mayor_que_el_solape_en_la_costura_se_cuenta_una_vez(monkeypatch):
+    # solape de 128 px (teselas en y=0 y y=512); turión de 250 px cortado en ambas
+    dets = _detectar(monkeypatch, [(300, 450, 340, 700)])
+    assert len(dets) == 1
+    assert dets[0]["box"] == [300, 450, 340, 700]
+
+def test_objeto_en_el_cruce_de_cuatro_teselas(monkeypatch):
+    dets = _detectar(monkeypatch, [(480, 450, 680, 700)])
+    assert len(dets) == 1
+    assert dets[0]["box"] == [480, 450, 680, 700]
+
+def test_objeto_dentro_del_solape_no_se_duplica(monkeypatch):
+    # entero en ambas teselas y cortado en ninguna
+    dets = _detectar(monkeypatch, [(300, 530, 340, 620)])
+    assert len(dets) == 1
+    assert dets[0]["box"] == [300, 530, 340, 620]
+
+def test_objetos_vecinos_en_la_costura_no_se_fusionan(monkeypatch):
+    objetos = [(300, 450, 340, 700), (360, 450, 400, 700)]
+    dets = _detectar(monkeypatch, objetos)
+    assert sorted(d["box"] for d in dets) == [list(o) for o in objetos]
+
+@pytest.mark.parametrize("objeto", [(50, 50, 120, 200), (1000, 1050, 1150, 1190)])
+def test_objeto_lejos_de_las_costuras(monkeypatch, objeto):
+    dets = _detectar(monkeypatch, [objeto])
+    assert [d["box"] for d in dets] == [list(objeto)]
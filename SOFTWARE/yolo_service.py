@@ -1,20 +1,165 @@
 # yolo_service.py
 import os
+import hashlib
+import threading
 import cv2
 import numpy as np
-from typing import Dict, List, Tuple, Optional, Iterable, Union
-from ultralytics import YOLO
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple, Optional, Iterable, Iterator, Union
 from clases import CLASES_MAP  # usamos normalización externa
+from cache_detecciones import CacheDetecciones, obtener_cache, hash_bytes, hash_archivo
 
 # =========================
 # Configuración del modelo único
 # =========================
-RUTA_MODELO = r"D:\Data\CARRERA\EVO\AGROSCAN\SOFTWARE\models\Proyecto Esparrago.pt"
+RUTA_MODELO = os.getenv(
+    "AGROSCAN_MODELO",
+    r"D:\Data\CARRERA\EVO\AGROSCAN\SOFTWARE\models\Proyecto Esparrago.pt",
+)
 
-if not os.path.exists(RUTA_MODELO):
-    raise FileNotFoundError(f"No se encontró el modelo en: {RUTA_MODELO}")
+# Backend de inferencia: "torch" (Ultralytics) u "onnx" (ONNX Runtime en CPU,
+# ver backend_onnx.py). El .onnx se exporta desde RUTA_MODELO la primera vez.
+BACKEND = os.getenv("AGROSCAN_BACKEND", "torch").strip().lower()
+ONNX_INT8 = os.getenv("AGROSCAN_ONNX_INT8", "0") == "1"
 
-MODEL = YOLO(RUTA_MODELO)
+def _ruta_onnx() -> str:
+    from backend_onnx import ruta_onnx_para
+    return os.getenv("AGROSCAN_MODELO_ONNX") or ruta_onnx_para(RUTA_MODELO, ONNX_INT8)
+
+def ruta_pesos_activa() -> str:
+    """Archivo de pesos que usa el backend actual (identifica el modelo en la caché)."""
+    return _ruta_onnx() if BACKEND == "onnx" else RUTA_MODELO
+
+class _ModeloPerezoso:
+    """
+    Contenedor thread-safe del modelo YOLO. Los pesos (y torch/ultralytics)
+    no se cargan al importar el módulo, sino en el primer get() o en
+    precargar(), que lo hace en un hilo de fondo.
+    """
+    def __init__(self, ruta: str, backend: str = "torch"):
+        self.ruta = ruta
+        self.backend = backend
+        self._modelo = None
+        self._error: Optional[BaseException] = None
+        self._lock = threading.Lock()       # serializa la carga
+        self._cb_lock = threading.Lock()    # protege _callbacks (no bloquea durante la carga)
+        self._listo = threading.Event()
+        self._callbacks: List[Callable[[Optional[BaseException]], None]] = []
+        self._hilo: Optional[threading.Thread] = None
+        self._remoto = False  # True: se infiere en el servidor, sin pesos locales
+
+    def _cargar(self):
+        if self.backend == "onnx":
+            from backend_onnx import ModeloOnnx, exportar_onnx
+            ruta_onnx = _ruta_onnx()
+            if not os.path.exists(ruta_onnx):
+                if not os.path.exists(self.ruta):
+                    raise FileNotFoundError(f"No se encontró el modelo en: {self.ruta} ni {ruta_onnx}")
+                exportar_onnx(self.ruta, ruta_onnx, int8=ONNX_INT8)
+            modelo = ModeloOnnx(ruta_onnx)
+        else:
+            if not os.path.exists(self.ruta):
+                raise FileNotFoundError(f"No se encontró el modelo en: {self.ruta}")
+            from ultralytics import YOLO  # import pesado (torch): solo al cargar
+            modelo = YOLO(self.ruta)
+        # Warm-up: la primera inferencia inicializa capas/fusión; la pagamos aquí
+        modelo(np.zeros((640, 640, 3), dtype=np.uint8), verbose=False)
+        return modelo
+
+    def get(self):
+        """Devuelve el modelo, cargándolo si hace falta (bloquea hasta tenerlo)."""
+        if self._modelo is not None:
+            return self._modelo
+        with self._lock:
+            if self._modelo is None:
+                try:
+                    self._modelo = self._cargar()
+                    self._error = None
+                except BaseException as e:
+                    self._error = e
+                    self._notificar()
+                    raise
+                self._notificar()
+        return self._modelo
+
+    def precargar(self, remoto: Optional[Callable[[], bool]] = None) -> None:
+        """
+        Inicia la carga en un hilo daemon (idempotente). Si `remoto()` devuelve
+        True (hay servidor de inferencia), se marca listo sin cargar los pesos.
+        """
+        if self.esta_listo() or (self._hilo and self._hilo.is_alive()):
+            return
+
+        def _run():
+            try:
+                if remoto is not None and remoto():
+                    self._remoto = True
+                    self._notificar()
+                    return
+                self.get()
+            except BaseException:
+                pass  # el error queda en self._error y se notifica a los callbacks
+
+        self._hilo = threading.Thread(target=_run, name="yolo-warmup", daemon=True)
+        self._hilo.start()
+
+    def esta_listo(self) -> bool:
+        return self._modelo is not None or self._remoto
+
+    def esperar(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que termine la carga (con o sin error). True si se puede analizar."""
+        self._listo.wait(timeout)
+        return self.esta_listo()
+
+    def al_estar_listo(self, callback: Callable[[Optional[BaseException]], None]) -> None:
+        """
+        Registra callback(error) para cuando termine la carga (error=None si fue bien).
+        Se invoca desde el hilo que carga el modelo; si ya terminó, se llama enseguida.
+        """
+        with self._cb_lock:
+            if not self._listo.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self._error)
+
+    def _notificar(self) -> None:
+        with self._cb_lock:
+            self._listo.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for cb in callbacks:
+            try:
+                cb(self._error)
+            except Exception:
+                pass
+
+_MODELO = _ModeloPerezoso(RUTA_MODELO, BACKEND)
+
+# Servidor local de inferencia (servidor_inferencia.py): se usa si está levantado
+SERVIDOR_HABILITADO = os.getenv("AGROSCAN_SERVIDOR", "1") != "0"
+
+def _servidor_disponible() -> bool:
+    from servidor_inferencia import servidor_disponible
+    return servidor_disponible()
+
+def get_model():
+    """Modelo YOLO cargado (lo carga en este hilo si aún no lo está)."""
+    return _MODELO.get()
+
+def precargar_modelo() -> None:
+    """
+    Carga el modelo en segundo plano (llamar tras el login). Si el servidor de
+    inferencia está levantado no se cargan pesos en este proceso.
+    """
+    _MODELO.precargar(remoto=_servidor_disponible if SERVIDOR_HABILITADO else None)
+
+def modelo_listo() -> bool:
+    return _MODELO.esta_listo()
+
+def esperar_modelo(timeout: Optional[float] = None) -> bool:
+    return _MODELO.esperar(timeout)
+
+def al_modelo_listo(callback: Callable[[Optional[BaseException]], None]) -> None:
+    _MODELO.al_estar_listo(callback)
 
 # =========================
 # Utilidades de colores
@@ -29,38 +174,54 @@ def _color_from_label(label: str) -> Tuple[int, int, int]:
     return ((h >> 0) & 0xFF, (h >> 8) & 0xFF, (h >> 16) & 0xFF)
 
 # =========================
-# NMS simple por IoU
+# NMS vectorizado (NumPy)
 # =========================
-def _iou(box1: List[int], box2: List[int]) -> float:
-    x1 = max(box1[0], box2[0])
-    y1 = max(box1[1], box2[1])
-    x2 = min(box1[2], box2[2])
-    y2 = min(box1[3], box2[3])
-    inter_w, inter_h = max(0, x2 - x1), max(0, y2 - y1)
-    inter_area = inter_w * inter_h
-    if inter_area <= 0:
-        return 0.0
-    area1 = max(0, box1[2]-box1[0]) * max(0, box1[3]-box1[1])
-    area2 = max(0, box2[2]-box2[0]) * max(0, box2[3]-box2[1])
-    denom = float(area1 + area2 - inter_area)
-    return inter_area / denom if denom > 0 else 0.0
+# Por encima de este número de cajas no se arma la matriz IoU completa (N x N)
+# para no disparar la memoria; se calcula fila a fila con el mismo broadcast.
+_NMS_MATRIX_MAX = 2048
 
-def _nms_per_group(dets: List[Dict], iou_threshold: float) -> List[Dict]:
-    keep: List[Dict] = []
-    for d in sorted(dets, key=lambda x: -x["confidence"]):
-        overlapped = any(_iou(d["box"], k["box"]) > iou_threshold for k in keep)
-        if not overlapped:
-            keep.append(d)
-    return keep
+def _iou_matrix(boxes: np.ndarray, others: np.ndarray) -> np.ndarray:
+    """IoU de cada caja de `boxes` (N,4) contra cada caja de `others` (M,4) -> (N,M)."""
+    x1 = np.maximum(boxes[:, None, 0], others[None, :, 0])
+    y1 = np.maximum(boxes[:, None, 1], others[None, :, 1])
+    x2 = np.minimum(boxes[:, None, 2], others[None, :, 2])
+    y2 = np.minimum(boxes[:, None, 3], others[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_b = np.clip(boxes[:, 2] - boxes[:, 0], 0, None) * np.clip(boxes[:, 3] - boxes[:, 1], 0, None)
+    area_o = np.clip(others[:, 2] - others[:, 0], 0, None) * np.clip(others[:, 3] - others[:, 1], 0, None)
+    denom = area_b[:, None] + area_o[None, :] - inter
+    with np.errstate(divide="ignore", invalid="ignore"):
+        iou = np.where((inter > 0) & (denom > 0), inter / denom, 0.0)
+    return iou
+
+def _nms_arrays(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """
+    NMS greedy sobre arrays: boxes (N,4), scores (N,).
+    Devuelve los índices conservados, ordenados por score descendente.
+    """
+    n = len(boxes)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    order = np.argsort(-scores, kind="stable")
+    boxes = boxes[order].astype(np.float32, copy=False)
+    suppressed = np.zeros(n, dtype=bool)
+    iou = _iou_matrix(boxes, boxes) if n <= _NMS_MATRIX_MAX else None
+
+    keep: List[int] = []
+    for i in range(n):
+        if suppressed[i]:
+            continue
+        keep.append(i)
+        fila = iou[i] if iou is not None else _iou_matrix(boxes[i:i + 1], boxes)[0]
+        suppressed |= fila > iou_threshold
+    return order[np.asarray(keep, dtype=np.int64)]
 
 # =========================
 # Core de análisis
 # =========================
-def _run_model(img_or_path: Union[str, np.ndarray],
-               conf_threshold: float = 0.25) -> List[Dict]:
+def _parse_result(res) -> List[Dict]:
+    """Convierte un Results de Ultralytics al formato de detección de la app."""
     detections: List[Dict] = []
-    res = MODEL(img_or_path, conf=conf_threshold)[0]
-
     for x1, y1, x2, y2, conf, cls in res.boxes.data.tolist():
         cls = int(cls)
         raw_name = res.names[cls] if hasattr(res, "names") else str(cls)
@@ -75,18 +236,57 @@ def _run_model(img_or_path: Union[str, np.ndarray],
         })
     return detections
 
+def _run_model(img_or_path: Union[str, np.ndarray],
+               conf_threshold: float = 0.25) -> List[Dict]:
+    res = get_model()(img_or_path, conf=conf_threshold)[0]
+    return _parse_result(res)
+
+def _run_model_batch(images: List[np.ndarray],
+                     conf_threshold: float = 0.25) -> List[List[Dict]]:
+    """Una sola pasada del modelo para todo el lote; respeta el orden de entrada."""
+    if not images:
+        return []
+    results = get_model()(images, conf=conf_threshold, verbose=False)
+    return [_parse_result(res) for res in results]
+
+def _inferir_lote(images: List[np.ndarray],
+                  conf_threshold: float = 0.25) -> List[List[Dict]]:
+    """
+    Detecciones crudas por imagen: en el servidor si está disponible; si no
+    lo está o no responde a tiempo, en proceso (carga el modelo local si hace falta).
+    """
+    if SERVIDOR_HABILITADO and images:
+        from servidor_inferencia import inferir_remoto
+        remoto = inferir_remoto(images, conf_threshold=conf_threshold)
+        if remoto is not None:
+            return remoto
+    return _run_model_batch(images, conf_threshold=conf_threshold)
+
 def _group_and_nms(detections: List[Dict],
                    iou_threshold: float = 0.30) -> List[Dict]:
-    groups: Dict[str, List[Dict]] = {}
-    for d in detections:
-        groups.setdefault(d["label"], []).append(d)
-    final_dets: List[Dict] = []
-    for _, dets in groups.items():
-        final_dets.extend(_nms_per_group(dets, iou_threshold))
-    return final_dets
-
-def _draw_dets(image: np.ndarray, dets: List[Dict]) -> np.ndarray:
-    out = image.copy()
+    """
+    NMS por etiqueta en una sola pasada: cada grupo se desplaza a una región
+    disjunta del plano (offset por clase) para que nunca se solapen entre sí.
+    Como antes, el resultado sale agrupado por etiqueta (en orden de primera
+    aparición) y, dentro de cada una, por confianza descendente.
+    """
+    if not detections:
+        return []
+    label_idx: Dict[str, int] = {}
+    cls = np.fromiter((label_idx.setdefault(d["label"], len(label_idx)) for d in detections),
+                      dtype=np.float32, count=len(detections))
+    boxes = np.asarray([d["box"] for d in detections], dtype=np.float32).reshape(-1, 4)
+    scores = np.fromiter((d["confidence"] for d in detections),
+                         dtype=np.float64, count=len(detections))
+
+    offset = float(boxes.max() - boxes.min()) + 1.0 if len(label_idx) > 1 else 0.0
+    keep = _nms_arrays(boxes + (cls * offset)[:, None], scores, iou_threshold)
+    keep = keep[np.argsort(cls[keep], kind="stable")]  # por etiqueta; estable: conserva el score
+    return [detections[i] for i in keep]
+
+def _draw_dets(image: np.ndarray, dets: List[Dict], inplace: bool = False) -> np.ndarray:
+    """Dibuja las cajas. Con inplace=True pinta sobre `image` (sin copiar el buffer)."""
+    out = image if inplace else image.copy()
     for d in dets:
         x1, y1, x2, y2 = d["box"]
         color = _color_from_label(d["label"])
@@ -96,25 +296,317 @@ def _draw_dets(image: np.ndarray, dets: List[Dict]) -> np.ndarray:
                     cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2, cv2.LINE_AA)
     return out
 
+# =========================
+# Lectura de imágenes y caché de detecciones
+# =========================
+CACHE_HABILITADA = os.getenv("AGROSCAN_CACHE", "1") != "0"
+
+def _hash_array(img: np.ndarray) -> str:
+    h = hashlib.sha256(f"{img.shape}|{img.dtype}".encode())
+    h.update(np.ascontiguousarray(img).data)
+    return h.hexdigest()
+
+def _leer_imagen(item: Union[str, np.ndarray],
+                 con_hash: bool = False) -> Tuple[Optional[np.ndarray], Optional[str]]:
+    """
+    Decodifica (una sola vez) y, si se pide, calcula el hash del contenido.
+    Para rutas se leen los bytes del archivo y se decodifican desde memoria,
+    así el hash no obliga a leer el archivo dos veces.
+    """
+    if not isinstance(item, str):
+        if item is None:
+            return None, None
+        return item, (_hash_array(item) if con_hash else None)
+    try:
+        buf = np.fromfile(item, dtype=np.uint8)
+    except OSError:
+        return None, None
+    img = cv2.imdecode(buf, cv2.IMREAD_COLOR) if buf.size else None
+    if img is None:
+        return None, None
+    return img, (hash_bytes(buf) if con_hash else None)
+
+def _clave_cache(hash_img: Optional[str], conf_threshold: float,
+                 iou_threshold: float, extra: str = "") -> Optional[str]:
+    if not hash_img:
+        return None
+    try:
+        hash_modelo = hash_archivo(ruta_pesos_activa())
+    except OSError:
+        return None
+    return CacheDetecciones.clave(hash_img, hash_modelo, conf_threshold, iou_threshold, extra)
+
+# =========================
+# Inferencia por teselas (imágenes de alta resolución)
+# =========================
+TESELA_TAM = int(os.getenv("AGROSCAN_TESELA_TAM", "640"))
+TESELA_SOLAPE = float(os.getenv("AGROSCAN_TESELA_SOLAPE", "0.20"))
+TESELA_LOTE = int(os.getenv("AGROSCAN_TESELA_LOTE", "8"))
+# Lado (px) a partir del cual analizar_imagen_yolo usa teselas solo; 0 = nunca
+TESELADO_AUTO_PX = int(os.getenv("AGROSCAN_TESELADO_AUTO_PX", "0"))
+
+def _posiciones(largo: int, tam: int, paso: int) -> List[int]:
+    if largo <= tam:
+        return [0]
+    pos = list(range(0, largo - tam + 1, paso))
+    if pos[-1] + tam < largo:
+        pos.append(largo - tam)  # última tesela pegada al borde
+    return pos
+
+def _teselas(alto: int, ancho: int, tam: int, solape: float) -> List[Tuple[int, int, int, int]]:
+    """Rejilla de teselas (x0, y0, x1, y1) de lado `tam` con solape fraccional."""
+    paso = max(1, int(round(tam * (1.0 - solape))))
+    return [(x, y, min(x + tam, ancho), min(y + tam, alto))
+            for y in _posiciones(alto, tam, paso)
+            for x in _posiciones(ancho, tam, paso)]
+
+# Fracción del área de un trozo cortado que debe cubrir otra caja de la misma
+# clase para considerarla el mismo objeto (intersección / área del trozo)
+TESELA_FUSION_IOS = 0.5
+
+def _ios_matrix(boxes: np.ndarray, others: np.ndarray) -> np.ndarray:
+    """Intersección sobre el área de cada caja de `boxes` (N,4) contra `others` (M,4) -> (N,M)."""
+    x1 = np.maximum(boxes[:, None, 0], others[None, :, 0])
+    y1 = np.maximum(boxes[:, None, 1], others[None, :, 1])
+    x2 = np.minimum(boxes[:, None, 2], others[None, :, 2])
+    y2 = np.minimum(boxes[:, None, 3], others[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_b = np.clip(boxes[:, 2] - boxes[:, 0], 0, None) * np.clip(boxes[:, 3] - boxes[:, 1], 0, None)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(area_b[:, None] > 0, inter / area_b[:, None], 0.0)
+
+def _unir_cortadas(enteras: List[Dict], cortadas: List[Dict]) -> List[Dict]:
+    """
+    Trozos de objetos cortados por el borde interior de una tesela:
+    - si una caja entera de la misma clase (de otra tesela) ya los cubre, sobran;
+    - si no (objeto más grande que el solape, cortado en todas las teselas),
+      los trozos que se solapan se unen en una sola caja (la unión de todos,
+      con la confianza del mejor).
+    """
+    unidas: List[Dict] = []
+    for label in dict.fromkeys(d["label"] for d in cortadas):
+        trozos = sorted((d for d in cortadas if d["label"] == label),
+                        key=lambda d: d["confidence"], reverse=True)
+        cajas = np.asarray([d["box"] for d in trozos], dtype=np.float32).reshape(-1, 4)
+        completas = [d["box"] for d in enteras if d["label"] == label]
+        if completas:
+            cubiertos = (_ios_matrix(cajas, np.asarray(completas, dtype=np.float32))
+                         >= TESELA_FUSION_IOS).any(axis=1)
+            trozos = [d for d, c in zip(trozos, cubiertos) if not c]
+            cajas = cajas[~cubiertos]
+        grupos: List[Dict] = []
+        caja_grupos = np.zeros((0, 4), dtype=np.float32)
+        for d, caja in zip(trozos, cajas):
+            if grupos:
+                cruce = np.maximum(_ios_matrix(caja[None], caja_grupos)[0],
+                                   _ios_matrix(caja_grupos, caja[None])[:, 0])
+                j = int(np.argmax(cruce))
+                if cruce[j] >= TESELA_FUSION_IOS:
+                    g = caja_grupos[j]
+                    caja_grupos[j] = [min(g[0], caja[0]), min(g[1], caja[1]),
+                                      max(g[2], caja[2]), max(g[3], caja[3])]
+                    grupos[j]["box"] = [int(v) for v in caja_grupos[j]]
+                    continue
+            grupos.append(dict(d))
+            caja_grupos = np.vstack([caja_grupos, caja[None]])
+        unidas.extend(grupos)
+    return unidas
+
+def _detectar_teselado(img: np.ndarray, conf_threshold: float, iou_threshold: float,
+                       tile_size: int, overlap: float, batch_size: int) -> List[Dict]:
+    """
+    Corta la imagen en teselas solapadas, las infiere por lotes, pasa las cajas a
+    coordenadas globales y las fusiona con el NMS por clase. Las cajas cortadas
+    por un borde interior de su tesela se descartan solo si otra tesela ve el
+    objeto entero; si no (objeto más grande que el solape), los trozos de
+    teselas vecinas se unen en una caja (ver _unir_cortadas).
+    """
+    alto, ancho = img.shape[:2]
+    teselas = _teselas(alto, ancho, tile_size, overlap)
+    margen = 2
+    enteras: List[Dict] = []
+    cortadas: List[Dict] = []
+    for k in range(0, len(teselas), max(1, batch_size)):
+        grupo = teselas[k:k + batch_size]
+        recortes = [np.ascontiguousarray(img[y0:y1, x0:x1]) for x0, y0, x1, y1 in grupo]
+        for (x0, y0, x1, y1), dets in zip(grupo, _inferir_lote(recortes, conf_threshold)):
+            for d in dets:
+                bx1, by1, bx2, by2 = d["box"]
+                corta = ((x0 > 0 and bx1 <= margen) or (y0 > 0 and by1 <= margen) or
+                         (x1 < ancho and bx2 >= (x1 - x0) - margen) or
+                         (y1 < alto and by2 >= (y1 - y0) - margen))
+                d["box"] = [bx1 + x0, by1 + y0, bx2 + x0, by2 + y0]
+                (cortadas if corta else enteras).append(d)
+    return _group_and_nms(enteras + _unir_cortadas(enteras, cortadas), iou_threshold=iou_threshold)
+
+def analizar_imagen_teselada(
+    img_or_path: Union[str, np.ndarray],
+    conf_threshold: float = 0.25,
+    iou_threshold: float = 0.30,
+    draw: bool = True,
+    tile_size: int = TESELA_TAM,
+    overlap: float = TESELA_SOLAPE,
+    batch_size: int = TESELA_LOTE,
+    inplace: bool = False,
+    usar_cache: bool = True
+) -> Tuple[List[Dict], Optional[np.ndarray]]:
+    """
+    Igual que analizar_imagen_yolo, pero para fotos de dron / alta resolución:
+    en lugar de reducir la imagen completa al tamaño de entrada del modelo
+    (los turiones pequeños desaparecen), la recorre en teselas de `tile_size`
+    px con `overlap` de solape y corre todas en lotes de `batch_size`.
+    """
+    return _analizar_una(img_or_path, conf_threshold, iou_threshold, draw, inplace,
+                         usar_cache, teselas=(tile_size, overlap, batch_size))
+
+def _analizar_una(img_or_path: Union[str, np.ndarray], conf_threshold: float,
+                  iou_threshold: float, draw: bool, inplace: bool, usar_cache: bool,
+                  teselas: Optional[Tuple[int, float, int]] = None
+                  ) -> Tuple[List[Dict], Optional[np.ndarray]]:
+    es_ruta = isinstance(img_or_path, str)
+    img, hash_img = _leer_imagen(img_or_path, con_hash=usar_cache and CACHE_HABILITADA)
+    if img is None:
+        return [], None
+
+    # Modo automático: fotos muy grandes van por teselas si así se configuró
+    if teselas is None and TESELADO_AUTO_PX and max(img.shape[:2]) >= TESELADO_AUTO_PX:
+        teselas = (TESELA_TAM, TESELA_SOLAPE, TESELA_LOTE)
+
+    extra = f"tesela={teselas[0]}/{teselas[1]:.3f}" if teselas else ""
+    clave = _clave_cache(hash_img, conf_threshold, iou_threshold, extra)
+    final_dets = obtener_cache().obtener(clave) if clave else None
+    if final_dets is None:
+        if teselas:
+            final_dets = _detectar_teselado(img, conf_threshold, iou_threshold, *teselas)
+        else:
+            raw = _inferir_lote([img], conf_threshold=conf_threshold)[0]
+            final_dets = _group_and_nms(raw, iou_threshold=iou_threshold)
+        if clave:
+            obtener_cache().guardar(clave, final_dets)
+    annotated = _draw_dets(img, final_dets, inplace=es_ruta or inplace) if draw else None
+    return final_dets, annotated
+
 def analizar_imagen_yolo(
     img_or_path: Union[str, np.ndarray],
     conf_threshold: float = 0.25,
     iou_threshold: float = 0.30,
-    draw: bool = True
+    draw: bool = True,
+    inplace: bool = False,
+    usar_cache: bool = True
 ) -> Tuple[List[Dict], Optional[np.ndarray]]:
     """
     Devuelve:
       - detections_final: [{"name","label","box","confidence"}, ...] (con NMS)
       - annotated_image: imagen con cajas o None si draw=False
+
+    La imagen se decodifica una sola vez y el array se pasa al modelo.
+    Si se recibe una ruta, el buffer decodificado es nuestro y se dibuja sobre
+    él; si se recibe un array, solo se pinta encima con inplace=True.
+    Con usar_cache, una imagen ya analizada (mismo contenido, modelo y
+    umbrales) no vuelve a pasar por el modelo.
+    Si AGROSCAN_TESELADO_AUTO_PX > 0, las imágenes cuyo lado mayor lo alcance
+    se analizan por teselas (ver analizar_imagen_teselada).
     """
-    img = cv2.imread(img_or_path) if isinstance(img_or_path, str) else img_or_path
+    return _analizar_una(img_or_path, conf_threshold, iou_threshold, draw, inplace, usar_cache)
+
+def anotar_imagen(img_or_path: Union[str, np.ndarray],
+                  detections: List[Dict]) -> Optional[np.ndarray]:
+    """Redibuja la imagen anotada a partir de detecciones ya calculadas (sin modelo)."""
+    img, _ = _leer_imagen(img_or_path)
     if img is None:
-        return [], None
+        return None
+    return _draw_dets(img, detections, inplace=isinstance(img_or_path, str))
 
-    raw = _run_model(img_or_path, conf_threshold=conf_threshold)
-    final_dets = _group_and_nms(raw, iou_threshold=iou_threshold)
-    annotated = _draw_dets(img, final_dets) if draw else None
-    return final_dets, annotated
+# =========================
+# Análisis por lotes
+# =========================
+def iterar_lote_yolo(
+    paths: Iterable[Union[str, np.ndarray]],
+    batch_size: int = 8,
+    conf_threshold: float = 0.25,
+    iou_threshold: float = 0.30,
+    draw: bool = False,
+    usar_cache: bool = True
+) -> Iterator[Dict]:
+    """
+    Versión en streaming de analizar_lote_yolo: decodifica y procesa un lote
+    de `batch_size` imágenes por pasada y va entregando un resultado por imagen
+    (mismo orden de entrada). Solo mantiene un lote en memoria a la vez.
+    Las imágenes con aciertos en la caché no entran al lote del modelo.
+    """
+    batch_size = max(1, int(batch_size))
+    con_hash = usar_cache and CACHE_HABILITADA
+    pendientes: List[Union[str, np.ndarray]] = []
+
+    with ThreadPoolExecutor(max_workers=min(batch_size, os.cpu_count() or 1)) as pool:
+        def _procesar(items):
+            # la decodificación (y el hash) liberan el GIL: lote en paralelo
+            leidas = list(pool.map(lambda it: _leer_imagen(it, con_hash), items))
+            claves = [_clave_cache(h, conf_threshold, iou_threshold) for _, h in leidas]
+            dets_por_idx: Dict[int, List[Dict]] = {}
+            for i, clave in enumerate(claves):
+                en_cache = obtener_cache().obtener(clave) if clave else None
+                if en_cache is not None:
+                    dets_por_idx[i] = en_cache
+
+            faltan = [i for i, (img, _) in enumerate(leidas)
+                      if img is not None and i not in dets_por_idx]
+            raws = _inferir_lote([leidas[i][0] for i in faltan], conf_threshold=conf_threshold)
+            for i, raw in zip(faltan, raws):
+                dets_por_idx[i] = _group_and_nms(raw, iou_threshold=iou_threshold)
+                if claves[i]:
+                    obtener_cache().guardar(claves[i], dets_por_idx[i])
+
+            for i, item in enumerate(items):
+                ruta = item if isinstance(item, str) else None
+                img = leidas[i][0]
+                if img is None:
+                    yield {"path": ruta, "detections": [], "conteo": conteo_sanos_enfermos([]),
+                           "annotated": None, "error": "No se pudo leer la imagen."}
+                    continue
+                final_dets = dets_por_idx[i]
+                yield {
+                    "path": ruta,
+                    "detections": final_dets,
+                    "conteo": conteo_sanos_enfermos(final_dets),
+                    "annotated": (_draw_dets(img, final_dets, inplace=isinstance(item, str))
+                                  if draw else None),
+                    "error": None,
+                }
+
+        for item in paths:
+            pendientes.append(item)
+            if len(pendientes) >= batch_size:
+                yield from _procesar(pendientes)
+                pendientes = []
+        if pendientes:
+            yield from _procesar(pendientes)
+
+def analizar_lote_yolo(
+    paths: Iterable[Union[str, np.ndarray]],
+    batch_size: int = 8,
+    conf_threshold: float = 0.25,
+    iou_threshold: float = 0.30,
+    draw: bool = False,
+    usar_cache: bool = True
+) -> Tuple[List[Dict], Dict[str, int]]:
+    """
+    Analiza muchas imágenes agrupándolas en lotes de tamaño fijo (una pasada
+    del modelo por lote).
+    Devuelve:
+      - resultados: [{"path","detections","conteo","annotated","error"}, ...]
+        en el mismo orden de entrada (conteo = conteo_sanos_enfermos)
+      - agregado: {"sanos","enfermos","total","imagenes"} de todo el lote
+    """
+    resultados = list(iterar_lote_yolo(paths, batch_size=batch_size,
+                                       conf_threshold=conf_threshold,
+                                       iou_threshold=iou_threshold, draw=draw,
+                                       usar_cache=usar_cache))
+    agregado = {"sanos": 0, "enfermos": 0, "total": 0, "imagenes": len(resultados)}
+    for r in resultados:
+        for k in ("sanos", "enfermos", "total"):
+            agregado[k] += r["conteo"][k]
+    return resultados, agregado
 
 # =========================
 # Resúmenes y conteos